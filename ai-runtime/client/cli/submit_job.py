@@ -33,6 +33,28 @@ def main() -> None:
         default=None,
         help="Sampling temperature",
     )
+    parser.add_argument(
+        "--priority",
+        choices=["interactive", "standard", "bulk"],
+        default=None,
+        help="Priority class (default: standard)",
+    )
+    parser.add_argument(
+        "--deadline-ms",
+        type=int,
+        default=None,
+        help="Drop the request if it cannot complete within this many ms",
+    )
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="Model to run (default: the server's default model)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the response as it is generated",
+    )
     parser.add_argument(
         "--timeout",
         type=int,
@@ -49,10 +71,26 @@ def main() -> None:
             print("ERROR: Server health check failed", file=sys.stderr)
             sys.exit(1)
 
+        if args.stream:
+            for text in client.infer_stream(
+                prompt=args.prompt,
+                max_tokens=args.max_tokens,
+                temperature=args.temperature,
+                priority=args.priority,
+                deadline_ms=args.deadline_ms,
+                model=args.model,
+            ):
+                print(text, end="", flush=True)
+            print()
+            return
+
         response = client.infer(
             prompt=args.prompt,
             max_tokens=args.max_tokens,
             temperature=args.temperature,
+            priority=args.priority,
+            deadline_ms=args.deadline_ms,
+            model=args.model,
         )
 
         print(f"Request ID: {response.request_id}")
@@ -1,6 +1,22 @@
+import json
 import requests
-from typing import Optional
-from shared.schemas.inference import InferenceRequest, InferenceResponse
+from typing import Iterator, Optional
+from shared.schemas.inference import InferenceRequest, InferenceResponse, InferenceStreamChunk
+
+DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"
+
+
+class DeadlineExceededError(TimeoutError):
+    # The server dropped the request because its deadline could not be met
+    pass
+
+
+def _error_code(response: requests.Response) -> Optional[str]:
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        return None
+    return detail.get("code") if isinstance(detail, dict) else None
 
 
 class AIRuntimeClient:
@@ -25,11 +41,17 @@ class AIRuntimeClient:
         prompt: str,
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
+        priority: Optional[str] = None,
+        deadline_ms: Optional[int] = None,
+        model: Optional[str] = None,
     ) -> InferenceResponse:
         request_data = InferenceRequest(
             prompt=prompt,
             max_tokens=max_tokens,
             temperature=temperature,
+            priority=priority,
+            deadline_ms=deadline_ms,
+            model=model,
         )
         
         try:
@@ -38,6 +60,8 @@ class AIRuntimeClient:
                 json=request_data.model_dump(),
                 timeout=self.timeout,
             )
+            if response.status_code == 504 and _error_code(response) == DEADLINE_EXCEEDED:
+                raise DeadlineExceededError(response.json()["detail"].get("message", "Deadline exceeded"))
             response.raise_for_status()
             return InferenceResponse(**response.json())
         except requests.exceptions.Timeout:
@@ -45,3 +69,59 @@ class AIRuntimeClient:
         except requests.exceptions.RequestException as e:
             raise ConnectionError(f"Request failed: {str(e)}")
 
+    def infer_stream(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        priority: Optional[str] = None,
+        deadline_ms: Optional[int] = None,
+        model: Optional[str] = None,
+    ) -> Iterator[str]:
+        # Yields generated text as the server produces it; joined, the pieces
+        # equal what infer() would return. Closing the iterator early closes
+        # the connection.
+        request_data = InferenceRequest(
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            priority=priority,
+            deadline_ms=deadline_ms,
+            model=model,
+        )
+        try:
+            response = self.session.post(
+                f"{self.base_url}/infer/stream",
+                json=request_data.model_dump(),
+                timeout=self.timeout,
+                stream=True,
+            )
+        except requests.exceptions.Timeout:
+            raise TimeoutError(f"Request timed out after {self.timeout} seconds")
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"Request failed: {str(e)}")
+
+        with response:
+            if response.status_code == 504 and _error_code(response) == DEADLINE_EXCEEDED:
+                raise DeadlineExceededError(response.json()["detail"].get("message", "Deadline exceeded"))
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = InferenceStreamChunk(**json.loads(line))
+                    if chunk.error is not None:
+                        message = chunk.error.get("message", "Generation failed")
+                        if chunk.error.get("code") == DEADLINE_EXCEEDED:
+                            raise DeadlineExceededError(message)
+                        raise RuntimeError(message)
+                    if chunk.text:
+                        yield chunk.text
+                    if chunk.done:
+                        return
+            except requests.exceptions.Timeout:
+                raise TimeoutError(f"Request timed out after {self.timeout} seconds")
+            except requests.exceptions.RequestException as e:
+                raise ConnectionError(f"Request failed: {str(e)}")
+        raise ConnectionError("Stream ended before the last chunk")
+
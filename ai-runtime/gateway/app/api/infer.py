@@ -1,6 +1,8 @@
 import httpx
 import logging
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from shared.disconnect import CLIENT_CLOSED_REQUEST, ClientDisconnected, cancel_on_disconnect
 from shared.schemas.inference import InferenceRequest, InferenceResponse
 from gateway.app.core.router import router as node_router
 from gateway.app.core.registry import registry
@@ -11,10 +13,19 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/infer", response_model=InferenceResponse)
-async def infer(
-    request: InferenceRequest, http_request: Request
-) -> InferenceResponse:
+def _node_error_detail(response: httpx.Response):
+    # Structured errors (e.g. DEADLINE_EXCEEDED) are passed through as-is so
+    # clients see the same error code with or without the gateway
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        detail = None
+    if isinstance(detail, dict):
+        return detail
+    return f"Node error: {response.text}"
+
+
+async def _acquire_node():
     node = await node_router.select_node()
     if node is None:
         logger.error("No healthy nodes available")
@@ -27,21 +38,33 @@ async def infer(
         raise HTTPException(
             status_code=503, detail="No inference nodes available"
         )
+    return node
 
+
+@router.post("/infer", response_model=InferenceResponse)
+async def infer(
+    request: InferenceRequest, http_request: Request
+) -> InferenceResponse:
+    # If the client goes away, the call to the node is cancelled and its
+    # connection closed, which cancels the request on the node in turn
+    node = await _acquire_node()
     node_url = f"{node.url.rstrip('/')}/infer"
     start_time = time.time()
 
     try:
         timeout = httpx.Timeout(settings.request_timeout_sec)
         async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                node_url,
-                json=request.model_dump(),
-                headers={
-                    "X-Request-ID": http_request.headers.get(
-                        "X-Request-ID", ""
-                    )
-                },
+            response = await cancel_on_disconnect(
+                http_request,
+                client.post(
+                    node_url,
+                    json=request.model_dump(),
+                    headers={
+                        "X-Request-ID": http_request.headers.get(
+                            "X-Request-ID", ""
+                        )
+                    },
+                ),
             )
             response.raise_for_status()
             result = InferenceResponse(**response.json())
@@ -50,6 +73,9 @@ async def infer(
                 f"Request routed to {node.node_id} (elapsed={elapsed:.3f}s)"
             )
             return result
+    except ClientDisconnected:
+        logger.info(f"Request to {node.node_id} cancelled: client disconnected")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
     except httpx.TimeoutException:
         logger.error(f"Request to {node.node_id} timed out")
         raise HTTPException(status_code=504, detail="Request timeout")
@@ -57,10 +83,75 @@ async def infer(
         logger.error(f"Node {node.node_id} returned error: {e.response.status_code}")
         raise HTTPException(
             status_code=e.response.status_code,
-            detail=f"Node error: {e.response.text}",
+            detail=_node_error_detail(e.response),
         )
     except Exception as e:
         logger.error(f"Request to {node.node_id} failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         await registry.decrement_node_load(node.node_id)
+
+
+@router.post("/infer/stream")
+async def infer_stream(
+    request: InferenceRequest, http_request: Request
+) -> StreamingResponse:
+    # Relays the node's NDJSON stream chunk by chunk. The node counts as
+    # loaded until the stream ends; node errors that arrive before the first
+    # chunk keep their status code. A client that disconnects closes the
+    # upstream response, and with it the node's stream.
+    node = await _acquire_node()
+    node_url = f"{node.url.rstrip('/')}/infer/stream"
+    client = httpx.AsyncClient(timeout=httpx.Timeout(settings.request_timeout_sec))
+    try:
+        upstream = await cancel_on_disconnect(
+            http_request,
+            client.send(
+                client.build_request(
+                    "POST",
+                    node_url,
+                    json=request.model_dump(),
+                    headers={"X-Request-ID": http_request.headers.get("X-Request-ID", "")},
+                ),
+                stream=True,
+            ),
+        )
+        if upstream.status_code >= 400:
+            await upstream.aread()
+            await upstream.aclose()
+            logger.error(f"Node {node.node_id} returned error: {upstream.status_code}")
+            raise HTTPException(
+                status_code=upstream.status_code,
+                detail=_node_error_detail(upstream),
+            )
+    except Exception as e:
+        await client.aclose()
+        await registry.decrement_node_load(node.node_id)
+        if isinstance(e, HTTPException):
+            raise
+        if isinstance(e, ClientDisconnected):
+            logger.info(f"Stream to {node.node_id} cancelled: client disconnected")
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+        if isinstance(e, httpx.TimeoutException):
+            logger.error(f"Request to {node.node_id} timed out")
+            raise HTTPException(status_code=504, detail="Request timeout")
+        logger.error(f"Request to {node.node_id} failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def relay():
+        start_time = time.time()
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+            logger.info(
+                f"Stream routed to {node.node_id} (elapsed={time.time() - start_time:.3f}s)"
+            )
+        finally:
+            await upstream.aclose()
+            await client.aclose()
+            await registry.decrement_node_load(node.node_id)
+
+    return StreamingResponse(
+        relay(),
+        media_type=upstream.headers.get("content-type", "application/x-ndjson"),
+    )
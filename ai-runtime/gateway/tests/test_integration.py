@@ -136,3 +136,69 @@ async def test_load_balancing(gateway_client):
         node2 = await registry.get_node("node2")
         assert node2 is not None
         assert node2.current_load > 0
+
+
+@pytest.mark.asyncio
+async def test_stream_passthrough(gateway_client):
+    lines = [
+        b'{"api_version":"v1","request_id":"test-id","text":"hello","done":false,"error":null}\n',
+        b'{"api_version":"v1","request_id":"test-id","text":" world","done":false,"error":null}\n',
+        b'{"api_version":"v1","request_id":"test-id","text":"","done":true,"error":null}\n',
+    ]
+
+    async def body():
+        for line in lines:
+            yield line
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/infer/stream"
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/x-ndjson"},
+            content=body(),
+        )
+
+    real_client = httpx.AsyncClient
+    with patch(
+        "httpx.AsyncClient",
+        side_effect=lambda **kwargs: real_client(transport=httpx.MockTransport(handler)),
+    ):
+        await registry.register_node(
+            "node1", "http://localhost:8000", max_capacity=100
+        )
+
+        response = gateway_client.post(
+            "/infer/stream",
+            json={"prompt": "test", "max_tokens": 10, "temperature": 0.7},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.content == b"".join(lines)
+        node = await registry.get_node("node1")
+        assert node.current_load == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_error_status_passed_through(gateway_client):
+    detail = {"code": "DEADLINE_EXCEEDED", "reason": "expired", "message": "late"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(504, json={"detail": detail})
+
+    real_client = httpx.AsyncClient
+    with patch(
+        "httpx.AsyncClient",
+        side_effect=lambda **kwargs: real_client(transport=httpx.MockTransport(handler)),
+    ):
+        await registry.register_node(
+            "node1", "http://localhost:8000", max_capacity=100
+        )
+
+        response = gateway_client.post(
+            "/infer/stream",
+            json={"prompt": "test", "max_tokens": 10, "temperature": 0.7},
+        )
+
+        assert response.status_code == 504
+        assert response.json()["detail"] == detail
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Compare static batching with continuous (iteration-level) batching.
+
+Sends a mixed-length workload (mostly short requests, some long ones) with
+Poisson arrivals through a batcher, scheduler and one worker running the mock
+model, which costs a fixed time per decoding step. With static batching a
+batch holds its worker until its longest request is done; with continuous
+batching requests join and leave the running batch between steps.
+
+Usage:
+    python scripts/bench_continuous_batching.py
+    python scripts/bench_continuous_batching.py --rate 40 --requests 400 --long-fraction 0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+os.environ.setdefault("USE_MOCK_MODEL", "true")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from server.app.core.batcher import DynamicBatcher
+from server.app.core.continuous import ContinuousBatchingWorker
+from server.app.core.queue import QueuedRequest
+from server.app.core.scheduler import Scheduler
+from server.app.core.worker import GPUWorker
+from server.app.models.loader import ModelLoader
+from server.app.models.mock import MockModel
+from server.app.schemas.inference import InferenceRequest
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def workload(args: argparse.Namespace) -> List[Tuple[float, int]]:
+    # (arrival offset in seconds, max_tokens), the same for every variant
+    rng = random.Random(args.seed)
+    at = 0.0
+    requests = []
+    for _ in range(args.requests):
+        at += rng.expovariate(args.rate)
+        tokens = args.long_tokens if rng.random() < args.long_fraction else args.short_tokens
+        requests.append((at, tokens))
+    return requests
+
+
+async def run_variant(
+    variant: str, requests: List[Tuple[float, int]], args: argparse.Namespace
+) -> Tuple[Dict[int, List[float]], float]:
+    loader = ModelLoader(gpu_id=0)
+    loader.model = MockModel(
+        gpu_id=0,
+        first_token_delay_ms=args.first_token_delay_ms,
+        token_delay_ms=args.token_delay_ms,
+    )
+    if variant == "continuous":
+        worker: GPUWorker = ContinuousBatchingWorker(
+            worker_id=0, gpu_id=0, model_loader=loader, max_running_requests=args.max_running
+        )
+        window_ms = 0
+    else:
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader, max_in_flight_batches=2)
+        window_ms = args.max_batch_latency_ms
+    input_queue: asyncio.Queue = asyncio.Queue()
+    batch_queue: asyncio.Queue = asyncio.Queue()
+    batcher = DynamicBatcher(args.max_batch_size, window_ms, input_queue, batch_queue)
+    scheduler = Scheduler([worker], batch_queue)
+    await worker.start()
+    await scheduler.start()
+    await batcher.start()
+
+    loop = asyncio.get_running_loop()
+    latencies: Dict[int, List[float]] = {}
+
+    async def send(index: int, offset: float, tokens: int) -> None:
+        await asyncio.sleep(max(0.0, started + offset - loop.time()))
+        sent = loop.time()
+        future = loop.create_future()
+        input_queue.put_nowait(
+            QueuedRequest(
+                request=InferenceRequest(prompt=f"bench {index}", max_tokens=tokens, temperature=0.0),
+                future=future,
+                request_id=f"req{index}",
+                enqueued_at=sent,
+            )
+        )
+        await future
+        latencies.setdefault(tokens, []).append((loop.time() - sent) * 1000.0)
+
+    started = loop.time()
+    wall_started = time.perf_counter()
+    try:
+        await asyncio.gather(*(send(i, offset, tokens) for i, (offset, tokens) in enumerate(requests)))
+    finally:
+        await batcher.stop()
+        await scheduler.stop()
+        await worker.stop()
+    return latencies, len(requests) / (time.perf_counter() - wall_started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark static vs continuous batching")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per variant")
+    parser.add_argument("--rate", type=float, default=15.0, help="Mean arrival rate (req/s)")
+    parser.add_argument("--short-tokens", type=int, default=16, help="max_tokens of short requests")
+    parser.add_argument("--long-tokens", type=int, default=256, help="max_tokens of long requests")
+    parser.add_argument("--long-fraction", type=float, default=0.1, help="Share of long requests")
+    parser.add_argument("--first-token-delay-ms", type=float, default=10.0, help="Mock prefill step time")
+    parser.add_argument("--token-delay-ms", type=float, default=1.0, help="Mock decoding step time")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Batcher size limit")
+    parser.add_argument("--max-batch-latency-ms", type=int, default=10, help="Static batch window")
+    parser.add_argument("--max-running", type=int, default=32, help="Continuous running request cap")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    requests = workload(args)
+    print(
+        f"{args.requests} requests at {args.rate:.0f} req/s, {args.long_fraction:.0%} with "
+        f"max_tokens={args.long_tokens}, the rest {args.short_tokens}; step {args.token_delay_ms} ms, "
+        f"prefill {args.first_token_delay_ms} ms\n"
+    )
+    print(
+        f"{'batching':>10} {'short p50 ms':>13} {'short p99 ms':>13} "
+        f"{'long p50 ms':>12} {'long p99 ms':>12} {'req/s':>7}"
+    )
+    print("-" * 72)
+    for variant in ("static", "continuous"):
+        latencies, throughput = asyncio.run(run_variant(variant, requests, args))
+        short = latencies.get(args.short_tokens, [0.0])
+        long = latencies.get(args.long_tokens, [0.0])
+        print(
+            f"{variant:>10} {statistics.median(short):>13.1f} {percentile(short, 99):>13.1f} "
+            f"{statistics.median(long):>12.1f} {percentile(long, 99):>12.1f} {throughput:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Compare the event-driven pipeline loops with the old 100 ms polling loops.
+
+Measures idle CPU time of a running pipeline (batcher, scheduler, workers)
+and the latency each loop variant adds to sequential and burst requests.
+
+Usage:
+    python scripts/bench_pipeline_loops.py
+    python scripts/bench_pipeline_loops.py --idle-seconds 5 --requests 500 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List, Tuple
+
+os.environ.setdefault("USE_MOCK_MODEL", "true")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from server.app.core.batcher import Batch, DynamicBatcher
+from server.app.core.queue import QueuedRequest
+from server.app.core.scheduler import Scheduler
+from server.app.core.worker import GPUWorker
+from server.app.models.loader import ModelLoader
+from server.app.schemas.inference import InferenceRequest
+
+
+# The loops as they were before they became event-driven: every stage wakes
+# up every 100 ms to re-check its queue, and the scheduler requeues a batch
+# when no worker is free.
+class PollingDynamicBatcher(DynamicBatcher):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._current_batch = None
+
+    async def _flush_current(self) -> None:
+        batch, self._current_batch = self._current_batch, None
+        if batch is not None and batch.size() > 0:
+            await self._output_queue.put(batch)
+
+    async def _batch_loop(self) -> None:
+        while self._running:
+            try:
+                if self._current_batch is None:
+                    try:
+                        queued = await asyncio.wait_for(self._input_queue.get(), timeout=0.1)
+                        self._current_batch = Batch(
+                            requests=[queued], created_at=asyncio.get_event_loop().time()
+                        )
+                    except asyncio.TimeoutError:
+                        continue
+                else:
+                    try:
+                        queued = await asyncio.wait_for(
+                            self._input_queue.get(),
+                            timeout=self._max_batch_latency_ms / 1000.0,
+                        )
+                        self._current_batch.requests.append(queued)
+                    except asyncio.TimeoutError:
+                        await self._flush_current()
+                        continue
+                if self._current_batch.size() >= self._max_batch_size:
+                    await self._flush_current()
+            except asyncio.CancelledError:
+                break
+
+
+class PollingGPUWorker(GPUWorker):
+    async def _worker_loop(self) -> None:
+        while self._running:
+            try:
+                try:
+                    batch = await asyncio.wait_for(self.get_input_queue().get(), timeout=0.1)
+                except asyncio.TimeoutError:
+                    continue
+                self._available = False
+                await self._process_batch(batch)
+                self._available = True
+            except asyncio.CancelledError:
+                break
+
+
+class PollingScheduler(Scheduler):
+    async def _schedule_loop(self) -> None:
+        while self._running:
+            try:
+                try:
+                    batch = await asyncio.wait_for(self._batch_queue.get(), timeout=0.1)
+                except asyncio.TimeoutError:
+                    continue
+                worker = next((w for w in self._workers if w.available), None)
+                if worker is None:
+                    await asyncio.sleep(0.01)
+                    await self._batch_queue.put(batch)
+                    continue
+                await worker.get_input_queue().put(batch)
+            except asyncio.CancelledError:
+                break
+
+
+VARIANTS = {
+    "polling": (PollingDynamicBatcher, PollingScheduler, PollingGPUWorker),
+    "event-driven": (DynamicBatcher, Scheduler, GPUWorker),
+}
+
+
+class Pipeline:
+    def __init__(self, variant: str, workers: int, max_batch_size: int, max_batch_latency_ms: int) -> None:
+        batcher_cls, scheduler_cls, worker_cls = VARIANTS[variant]
+        self.input_queue: asyncio.Queue[QueuedRequest] = asyncio.Queue()
+        batch_queue: asyncio.Queue[Batch] = asyncio.Queue()
+        self.workers = []
+        for i in range(workers):
+            loader = ModelLoader(gpu_id=i)
+            loader.load()
+            self.workers.append(worker_cls(worker_id=i, gpu_id=i, model_loader=loader))
+        self.batcher = batcher_cls(max_batch_size, max_batch_latency_ms, self.input_queue, batch_queue)
+        self.scheduler = scheduler_cls(self.workers, batch_queue)
+        self._next_id = 0
+
+    async def start(self) -> None:
+        for worker in self.workers:
+            await worker.start()
+        await self.scheduler.start()
+        await self.batcher.start()
+
+    async def stop(self) -> None:
+        await self.batcher.stop()
+        await self.scheduler.stop()
+        for worker in self.workers:
+            await worker.stop()
+
+    def submit(self) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._next_id += 1
+        queued = QueuedRequest(
+            request=InferenceRequest(prompt="bench", max_tokens=1),
+            future=future,
+            request_id=f"req{self._next_id}",
+        )
+        self.input_queue.put_nowait(queued)
+        return future
+
+
+async def measure_idle_cpu(pipeline: Pipeline, seconds: float) -> float:
+    started_cpu = time.process_time()
+    started = time.perf_counter()
+    await asyncio.sleep(seconds)
+    return (time.process_time() - started_cpu) / (time.perf_counter() - started) * 1000.0
+
+
+async def measure_sequential(pipeline: Pipeline, requests: int) -> List[float]:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await pipeline.submit()
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return latencies
+
+
+async def measure_burst(pipeline: Pipeline, requests: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(pipeline.submit() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def run_variant(variant: str, args: argparse.Namespace) -> Tuple[float, List[float], List[float], float]:
+    # Sequential requests run with batch size 1 so the batch window never
+    # applies and only loop overhead shows up in the latency
+    pipeline = Pipeline(variant, args.workers, 1, args.max_batch_latency_ms)
+    await pipeline.start()
+    try:
+        await measure_sequential(pipeline, 10)
+        idle_cpu = await measure_idle_cpu(pipeline, args.idle_seconds)
+        sequential = await measure_sequential(pipeline, args.requests)
+    finally:
+        await pipeline.stop()
+
+    pipeline = Pipeline(variant, args.workers, args.max_batch_size, args.max_batch_latency_ms)
+    await pipeline.start()
+    try:
+        burst = await measure_burst(pipeline, args.requests)
+        windowed = await measure_sequential(pipeline, min(args.requests, 50))
+    finally:
+        await pipeline.stop()
+    return idle_cpu, sequential, windowed, burst
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline loop variants")
+    parser.add_argument("--idle-seconds", type=float, default=3.0, help="Idle period to measure CPU over")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per latency/burst run")
+    parser.add_argument("--workers", type=int, default=2, help="Number of workers")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Batch size for the burst run")
+    parser.add_argument("--max-batch-latency-ms", type=int, default=10, help="Batch window")
+    args = parser.parse_args()
+
+    print(
+        f"workers: {args.workers}, idle: {args.idle_seconds:.1f}s, requests: {args.requests}, "
+        f"batch window: {args.max_batch_latency_ms} ms\n"
+    )
+    print(
+        f"{'loops':>13} {'idle CPU ms/s':>14} {'seq p50 ms':>11} {'seq p99 ms':>11} "
+        f"{'window p50 ms':>14} {'burst req/s':>12}"
+    )
+    print("-" * 80)
+    for variant in VARIANTS:
+        idle_cpu, sequential, windowed, burst = asyncio.run(run_variant(variant, args))
+        print(
+            f"{variant:>13} {idle_cpu:>14.3f} {statistics.median(sequential):>11.3f} "
+            f"{percentile(sequential, 99):>11.3f} {statistics.median(windowed):>14.3f} {burst:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
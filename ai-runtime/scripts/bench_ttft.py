@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Compare time to first token of /infer-style and streaming requests.
+
+Runs the inference pipeline in-process on the mock model, which emits one
+token per step after a prefill delay. A buffered request sees its first
+token only when the whole response is done; a streaming one as soon as the
+first step completes.
+
+Usage:
+    python scripts/bench_ttft.py
+    python scripts/bench_ttft.py --first-token-delay-ms 50 --token-delay-ms 5 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List, Tuple
+
+os.environ.setdefault("USE_MOCK_MODEL", "true")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def buffered(pipeline, request, request_id: str) -> Tuple[float, float]:
+    started = time.perf_counter()
+    await pipeline.enqueue(request, request_id)
+    elapsed = (time.perf_counter() - started) * 1000.0
+    return elapsed, elapsed
+
+
+async def streamed(pipeline, request, request_id: str) -> Tuple[float, float]:
+    started = time.perf_counter()
+    first = None
+    async for _ in pipeline.stream(request, request_id):
+        if first is None:
+            first = (time.perf_counter() - started) * 1000.0
+    return first, (time.perf_counter() - started) * 1000.0
+
+
+async def run(mode, args: argparse.Namespace) -> Tuple[List[float], List[float]]:
+    from server.app.core.pipeline import InferencePipeline
+    from server.app.schemas.inference import InferenceRequest
+
+    pipeline = InferencePipeline()
+    await pipeline.initialize()
+    ttft: List[float] = []
+    total: List[float] = []
+    try:
+        for round_index in range(args.rounds):
+            results = await asyncio.gather(
+                *(
+                    mode(
+                        pipeline,
+                        # temperature > 0 keeps the response cache out of the way
+                        InferenceRequest(prompt=f"bench {round_index} {i}", temperature=0.7),
+                        f"req{round_index}-{i}",
+                    )
+                    for i in range(args.concurrency)
+                )
+            )
+            for first, done in results:
+                ttft.append(first)
+                total.append(done)
+    finally:
+        await pipeline.shutdown()
+    return ttft, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark time to first token")
+    parser.add_argument("--first-token-delay-ms", type=float, default=30.0, help="Mock prefill time")
+    parser.add_argument("--token-delay-ms", type=float, default=2.0, help="Mock time per later token")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests sent together per round")
+    parser.add_argument("--rounds", type=int, default=20, help="Rounds per mode")
+    args = parser.parse_args()
+
+    os.environ["MOCK_FIRST_TOKEN_DELAY_MS"] = str(args.first_token_delay_ms)
+    os.environ["MOCK_TOKEN_DELAY_MS"] = str(args.token_delay_ms)
+
+    print(
+        f"prefill: {args.first_token_delay_ms:.0f} ms, per token: {args.token_delay_ms:.0f} ms, "
+        f"concurrency: {args.concurrency}, rounds: {args.rounds}\n"
+    )
+    print(f"{'mode':>9} {'TTFT p50 ms':>12} {'TTFT p99 ms':>12} {'total p50 ms':>13}")
+    print("-" * 50)
+    for name, mode in (("buffered", buffered), ("streamed", streamed)):
+        ttft, total = asyncio.run(run(mode, args))
+        print(
+            f"{name:>9} {statistics.median(ttft):>12.1f} {percentile(ttft, 99):>12.1f} "
+            f"{statistics.median(total):>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
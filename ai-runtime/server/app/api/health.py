@@ -1,10 +1,13 @@
-from fastapi import APIRouter
-from typing import Dict
+from fastapi import APIRouter, Response
+from typing import Any, Dict
+from server.app.core.pipeline import pipeline
 
 router = APIRouter()
 
 
 @router.get("/health")
-async def health_check() -> Dict[str, str]:
-    return {"status": "ok"}
-
+async def health_check(response: Response) -> Dict[str, Any]:
+    health = pipeline.health()
+    if health["status"] == "unavailable":
+        response.status_code = 503
+    return health
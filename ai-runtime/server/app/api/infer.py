@@ -1,28 +1,90 @@
-from fastapi import APIRouter, HTTPException
-from server.app.schemas.inference import InferenceRequest, InferenceResponse
+from typing import AsyncIterator
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from server.app.schemas.inference import InferenceRequest, InferenceResponse, InferenceStreamChunk
 from server.app.core.logging import get_request_id
 from server.app.core.pipeline import pipeline
+from server.app.core.deadlines import DeadlineExceeded
+from shared.disconnect import CLIENT_CLOSED_REQUEST, ClientDisconnected, cancel_on_disconnect
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _http_error(e: Exception, request_id: str) -> HTTPException:
+    if isinstance(e, ClientDisconnected):
+        logger.info(f"Request {request_id} cancelled: client disconnected")
+        return HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    if isinstance(e, DeadlineExceeded):
+        logger.warning(f"Request {request_id} dropped: deadline {e.reason}")
+        return HTTPException(
+            status_code=504,
+            detail={"code": e.code, "reason": e.reason, "message": str(e)},
+        )
+    if isinstance(e, RuntimeError):
+        if "queue full" in str(e).lower() or "backpressure" in str(e).lower():
+            logger.warning(f"Request {request_id} rejected: queue full")
+            return HTTPException(status_code=429, detail="Request limit exceeded, please try again later")
+        return HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
+    logger.error(f"Inference failed: {str(e)}", exc_info=True)
+    return HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
+
 
 @router.post("/infer", response_model=InferenceResponse)
-async def infer(request: InferenceRequest) -> InferenceResponse:
+async def infer(request: InferenceRequest, http_request: Request) -> InferenceResponse:
+    # A client that disconnects cancels its request, wherever it is: still
+    # queued, waiting in a batch, or generating
     request_id = get_request_id()
     logger.info(f"Received inference request: prompt_length={len(request.prompt)}")
     
     try:
-        response = await pipeline.enqueue(request, request_id)
+        response = await cancel_on_disconnect(http_request, pipeline.enqueue(request, request_id))
         logger.info(f"Inference completed: response_length={len(response.text)}")
         return response
-    except RuntimeError as e:
-        if "queue full" in str(e).lower() or "backpressure" in str(e).lower():
-            logger.warning(f"Request {request_id} rejected: queue full")
-            raise HTTPException(status_code=429, detail="Request limit exceeded, please try again later")
-        raise HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
     except Exception as e:
-        logger.error(f"Inference failed: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
+        raise _http_error(e, request_id)
+
+
+@router.post("/infer/stream")
+async def infer_stream(request: InferenceRequest, http_request: Request) -> StreamingResponse:
+    # Newline-delimited JSON, one InferenceStreamChunk per line. The response
+    # starts with the first generated text, so errors raised before then
+    # (backpressure, deadlines) still get their HTTP status; later failures
+    # end the stream with a chunk carrying the error. A disconnect cancels
+    # the request: before the first text here, afterwards by the response
+    # closing the body, which closes the pipeline stream.
+    request_id = get_request_id()
+    logger.info(f"Received streaming request: prompt_length={len(request.prompt)}")
+    pieces = pipeline.stream(request, request_id)
+    try:
+        first = await cancel_on_disconnect(http_request, anext(pieces, None))
+    except Exception as e:
+        await pieces.aclose()
+        raise _http_error(e, request_id)
+
+    async def body() -> AsyncIterator[str]:
+        length = 0
+        try:
+            piece = first
+            while piece is not None:
+                length += len(piece)
+                yield InferenceStreamChunk(request_id=request_id, text=piece).model_dump_json() + "\n"
+                piece = await anext(pieces, None)
+        except Exception as e:
+            error = _http_error(e, request_id)
+            detail = error.detail if isinstance(error.detail, dict) else {"message": error.detail}
+            yield InferenceStreamChunk(
+                request_id=request_id,
+                done=True,
+                error={"status_code": error.status_code, **detail},
+            ).model_dump_json() + "\n"
+            return
+        finally:
+            await pieces.aclose()
+        logger.info(f"Streaming completed: response_length={length}")
+        yield InferenceStreamChunk(request_id=request_id, done=True).model_dump_json() + "\n"
 
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from typing import Any, Dict
+from server.app.core.pipeline import pipeline
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    return pipeline.stats()
@@ -0,0 +1,68 @@
+import bisect
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from server.app.core.batch_cost import TokenCostEstimator
+from server.app.core.queue import QueuedRequest
+from server.app.schemas.inference import DEFAULT_MAX_TOKENS, InferenceRequest
+
+Bucket = Tuple[int, int]
+
+
+def parse_edges(value: str) -> List[int]:
+    # "128,512,2048" -> [128, 512, 2048]; empty means no bucketing
+    edges = sorted({int(part) for part in value.split(",") if part.strip()})
+    if any(edge <= 0 for edge in edges):
+        raise ValueError(f"Bucket edges must be positive: {value!r}")
+    return edges
+
+
+def _max_tokens(request: InferenceRequest) -> int:
+    return request.max_tokens if request.max_tokens is not None else DEFAULT_MAX_TOKENS
+
+
+def padding_efficiency(
+    requests: List[QueuedRequest], estimator: Optional[TokenCostEstimator] = None
+) -> float:
+    # Share of the padded batch that is real work: a static batch pads
+    # every prompt to the longest one and decodes until the longest
+    # generation finishes
+    if not requests:
+        return 1.0
+    estimator = estimator or TokenCostEstimator()
+    prompts = [estimator.prompt_tokens(q.request.prompt) for q in requests]
+    generations = [_max_tokens(q.request) for q in requests]
+    padded = len(requests) * (max(prompts) + max(generations))
+    return (sum(prompts) + sum(generations)) / padded
+
+
+class LengthBuckets:
+    # Splits requests by prompt length, and optionally by max_tokens, so
+    # a batch holds requests of similar length. Edges are inclusive upper
+    # bounds: with edges [128, 512] prompts of up to 128 tokens fall in
+    # bucket 0, up to 512 in bucket 1 and longer ones in bucket 2.
+
+    def __init__(
+        self,
+        prompt_edges: Sequence[int],
+        max_tokens_edges: Sequence[int] = (),
+        estimator: Optional[TokenCostEstimator] = None,
+    ) -> None:
+        self._prompt_edges = sorted(prompt_edges)
+        self._max_tokens_edges = sorted(max_tokens_edges)
+        self._estimator = estimator or TokenCostEstimator()
+
+    def bucket(self, request: InferenceRequest) -> Bucket:
+        prompt_tokens = self._estimator.prompt_tokens(request.prompt)
+        return (
+            bisect.bisect_left(self._prompt_edges, prompt_tokens),
+            bisect.bisect_left(self._max_tokens_edges, _max_tokens(request)),
+        )
+
+    @property
+    def estimator(self) -> TokenCostEstimator:
+        return self._estimator
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "prompt_bucket_edges": list(self._prompt_edges),
+            "max_tokens_bucket_edges": list(self._max_tokens_edges),
+        }
@@ -0,0 +1,70 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+from server.app.schemas.inference import DEFAULT_MAX_TOKENS, InferenceRequest
+
+TOKENS = "tokens"
+REQUESTS = "requests"
+COST_ESTIMATORS = (TOKENS, REQUESTS)
+
+# Rough characters per token for English text with BPE tokenizers
+CHARS_PER_TOKEN = 4.0
+
+
+class CostEstimator(ABC):
+    # Estimates the compute and memory a request adds to a batch, in the
+    # units of the batcher's budget. Runs on the event loop for every
+    # request, so it must be cheap.
+
+    @abstractmethod
+    def estimate(self, request: InferenceRequest) -> float:
+        ...
+
+    def describe(self) -> Dict[str, Any]:
+        return {"cost_estimator": type(self).__name__}
+
+
+class RequestCountEstimator(CostEstimator):
+    # Every request costs 1: a budget of n is a plain n-request cap
+
+    def estimate(self, request: InferenceRequest) -> float:
+        return 1.0
+
+    def describe(self) -> Dict[str, Any]:
+        return {"cost_estimator": REQUESTS}
+
+
+class TokenCostEstimator(CostEstimator):
+    # Prompt tokens plus the tokens to generate: what the model processes
+    # for the request and roughly what its KV cache holds at the end.
+    # Without a tokenizer, prompt tokens are approximated from the length.
+
+    def __init__(
+        self,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        chars_per_token: float = CHARS_PER_TOKEN,
+    ) -> None:
+        if chars_per_token <= 0:
+            raise ValueError("chars_per_token must be positive")
+        self._count_tokens = count_tokens
+        self._chars_per_token = chars_per_token
+
+    def prompt_tokens(self, prompt: str) -> int:
+        if self._count_tokens is not None:
+            return self._count_tokens(prompt)
+        return max(1, math.ceil(len(prompt) / self._chars_per_token))
+
+    def estimate(self, request: InferenceRequest) -> float:
+        max_tokens = request.max_tokens if request.max_tokens is not None else DEFAULT_MAX_TOKENS
+        return float(self.prompt_tokens(request.prompt) + max_tokens)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"cost_estimator": TOKENS}
+
+
+def create_cost_estimator(name: str) -> CostEstimator:
+    if name == TOKENS:
+        return TokenCostEstimator()
+    if name == REQUESTS:
+        return RequestCountEstimator()
+    raise ValueError(f"Unknown cost estimator {name!r}, expected one of {COST_ESTIMATORS}")
@@ -0,0 +1,251 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FIXED = "fixed"
+ADAPTIVE = "adaptive"
+POLICIES = (FIXED, ADAPTIVE)
+
+# Upper tail of an exponential queueing delay: P(W > ln(100) * E[W]) = 1%
+_P99_TAIL_FACTOR = math.log(100.0)
+# One-sided 99% quantile of the standard normal distribution
+_Z99 = 2.326
+# Spread of recent batch sizes needed to refit S(n) = a + b * n
+_MIN_SIZE_VARIANCE = 0.25
+# Candidate windows evaluated between 0 and the maximum window
+_WINDOW_STEPS = 50
+
+
+class BatchPolicy(ABC):
+    # Decides how large a batch the DynamicBatcher aims for and how long it
+    # keeps a batch open. Timestamps are passed in so the same policy runs
+    # against the event loop clock or a simulated one.
+
+    def observe_arrival(self, at: float) -> None:
+        pass
+
+    def observe_batch(self, size: int, service_s: float) -> None:
+        pass
+
+    @abstractmethod
+    def target_size(self) -> int:
+        ...
+
+    @abstractmethod
+    def window_s(self) -> float:
+        ...
+
+    def describe(self) -> Dict[str, Any]:
+        return {"target_size": self.target_size(), "window_ms": self.window_s() * 1000.0}
+
+
+class FixedBatchPolicy(BatchPolicy):
+    def __init__(self, max_batch_size: int, max_batch_latency_ms: float) -> None:
+        self._max_batch_size = max_batch_size
+        self._window_s = max_batch_latency_ms / 1000.0
+
+    def target_size(self) -> int:
+        return self._max_batch_size
+
+    def window_s(self) -> float:
+        return self._window_s
+
+    def describe(self) -> Dict[str, Any]:
+        return {"policy": FIXED, **super().describe()}
+
+
+class AdaptiveBatchPolicy(BatchPolicy):
+    # Picks the batch window (and a matching target size) with the lowest
+    # predicted p99 latency from two online estimates:
+    # - arrival rate: arrivals counted over an exponentially decaying window
+    # - batch service time S(n) = a + b * n: least squares over recent
+    #   batches with exponential forgetting
+    # A window w gives batches of about 1 + rate * w requests. Predicted p99
+    # is w + S(n) + a G/G/c queueing tail. At low load this picks w=0 (no
+    # waiting); as load grows it trades window for larger, cheaper-per-request
+    # batches. Windows never exceed max_window_ms or the SLO minus S(1). When
+    # no window keeps the workers stable it falls back to the largest batch
+    # that fits the SLO.
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_window_ms: float,
+        slo_ms: float,
+        workers: int = 1,
+        arrival_window_s: float = 1.0,
+        service_decay: float = 0.99,
+        max_utilization: float = 0.95,
+        service_scv: float = 0.1,
+        initial_batch_size: Optional[int] = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if slo_ms <= 0:
+            raise ValueError("slo_ms must be positive")
+        self._max_batch_size = max_batch_size
+        self._initial_batch_size = min(initial_batch_size or max_batch_size, max_batch_size)
+        self._max_window_s = max_window_ms / 1000.0
+        self._slo_s = slo_ms / 1000.0
+        self._workers = max(workers, 1)
+        self._arrival_window_s = arrival_window_s
+        self._service_decay = service_decay
+        self._max_utilization = max_utilization
+        self._service_scv = service_scv
+        self._first_arrival: Optional[float] = None
+        self._last_arrival: Optional[float] = None
+        self._arrival_weight = 0.0
+        # Weighted sums for the S(n) = a + b * n fit
+        self._w = self._sn = self._ss = self._snn = self._sns = 0.0
+        self._fit: Optional[Tuple[float, float]] = None
+        self._observed_batches = 0
+        self._decision: Optional[Tuple[int, float, float]] = None
+
+    def observe_arrival(self, at: float) -> None:
+        if self._last_arrival is None:
+            self._first_arrival = at
+        else:
+            gap = max(at - self._last_arrival, 0.0)
+            self._arrival_weight *= math.exp(-gap / self._arrival_window_s)
+            self._decision = None
+        self._arrival_weight += 1.0
+        self._last_arrival = max(at, self._last_arrival or at)
+
+    def observe_batch(self, size: int, service_s: float) -> None:
+        if size < 1:
+            return
+        self._observed_batches += 1
+        d = self._service_decay
+        self._w = self._w * d + 1.0
+        self._sn = self._sn * d + size
+        self._ss = self._ss * d + service_s
+        self._snn = self._snn * d + size * size
+        self._sns = self._sns * d + size * service_s
+        self._decision = None
+
+    def arrival_rate(self) -> Optional[float]:
+        if self._first_arrival is None or self._last_arrival == self._first_arrival:
+            return None
+        # Normalize by the decayed length of the observed span, so the
+        # estimate is unbiased before a full window has been seen
+        elapsed = self._last_arrival - self._first_arrival
+        span = self._arrival_window_s * (1.0 - math.exp(-elapsed / self._arrival_window_s))
+        # The first arrival opens the span; it is not counted as a gap
+        return max(self._arrival_weight - math.exp(-elapsed / self._arrival_window_s), 0.0) / span
+
+    def service_model(self) -> Optional[Tuple[float, float]]:
+        # (a, b) of S(n) = a + b * n, or None until batches of different
+        # sizes have been observed
+        if self._w == 0.0:
+            return None
+        mean_n = self._sn / self._w
+        mean_s = self._ss / self._w
+        var_n = self._snn / self._w - mean_n * mean_n
+        if var_n > _MIN_SIZE_VARIANCE:
+            b = (self._sns / self._w - mean_n * mean_s) / var_n
+            a = mean_s - b * mean_n
+            if a >= 0.0 and b >= 0.0:
+                self._fit = (a, b)
+        # When recent batches all had about the same size, the last fit that
+        # saw a spread of sizes still describes the slope best
+        return self._fit
+
+    def predict(self, window: float, rate: float, a: float, b: float) -> Tuple[int, float]:
+        # (target size, predicted p99) for a batch window; p99 is inf if the
+        # workers cannot keep up. A batch holds its opening request plus the
+        # Poisson arrivals during the window; the target size caps it at the
+        # 99th percentile of that count so it rarely closes before the window.
+        arrivals = rate * window
+        target = min(self._max_batch_size, 1 + math.ceil(arrivals + _Z99 * math.sqrt(arrivals)))
+        expected_size = min(float(self._max_batch_size), 1.0 + arrivals)
+        service = a + b * expected_size
+        utilization = rate * service / (expected_size * self._workers)
+        if utilization >= self._max_utilization:
+            return target, math.inf
+        # Sakasegawa's M/M/c mean queueing delay, scaled by the arrival and
+        # service variability (Allen-Cunneen); batches of n Poisson arrivals
+        # arrive with squared coefficient of variation of about 1/n
+        c = self._workers
+        variability = (1.0 / expected_size + self._service_scv) / 2.0
+        wait = variability * service * utilization ** (math.sqrt(2.0 * (c + 1)) - 1.0) / (
+            c * (1.0 - utilization)
+        )
+        return target, window + service + _P99_TAIL_FACTOR * wait
+
+    def _decide(self) -> Tuple[int, float, float]:
+        if self._decision is not None:
+            return self._decision
+        rate = self.arrival_rate()
+        model = self.service_model()
+        if rate is None or model is None:
+            # Not enough measured yet: behave like the fixed policy, but
+            # alternate the target size so a saturated server still sees
+            # batches of different sizes to fit S(n) on
+            target = self._initial_batch_size
+            if self._observed_batches % 2:
+                target = max(1, target // 2)
+            return target, self._max_window_s, math.inf
+        a, b = model
+        best = (1, 0.0, math.inf)
+        for step in range(_WINDOW_STEPS + 1):
+            window = self._max_window_s * step / _WINDOW_STEPS
+            if step and window + a + b > self._slo_s:
+                break
+            target, p99 = self.predict(window, rate, a, b)
+            if p99 < best[2]:
+                best = (target, window, p99)
+        if math.isinf(best[2]):
+            # Overloaded at every window: maximize throughput within the SLO
+            service = a + b * self._max_batch_size
+            window = min(self._max_window_s, max(self._slo_s - service, 0.0))
+            best = (self._max_batch_size, window, math.inf)
+        self._decision = best
+        return best
+
+    def target_size(self) -> int:
+        return self._decide()[0]
+
+    def window_s(self) -> float:
+        return self._decide()[1]
+
+    def describe(self) -> Dict[str, Any]:
+        size, window, p99 = self._decide()
+        rate = self.arrival_rate()
+        model = self.service_model()
+        return {
+            "policy": ADAPTIVE,
+            "target_size": size,
+            "window_ms": window * 1000.0,
+            "predicted_p99_ms": None if math.isinf(p99) else p99 * 1000.0,
+            "slo_ms": self._slo_s * 1000.0,
+            "meets_slo": p99 <= self._slo_s,
+            "arrival_rate_rps": rate,
+            "service_ms": None if model is None else {
+                "per_batch": model[0] * 1000.0,
+                "per_request": model[1] * 1000.0,
+            },
+        }
+
+
+def create_batch_policy(
+    policy: str,
+    max_batch_size: int,
+    max_batch_latency_ms: float,
+    adaptive_max_batch_size: int,
+    slo_ms: float,
+    workers: int,
+) -> BatchPolicy:
+    if policy == FIXED:
+        return FixedBatchPolicy(max_batch_size, max_batch_latency_ms)
+    if policy == ADAPTIVE:
+        return AdaptiveBatchPolicy(
+            max_batch_size=adaptive_max_batch_size,
+            max_window_ms=max_batch_latency_ms,
+            slo_ms=slo_ms,
+            workers=workers,
+            initial_batch_size=max_batch_size,
+        )
+    raise ValueError(f"Unknown batch policy {policy!r}, expected one of {POLICIES}")
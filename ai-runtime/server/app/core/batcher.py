@@ -1,21 +1,61 @@
 import asyncio
 import logging
-from typing import List, Optional
+import math
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 from dataclasses import dataclass
+from server.app.core.batch_buckets import Bucket, LengthBuckets, padding_efficiency
+from server.app.core.batch_cost import CostEstimator, TokenCostEstimator
+from server.app.core.batch_policy import BatchPolicy, FixedBatchPolicy
+from server.app.core.cancellation import QUEUED, CancelStats
+from server.app.core.deadlines import DropStats, drop_if_late
 from server.app.core.queue import QueuedRequest
 from server.app.schemas.inference import InferenceRequest
 
 logger = logging.getLogger(__name__)
 
+# Why a batch was closed
+FULL = "full"
+BUDGET = "budget"
+WINDOW = "window"
+SHUTDOWN = "shutdown"
+
 
 @dataclass
 class Batch:
     requests: List[QueuedRequest]
     created_at: float
+    # Dispatch order, assigned by the scheduler
+    sequence: int = 0
+    # Model every request in the batch runs on; None for the default model
+    model: Optional[str] = None
+    # Estimated cost of the batch, in the cost estimator's units
+    cost: float = 0.0
+    # Share of the padded prompt and generation tokens that is real work
+    padding_efficiency: float = 1.0
 
     def size(self) -> int:
         return len(self.requests)
 
+    def urgency(self) -> Tuple[int, float, int]:
+        # That of the most urgent request: a batch is as urgent as the most
+        # urgent caller waiting on it
+        return min((queued.urgency() for queued in self.requests), default=(math.inf, math.inf, 0))
+
+
+def model_key(queued: QueuedRequest) -> Hashable:
+    return queued.request.model
+
+
+@dataclass
+class _OpenBatch:
+    batch: Batch
+    target_size: int
+    # Event loop time at which the batch goes out however full it is
+    flush_at: float
+    # Batch key, and length bucket within it (None without bucketing)
+    group: Hashable = None
+    bucket: Optional[Bucket] = None
+
 
 class DynamicBatcher:
     def __init__(
@@ -24,12 +64,46 @@ class DynamicBatcher:
         max_batch_latency_ms: int,
         input_queue: asyncio.Queue[QueuedRequest],
         output_queue: asyncio.Queue[Batch],
+        policy: Optional[BatchPolicy] = None,
+        drop_stats: Optional[DropStats] = None,
+        batch_key: Callable[[QueuedRequest], Hashable] = model_key,
+        max_batch_cost: Optional[float] = None,
+        cost_estimator: Optional[CostEstimator] = None,
+        buckets: Optional[LengthBuckets] = None,
+        cancel_stats: Optional[CancelStats] = None,
     ) -> None:
         self._max_batch_size = max_batch_size
         self._max_batch_latency_ms = max_batch_latency_ms
+        self._policy = policy or FixedBatchPolicy(max_batch_size, max_batch_latency_ms)
         self._input_queue = input_queue
         self._output_queue = output_queue
-        self._current_batch: Optional[Batch] = None
+        self._drop_stats = drop_stats
+        self._cancel_stats = cancel_stats
+        # Requests only share a batch when their keys are equal: by default
+        # the model, since a batch runs on one model
+        self._batch_key = batch_key
+        # Within a key, requests are split further by length bucket, each
+        # bucket with its own open batch
+        self._buckets = buckets
+        # Batches being filled, one per (key, bucket), oldest first
+        self._open: Dict[Tuple[Hashable, Optional[Bucket]], _OpenBatch] = {}
+        # Budget on the summed cost of a batch (None: requests only count
+        # against the target size). A request that would take a batch over
+        # it starts the next batch; one that exceeds it alone runs alone.
+        self._max_batch_cost = max_batch_cost
+        self._cost_estimator = cost_estimator or TokenCostEstimator()
+        self._batches = 0
+        self._batched_requests = 0
+        self._batched_cost = 0.0
+        self._flushes: Dict[str, int] = {FULL: 0, BUDGET: 0, WINDOW: 0, SHUTDOWN: 0}
+        self._merged_batches = 0
+        self._padding_efficiency_sum = 0.0
+        self._min_padding_efficiency: Optional[float] = None
+        self._length_estimator = (
+            buckets.estimator if buckets is not None
+            else cost_estimator if isinstance(cost_estimator, TokenCostEstimator)
+            else TokenCostEstimator()
+        )
         self._running = False
         self._task: Optional[asyncio.Task] = None
 
@@ -40,62 +114,182 @@ class DynamicBatcher:
         self._task = asyncio.create_task(self._batch_loop())
         logger.info(
             f"DynamicBatcher started: max_size={self._max_batch_size}, "
-            f"max_latency_ms={self._max_batch_latency_ms}"
+            f"max_latency_ms={self._max_batch_latency_ms}, "
+            f"policy={type(self._policy).__name__}, "
+            f"max_batch_cost={self._max_batch_cost}, "
+            f"length_buckets={self._buckets is not None}"
         )
 
+    @property
+    def policy(self) -> BatchPolicy:
+        return self._policy
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._policy.describe(),
+            **self._cost_estimator.describe(),
+            "max_batch_cost": self._max_batch_cost,
+            "open_batches": len(self._open),
+            "batches": self._batches,
+            "mean_batch_size": self._batched_requests / self._batches if self._batches else 0.0,
+            "mean_batch_cost": self._batched_cost / self._batches if self._batches else 0.0,
+            "flushes": dict(self._flushes),
+            "length_buckets": self._buckets.describe() if self._buckets else None,
+            "merged_batches": self._merged_batches,
+            "mean_padding_efficiency": (
+                self._padding_efficiency_sum / self._batches if self._batches else 1.0
+            ),
+            "min_padding_efficiency": (
+                self._min_padding_efficiency if self._min_padding_efficiency is not None else 1.0
+            ),
+        }
+
     async def stop(self) -> None:
         self._running = False
-        if self._current_batch and self._current_batch.size() > 0:
-            await self._flush_batch()
         if self._task:
             self._task.cancel()
             try:
                 await self._task
             except asyncio.CancelledError:
                 pass
+            self._task = None
+        # Requests collected before cancellation still go out
+        for key in list(self._open):
+            await self._flush_batch(key, SHUTDOWN)
         logger.info("DynamicBatcher stopped")
 
     async def _batch_loop(self) -> None:
-        while self._running:
+        # Idle: one blocking get, no timers. While batches are open, the wait
+        # for the next request ends at the earliest batch's flush time, and
+        # requests already queued are taken before any window is checked. A
+        # request joins the open batch for its key or opens one, with the
+        # policy's target size and window at that moment. A batch closes at
+        # its target size, at its cost budget or when its window ends.
+        # Requests whose deadline has passed or whose caller has gone away
+        # never join a batch. Shutdown cancels the pending get.
+        #
+        # With length buckets, each bucket fills and times out on its own.
+        # A bucket's window is fixed when it opens, so a sparse bucket is
+        # never held back by busy ones; and when it closes under-filled it
+        # takes along the open batches of neighbouring buckets for the same
+        # key rather than going out as a lone request.
+        loop = asyncio.get_running_loop()
+        while True:
             try:
-                if self._current_batch is None:
-                    try:
-                        queued = await asyncio.wait_for(
-                            self._input_queue.get(), timeout=0.1
-                        )
-                        self._current_batch = Batch(
-                            requests=[queued], created_at=asyncio.get_event_loop().time()
-                        )
-                    except asyncio.TimeoutError:
-                        continue
-                    except asyncio.CancelledError:
-                        break
+                queued: Optional[QueuedRequest] = None
+                if not self._open:
+                    queued = await self._input_queue.get()
                 else:
+                    flush_at = min(open_batch.flush_at for open_batch in self._open.values())
                     try:
-                        queued = await asyncio.wait_for(
-                            self._input_queue.get(),
-                            timeout=self._max_batch_latency_ms / 1000.0,
-                        )
-                        self._current_batch.requests.append(queued)
-                    except asyncio.TimeoutError:
-                        await self._flush_batch()
-                        continue
-                    except asyncio.CancelledError:
-                        break
-
-                if self._current_batch.size() >= self._max_batch_size:
-                    await self._flush_batch()
-            except asyncio.CancelledError:
-                break
+                        async with asyncio.timeout_at(flush_at):
+                            queued = await self._input_queue.get()
+                    except TimeoutError:
+                        pass
+                if queued is not None and self._admit(queued, loop):
+                    await self._add(queued, loop.time())
+                if queued is None or self._input_queue.empty():
+                    # Requests already queued join before windows are checked
+                    now = loop.time()
+                    for key in [key for key, b in self._open.items() if b.flush_at <= now]:
+                        if key in self._open:
+                            self._merge_neighbours(key)
+                        await self._flush_batch(key, WINDOW)
             except Exception as e:
                 logger.error(f"Batcher error: {e}", exc_info=True)
-                if self._current_batch and self._current_batch.size() > 0:
-                    await self._flush_batch()
+                for key in list(self._open):
+                    await self._flush_batch(key, SHUTDOWN)
+
+    async def _add(self, queued: QueuedRequest, now: float) -> None:
+        group = self._batch_key(queued)
+        bucket = self._buckets.bucket(queued.request) if self._buckets is not None else None
+        key = (group, bucket)
+        cost = self._cost_estimator.estimate(queued.request)
+        budget = self._max_batch_cost
+        open_batch = self._open.get(key)
+        if open_batch is not None and budget is not None and open_batch.batch.cost + cost > budget:
+            await self._flush_batch(key, BUDGET)
+            open_batch = None
+        if open_batch is None:
+            open_batch = self._open[key] = self._open_batch(queued, now)
+            open_batch.group, open_batch.bucket = group, bucket
+        else:
+            open_batch.batch.requests.append(queued)
+        open_batch.batch.cost += cost
+        if open_batch.batch.size() >= open_batch.target_size:
+            await self._flush_batch(key, FULL)
+        elif budget is not None and open_batch.batch.cost >= budget:
+            await self._flush_batch(key, BUDGET)
+
+    def _open_batch(self, queued: QueuedRequest, now: float) -> _OpenBatch:
+        return _OpenBatch(
+            batch=Batch(requests=[queued], created_at=now, model=queued.request.model),
+            target_size=self._policy.target_size(),
+            flush_at=now + self._policy.window_s(),
+        )
 
-    async def _flush_batch(self) -> None:
-        if self._current_batch is None or self._current_batch.size() == 0:
+    def _merge_neighbours(self, key: Tuple[Hashable, Optional[Bucket]]) -> None:
+        # Starvation guard for sparse buckets: fill the closing batch from
+        # the same key's other buckets, nearest length first, within the
+        # target size and cost budget
+        closing = self._open[key]
+        if closing.bucket is None:
             return
-        batch = self._current_batch
-        self._current_batch = None
+        batch = closing.batch
+        neighbours = sorted(
+            (
+                (abs(b.bucket[0] - closing.bucket[0]) + abs(b.bucket[1] - closing.bucket[1]), b.flush_at, k)
+                for k, b in self._open.items()
+                if k != key and b.group == closing.group
+            ),
+            key=lambda item: item[:2],
+        )
+        for _, _, other_key in neighbours:
+            other = self._open[other_key].batch
+            if batch.size() + other.size() > closing.target_size:
+                continue
+            if self._max_batch_cost is not None and batch.cost + other.cost > self._max_batch_cost:
+                continue
+            batch.requests.extend(other.requests)
+            batch.cost += other.cost
+            del self._open[other_key]
+            self._merged_batches += 1
+
+    def _admit(self, queued: QueuedRequest, loop: asyncio.AbstractEventLoop) -> bool:
+        if queued.future.cancelled():
+            self._skip_cancelled(queued)
+            return False
+        now = loop.time()
+        self._policy.observe_arrival(queued.enqueued_at if queued.enqueued_at is not None else now)
+        return not drop_if_late(queued, now, self._drop_stats)
+
+    def _skip_cancelled(self, queued: QueuedRequest) -> None:
+        if self._cancel_stats is not None:
+            self._cancel_stats.record_skipped(queued, QUEUED)
+
+    async def _flush_batch(self, key: Tuple[Hashable, Optional[Bucket]], reason: str) -> None:
+        open_batch = self._open.pop(key, None)
+        if open_batch is None:
+            return
+        batch = open_batch.batch
+        # Requests cancelled while the batch was open leave it here
+        for queued in batch.requests:
+            if queued.future.cancelled():
+                self._skip_cancelled(queued)
+                batch.cost -= self._cost_estimator.estimate(queued.request)
+        batch.requests = [queued for queued in batch.requests if not queued.future.cancelled()]
+        if batch.size() == 0:
+            return
+        self._batches += 1
+        self._batched_requests += batch.size()
+        self._batched_cost += batch.cost
+        self._flushes[reason] += 1
+        batch.padding_efficiency = padding_efficiency(batch.requests, self._length_estimator)
+        self._padding_efficiency_sum += batch.padding_efficiency
+        if self._min_padding_efficiency is None or batch.padding_efficiency < self._min_padding_efficiency:
+            self._min_padding_efficiency = batch.padding_efficiency
         await self._output_queue.put(batch)
-        logger.debug(f"Batch flushed: size={batch.size()}")
+        logger.debug(
+            f"Batch flushed ({reason}): size={batch.size()}, cost={batch.cost:.0f}, "
+            f"padding_efficiency={batch.padding_efficiency:.2f}"
+        )
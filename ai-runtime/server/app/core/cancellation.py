@@ -0,0 +1,44 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+from server.app.core.batch_cost import TokenCostEstimator
+from server.app.core.queue import QueuedRequest
+
+logger = logging.getLogger(__name__)
+
+# Where a cancelled request's work was skipped
+QUEUED = "queued"
+BATCHED = "batched"
+RUNNING = "running"
+STAGES = (QUEUED, BATCHED, RUNNING)
+
+
+class CancelStats:
+    # Cancelled requests (client gone) whose work was skipped, by stage:
+    # before joining a batch, in a batch before it ran, or mid-generation.
+    # Tokens saved are prompt plus max_tokens for requests that never ran
+    # and the remaining max_tokens for ones stopped while running. Updated
+    # from the event loop and executor threads; read by the metrics endpoint.
+
+    def __init__(self, estimator: Optional[TokenCostEstimator] = None) -> None:
+        self._lock = threading.Lock()
+        self._estimator = estimator or TokenCostEstimator()
+        self._cancelled: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self._tokens_saved = 0
+
+    def record(self, stage: str, tokens_saved: float) -> None:
+        with self._lock:
+            self._cancelled[stage] += 1
+            self._tokens_saved += int(tokens_saved)
+
+    def record_skipped(self, queued: QueuedRequest, stage: str) -> None:
+        self.record(stage, self._estimator.estimate(queued.request))
+        logger.info(f"Skipped cancelled request {queued.request_id} ({stage})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cancelled": sum(self._cancelled.values()),
+                "cancelled_by_stage": dict(self._cancelled),
+                "tokens_saved": self._tokens_saved,
+            }
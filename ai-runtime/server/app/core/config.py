@@ -10,11 +10,37 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
     model_path: Optional[str] = None
     model_name: Optional[str] = None
+    # Comma-separated "package.module:ClassName" paths a model directory's
+    # config.json may name as its architecture
+    model_architectures: str = ""
     use_mock_model: bool = False
+    mock_first_token_delay_ms: float = 0.0
+    mock_token_delay_ms: float = 0.0
+    mock_model_bytes: int = 256 * 1024 * 1024
+    model_memory_budget_bytes: int = 0
     max_concurrent_requests: int = 2
     batch_max_size: int = 8
     batch_max_latency_ms: int = 50
+    batch_policy: str = "fixed"
+    batch_slo_ms: int = 200
+    batch_adaptive_max_size: int = 32
+    batch_max_tokens: int = 0
+    batch_cost_estimator: str = "tokens"
+    batch_prompt_buckets: str = ""
+    batch_max_tokens_buckets: str = ""
     max_in_flight_requests: int = 100
+    scheduler_max_queued_batches: int = 2
+    scheduler_work_stealing: bool = False
+    worker_max_in_flight_batches: int = 2
+    worker_continuous_batching: bool = False
+    worker_max_running_requests: int = 32
+    worker_processes: bool = False
+    worker_process_count: int = 0
+    prefix_cache_max_bytes: int = 0
+    response_cache_enabled: bool = False
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 16 * 1024 * 1024
+    response_cache_ttl_s: float = 60.0
     gateway_url: Optional[str] = None
     node_id: Optional[str] = None
     heartbeat_interval_sec: int = 5
@@ -29,15 +55,85 @@ class Settings(BaseSettings):
         use_mock = os.getenv("USE_MOCK_MODEL", "").lower()
         if use_mock in ("true", "1", "yes"):
             object.__setattr__(self, "use_mock_model", True)
+        first_token_delay = os.getenv("MOCK_FIRST_TOKEN_DELAY_MS")
+        if first_token_delay:
+            object.__setattr__(self, "mock_first_token_delay_ms", float(first_token_delay))
+        token_delay = os.getenv("MOCK_TOKEN_DELAY_MS")
+        if token_delay:
+            object.__setattr__(self, "mock_token_delay_ms", float(token_delay))
+        mock_model_bytes = os.getenv("MOCK_MODEL_BYTES")
+        if mock_model_bytes:
+            object.__setattr__(self, "mock_model_bytes", int(mock_model_bytes))
+        model_budget = os.getenv("MODEL_MEMORY_BUDGET_BYTES")
+        if model_budget:
+            object.__setattr__(self, "model_memory_budget_bytes", int(model_budget))
         batch_size = os.getenv("BATCH_MAX_SIZE")
         if batch_size:
             object.__setattr__(self, "batch_max_size", int(batch_size))
         batch_latency = os.getenv("BATCH_MAX_LATENCY_MS")
         if batch_latency:
             object.__setattr__(self, "batch_max_latency_ms", int(batch_latency))
+        batch_policy = os.getenv("BATCH_POLICY")
+        if batch_policy:
+            object.__setattr__(self, "batch_policy", batch_policy.lower())
+        batch_slo = os.getenv("BATCH_SLO_MS")
+        if batch_slo:
+            object.__setattr__(self, "batch_slo_ms", int(batch_slo))
+        adaptive_size = os.getenv("BATCH_ADAPTIVE_MAX_SIZE")
+        if adaptive_size:
+            object.__setattr__(self, "batch_adaptive_max_size", int(adaptive_size))
+        batch_tokens = os.getenv("BATCH_MAX_TOKENS")
+        if batch_tokens:
+            object.__setattr__(self, "batch_max_tokens", int(batch_tokens))
+        cost_estimator = os.getenv("BATCH_COST_ESTIMATOR")
+        if cost_estimator:
+            object.__setattr__(self, "batch_cost_estimator", cost_estimator.lower())
+        # Empty leaves bucketing off
+        prompt_buckets = os.getenv("BATCH_PROMPT_BUCKETS")
+        if prompt_buckets is not None:
+            object.__setattr__(self, "batch_prompt_buckets", prompt_buckets)
+        max_tokens_buckets = os.getenv("BATCH_MAX_TOKENS_BUCKETS")
+        if max_tokens_buckets is not None:
+            object.__setattr__(self, "batch_max_tokens_buckets", max_tokens_buckets)
         max_in_flight = os.getenv("MAX_IN_FLIGHT_REQUESTS")
         if max_in_flight:
             object.__setattr__(self, "max_in_flight_requests", int(max_in_flight))
+        max_queued = os.getenv("SCHEDULER_MAX_QUEUED_BATCHES")
+        if max_queued:
+            object.__setattr__(self, "scheduler_max_queued_batches", int(max_queued))
+        work_stealing = os.getenv("SCHEDULER_WORK_STEALING", "").lower()
+        if work_stealing:
+            object.__setattr__(self, "scheduler_work_stealing", work_stealing in ("true", "1", "yes"))
+        worker_in_flight = os.getenv("WORKER_MAX_IN_FLIGHT_BATCHES")
+        if worker_in_flight:
+            object.__setattr__(self, "worker_max_in_flight_batches", int(worker_in_flight))
+        continuous = os.getenv("WORKER_CONTINUOUS_BATCHING", "").lower()
+        if continuous:
+            object.__setattr__(self, "worker_continuous_batching", continuous in ("true", "1", "yes"))
+        max_running = os.getenv("WORKER_MAX_RUNNING_REQUESTS")
+        if max_running:
+            object.__setattr__(self, "worker_max_running_requests", int(max_running))
+        worker_processes = os.getenv("WORKER_PROCESSES", "").lower()
+        if worker_processes:
+            object.__setattr__(self, "worker_processes", worker_processes in ("true", "1", "yes"))
+        process_count = os.getenv("WORKER_PROCESS_COUNT")
+        if process_count:
+            object.__setattr__(self, "worker_process_count", int(process_count))
+        prefix_cache_bytes = os.getenv("PREFIX_CACHE_MAX_BYTES")
+        if prefix_cache_bytes:
+            object.__setattr__(self, "prefix_cache_max_bytes", int(prefix_cache_bytes))
+        cache_enabled = os.getenv("RESPONSE_CACHE_ENABLED", "").lower()
+        if cache_enabled:
+            object.__setattr__(self, "response_cache_enabled", cache_enabled in ("true", "1", "yes"))
+        cache_entries = os.getenv("RESPONSE_CACHE_MAX_ENTRIES")
+        if cache_entries:
+            object.__setattr__(self, "response_cache_max_entries", int(cache_entries))
+        cache_bytes = os.getenv("RESPONSE_CACHE_MAX_BYTES")
+        if cache_bytes:
+            object.__setattr__(self, "response_cache_max_bytes", int(cache_bytes))
+        cache_ttl = os.getenv("RESPONSE_CACHE_TTL_S")
+        if cache_ttl:
+            object.__setattr__(self, "response_cache_ttl_s", float(cache_ttl))
         gateway_url = os.getenv("GATEWAY_URL")
         if gateway_url:
             object.__setattr__(self, "gateway_url", gateway_url)
@@ -0,0 +1,269 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from server.app.core.batcher import Batch
+from server.app.core.cancellation import CancelStats
+from server.app.core.deadlines import DropStats
+from server.app.core.queue import QueuedRequest
+from server.app.core.worker import SERVICE_TIME_EWMA_ALPHA, GPUWorker
+from server.app.models.loader import GenerationRow, ModelLoader
+from server.app.models.registry import ModelRegistry
+from server.app.schemas.inference import DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE, InferenceResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RunningRequest:
+    queued: QueuedRequest
+    row: GenerationRow
+    # Loader of the request's model, pinned while the request runs; None if
+    # the model failed to load
+    loader: Optional[ModelLoader] = None
+
+
+class ContinuousBatchingWorker(GPUWorker):
+    # Iteration-level batching: instead of holding a batch until its longest
+    # request finishes, the worker runs one decoding step at a time over a
+    # set of running requests. Requests from newly queued batches join at the
+    # next step boundary (up to max_running_requests) and finished ones leave
+    # right away, so short requests never wait for long ones to drain.
+
+    def __init__(
+        self,
+        worker_id: int,
+        gpu_id: int,
+        model_loader: Optional[ModelLoader] = None,
+        max_running_requests: int = 32,
+        drop_stats: Optional[DropStats] = None,
+        model_registry: Optional[ModelRegistry] = None,
+        cancel_stats: Optional[CancelStats] = None,
+        on_batch_executed: Optional[Callable[[int, float], None]] = None,
+    ) -> None:
+        if max_running_requests < 1:
+            raise ValueError("max_running_requests must be at least 1")
+        super().__init__(
+            worker_id=worker_id,
+            gpu_id=gpu_id,
+            model_loader=model_loader,
+            on_batch_executed=on_batch_executed,
+            drop_stats=drop_stats,
+            model_registry=model_registry,
+            cancel_stats=cancel_stats,
+        )
+        self._max_running_requests = max_running_requests
+        self._running_requests: List[RunningRequest] = []
+        # Taken from the queue, waiting for a free row
+        self._waiting: Deque[QueuedRequest] = deque()
+        self._steps = 0
+        self._completed_requests = 0
+        self._peak_running_requests = 0
+        # Step time since the last request finished, for the service time
+        # average: per-request time is the step time spent per completion
+        self._busy_since_completion_s = 0.0
+
+    @property
+    def max_running_requests(self) -> int:
+        return self._max_running_requests
+
+    @property
+    def running_requests(self) -> int:
+        return len(self._running_requests)
+
+    def _has_room(self) -> bool:
+        return len(self._running_requests) + len(self._waiting) < self._max_running_requests
+
+    async def _worker_loop(self) -> None:
+        # Blocks on the queue only while nothing is running; otherwise picks
+        # up queued batches between steps without waiting
+        loop = asyncio.get_running_loop()
+        input_queue = self.get_input_queue()
+        while True:
+            if not self._running_requests and not self._waiting:
+                batch = self._next_queued()
+                if batch is None:
+                    batch = await input_queue.get()
+                    self._queued_requests -= batch.size()
+                self._admit(batch)
+            while self._has_room():
+                batch = self._next_queued()
+                if batch is None:
+                    break
+                self._admit(batch)
+            self._leave_done()
+
+            joining: List[QueuedRequest] = []
+            while self._waiting and len(self._running_requests) + len(joining) < self._max_running_requests:
+                queued = self._waiting.popleft()
+                if not queued.future.done():
+                    joining.append(queued)
+                else:
+                    if queued.future.cancelled():
+                        self._skip_cancelled(queued)
+                    self._track_running(-1)
+            if not joining and not self._running_requests:
+                continue
+
+            self._execute_started_at = loop.time()
+            started: List[RunningRequest] = []
+            try:
+                pieces = await loop.run_in_executor(
+                    None, self._step, joining, list(self._running_requests), started
+                )
+            except Exception as e:
+                self._fail_step(joining, started, e)
+                continue
+            finally:
+                elapsed = loop.time() - self._execute_started_at
+                self._execute_started_at = None
+                self._execute_busy_s += elapsed
+                self._busy_since_completion_s += elapsed
+            self._steps += 1
+            # Each step is the unit of work here: its rows and time are what
+            # the batch policy fits service time to
+            self._notify_batch_executed(len(pieces), elapsed)
+            self._running_requests.extend(started)
+            self._peak_running_requests = max(self._peak_running_requests, len(self._running_requests))
+            self._deliver(pieces)
+
+    def _admit(self, batch: Batch) -> None:
+        requests = self._live_requests(batch)
+        self._waiting.extend(requests)
+        self._track_running(len(requests))
+
+    def _step(
+        self,
+        joining: List[QueuedRequest],
+        running: List[RunningRequest],
+        started: List[RunningRequest],
+    ) -> List[Optional[str]]:
+        # Runs on the executor thread: starts the joining requests (loading
+        # their models if needed) into started and advances every row one
+        # token, each model's rows in one step call. Returns the pieces per
+        # request, running ones first.
+        for queued in joining:
+            started.append(self._start(queued))
+        everyone = running + started
+        pieces: List[Optional[str]] = [None] * len(everyone)
+        groups: Dict[int, Tuple[ModelLoader, List[int]]] = {}
+        for i, request in enumerate(everyone):
+            if request.loader is not None:
+                groups.setdefault(id(request.loader), (request.loader, []))[1].append(i)
+        for loader, indexes in groups.values():
+            for i, piece in zip(indexes, loader.step_rows([everyone[i].row for i in indexes])):
+                pieces[i] = piece
+        return pieces
+
+    def _start(self, queued: QueuedRequest) -> RunningRequest:
+        request = queued.request
+        row = GenerationRow(
+            prompt=request.prompt,
+            max_tokens=request.max_tokens if request.max_tokens is not None else DEFAULT_MAX_TOKENS,
+            temperature=request.temperature if request.temperature is not None else DEFAULT_TEMPERATURE,
+        )
+        try:
+            loader = self._models.acquire(request.model)
+        except Exception as e:
+            row.error = e
+            row.finished = True
+            return RunningRequest(queued=queued, row=row)
+        row = loader.start_rows([row.prompt], [row.max_tokens], [row.temperature])[0]
+        return RunningRequest(queued=queued, row=row, loader=loader)
+
+    def _release(self, requests: List[RunningRequest]) -> None:
+        # Unpins the prefixes and models of requests that are leaving
+        for request in requests:
+            if request.loader is not None:
+                request.loader.release_rows([request.row])
+                self._models.release(request.queued.request.model)
+                request.loader = None
+
+    def _fail_step(
+        self, joining: List[QueuedRequest], started: List[RunningRequest], error: Exception
+    ) -> None:
+        # A step that raised leaves its rows in an unknown state: every
+        # running and joining request fails with the error and frees its row
+        logger.error(f"Worker {self._worker_id} decoding step failed: {error}", exc_info=True)
+        failed = self._running_requests + started
+        self._running_requests = []
+        self._release(failed)
+        for queued in [r.queued for r in failed] + joining[len(started):]:
+            if not queued.future.done():
+                queued.future.set_exception(error)
+        self._track_running(-(len(failed) + len(joining) - len(started)))
+
+    def _deliver(self, pieces: List[Optional[str]]) -> None:
+        still_running: List[RunningRequest] = []
+        finished = 0
+        for running, piece in zip(self._running_requests, pieces):
+            queued, row = running.queued, running.row
+            if piece and queued.token_sink is not None and row.error is None:
+                queued.token_sink.put_nowait(piece)
+            if not row.finished:
+                still_running.append(running)
+                continue
+            finished += 1
+            self._release([running])
+            if not queued.future.done():
+                if row.error is not None:
+                    queued.future.set_exception(row.error)
+                else:
+                    queued.future.set_result(
+                        InferenceResponse(api_version="v1", text=row.text, request_id=queued.request_id)
+                    )
+        self._running_requests = still_running
+        if finished:
+            self._completed_requests += finished
+            self._track_running(-finished)
+            self._record_completions(finished)
+
+    def _leave_done(self) -> None:
+        # Requests resolved elsewhere (cancelled, dropped) free their row
+        left = [r for r in self._running_requests if r.queued.future.done()]
+        for request in left:
+            if request.queued.future.cancelled() and not request.row.finished:
+                self._record_cancelled_row(max(0, request.row.max_tokens - request.row.steps))
+        if left:
+            self._running_requests = [r for r in self._running_requests if not r.queued.future.done()]
+            self._release(left)
+            self._track_running(-len(left))
+
+    def _track_running(self, requests: int) -> None:
+        self._track_in_flight(requests, 0)
+        self._set_available(self._has_room())
+
+    def _record_completions(self, finished: int) -> None:
+        per_request = self._busy_since_completion_s / finished
+        self._busy_since_completion_s = 0.0
+        if self._service_time_per_request_s == 0.0:
+            self._service_time_per_request_s = per_request
+        else:
+            self._service_time_per_request_s += SERVICE_TIME_EWMA_ALPHA * (
+                per_request - self._service_time_per_request_s
+            )
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self.get_input_queue()
+        self._running = True
+        self._started_at = self._in_flight_changed_at = asyncio.get_running_loop().time()
+        self._task = asyncio.create_task(self._worker_loop())
+        logger.info(
+            f"ContinuousBatchingWorker {self._worker_id} started on GPU {self._gpu_id}: "
+            f"max_running_requests={self._max_running_requests}"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "continuous_batching": True,
+            "running_requests": len(self._running_requests),
+            "waiting_requests": len(self._waiting),
+            "max_running_requests": self._max_running_requests,
+            "peak_running_requests": self._peak_running_requests,
+            "completed_requests": self._completed_requests,
+            "decode_steps": self._steps,
+        }
@@ -0,0 +1,106 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first; requests without one are "standard"
+INTERACTIVE = "interactive"
+STANDARD = "standard"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, STANDARD, BULK)
+
+DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"
+
+# Drop reasons
+EXPIRED = "expired"
+UNMEETABLE = "unmeetable"
+QUEUE_FULL = "queue_full"
+
+
+def priority_rank(priority: Optional[str]) -> int:
+    if priority is None:
+        return PRIORITY_CLASSES.index(STANDARD)
+    try:
+        return PRIORITY_CLASSES.index(priority)
+    except ValueError:
+        raise ValueError(
+            f"Unknown priority {priority!r}, expected one of {PRIORITY_CLASSES}"
+        )
+
+
+class DeadlineExceeded(RuntimeError):
+    # Raised to the caller when its request was dropped because the deadline
+    # had passed (expired) or could no longer be met (unmeetable)
+    code = DEADLINE_EXCEEDED
+
+    def __init__(self, request_id: str, reason: str, late_by_ms: float) -> None:
+        self.request_id = request_id
+        self.reason = reason
+        self.late_by_ms = late_by_ms
+        super().__init__(
+            f"Request {request_id} dropped: deadline {reason} "
+            f"(late by {late_by_ms:.1f} ms)"
+        )
+
+
+class DropStats:
+    # Submitted and dropped request counts per priority class. Updated from
+    # the event loop; read by the metrics endpoint.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._submitted: Dict[str, int] = {name: 0 for name in PRIORITY_CLASSES}
+        self._dropped: Dict[str, Dict[str, int]] = {name: {} for name in PRIORITY_CLASSES}
+
+    def record_submitted(self, priority: str) -> None:
+        with self._lock:
+            self._submitted[priority] = self._submitted.get(priority, 0) + 1
+
+    def record_dropped(self, priority: str, reason: str) -> None:
+        with self._lock:
+            reasons = self._dropped.setdefault(priority, {})
+            reasons[reason] = reasons.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {}
+            for name in sorted(set(self._submitted) | set(self._dropped), key=priority_rank):
+                submitted = self._submitted.get(name, 0)
+                dropped = dict(self._dropped.get(name, {}))
+                total = sum(dropped.values())
+                classes[name] = {
+                    "submitted": submitted,
+                    "dropped": total,
+                    "dropped_by_reason": dropped,
+                    "drop_rate": total / submitted if submitted else 0.0,
+                }
+            return classes
+
+
+def drop_if_late(
+    queued: Any,
+    now: float,
+    stats: Optional[DropStats] = None,
+    remaining_s: float = 0.0,
+) -> bool:
+    # Fails the request's future with DeadlineExceeded and returns True if its
+    # deadline has passed, or would pass before remaining_s of further work
+    # completes. Requests without a deadline are never dropped.
+    deadline = queued.deadline
+    if deadline is None or queued.future.done():
+        return False
+    if now >= deadline:
+        reason = EXPIRED
+    elif now + remaining_s > deadline:
+        reason = UNMEETABLE
+    else:
+        return False
+    late_by_ms = (now + remaining_s - deadline) * 1000.0
+    queued.future.set_exception(DeadlineExceeded(queued.request_id, reason, late_by_ms))
+    if stats is not None:
+        stats.record_dropped(queued.priority, reason)
+    logger.info(
+        f"Dropped request {queued.request_id} ({queued.priority}): deadline {reason}"
+    )
+    return True
@@ -1,12 +1,21 @@
 import asyncio
 import logging
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from server.app.core.config import settings
 from server.app.core.queue import BoundedRequestQueue
 from server.app.core.batcher import DynamicBatcher
-from server.app.core.worker import GPUWorker
+from server.app.core.batch_buckets import LengthBuckets, parse_edges
+from server.app.core.batch_cost import create_cost_estimator
+from server.app.core.batch_policy import create_batch_policy
+from server.app.core.cancellation import CancelStats
+from server.app.core.deadlines import STANDARD, DropStats
+from server.app.core.response_cache import ResponseCache, request_key
+from server.app.core.worker import BatchQueue, GPUWorker
+from server.app.core.continuous import ContinuousBatchingWorker
+from server.app.core.process_worker import ProcessWorker, physical_cpu_count
 from server.app.core.scheduler import Scheduler
 from server.app.models.loader import ModelLoader
+from server.app.models.registry import ModelRegistry
 from server.app.schemas.inference import InferenceRequest, InferenceResponse
 
 logger = logging.getLogger(__name__)
@@ -15,41 +24,118 @@ logger = logging.getLogger(__name__)
 class InferencePipeline:
     def __init__(self) -> None:
         self._request_queue: Optional[BoundedRequestQueue] = None
-        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_queue: Optional[BatchQueue] = None
         self._batcher: Optional[DynamicBatcher] = None
         self._workers: List[GPUWorker] = []
         self._scheduler: Optional[Scheduler] = None
+        self._drop_stats = DropStats()
+        self._cancel_stats = CancelStats()
+        self._response_cache: Optional[ResponseCache] = None
+        if settings.response_cache_enabled:
+            self._response_cache = ResponseCache(
+                max_entries=settings.response_cache_max_entries,
+                max_bytes=settings.response_cache_max_bytes,
+                ttl_s=settings.response_cache_ttl_s,
+            )
         self._initialized = False
 
     async def initialize(self) -> None:
         if self._initialized:
             return
 
-        gpu_count = self._get_gpu_count()
-        logger.info(f"Initializing pipeline with {gpu_count} GPUs")
+        if settings.worker_processes:
+            worker_count = settings.worker_process_count or physical_cpu_count()
+            logger.info(f"Initializing pipeline with {worker_count} worker processes")
+        else:
+            worker_count = self._get_gpu_count()
+            logger.info(f"Initializing pipeline with {worker_count} GPUs")
 
         self._request_queue = BoundedRequestQueue(
-            maxsize=settings.max_in_flight_requests
+            maxsize=settings.max_in_flight_requests,
+            drop_stats=self._drop_stats,
         )
-        self._batch_queue = asyncio.Queue()
+        # Ordered like the request queue, so a backlog of batches waiting for
+        # workers is still served by priority class and deadline
+        self._batch_queue = BatchQueue()
 
+        policy = create_batch_policy(
+            settings.batch_policy,
+            max_batch_size=settings.batch_max_size,
+            max_batch_latency_ms=settings.batch_max_latency_ms,
+            adaptive_max_batch_size=settings.batch_adaptive_max_size,
+            slo_ms=settings.batch_slo_ms,
+            workers=worker_count,
+        )
+        prompt_edges = parse_edges(settings.batch_prompt_buckets)
+        max_tokens_edges = parse_edges(settings.batch_max_tokens_buckets)
+        buckets = (
+            LengthBuckets(prompt_edges, max_tokens_edges)
+            if prompt_edges or max_tokens_edges else None
+        )
         self._batcher = DynamicBatcher(
             max_batch_size=settings.batch_max_size,
             max_batch_latency_ms=settings.batch_max_latency_ms,
             input_queue=self._request_queue._queue,
             output_queue=self._batch_queue,
+            policy=policy,
+            drop_stats=self._drop_stats,
+            cancel_stats=self._cancel_stats,
+            # 0 leaves batches bounded by request count alone
+            max_batch_cost=settings.batch_max_tokens or None,
+            cost_estimator=create_cost_estimator(settings.batch_cost_estimator),
+            buckets=buckets,
         )
 
         self._workers = []
-        for i in range(gpu_count):
-            loader = ModelLoader(gpu_id=i)
-            loader.load()
-            worker = GPUWorker(worker_id=i, gpu_id=i, model_loader=loader)
+        if settings.worker_processes and settings.worker_continuous_batching:
+            logger.warning("Continuous batching is not supported with worker processes, ignoring it")
+        for i in range(worker_count):
+            if settings.worker_processes:
+                # Each process loads its own model on the CPU
+                self._workers.append(
+                    ProcessWorker(
+                        worker_id=i,
+                        max_in_flight_batches=settings.worker_max_in_flight_batches,
+                        on_batch_executed=policy.observe_batch,
+                        drop_stats=self._drop_stats,
+                        cancel_stats=self._cancel_stats,
+                    )
+                )
+                continue
+            # Other models load on first use, within the device's budget
+            models = ModelRegistry(
+                gpu_id=i,
+                max_bytes=settings.model_memory_budget_bytes,
+                default_model=settings.model_name,
+            )
+            models.preload()
+            if settings.worker_continuous_batching:
+                worker: GPUWorker = ContinuousBatchingWorker(
+                    worker_id=i,
+                    gpu_id=i,
+                    model_registry=models,
+                    max_running_requests=settings.worker_max_running_requests,
+                    on_batch_executed=policy.observe_batch,
+                    drop_stats=self._drop_stats,
+                    cancel_stats=self._cancel_stats,
+                )
+            else:
+                worker = GPUWorker(
+                    worker_id=i,
+                    gpu_id=i,
+                    model_registry=models,
+                    max_in_flight_batches=settings.worker_max_in_flight_batches,
+                    on_batch_executed=policy.observe_batch,
+                    drop_stats=self._drop_stats,
+                    cancel_stats=self._cancel_stats,
+                )
             self._workers.append(worker)
 
         self._scheduler = Scheduler(
             workers=self._workers,
             batch_queue=self._batch_queue,
+            max_queued_batches=settings.scheduler_max_queued_batches,
+            work_stealing=settings.scheduler_work_stealing,
         )
 
         await self._batcher.start()
@@ -79,8 +165,85 @@ class InferencePipeline:
             await self.initialize()
         if self._request_queue is None:
             raise RuntimeError("Request queue not initialized")
-        future = await self._request_queue.put(request, request_id)
-        return await future
+        cache = self._response_cache
+        key = request_key(request) if cache is not None else None
+        if key is None:
+            future = await self._request_queue.put(request, request_id)
+            return await future
+
+        cached = cache.get(key, request_id)
+        if cached is not None:
+            return cached
+        if request.deadline_ms is not None:
+            # A deadline belongs to its own request: sharing a computation
+            # would impose one caller's deadline on the others
+            response = await (await self._request_queue.put(request, request_id))
+            cache.put(key, response)
+            return response
+        return await cache.compute(
+            key,
+            request_id,
+            lambda: self._request_queue.put(request, request_id),
+            group=request.priority or STANDARD,
+        )
+
+    async def stream(
+        self, request: InferenceRequest, request_id: str
+    ) -> AsyncIterator[str]:
+        # Yields generated text as the worker produces it. Raises what
+        # enqueue() would raise, after any text already yielded. Streams are
+        # served from the response cache but never share a computation.
+        if not self._initialized:
+            await self.initialize()
+        if self._request_queue is None:
+            raise RuntimeError("Request queue not initialized")
+        cache = self._response_cache
+        key = request_key(request) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key, request_id)
+            if cached is not None:
+                yield cached.text
+                return
+
+        tokens: asyncio.Queue = asyncio.Queue()
+        future = await self._request_queue.put(request, request_id, token_sink=tokens)
+        # None marks the end: the worker has queued every piece of text
+        # before the future resolves
+        future.add_done_callback(lambda _: tokens.put_nowait(None))
+        try:
+            while True:
+                piece = await tokens.get()
+                if piece is None:
+                    break
+                yield piece
+            response = future.result()
+        finally:
+            if not future.done():
+                future.cancel()
+        if key is not None:
+            cache.put(key, response)
+
+    def health(self) -> Dict[str, Any]:
+        # "degraded" while some workers are not ready (e.g. a worker process
+        # restarting), "unavailable" when none are
+        ready = sum(1 for worker in self._workers if worker.ready)
+        if ready == len(self._workers):
+            status = "ok"
+        else:
+            status = "degraded" if ready else "unavailable"
+        return {"status": status, "workers_ready": ready, "workers": len(self._workers)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "initialized": self._initialized,
+            "queued_requests": self._request_queue.qsize() if self._request_queue else 0,
+            "pending_batches": self._batch_queue.qsize() if self._batch_queue else 0,
+            "batcher": self._batcher.stats() if self._batcher else None,
+            "priority_classes": self._drop_stats.snapshot(),
+            "cancellations": self._cancel_stats.snapshot(),
+            "response_cache": self._response_cache.stats() if self._response_cache else None,
+            "workers": [worker.stats() for worker in self._workers],
+        }
 
     def _get_gpu_count(self) -> int:
         if settings.use_mock_model:
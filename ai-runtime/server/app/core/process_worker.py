@@ -0,0 +1,495 @@
+import asyncio
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+from server.app.core.cancellation import CancelStats
+from server.app.core.config import settings
+from server.app.core.deadlines import DropStats
+from server.app.core.queue import QueuedRequest
+from server.app.core.worker import GPUWorker
+from server.app.models.loader import ModelLoader, PreparedBatch, RowCancelled
+from server.app.models.registry import ModelRegistry
+from server.app.schemas.inference import DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a child process to load its model, and to exit on stop
+PROCESS_START_TIMEOUT_S = 120.0
+PROCESS_STOP_TIMEOUT_S = 5.0
+# Seconds between attempts to restart a process that failed to come back
+PROCESS_RESTART_RETRY_S = 5.0
+# Where the CPU controller of this process's cgroup is mounted
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+class WorkerProcessCrashed(RuntimeError):
+    # Raised to the requests of a batch whose worker process died running it
+    pass
+
+
+def physical_cpu_count() -> int:
+    # CPUs this process can actually keep busy: the physical cores, capped by
+    # its CPU affinity and by a cgroup CPU quota (as in a container), which
+    # os.cpu_count() both ignore
+    count = _physical_core_count()
+    if hasattr(os, "sched_getaffinity"):
+        count = min(count, len(os.sched_getaffinity(0)) or count)
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, quota)
+    return max(count, 1)
+
+
+def _cgroup_cpu_quota() -> Optional[int]:
+    # CPUs allowed by the cgroup quota, rounded up; None when unlimited.
+    # cgroup v2 has "<quota> <period>" (or "max <period>") in cpu.max, v1
+    # has cpu.cfs_quota_us (-1 when unlimited) and cpu.cfs_period_us.
+    try:
+        with open(os.path.join(CGROUP_ROOT, "cpu.max")) as f:
+            quota, _, period = f.read().strip().partition(" ")
+    except OSError:
+        try:
+            with open(os.path.join(CGROUP_ROOT, "cpu", "cpu.cfs_quota_us")) as f:
+                quota = f.read().strip()
+            with open(os.path.join(CGROUP_ROOT, "cpu", "cpu.cfs_period_us")) as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    try:
+        quota_us, period_us = int(quota), int(period)
+    except ValueError:
+        return None
+    if quota_us <= 0 or period_us <= 0:
+        return None
+    return max(math.ceil(quota_us / period_us), 1)
+
+
+def _physical_core_count() -> int:
+    # Physical cores from /proc/cpuinfo (Linux), which unlike os.cpu_count()
+    # does not count hyperthreads: CPU-bound workers sharing a core gain little
+    try:
+        cores = set()
+        physical_id = core_id = None
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    physical_id = value.strip()
+                elif key == "core id":
+                    core_id = value.strip()
+                elif not key and core_id is not None:
+                    cores.add((physical_id, core_id))
+                    physical_id = core_id = None
+        if core_id is not None:
+            cores.add((physical_id, core_id))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+    return os.cpu_count() or 1
+
+
+def _portable(error: Exception) -> Exception:
+    # Exceptions cross the pipe pickled; ones that cannot be are sent as
+    # a RuntimeError with the same message
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _process_main(
+    conn: Connection,
+    gpu_id: Optional[int],
+    settings_values: Dict[str, Any],
+    loader_factory: Callable[..., ModelLoader],
+) -> None:
+    # Child process: loads its own default model, then runs batches sent by
+    # the parent until it receives None, loading other models on demand.
+    # Messages from the parent:
+    #   ("run", batch id, model, prompts, max_tokens, temperatures, stream)
+    #   ("cancel", batch id, row) when a request of a batch is cancelled
+    # Messages to the parent:
+    #   ("ready", model stats) once loaded, or ("failed", error)
+    #   ("step", pieces) per decoding step of a streamed batch
+    #   ("done", results, model stats) when a batch completes
+    for name, value in settings_values.items():
+        object.__setattr__(settings, name, value)
+    models = ModelRegistry(
+        gpu_id=gpu_id,
+        max_bytes=settings.model_memory_budget_bytes,
+        default_model=settings.model_name,
+        loader_factory=loader_factory,
+    )
+    try:
+        models.preload()
+    except Exception as e:
+        conn.send(("failed", _portable(e)))
+        return
+    conn.send(("ready", models.stats()))
+    # Cancelled rows by batch id. A cancel can arrive before its batch (the
+    # parent sends it as soon as the request is cancelled) or after it is done.
+    cancels: Dict[int, Set[int]] = {}
+
+    def receive() -> Any:
+        message = conn.recv()
+        if message is not None and message[0] == "cancel":
+            cancels.setdefault(message[1], set()).add(message[2])
+        return message
+
+    while True:
+        try:
+            message = receive()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        if message[0] == "cancel":
+            continue
+        _, batch_id, model, prompts, max_tokens, temperatures, stream = message
+        cancelled = cancels.setdefault(batch_id, set())
+
+        def is_cancelled(row: int) -> bool:
+            while conn.poll():
+                receive()
+            return row in cancelled
+
+        try:
+            loader = models.acquire(model)
+        except Exception as e:
+            conn.send(("done", [_portable(e)] * len(prompts), models.stats()))
+            continue
+        try:
+            prepared = loader.prepare_batch(prompts, max_tokens, temperatures)
+            if stream or loader.supports_steps():
+                # Step-wise, so rows of cancelled requests stop early
+                texts: List[List[str]] = [[] for _ in prompts]
+                errors: List[Optional[Exception]] = [None] * len(prompts)
+                for step in loader.stream_batch(prepared, cancelled=is_cancelled):
+                    pieces: List[Optional[str]] = []
+                    for row, piece in enumerate(step):
+                        if isinstance(piece, Exception):
+                            errors[row] = piece
+                            piece = None
+                        elif piece and errors[row] is None:
+                            texts[row].append(piece)
+                        pieces.append(piece or None)
+                    if stream and any(pieces):
+                        conn.send(("step", pieces))
+                results: List[Union[str, Exception]] = [
+                    error if error is not None else "".join(text)
+                    for text, error in zip(texts, errors)
+                ]
+            else:
+                results = loader.run_batch(prepared)
+        except Exception as e:
+            results = [e] * len(prompts)
+        finally:
+            models.release(model)
+        for done in [key for key in cancels if key <= batch_id]:
+            del cancels[done]
+        conn.send((
+            "done",
+            [_portable(r) if isinstance(r, Exception) else r for r in results],
+            models.stats(),
+        ))
+
+
+class ProcessWorker(GPUWorker):
+    # Runs models in a separate OS process with its own ModelRegistry, so
+    # CPU-bound generation on several workers is not serialized by the GIL.
+    # The scheduler sees an ordinary worker: batches are prepared and queued
+    # as in GPUWorker, and only execution crosses the process boundary. Each
+    # batch goes over a pipe as plain lists of prompts and settings, and
+    # results (or, when streaming, one message per decoding step) come back
+    # the same way, and a request cancelled mid-batch is sent as a cancel
+    # message so the child stops its row at the next step. A process that
+    # dies fails the batch it was running and is restarted as soon as it
+    # exits; the worker reports itself not ready until it is back.
+
+    def __init__(
+        self,
+        worker_id: int,
+        gpu_id: Optional[int] = None,
+        max_in_flight_batches: int = 2,
+        on_batch_executed: Optional[Callable[[int, float], None]] = None,
+        drop_stats: Optional[DropStats] = None,
+        loader_factory: Callable[..., ModelLoader] = ModelLoader,
+        start_method: str = "spawn",
+        cancel_stats: Optional[CancelStats] = None,
+    ) -> None:
+        # Models live in the child; the parent only packs batches, which
+        # needs no model
+        super().__init__(
+            worker_id=worker_id,
+            gpu_id=gpu_id if gpu_id is not None else -1,
+            max_in_flight_batches=max_in_flight_batches,
+            on_batch_executed=on_batch_executed,
+            drop_stats=drop_stats,
+            cancel_stats=cancel_stats,
+        )
+        self._loader_gpu_id = gpu_id
+        self._loader_factory = loader_factory
+        self._context = multiprocessing.get_context(start_method)
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._conn: Optional[Connection] = None
+        # Held while a thread runs a batch on, or restarts, the process
+        self._process_lock = threading.Lock()
+        # Held while sending to the process, which cancel messages do from
+        # the event loop while a batch runs
+        self._send_lock = threading.Lock()
+        self._batch_ids = itertools.count()
+        self._monitor: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._restarts = 0
+        self._model_stats: Dict[str, Any] = {}
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    @property
+    def restarts(self) -> int:
+        return self._restarts
+
+    @property
+    def ready(self) -> bool:
+        # False while the process is dead or restarting
+        process = self._process
+        return self._running and process is not None and process.is_alive()
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._start_process)
+        self._stopping.clear()
+        self._monitor = threading.Thread(
+            target=self._monitor_process,
+            name=f"inference-worker-{self._worker_id}-monitor",
+            daemon=True,
+        )
+        self._monitor.start()
+        await super().start()
+
+    async def stop(self) -> None:
+        await super().stop()
+        self._stopping.set()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._stop_process)
+        if self._monitor is not None:
+            await loop.run_in_executor(None, self._monitor.join)
+            self._monitor = None
+
+    def _start_process(self) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_process_main,
+            args=(child_conn, self._loader_gpu_id, settings.model_dump(), self._loader_factory),
+            name=f"inference-worker-{self._worker_id}",
+            daemon=True,
+        )
+        process.start()
+        # Only the child holds its end, so the parent sees EOF if it dies
+        child_conn.close()
+        try:
+            if not parent_conn.poll(PROCESS_START_TIMEOUT_S):
+                raise RuntimeError(
+                    f"Worker process {self._worker_id} did not load its model in "
+                    f"{PROCESS_START_TIMEOUT_S:.0f}s"
+                )
+            status, payload = parent_conn.recv()
+        except Exception:
+            process.kill()
+            parent_conn.close()
+            raise
+        if status != "ready":
+            process.join(PROCESS_STOP_TIMEOUT_S)
+            parent_conn.close()
+            raise RuntimeError(f"Worker process {self._worker_id} failed to load model: {payload}")
+        self._process, self._conn = process, parent_conn
+        self._model_stats = payload
+        logger.info(f"Worker {self._worker_id} process started: pid={process.pid}")
+
+    def _stop_process(self) -> None:
+        with self._process_lock:
+            # Only the swap and the stop message hold the send lock, which
+            # cancels take on the event loop, not the wait for the exit
+            with self._send_lock:
+                process, conn = self._process, self._conn
+                self._process = self._conn = None
+                if conn is not None:
+                    try:
+                        conn.send(None)
+                    except (OSError, ValueError):
+                        pass
+                    conn.close()
+            if process is None:
+                return
+            process.join(PROCESS_STOP_TIMEOUT_S)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        logger.info(f"Worker {self._worker_id} process stopped")
+
+    def _monitor_process(self) -> None:
+        # Monitor thread: restarts the process as soon as it exits rather
+        # than when the next batch finds it dead, and keeps retrying a
+        # restart that fails. A batch running when it died restarts it
+        # itself, under the process lock.
+        while not self._stopping.is_set():
+            process = self._process
+            if process is not None:
+                wait([process.sentinel])
+            with self._process_lock:
+                if self._stopping.is_set():
+                    return
+                if self._process is not None and self._process is not process:
+                    continue
+                try:
+                    self._restart_process()
+                    continue
+                except Exception as e:
+                    logger.error(f"Worker {self._worker_id} process restart failed: {e}")
+            self._stopping.wait(PROCESS_RESTART_RETRY_S)
+
+    def _restart_process(self) -> None:
+        # Called with the process lock held
+        if self._process is not None:
+            self._process.join(0)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            logger.error(
+                f"Worker {self._worker_id} process {self._process.pid} died "
+                f"(exit code {self._process.exitcode}), restarting"
+            )
+        with self._send_lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._process = self._conn = None
+        self._restarts += 1
+        self._start_process()
+
+    async def _prepare(
+        self, requests: List[QueuedRequest], model: Optional[str] = None
+    ) -> Union[PreparedBatch, Exception]:
+        return PreparedBatch(
+            prompts=[queued.request.prompt for queued in requests],
+            max_tokens=[
+                queued.request.max_tokens if queued.request.max_tokens is not None else DEFAULT_MAX_TOKENS
+                for queued in requests
+            ],
+            temperatures=[
+                queued.request.temperature if queued.request.temperature is not None else DEFAULT_TEMPERATURE
+                for queued in requests
+            ],
+            model=model,
+        )
+
+    def _discard(self, prepared: Union[PreparedBatch, Exception, None]) -> None:
+        # Nothing is pinned in this process
+        pass
+
+    async def _execute(
+        self,
+        requests: List[QueuedRequest],
+        prepared: Union[PreparedBatch, Exception, None],
+    ) -> List[Union[str, Exception]]:
+        if isinstance(prepared, Exception):
+            return [prepared] * len(requests)
+        loop = asyncio.get_running_loop()
+        batch_id = next(self._batch_ids)
+        callbacks = [
+            lambda future, row=row: future.cancelled() and self._send_cancel(batch_id, row)
+            for row in range(len(requests))
+        ]
+        for queued, callback in zip(requests, callbacks):
+            queued.future.add_done_callback(callback)
+        try:
+            return await loop.run_in_executor(
+                None, self._run_in_process, requests, prepared, loop, batch_id
+            )
+        except Exception as e:
+            logger.error(f"Worker {self._worker_id} generation error: {e}", exc_info=True)
+            return [e] * len(requests)
+        finally:
+            for queued, callback in zip(requests, callbacks):
+                queued.future.remove_done_callback(callback)
+
+    def _send(self, message: Any) -> None:
+        with self._send_lock:
+            if self._conn is None:
+                raise EOFError("Worker process is not running")
+            self._conn.send(message)
+
+    def _send_cancel(self, batch_id: int, row: int) -> None:
+        # Runs on the event loop when a request of a running batch is
+        # cancelled. A process that is gone has nothing left to stop.
+        try:
+            self._send(("cancel", batch_id, row))
+        except (EOFError, OSError, ValueError):
+            pass
+
+    def _run_in_process(
+        self,
+        requests: List[QueuedRequest],
+        prepared: PreparedBatch,
+        loop: asyncio.AbstractEventLoop,
+        batch_id: int,
+    ) -> List[Union[str, Exception]]:
+        # Runs on the executor thread, blocked on the pipe (outside the GIL)
+        # while the child generates. Streamed pieces go to each request's
+        # sink before the results are returned.
+        stream = any(queued.token_sink is not None for queued in requests)
+        with self._process_lock:
+            if self._process is None or not self._process.is_alive():
+                self._restart_process()
+            assert self._conn is not None
+            try:
+                self._send((
+                    "run",
+                    batch_id,
+                    prepared.model,
+                    prepared.prompts,
+                    prepared.max_tokens,
+                    prepared.temperatures,
+                    stream,
+                ))
+                while True:
+                    message = self._conn.recv()
+                    if message[0] == "done":
+                        self._model_stats = message[2]
+                        for result in message[1]:
+                            if isinstance(result, RowCancelled):
+                                self._record_cancelled_row(result.remaining_tokens)
+                        return message[1]
+                    for queued, piece in zip(requests, message[1]):
+                        if piece and queued.token_sink is not None:
+                            loop.call_soon_threadsafe(queued.token_sink.put_nowait, piece)
+            except (EOFError, OSError):
+                pid = self._process.pid
+                self._restart_process()
+        error = WorkerProcessCrashed(
+            f"Worker {self._worker_id} process {pid} exited while running the batch"
+        )
+        return [error] * len(requests)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "models": self._model_stats,
+            "process": {
+                "pid": self.pid,
+                "alive": self._process is not None and self._process.is_alive(),
+                "restarts": self._restarts,
+            },
+        }
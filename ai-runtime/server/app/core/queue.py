@@ -1,7 +1,10 @@
 import asyncio
+import itertools
 import logging
-from typing import Optional, Generic, TypeVar, Callable, Awaitable
-from dataclasses import dataclass
+import math
+from typing import Optional, Generic, Tuple, TypeVar, Callable, Awaitable
+from dataclasses import dataclass, field
+from server.app.core.deadlines import QUEUE_FULL, STANDARD, DropStats, priority_rank
 from server.app.schemas.inference import InferenceRequest, InferenceResponse
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,29 @@ class QueuedRequest:
     request: InferenceRequest
     future: asyncio.Future[InferenceResponse]
     request_id: str
+    # Event loop time when the request entered the queue
+    enqueued_at: Optional[float] = None
+    priority: str = STANDARD
+    # Event loop time by which the result is needed; None for no deadline
+    deadline: Optional[float] = None
+    sequence: int = 0
+    # Receives generated text as it is produced, for streaming requests
+    token_sink: Optional["asyncio.Queue[str]"] = None
+    _rank: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._rank = priority_rank(self.priority)
+
+    def urgency(self) -> Tuple[int, float, int]:
+        # Priority class first, then earliest deadline, then arrival order
+        return (
+            self._rank,
+            self.deadline if self.deadline is not None else math.inf,
+            self.sequence,
+        )
+
+    def __lt__(self, other: "QueuedRequest") -> bool:
+        return self.urgency() < other.urgency()
 
 
 class BoundedRequestQueue(Generic[T, R]):
@@ -22,21 +48,46 @@ class BoundedRequestQueue(Generic[T, R]):
         self,
         maxsize: int,
         on_item: Optional[Callable[[T], Awaitable[R]]] = None,
+        drop_stats: Optional[DropStats] = None,
     ) -> None:
-        self._queue: asyncio.Queue[QueuedRequest] = asyncio.Queue(maxsize=maxsize)
+        # Served by priority class, then earliest deadline, then FIFO
+        self._queue: asyncio.PriorityQueue[QueuedRequest] = asyncio.PriorityQueue(
+            maxsize=maxsize
+        )
         self._maxsize = maxsize
         self._on_item = on_item
+        self._drop_stats = drop_stats
+        self._sequence = itertools.count()
 
     async def put(
-        self, request: InferenceRequest, request_id: str
+        self,
+        request: InferenceRequest,
+        request_id: str,
+        token_sink: Optional["asyncio.Queue[str]"] = None,
     ) -> asyncio.Future[InferenceResponse]:
         future: asyncio.Future[InferenceResponse] = asyncio.Future()
-        queued = QueuedRequest(request=request, future=future, request_id=request_id)
+        now = asyncio.get_running_loop().time()
+        priority = request.priority or STANDARD
+        deadline_ms = request.deadline_ms
+        queued = QueuedRequest(
+            request=request,
+            future=future,
+            request_id=request_id,
+            enqueued_at=now,
+            priority=priority,
+            deadline=now + deadline_ms / 1000.0 if deadline_ms is not None else None,
+            sequence=next(self._sequence),
+            token_sink=token_sink,
+        )
+        if self._drop_stats is not None:
+            self._drop_stats.record_submitted(priority)
         try:
             self._queue.put_nowait(queued)
             logger.debug(f"Request {request_id} enqueued")
         except asyncio.QueueFull:
             logger.warning(f"Request {request_id} rejected: queue full")
+            if self._drop_stats is not None:
+                self._drop_stats.record_dropped(priority, QUEUE_FULL)
             future.set_exception(
                 RuntimeError("Request queue full, backpressure applied")
             )
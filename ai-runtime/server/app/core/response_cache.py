@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from server.app.schemas.inference import (
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_TEMPERATURE,
+    InferenceRequest,
+    InferenceResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping (key, dict slot, response object) on top of the
+# generated text, so many tiny responses still count against the byte budget
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+def request_key(request: InferenceRequest) -> Optional[str]:
+    # Hash of the fields that determine the generated text, or None when the
+    # result is sampled (temperature > 0) and must not be reused
+    max_tokens = request.max_tokens if request.max_tokens is not None else DEFAULT_MAX_TOKENS
+    temperature = request.temperature if request.temperature is not None else DEFAULT_TEMPERATURE
+    if temperature != 0:
+        return None
+    payload = json.dumps([request.model, request.prompt, max_tokens, 0.0], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _CacheEntry:
+    text: str
+    size_bytes: int
+    expires_at: float
+
+
+@dataclass
+class _InFlight:
+    future: asyncio.Future
+    waiters: int = 0
+
+
+class ResponseCache:
+    # LRU cache of deterministic responses with a TTL and a byte budget, plus
+    # the table of requests currently being computed so identical requests
+    # share one result instead of each taking a batch slot. Only used from
+    # the event loop.
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl_s = ttl_s
+        self._clock = clock
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        # In-flight computations by (key, group)
+        self._in_flight: Dict[Tuple[str, Hashable], _InFlight] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str, request_id: str) -> Optional[InferenceResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            self._remove(key)
+            self._expirations += 1
+            entry = None
+        if entry is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return InferenceResponse(text=entry.text, request_id=request_id)
+
+    def put(self, key: str, response: InferenceResponse) -> None:
+        size = len(response.text.encode("utf-8")) + len(key) + _ENTRY_OVERHEAD_BYTES
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _CacheEntry(response.text, size, self._clock() + self._ttl_s)
+        self._bytes += size
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+
+    async def compute(
+        self,
+        key: str,
+        request_id: str,
+        submit: Callable[[], Any],
+        group: Hashable = None,
+    ) -> InferenceResponse:
+        # Waits for the in-flight request with the same key and group, or
+        # starts one with submit() (a coroutine returning the request's
+        # future). Only callers in the same group share a computation; the
+        # pipeline groups by priority class, so no request waits on one
+        # queued at a lower class. The result is cached under key once it
+        # succeeds. The computation is cancelled only when every caller
+        # waiting on it has gone away.
+        slot = (key, group)
+        in_flight = self._in_flight.get(slot)
+        if in_flight is not None:
+            self._coalesced += 1
+        else:
+            future = await submit()
+            in_flight = self._in_flight.get(slot)
+            if in_flight is None:
+                in_flight = self._in_flight[slot] = _InFlight(future=future)
+                future.add_done_callback(lambda done: self._finish(slot, done))
+            else:
+                # Another caller registered while submit() was suspended
+                self._coalesced += 1
+                future.cancel()
+        in_flight.waiters += 1
+        try:
+            response = await asyncio.shield(in_flight.future)
+        finally:
+            in_flight.waiters -= 1
+            if in_flight.waiters == 0 and not in_flight.future.done():
+                in_flight.future.cancel()
+        if response.request_id != request_id:
+            response = InferenceResponse(text=response.text, request_id=request_id)
+        return response
+
+    def _finish(self, slot: Tuple[str, Hashable], future: asyncio.Future) -> None:
+        if self._in_flight.get(slot) is not None and self._in_flight[slot].future is future:
+            del self._in_flight[slot]
+        if not future.cancelled() and future.exception() is None:
+            self.put(slot[0], future.result())
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._bytes,
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "ttl_s": self._ttl_s,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._in_flight),
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
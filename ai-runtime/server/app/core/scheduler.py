@@ -1,4 +1,5 @@
 import asyncio
+import itertools
 import logging
 from typing import List, Optional
 from server.app.core.batcher import Batch
@@ -12,9 +13,16 @@ class Scheduler:
         self,
         workers: List[GPUWorker],
         batch_queue: asyncio.Queue[Batch],
+        max_queued_batches: int = 2,
+        work_stealing: bool = False,
     ) -> None:
+        if max_queued_batches < 1:
+            raise ValueError("max_queued_batches must be at least 1")
         self._workers = workers
         self._batch_queue = batch_queue
+        self._max_queued_batches = max_queued_batches
+        self._work_stealing = work_stealing
+        self._sequence = itertools.count(1)
         self._running = False
         self._task: Optional[asyncio.Task] = None
 
@@ -22,8 +30,15 @@ class Scheduler:
         if self._running:
             return
         self._running = True
+        if self._work_stealing:
+            for worker in self._workers:
+                worker.set_peers(self._workers)
         self._task = asyncio.create_task(self._schedule_loop())
-        logger.info(f"Scheduler started with {len(self._workers)} workers")
+        logger.info(
+            f"Scheduler started with {len(self._workers)} workers: "
+            f"max_queued_batches={self._max_queued_batches}, "
+            f"work_stealing={self._work_stealing}"
+        )
 
     async def stop(self) -> None:
         self._running = False
@@ -33,34 +48,73 @@ class Scheduler:
                 await self._task
             except asyncio.CancelledError:
                 pass
+            self._task = None
         logger.info("Scheduler stopped")
 
     async def _schedule_loop(self) -> None:
-        while self._running:
+        # A batch is taken from the batch queue only once some worker has
+        # room for it, so the backlog waits there, most urgent first, rather
+        # than behind a batch held here. Each goes to the worker expected to
+        # finish it soonest and is never put back. stop() cancels whichever
+        # wait is pending.
+        while True:
+            await self._wait_for_room()
+            batch = await self._batch_queue.get()
             try:
-                try:
-                    batch = await asyncio.wait_for(
-                        self._batch_queue.get(), timeout=0.1
-                    )
-                except asyncio.TimeoutError:
-                    continue
-                except asyncio.CancelledError:
-                    break
-                worker = await self._find_available_worker()
-                if worker is None:
-                    logger.warning("No available worker, requeuing batch")
-                    await asyncio.sleep(0.01)
-                    await self._batch_queue.put(batch)
-                    continue
-                await worker.get_input_queue().put(batch)
-                logger.debug(f"Batch scheduled to worker {worker.worker_id}")
-            except asyncio.CancelledError:
-                break
+                worker = await self._acquire_worker(batch)
+                batch.sequence = next(self._sequence)
+                worker.submit(batch)
+                logger.debug(
+                    f"Batch of {batch.size()} scheduled to worker {worker.worker_id} "
+                    f"(queue_depth={worker.queue_depth})"
+                )
             except Exception as e:
                 logger.error(f"Scheduler error: {e}", exc_info=True)
+                for queued in batch.requests:
+                    if not queued.future.done():
+                        queued.future.set_exception(e)
 
-    async def _find_available_worker(self) -> Optional[GPUWorker]:
-        for worker in self._workers:
-            if worker.available:
+    async def _acquire_worker(self, batch: Batch) -> GPUWorker:
+        if not self._workers:
+            raise RuntimeError("No workers configured")
+        while True:
+            worker = self._select_worker(batch)
+            if worker is not None:
                 return worker
-        return None
+            await self._wait_for_room()
+
+    async def _wait_for_room(self) -> None:
+        # Until some worker's queue is below max_queued_batches
+        if not self._workers or any(
+            worker.queue_depth < self._max_queued_batches for worker in self._workers
+        ):
+            return
+        logger.debug("All worker queues full, waiting")
+        waiters = [
+            asyncio.create_task(w.wait_for_capacity(self._max_queued_batches))
+            for w in self._workers
+        ]
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    def _select_worker(self, batch: Batch) -> Optional[GPUWorker]:
+        # Lowest estimated completion time among workers with queue room;
+        # ties (e.g. before any service time is known) go to the worker
+        # holding the fewest requests
+        candidates = [
+            worker for worker in self._workers
+            if worker.queue_depth < self._max_queued_batches
+        ]
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda worker: (
+                worker.estimated_completion_s(batch.size()),
+                worker.pending_requests,
+                worker.worker_id,
+            ),
+        )
@@ -1,50 +1,257 @@
 import asyncio
+import heapq
+import itertools
 import logging
-from typing import Optional, List
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from server.app.core.batcher import Batch
-from server.app.models.loader import ModelLoader
-from server.app.schemas.inference import InferenceResponse
+from server.app.core.cancellation import BATCHED, RUNNING, CancelStats
+from server.app.core.deadlines import DropStats, drop_if_late
+from server.app.core.queue import QueuedRequest
+from server.app.models.loader import ModelLoader, PreparedBatch, RowCancelled
+from server.app.models.registry import ModelRegistry
+from server.app.schemas.inference import DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE, InferenceResponse
 
 logger = logging.getLogger(__name__)
 
+# Weight of the newest batch in the per-request service time average
+SERVICE_TIME_EWMA_ALPHA = 0.2
+
+
+class BatchQueue(asyncio.Queue):
+    # Batches ordered by urgency (priority class, then deadline, then arrival
+    # of their most urgent request), FIFO among equals. The head can be
+    # inspected without removing it.
+
+    def _init(self, maxsize: int) -> None:
+        self._queue: List[Tuple[Tuple[int, float, int], int, Batch]] = []
+        self._count = itertools.count()
+
+    def _put(self, batch: Batch) -> None:
+        heapq.heappush(self._queue, (batch.urgency(), next(self._count), batch))
+
+    def _get(self) -> Batch:
+        return heapq.heappop(self._queue)[-1]
+
+    def peek(self) -> Optional[Batch]:
+        return self._queue[0][-1] if self._queue else None
+
+
+@dataclass
+class InFlightBatch:
+    batch: Batch
+    # Requests still waiting for a result when the batch was taken
+    requests: List[QueuedRequest] = field(default_factory=list)
+    prepared: Union[PreparedBatch, Exception, None] = None
+
 
 class GPUWorker:
-    def __init__(self, worker_id: int, gpu_id: int, model_loader: ModelLoader) -> None:
+    def __init__(
+        self,
+        worker_id: int,
+        gpu_id: int,
+        model_loader: Optional[ModelLoader] = None,
+        max_in_flight_batches: int = 1,
+        on_batch_executed: Optional[Callable[[int, float], None]] = None,
+        drop_stats: Optional[DropStats] = None,
+        model_registry: Optional[ModelRegistry] = None,
+        cancel_stats: Optional[CancelStats] = None,
+    ) -> None:
+        if max_in_flight_batches < 1:
+            raise ValueError("max_in_flight_batches must be at least 1")
         self._worker_id = worker_id
         self._gpu_id = gpu_id
-        self._model_loader = model_loader
+        # Models this worker runs. A single model_loader becomes the default
+        # model of a registry of its own.
+        if model_registry is None:
+            model_registry = ModelRegistry(gpu_id=gpu_id)
+            if model_loader is not None:
+                model_registry.add(model_loader)
+        self._models = model_registry
+        self._max_in_flight_batches = max_in_flight_batches
+        # Called with (batch size, execution seconds), e.g. by the batch policy
+        self._on_batch_executed = on_batch_executed
+        self._drop_stats = drop_stats
+        self._cancel_stats = cancel_stats
         self._running = False
         self._task: Optional[asyncio.Task] = None
-        self._input_queue: Optional[asyncio.Queue[Batch]] = None
+        self._execute_task: Optional[asyncio.Task] = None
+        self._input_queue: Optional[BatchQueue] = None
+        # Batches that are prepared and waiting for the device, in order
+        self._prepared: Optional[asyncio.Queue[InFlightBatch]] = None
+        self._slots: Optional[asyncio.Semaphore] = None
         self._available = True
+        # Set whenever the worker's load changes (batch queued, started or
+        # finished); waiters re-check their condition after each wakeup
+        self._load_changed = asyncio.Event()
+        # Load accounting used by the scheduler's completion time estimate
+        self._queued_requests = 0
+        self._in_flight_requests = 0
+        self._in_flight_batches = 0
+        self._execute_started_at: Optional[float] = None
+        self._service_time_per_request_s = 0.0
+        self._completed_batches = 0
+        self._stolen_batches = 0
+        self._peers: Sequence["GPUWorker"] = ()
+        # Occupancy: device busy time and the time integral of in-flight batches
+        self._started_at: Optional[float] = None
+        self._execute_busy_s = 0.0
+        self._in_flight_area = 0.0
+        self._in_flight_changed_at = 0.0
+        self._peak_in_flight_batches = 0
 
     async def start(self) -> None:
         if self._running:
             return
-        self._input_queue = asyncio.Queue()
+        self.get_input_queue()
+        self._prepared = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self._max_in_flight_batches)
         self._running = True
+        self._started_at = self._in_flight_changed_at = asyncio.get_running_loop().time()
         self._task = asyncio.create_task(self._worker_loop())
-        logger.info(f"GPUWorker {self._worker_id} started on GPU {self._gpu_id}")
+        self._execute_task = asyncio.create_task(self._execute_loop())
+        logger.info(
+            f"GPUWorker {self._worker_id} started on GPU {self._gpu_id}: "
+            f"max_in_flight_batches={self._max_in_flight_batches}"
+        )
 
-    def get_input_queue(self) -> asyncio.Queue[Batch]:
+    def get_input_queue(self) -> "BatchQueue":
         if self._input_queue is None:
-            self._input_queue = asyncio.Queue()
+            self._input_queue = BatchQueue()
         return self._input_queue  # type: ignore
 
     async def stop(self) -> None:
         self._running = False
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+        for task in (self._task, self._execute_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._execute_task = None
         logger.info(f"GPUWorker {self._worker_id} stopped")
 
     @property
     def available(self) -> bool:
         return self._available
 
+    @property
+    def ready(self) -> bool:
+        # Whether the worker can run batches now, as reported by /health
+        return self._running
+
+    def _set_available(self, available: bool) -> None:
+        self._available = available
+        self._load_changed.set()
+
+    async def wait_for_capacity(self, max_queued_batches: int) -> None:
+        while self.queue_depth >= max_queued_batches:
+            self._load_changed.clear()
+            await self._load_changed.wait()
+
+    @property
+    def queue_depth(self) -> int:
+        return self.get_input_queue().qsize()
+
+    @property
+    def queued_requests(self) -> int:
+        return self._queued_requests
+
+    @property
+    def in_flight_requests(self) -> int:
+        return self._in_flight_requests
+
+    @property
+    def in_flight_batches(self) -> int:
+        return self._in_flight_batches
+
+    @property
+    def max_in_flight_batches(self) -> int:
+        return self._max_in_flight_batches
+
+    @property
+    def pending_requests(self) -> int:
+        return self._queued_requests + self._in_flight_requests
+
+    @property
+    def service_time_per_request_s(self) -> float:
+        return self._service_time_per_request_s
+
+    def estimated_completion_s(self, extra_requests: int = 0) -> float:
+        # Time until this worker would finish everything it holds plus
+        # extra_requests, from a moving average of per-request service time
+        return self._remaining_in_flight_s() + (
+            self._queued_requests + extra_requests
+        ) * self._service_time_per_request_s
+
+    def _remaining_in_flight_s(self) -> float:
+        remaining = self._in_flight_requests * self._service_time_per_request_s
+        if self._execute_started_at is not None:
+            elapsed = asyncio.get_running_loop().time() - self._execute_started_at
+            remaining = max(0.0, remaining - elapsed)
+        return remaining
+
+    def submit(self, batch: Batch) -> None:
+        self._queued_requests += batch.size()
+        self.get_input_queue().put_nowait(batch)
+        self._load_changed.set()
+
+    def set_peers(self, peers: Sequence["GPUWorker"]) -> None:
+        # Workers this one may steal queued batches from when it runs dry
+        self._peers = [peer for peer in peers if peer is not self]
+
+    def take_queued(self) -> Optional[Batch]:
+        # Head of this worker's queue, removed from it
+        try:
+            batch = self.get_input_queue().get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+        self._queued_requests -= batch.size()
+        self._load_changed.set()
+        return batch
+
+    def occupancy(self) -> Dict[str, float]:
+        # execute_busy_ratio: share of wall time the device was running a batch
+        # mean_in_flight_batches: time-weighted average of batches held
+        # (preparing, waiting for the device, executing or resolving)
+        if self._started_at is None:
+            return {
+                "execute_busy_ratio": 0.0,
+                "mean_in_flight_batches": 0.0,
+                "peak_in_flight_batches": 0,
+            }
+        now = asyncio.get_running_loop().time()
+        uptime = max(now - self._started_at, 1e-9)
+        busy = self._execute_busy_s
+        if self._execute_started_at is not None:
+            busy += now - self._execute_started_at
+        area = self._in_flight_area + self._in_flight_batches * (now - self._in_flight_changed_at)
+        return {
+            "execute_busy_ratio": min(busy / uptime, 1.0),
+            "mean_in_flight_batches": area / uptime,
+            "peak_in_flight_batches": self._peak_in_flight_batches,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self._worker_id,
+            "gpu_id": self._gpu_id,
+            "ready": self.ready,
+            "available": self._available,
+            "queue_depth": self.queue_depth,
+            "queued_requests": self._queued_requests,
+            "in_flight_requests": self._in_flight_requests,
+            "in_flight_batches": self._in_flight_batches,
+            "max_in_flight_batches": self._max_in_flight_batches,
+            "service_time_per_request_ms": self._service_time_per_request_s * 1000.0,
+            "completed_batches": self._completed_batches,
+            "stolen_batches": self._stolen_batches,
+            "models": self._models.stats(),
+            **self.occupancy(),
+        }
+
     @property
     def worker_id(self) -> int:
         return self._worker_id
@@ -54,67 +261,285 @@ class GPUWorker:
         return self._gpu_id
 
     async def _worker_loop(self) -> None:
-        while self._running:
+        # Intake and preparation. Takes a batch whenever an in-flight slot is
+        # free, so batch N+1 is prepared while batch N executes. Blocks on the
+        # queue while idle; stop() cancels the pending wait. An unexpected
+        # error fails the batch being taken in, not the loop.
+        assert self._slots is not None and self._prepared is not None
+        input_queue = self.get_input_queue()
+        while True:
+            await self._slots.acquire()
+            batch: Optional[Batch] = None
+            in_flight: Optional[InFlightBatch] = None
             try:
-                if self._input_queue is None:
-                    await asyncio.sleep(0.1)
-                    continue
-                try:
-                    batch = await asyncio.wait_for(
-                        self._input_queue.get(), timeout=0.1
-                    )
-                except asyncio.TimeoutError:
-                    continue
-                except asyncio.CancelledError:
-                    break
-                self._available = False
-                await self._process_batch(batch)
-                self._available = True
-            except asyncio.CancelledError:
-                break
+                batch = self._next_queued()
+                if batch is None:
+                    batch = await input_queue.get()
+                    self._queued_requests -= batch.size()
+                in_flight = InFlightBatch(batch=batch)
+                self._track_in_flight(batch.size(), 1)
+                in_flight.requests = self._live_requests(batch)
+                if in_flight.requests:
+                    in_flight.prepared = await self._prepare(in_flight.requests, batch.model)
+                self._prepared.put_nowait(in_flight)
             except Exception as e:
-                logger.error(f"Worker {self._worker_id} error: {e}", exc_info=True)
-                self._available = True
+                logger.error(f"Worker {self._worker_id} intake error: {e}", exc_info=True)
+                if in_flight is not None:
+                    # The execute loop fails its requests and frees the slot
+                    in_flight.requests = [q for q in batch.requests if not q.future.done()]
+                    in_flight.prepared = e
+                    self._prepared.put_nowait(in_flight)
+                else:
+                    if batch is not None:
+                        self._fail(batch.requests, e)
+                    self._slots.release()
+
+    async def _execute_loop(self) -> None:
+        # Runs prepared batches on the device one at a time, in order. Results
+        # are fanned out in a later loop iteration so the next batch is
+        # already executing while futures of this one resolve.
+        assert self._prepared is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            in_flight = await self._prepared.get()
+            results: List[Union[str, Exception]] = []
+            try:
+                if in_flight.requests and all(queued.future.cancelled() for queued in in_flight.requests):
+                    # Every caller left while the batch waited for the device
+                    for queued in in_flight.requests:
+                        self._skip_cancelled(queued)
+                    self._discard(in_flight.prepared)
+                    in_flight.requests = []
+                if in_flight.requests:
+                    self._execute_started_at = loop.time()
+                    try:
+                        results = await self._execute(in_flight.requests, in_flight.prepared)
+                    finally:
+                        elapsed = loop.time() - self._execute_started_at
+                        self._execute_started_at = None
+                        self._execute_busy_s += elapsed
+                        self._record_service_time(len(in_flight.requests), elapsed)
+            except Exception as e:
+                logger.error(f"Worker {self._worker_id} execution error: {e}", exc_info=True)
+                results = [e] * len(in_flight.requests)
+            loop.call_soon(self._complete, in_flight, results)
+
+    def _complete(self, in_flight: InFlightBatch, results: List[Union[str, Exception]]) -> None:
+        try:
+            self._resolve(in_flight.requests, results)
+        except Exception as e:
+            logger.error(f"Worker {self._worker_id} error: {e}", exc_info=True)
+        finally:
+            self._completed_batches += 1
+            self._track_in_flight(-in_flight.batch.size(), -1)
+            if self._slots is not None:
+                self._slots.release()
+
+    def _fail(self, requests: List[QueuedRequest], error: Exception) -> None:
+        for queued in requests:
+            if not queued.future.done():
+                queued.future.set_exception(error)
+
+    def _track_in_flight(self, requests: int, batches: int) -> None:
+        now = asyncio.get_running_loop().time()
+        self._in_flight_area += self._in_flight_batches * (now - self._in_flight_changed_at)
+        self._in_flight_changed_at = now
+        self._in_flight_requests += requests
+        self._in_flight_batches += batches
+        self._peak_in_flight_batches = max(self._peak_in_flight_batches, self._in_flight_batches)
+        self._set_available(self._in_flight_batches < self._max_in_flight_batches)
+
+    def _next_queued(self) -> Optional[Batch]:
+        # The most urgent batch queued here or, with peers set, at any peer,
+        # oldest first among equals. Taking a peer's head when it comes before
+        # ours is the work steal, and it keeps batches starting in urgency
+        # and then dispatch order.
+        source: Optional[GPUWorker] = None
+        first: Optional[Batch] = None
+        for worker in [self, *self._peers]:
+            head = worker.get_input_queue().peek()
+            if head is not None and (
+                first is None or (head.urgency(), head.sequence) < (first.urgency(), first.sequence)
+            ):
+                source, first = worker, head
+        if source is None:
+            return None
+        batch = source.take_queued()
+        if source is not self:
+            self._stolen_batches += 1
+            logger.debug(
+                f"Worker {self._worker_id} stole batch of {batch.size()} "
+                f"from worker {source.worker_id}"
+            )
+        return batch
+
+    def _live_requests(self, batch: Batch) -> List[QueuedRequest]:
+        # Requests still waiting for a result whose deadline this worker can
+        # meet, given the work already in flight and this batch's own run time
+        for queued in batch.requests:
+            if queued.future.cancelled():
+                self._skip_cancelled(queued)
+        requests = [queued for queued in batch.requests if not queued.future.done()]
+        if not any(queued.deadline is not None for queued in requests):
+            return requests
+        now = asyncio.get_running_loop().time()
+        remaining = self._remaining_in_flight_s() + len(requests) * self._service_time_per_request_s
+        return [
+            queued for queued in requests
+            if not drop_if_late(queued, now, self._drop_stats, remaining)
+        ]
+
+    def _skip_cancelled(self, queued: QueuedRequest) -> None:
+        if self._cancel_stats is not None:
+            self._cancel_stats.record_skipped(queued, BATCHED)
+
+    def _record_cancelled_row(self, remaining_tokens: int) -> None:
+        if self._cancel_stats is not None:
+            self._cancel_stats.record(RUNNING, remaining_tokens)
+
+    def _notify_batch_executed(self, size: int, elapsed_s: float) -> None:
+        if self._on_batch_executed is not None:
+            try:
+                self._on_batch_executed(size, elapsed_s)
+            except Exception as e:
+                logger.warning(f"Worker {self._worker_id} batch observer failed: {e}")
+
+    def _record_service_time(self, size: int, elapsed_s: float) -> None:
+        self._notify_batch_executed(size, elapsed_s)
+        per_request = elapsed_s / max(size, 1)
+        if self._service_time_per_request_s == 0.0:
+            self._service_time_per_request_s = per_request
+        else:
+            self._service_time_per_request_s += SERVICE_TIME_EWMA_ALPHA * (
+                per_request - self._service_time_per_request_s
+            )
 
     async def _process_batch(self, batch: Batch) -> None:
+        # All three stages back to back, without the in-flight pipeline
         logger.debug(
             f"Worker {self._worker_id} processing batch: size={batch.size()}"
         )
-        responses = await self._generate_batch(batch.requests)
-        for queued, response in zip(batch.requests, responses):
-            if not queued.future.done():
-                queued.future.set_result(response)
+        requests = self._live_requests(batch)
+        if not requests:
+            return
+        prepared = await self._prepare(requests, batch.model)
+        results = await self._execute(requests, prepared)
+        self._resolve(requests, results)
 
-    async def _generate_batch(
-        self, requests: List
-    ) -> List[InferenceResponse]:
-        loop = asyncio.get_event_loop()
-        responses: List[InferenceResponse] = []
-        for queued in requests:
-            try:
-                text = await loop.run_in_executor(
-                    None,
-                    self._model_loader.generate,
-                    queued.request.prompt,
-                    queued.request.max_tokens if queued.request.max_tokens is not None else 100,
-                    queued.request.temperature if queued.request.temperature is not None else 0.7,
-                )
-                responses.append(
-                    InferenceResponse(
-                        api_version="v1", text=text, request_id=queued.request_id
-                    )
-                )
-            except Exception as e:
-                logger.error(
-                    f"Worker {self._worker_id} generation error: {e}", exc_info=True
+    async def _prepare(
+        self, requests: List[QueuedRequest], model: Optional[str] = None
+    ) -> Union[PreparedBatch, Exception]:
+        # Loads the model if it is not resident and pins it until _execute
+        # is done with the batch
+        prompts = [queued.request.prompt for queued in requests]
+        max_tokens = [
+            queued.request.max_tokens if queued.request.max_tokens is not None else DEFAULT_MAX_TOKENS
+            for queued in requests
+        ]
+        temperatures = [
+            queued.request.temperature if queued.request.temperature is not None else DEFAULT_TEMPERATURE
+            for queued in requests
+        ]
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                None, self._acquire_and_prepare, model, prompts, max_tokens, temperatures
+            )
+        except Exception as e:
+            logger.error(
+                f"Worker {self._worker_id} preparation error: {e}", exc_info=True
+            )
+            return e
+
+    def _discard(self, prepared: Union[PreparedBatch, Exception, None]) -> None:
+        # Drops a prepared batch that will not run, unpinning its model
+        if isinstance(prepared, PreparedBatch):
+            self._models.release(prepared.model)
+
+    def _acquire_and_prepare(
+        self,
+        model: Optional[str],
+        prompts: List[str],
+        max_tokens: List[int],
+        temperatures: List[float],
+    ) -> PreparedBatch:
+        # Runs on the executor thread, since loading a model blocks
+        loader = self._models.acquire(model)
+        try:
+            prepared = loader.prepare_batch(prompts, max_tokens, temperatures)
+        except Exception:
+            self._models.release(model)
+            raise
+        prepared.model = model
+        return prepared
+
+    async def _execute(
+        self,
+        requests: List[QueuedRequest],
+        prepared: Union[PreparedBatch, Exception, None],
+    ) -> List[Union[str, Exception]]:
+        if isinstance(prepared, Exception):
+            return [prepared] * len(requests)
+        loop = asyncio.get_running_loop()
+        try:
+            loader = self._models.resident(prepared.model)
+            # Step-wise whenever the model can, so rows of requests cancelled
+            # mid-batch stop early, streaming or not
+            if loader.supports_steps() or any(queued.token_sink is not None for queued in requests):
+                return await loop.run_in_executor(
+                    None, self._run_steps, requests, loader, prepared, loop
                 )
-                if not queued.future.done():
-                    queued.future.set_exception(e)
-                responses.append(
+            return await loop.run_in_executor(None, loader.run_batch, prepared)
+        except Exception as e:
+            logger.error(
+                f"Worker {self._worker_id} generation error: {e}", exc_info=True
+            )
+            return [e] * len(requests)
+        finally:
+            self._models.release(prepared.model)
+
+    def _run_steps(
+        self,
+        requests: List[QueuedRequest],
+        loader: ModelLoader,
+        prepared: PreparedBatch,
+        loop: asyncio.AbstractEventLoop,
+    ) -> List[Union[str, Exception]]:
+        # Runs on the executor thread. Each row's text is the join of its
+        # steps; a streaming request's sink gets each piece as soon as its
+        # step completes, before the request's future resolves. Rows of
+        # requests cancelled meanwhile stop at the next step.
+        pieces: List[List[str]] = [[] for _ in requests]
+        errors: List[Optional[Exception]] = [None] * len(requests)
+        steps = loader.stream_batch(prepared, cancelled=lambda row: requests[row].future.cancelled())
+        for step in steps:
+            for row, piece in enumerate(step):
+                if isinstance(piece, RowCancelled):
+                    errors[row] = piece
+                    self._record_cancelled_row(piece.remaining_tokens)
+                elif isinstance(piece, Exception):
+                    errors[row] = piece
+                elif piece and errors[row] is None:
+                    pieces[row].append(piece)
+                    sink = requests[row].token_sink
+                    if sink is not None:
+                        loop.call_soon_threadsafe(sink.put_nowait, piece)
+        return [
+            error if error is not None else "".join(row)
+            for row, error in zip(pieces, errors)
+        ]
+
+    def _resolve(
+        self, requests: List[QueuedRequest], results: List[Union[str, Exception]]
+    ) -> None:
+        for queued, result in zip(requests, results):
+            if queued.future.done():
+                continue
+            if isinstance(result, Exception):
+                queued.future.set_exception(result)
+            else:
+                queued.future.set_result(
                     InferenceResponse(
-                        api_version="v1",
-                        text=f"Error: {str(e)}",
-                        request_id=queued.request_id,
+                        api_version="v1", text=result, request_id=queued.request_id
                     )
                 )
-        return responses
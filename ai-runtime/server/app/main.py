@@ -3,7 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import Response
 from server.app.core.config import settings
 from server.app.core.logging import setup_logging, request_id_var
-from server.app.api import health, infer
+from server.app.api import health, infer, metrics
 import logging
 import uuid
 from typing import Callable, Awaitable
@@ -23,6 +23,7 @@ app.add_middleware(
 
 app.include_router(health.router)
 app.include_router(infer.router)
+app.include_router(metrics.router)
 
 
 @app.middleware("http")
@@ -1,31 +1,195 @@
 import logging
-from typing import Optional, Any
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 from server.app.core.config import settings
+from server.app.models.mock import MockModel
+from server.app.models.prefix_cache import PrefixCache, PrefixMatch
+from server.app.models.weights import (
+    LoadedWeights,
+    estimate_weights_bytes,
+    load_weights,
+    memory_usage,
+    resolve_model_dir,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class RowCancelled(Exception):
+    # Reported by stream_batch in place of the text of a row that was
+    # stopped because its request was cancelled
+    def __init__(self, remaining_tokens: int) -> None:
+        self.remaining_tokens = remaining_tokens
+        super().__init__(f"Row cancelled with {remaining_tokens} tokens left")
+
+    def __reduce__(self):
+        # Crosses the worker process pipe with its token count intact
+        return (RowCancelled, (self.remaining_tokens,))
+
+
+@dataclass
+class PreparedBatch:
+    prompts: List[str]
+    max_tokens: List[int]
+    temperatures: List[float]
+    # Packed model inputs (token ids, padded tensors) when the model splits
+    # input preparation from execution; None otherwise
+    inputs: Any = None
+    # Registry name of the model the batch runs on; None for the default
+    model: Optional[str] = None
+
+
+@dataclass
+class GenerationRow:
+    # One sequence decoded a token step at a time
+    prompt: str
+    max_tokens: int
+    temperature: float
+    # Model-specific decoding state (KV cache, position, sampler)
+    state: Any = None
+    pieces: List[str] = field(default_factory=list)
+    steps: int = 0
+    error: Optional[Exception] = None
+    finished: bool = False
+    # Cached prompt prefix the row was started from, pinned until it finishes
+    prefix: Optional[PrefixMatch] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pieces)
+
+
 class ModelLoader:
-    def __init__(self, gpu_id: Optional[int] = None) -> None:
+    def __init__(self, gpu_id: Optional[int] = None, model_name: Optional[str] = None) -> None:
         self.model: Optional[Any] = None
         self.device: Optional[str] = None
         self.gpu_id = gpu_id
+        # None loads the default model (MODEL_PATH, or MODEL_NAME under it);
+        # any other name is a subdirectory of MODEL_PATH
+        self.model_name = model_name
+        self.prefix_cache: Optional[PrefixCache] = None
+        self.weights: Optional[LoadedWeights] = None
 
     def load(self) -> None:
         logger.info(f"Initializing model loader for GPU {self.gpu_id}")
         if settings.use_mock_model:
             logger.info("Using mock model mode (no GPU required)")
-            self.model = None
+            self.model = MockModel(
+                gpu_id=self.gpu_id,
+                model_name=self.model_name,
+                first_token_delay_ms=settings.mock_first_token_delay_ms,
+                token_delay_ms=settings.mock_token_delay_ms,
+            )
             self.device = "mock"
+            if settings.prefix_cache_max_bytes > 0:
+                self.enable_prefix_cache(settings.prefix_cache_max_bytes)
         else:
-            logger.warning("Model loader is a placeholder - implement actual model loading")
-            self.model = None
             if self._check_cuda():
                 self.device = f"cuda:{self.gpu_id}" if self.gpu_id is not None else "cuda:0"
             else:
                 self.device = "cpu"
+            if settings.model_path:
+                allowed = [a.strip() for a in settings.model_architectures.split(",") if a.strip()]
+                weights = load_weights(self._model_dir(), self.device, allowed)
+                if not hasattr(weights.model, "generate") and not hasattr(weights.model, "generate_batch"):
+                    raise TypeError(
+                        f"{type(weights.model).__name__} from {weights.model_dir} does not support "
+                        f"text generation (no generate or generate_batch method)"
+                    )
+                self.weights = weights
+                self.model = weights.model
+                logger.info(
+                    f"Loaded {type(self.model).__name__} from {self.weights.weights_file} "
+                    f"({self.weights.weights_bytes} bytes mapped) in "
+                    f"{self.weights.load_time_s * 1000.0:.1f} ms"
+                )
+            elif self.model_name is not None:
+                raise FileNotFoundError(f"Cannot load model {self.model_name}: no MODEL_PATH set")
+            else:
+                logger.warning("No MODEL_PATH set, using placeholder model")
+                self.model = None
         logger.info(f"Model loader initialized with device: {self.device}")
 
+    def _model_dir(self) -> str:
+        assert settings.model_path
+        if self.model_name is None:
+            return resolve_model_dir(settings.model_path, settings.model_name)
+        model_dir = os.path.join(settings.model_path, self.model_name)
+        if not os.path.isdir(model_dir):
+            raise FileNotFoundError(f"Unknown model {self.model_name}: no directory {model_dir}")
+        return model_dir
+
+    def estimate_bytes(self) -> int:
+        # Memory the model will take once loaded, known before loading it
+        if settings.use_mock_model:
+            return settings.mock_model_bytes
+        if settings.model_path:
+            try:
+                return estimate_weights_bytes(self._model_dir())
+            except FileNotFoundError:
+                return 0
+        return 0
+
+    def memory_bytes(self) -> int:
+        # Memory held by the loaded model
+        if self.weights is not None:
+            return self.weights.weights_bytes
+        if isinstance(self.model, MockModel):
+            return settings.mock_model_bytes
+        return 0
+
+    def unload(self) -> None:
+        # Drops the model so its memory can be reclaimed
+        device = self.device
+        self.model = None
+        self.weights = None
+        self.prefix_cache = None
+        if device is not None and device.startswith("cuda"):
+            try:
+                import torch
+                torch.cuda.empty_cache()
+            except ImportError:
+                pass
+        logger.info(f"Model {self.model_name or 'default'} unloaded from {device}")
+
+    def enable_prefix_cache(self, max_bytes: int) -> bool:
+        # Reuse model state across prompts that share a prefix. Needs a model
+        # with step-wise decoding that can also tokenize, prefill on top of
+        # cached state and split and size that state.
+        if not self.supports_steps() or not all(
+            hasattr(self.model, name)
+            for name in ("tokenize", "prefill", "split_state", "state_nbytes")
+        ):
+            logger.info("Model does not support prefix reuse, prefix cache disabled")
+            return False
+        self.prefix_cache = PrefixCache(
+            max_bytes=max_bytes,
+            split_state=self.model.split_state,
+            state_nbytes=self.model.state_nbytes,
+        )
+        logger.info(f"Prefix cache enabled: max_bytes={max_bytes}")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        # Memory is the whole process's, so workers sharing a process report
+        # the same figures; each worker process reports its own
+        weights = None
+        if self.weights is not None:
+            weights = {
+                "model_dir": self.weights.model_dir,
+                "weights_file": self.weights.weights_file,
+                "weights_bytes": self.weights.weights_bytes,
+                "load_time_ms": self.weights.load_time_s * 1000.0,
+            }
+        return {
+            "model_name": self.model_name,
+            "device": self.device,
+            "weights": weights,
+            "memory": memory_usage(),
+            "prefix_cache": self.prefix_cache.stats() if self.prefix_cache else None,
+        }
+
     @staticmethod
     def get_gpu_count() -> int:
         try:
@@ -47,5 +211,230 @@ class ModelLoader:
                 gpu_suffix = f" (GPU {self.gpu_id})" if self.gpu_id is not None else ""
                 return f"[MOCK{gpu_suffix}] Generated {max_tokens} tokens for: {prompt[:50]}..."
             return f"[PLACEHOLDER] Generated response for prompt: {prompt[:50]}..."
+        if not hasattr(self.model, "generate"):
+            raise RuntimeError(f"{type(self.model).__name__} does not support text generation")
         return self.model.generate(prompt, max_tokens, temperature)
 
+    def generate_batch(
+        self,
+        prompts: List[str],
+        max_tokens: List[int],
+        temperatures: List[float],
+    ) -> List[Union[str, Exception]]:
+        # One entry per prompt: the generated text or the exception for that row.
+        # A failed batched call is retried row by row so one bad request cannot
+        # fail the rest of the batch.
+        if not (len(prompts) == len(max_tokens) == len(temperatures)):
+            raise ValueError("prompts, max_tokens and temperatures must have equal length")
+        if not prompts:
+            return []
+        if self.prefix_cache is not None:
+            # Step through the rows so prompts go through the prefix cache
+            rows = self.start_rows(prompts, max_tokens, temperatures)
+            while not all(row.finished for row in rows):
+                self.step_rows(rows)
+            return [row.error if row.error is not None else row.text for row in rows]
+        if self.model is not None and hasattr(self.model, "generate_batch"):
+            try:
+                texts = self.model.generate_batch(prompts, max_tokens, temperatures)
+                if len(texts) == len(prompts):
+                    return list(texts)
+                logger.warning(
+                    f"Batched generation returned {len(texts)} results for "
+                    f"{len(prompts)} prompts, retrying per request"
+                )
+            except Exception as e:
+                logger.warning(f"Batched generation failed, retrying per request: {e}")
+        return self._generate_rows(prompts, max_tokens, temperatures)
+
+    def prepare_batch(
+        self,
+        prompts: List[str],
+        max_tokens: List[int],
+        temperatures: List[float],
+    ) -> PreparedBatch:
+        # CPU-side work (tokenization, input packing) that can run while the
+        # previous batch is still executing
+        if not (len(prompts) == len(max_tokens) == len(temperatures)):
+            raise ValueError("prompts, max_tokens and temperatures must have equal length")
+        inputs = None
+        if self.model is not None and hasattr(self.model, "prepare_batch"):
+            inputs = self.model.prepare_batch(prompts, max_tokens, temperatures)
+        return PreparedBatch(list(prompts), list(max_tokens), list(temperatures), inputs)
+
+    def run_batch(self, prepared: PreparedBatch) -> List[Union[str, Exception]]:
+        if prepared.inputs is None or not hasattr(self.model, "run_batch"):
+            return self.generate_batch(
+                prepared.prompts, prepared.max_tokens, prepared.temperatures
+            )
+        try:
+            texts = self.model.run_batch(prepared.inputs)
+            if len(texts) == len(prepared.prompts):
+                return list(texts)
+            logger.warning(
+                f"Batched run returned {len(texts)} results for "
+                f"{len(prepared.prompts)} prompts, retrying per request"
+            )
+        except Exception as e:
+            logger.warning(f"Batched run failed, retrying per request: {e}")
+        return self._generate_rows(
+            prepared.prompts, prepared.max_tokens, prepared.temperatures
+        )
+
+    def stream_batch(
+        self,
+        prepared: PreparedBatch,
+        cancelled: Optional[Callable[[int], bool]] = None,
+    ) -> Iterator[List[Union[str, Exception, None]]]:
+        # Incremental generation: one list per step with, for each row, the
+        # text produced in that step, None if it produced nothing, or the
+        # exception that failed it. Rows for which cancelled(row) turns true
+        # stop before the next step and report RowCancelled. Models without
+        # step-wise decoding produce everything in a single step.
+        if not self.supports_steps():
+            yield self.run_batch(prepared)
+            return
+        rows = self.start_rows(prepared.prompts, prepared.max_tokens, prepared.temperatures)
+        reported = [False] * len(rows)
+        while True:
+            stopped: List[Union[str, Exception, None]] = [None] * len(rows)
+            if cancelled is not None:
+                for i, row in enumerate(rows):
+                    if not row.finished and cancelled(i):
+                        row.finished = reported[i] = True
+                        stopped[i] = RowCancelled(max(0, row.max_tokens - row.steps))
+                        self.release_rows([row])
+            if all(row.finished for row in rows):
+                if any(piece is not None for piece in stopped):
+                    yield stopped
+                return
+            step: List[Union[str, Exception, None]] = [
+                piece if piece is not None else stop
+                for piece, stop in zip(self.step_rows(rows), stopped)
+            ]
+            for i, row in enumerate(rows):
+                if row.error is not None and not reported[i]:
+                    step[i] = row.error
+                    reported[i] = True
+            if any(piece is not None for piece in step):
+                yield step
+            if all(row.finished for row in rows):
+                return
+
+    def supports_steps(self) -> bool:
+        # Whether the model decodes one token step at a time (start/step), so
+        # rows can join and leave a running batch between steps
+        return (
+            self.model is not None
+            and hasattr(self.model, "start")
+            and hasattr(self.model, "step")
+        )
+
+    def start_rows(
+        self,
+        prompts: List[str],
+        max_tokens: List[int],
+        temperatures: List[float],
+    ) -> List[GenerationRow]:
+        # New rows for step_rows. Each row keeps its own max_tokens and
+        # temperature, so rows with different settings share a step.
+        if not (len(prompts) == len(max_tokens) == len(temperatures)):
+            raise ValueError("prompts, max_tokens and temperatures must have equal length")
+        rows = []
+        for prompt, tokens, temperature in zip(prompts, max_tokens, temperatures):
+            row = GenerationRow(prompt=prompt, max_tokens=tokens, temperature=temperature)
+            if self.supports_steps():
+                try:
+                    if self.prefix_cache is not None:
+                        self._start_from_prefix(row)
+                    else:
+                        row.state = self.model.start(prompt, tokens, temperature)
+                except Exception as e:
+                    row.error = e
+                    row.finished = True
+                    self.release_rows([row])
+            rows.append(row)
+        return rows
+
+    def _start_from_prefix(self, row: GenerationRow) -> None:
+        # Prefills only the part of the prompt past its longest cached
+        # prefix, and caches the newly computed part for later prompts
+        assert self.prefix_cache is not None
+        tokens = self.model.tokenize(row.prompt)
+        row.prefix = self.prefix_cache.acquire(tokens)
+        prompt_state, new_state = self.model.prefill(tokens, row.prefix.states)
+        self.prefix_cache.insert(tokens, row.prefix, new_state)
+        row.state = self.model.start(
+            row.prompt, row.max_tokens, row.temperature, prompt_state=prompt_state
+        )
+
+    def release_rows(self, rows: List[GenerationRow]) -> None:
+        # Unpins the cached prefixes of rows that finished or were abandoned
+        for row in rows:
+            if row.prefix is not None and self.prefix_cache is not None:
+                self.prefix_cache.release(row.prefix)
+            row.prefix = None
+
+    def step_rows(self, rows: List[GenerationRow]) -> List[Optional[str]]:
+        # Advances every unfinished row by one token and returns, per row, the
+        # text it produced (None if it produced nothing). Rows that reach
+        # max_tokens, end their sequence or fail are marked finished. Without
+        # step-wise decoding the whole generation happens in the first step.
+        pieces: List[Optional[str]] = [None] * len(rows)
+        active = [i for i, row in enumerate(rows) if not row.finished]
+        if not active:
+            return pieces
+        if not self.supports_steps():
+            results = self.generate_batch(
+                [rows[i].prompt for i in active],
+                [rows[i].max_tokens for i in active],
+                [rows[i].temperature for i in active],
+            )
+            for i, result in zip(active, results):
+                row = rows[i]
+                row.finished = True
+                if isinstance(result, Exception):
+                    row.error = result
+                else:
+                    row.pieces.append(result)
+                    pieces[i] = result
+            return pieces
+        try:
+            tokens = self.model.step([rows[i].state for i in active])
+            if len(tokens) != len(active):
+                raise RuntimeError(
+                    f"Model step returned {len(tokens)} tokens for {len(active)} rows"
+                )
+        except Exception as e:
+            logger.warning(f"Decoding step failed for {len(active)} rows: {e}")
+            for i in active:
+                rows[i].error = e
+                rows[i].finished = True
+            self.release_rows([rows[i] for i in active])
+            return pieces
+        for i, token in zip(active, tokens):
+            row = rows[i]
+            if token is None:
+                row.finished = True
+                continue
+            row.steps += 1
+            row.pieces.append(token)
+            pieces[i] = token
+            if row.steps >= row.max_tokens:
+                row.finished = True
+        self.release_rows([rows[i] for i in active if rows[i].finished])
+        return pieces
+
+    def _generate_rows(
+        self,
+        prompts: List[str],
+        max_tokens: List[int],
+        temperatures: List[float],
+    ) -> List[Union[str, Exception]]:
+        results: List[Union[str, Exception]] = []
+        for prompt, tokens, temperature in zip(prompts, max_tokens, temperatures):
+            try:
+                results.append(self.generate(prompt, tokens, temperature))
+            except Exception as e:
+                results.append(e)
+        return results
@@ -0,0 +1,114 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+# A token is a word with its leading whitespace, so joined tokens give back
+# the full text
+_TOKEN_PATTERN = re.compile(r"\s*\S+")
+
+
+@dataclass
+class MockSequence:
+    text_tokens: List[str]
+    max_tokens: int
+    position: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= self.max_tokens
+
+
+class MockModel:
+    # Stand-in model for USE_MOCK_MODEL that decodes like a real one: every
+    # sequence runs max_tokens steps, the first step of a new sequence costs
+    # first_token_delay_ms (prefill) and every other step token_delay_ms. The
+    # visible text is a short summary; steps after it produce empty tokens.
+    # Prompts are split into word tokens, and computed_tokens counts the
+    # prompt tokens prefilled, so prefix reuse shows up without a GPU.
+
+    def __init__(
+        self,
+        gpu_id: Optional[int] = None,
+        model_name: Optional[str] = None,
+        first_token_delay_ms: float = 0.0,
+        token_delay_ms: float = 0.0,
+        state_bytes_per_token: int = 1024,
+    ) -> None:
+        self.gpu_id = gpu_id
+        self.model_name = model_name
+        self.first_token_delay_s = first_token_delay_ms / 1000.0
+        self.token_delay_s = token_delay_ms / 1000.0
+        self.state_bytes_per_token = state_bytes_per_token
+        self.computed_tokens = 0
+        self._lock = threading.Lock()
+
+    def text(self, prompt: str, max_tokens: int) -> str:
+        name = f" {self.model_name}" if self.model_name is not None else ""
+        gpu_suffix = f" (GPU {self.gpu_id})" if self.gpu_id is not None else ""
+        return f"[MOCK{name}{gpu_suffix}] Generated {max_tokens} tokens for: {prompt[:50]}..."
+
+    def tokenize(self, prompt: str) -> List[str]:
+        return _TOKEN_PATTERN.findall(prompt)
+
+    def prefill(
+        self, tokens: Sequence[str], cached_states: List[Tuple[str, ...]]
+    ) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        # (state for the whole prompt, state for the tokens not covered by
+        # cached_states). The "state" of a token is the token itself.
+        cached = sum(len(state) for state in cached_states)
+        computed = tuple(tokens[cached:])
+        with self._lock:
+            self.computed_tokens += len(computed)
+        return tuple(token for state in cached_states for token in state) + computed, computed
+
+    @staticmethod
+    def split_state(state: Tuple[str, ...], length: int) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        return state[:length], state[length:]
+
+    def state_nbytes(self, state: Tuple[str, ...]) -> int:
+        return len(state) * self.state_bytes_per_token
+
+    def start(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        prompt_state: Any = None,
+    ) -> MockSequence:
+        if prompt_state is None:
+            self.prefill(self.tokenize(prompt), [])
+        return MockSequence(_TOKEN_PATTERN.findall(self.text(prompt, max_tokens)), max_tokens)
+
+    def step(self, sequences: List[MockSequence]) -> List[Optional[str]]:
+        # One decoding step for every sequence; None for finished ones
+        prefill = any(seq.position == 0 and not seq.finished for seq in sequences)
+        delay = self.first_token_delay_s if prefill else self.token_delay_s
+        if delay > 0:
+            time.sleep(delay)
+        tokens: List[Optional[str]] = []
+        for seq in sequences:
+            if seq.finished:
+                tokens.append(None)
+                continue
+            tokens.append(seq.text_tokens[seq.position] if seq.position < len(seq.text_tokens) else "")
+            seq.position += 1
+        return tokens
+
+    def generate(self, prompt: str, max_tokens: int = 100, temperature: float = 0.7) -> str:
+        return self.generate_batch([prompt], [max_tokens], [temperature])[0]
+
+    def generate_batch(
+        self, prompts: List[str], max_tokens: List[int], temperatures: List[float]
+    ) -> List[str]:
+        sequences = [
+            self.start(prompt, tokens, temperature)
+            for prompt, tokens, temperature in zip(prompts, max_tokens, temperatures)
+        ]
+        texts = [""] * len(sequences)
+        while not all(seq.finished for seq in sequences):
+            for row, token in enumerate(self.step(sequences)):
+                if token is not None:
+                    texts[row] += token
+        return texts
@@ -0,0 +1,208 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class _Node:
+    __slots__ = ("tokens", "state", "nbytes", "children", "parent", "refs", "last_used")
+
+    def __init__(
+        self,
+        tokens: Tuple[Hashable, ...],
+        state: Any,
+        nbytes: int,
+        parent: Optional["_Node"],
+    ) -> None:
+        # Edge label: the tokens this node adds to its parent's prefix, and
+        # the model state computed for exactly those tokens
+        self.tokens = tokens
+        self.state = state
+        self.nbytes = nbytes
+        self.children: Dict[Hashable, "_Node"] = {}
+        self.parent = parent
+        self.refs = 0
+        self.last_used = 0.0
+
+
+@dataclass
+class PrefixMatch:
+    # Longest cached prefix of a prompt. The nodes on its path stay pinned
+    # (not evictable) until release().
+    length: int = 0
+    # Per-node model states covering tokens[:length], root first
+    states: List[Any] = field(default_factory=list)
+    nodes: List[_Node] = field(default_factory=list)
+    released: bool = False
+
+
+class PrefixCache:
+    # Radix tree over prompt token sequences. Each edge holds the model
+    # state (e.g. KV cache) for its tokens, so a prompt reuses the state of
+    # its longest cached prefix and only the rest is computed. Edges are split
+    # where prompts diverge, which turns a shared system prompt into its own
+    # node. Unpinned leaves are evicted least recently used first once the
+    # states exceed max_bytes. Thread-safe: rows are started from executor
+    # threads.
+
+    def __init__(
+        self,
+        max_bytes: int,
+        split_state: Callable[[Any, int], Tuple[Any, Any]],
+        state_nbytes: Callable[[Any], int],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._split_state = split_state
+        self._state_nbytes = state_nbytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._root = _Node((), None, 0, None)
+        self._bytes = 0
+        self._nodes = 0
+        self._lookups = 0
+        self._hits = 0
+        self._prompt_tokens = 0
+        self._saved_tokens = 0
+        self._evictions = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def acquire(self, tokens: Sequence[Hashable]) -> PrefixMatch:
+        # At least one prompt token is always left to compute, since the
+        # model needs it to produce the first output token
+        tokens = tuple(tokens)
+        limit = len(tokens) - 1
+        with self._lock:
+            now = self._clock()
+            match = PrefixMatch()
+            node = self._root
+            while match.length < limit:
+                child = node.children.get(tokens[match.length])
+                if child is None:
+                    break
+                common = _common_length(child.tokens, tokens[match.length:limit])
+                if common == 0:
+                    break
+                if common < len(child.tokens):
+                    child = self._split(child, common)
+                child.refs += 1
+                child.last_used = now
+                match.nodes.append(child)
+                match.states.append(child.state)
+                match.length += common
+                node = child
+            self._lookups += 1
+            self._prompt_tokens += len(tokens)
+            if match.length:
+                self._hits += 1
+                self._saved_tokens += match.length
+            return match
+
+    def insert(self, tokens: Sequence[Hashable], match: PrefixMatch, state: Any) -> None:
+        # Caches the state computed for tokens[match.length:] below the
+        # matched prefix. The new node is pinned along with the match.
+        tokens = tuple(tokens)
+        rest = tokens[match.length:]
+        if not rest or match.released:
+            return
+        nbytes = self._state_nbytes(state)
+        with self._lock:
+            parent = match.nodes[-1] if match.nodes else self._root
+            if rest[0] in parent.children:
+                # Another request cached a continuation meanwhile
+                return
+            if not self._make_room(nbytes):
+                return
+            node = _Node(rest, state, nbytes, parent)
+            node.refs = 1
+            node.last_used = self._clock()
+            parent.children[rest[0]] = node
+            self._bytes += nbytes
+            self._nodes += 1
+            match.nodes.append(node)
+
+    def release(self, match: PrefixMatch) -> None:
+        with self._lock:
+            if match.released:
+                return
+            match.released = True
+            now = self._clock()
+            for node in match.nodes:
+                node.refs -= 1
+                node.last_used = now
+
+    def _split(self, node: _Node, length: int) -> _Node:
+        # Splits node's edge after length tokens; returns the new upper node
+        head_state, tail_state = self._split_state(node.state, length)
+        head_bytes = self._state_nbytes(head_state)
+        tail_bytes = self._state_nbytes(tail_state)
+        # Matches pinning node keep pinning the tail; the head cannot be
+        # evicted while it has the tail below it, so it starts unpinned
+        head = _Node(node.tokens[:length], head_state, head_bytes, node.parent)
+        head.last_used = node.last_used
+        node.parent.children[node.tokens[0]] = head
+        node.tokens = node.tokens[length:]
+        node.state = tail_state
+        node.parent = head
+        head.children[node.tokens[0]] = node
+        self._bytes += head_bytes + tail_bytes - node.nbytes
+        node.nbytes = tail_bytes
+        self._nodes += 1
+        return head
+
+    def _make_room(self, nbytes: int) -> bool:
+        if nbytes > self._max_bytes:
+            return False
+        while self._bytes + nbytes > self._max_bytes:
+            victim = self._lru_leaf()
+            if victim is None:
+                return False
+            self._evict(victim)
+        return True
+
+    def _lru_leaf(self) -> Optional[_Node]:
+        victim: Optional[_Node] = None
+        stack = list(self._root.children.values())
+        while stack:
+            node = stack.pop()
+            if node.children:
+                stack.extend(node.children.values())
+            elif node.refs == 0 and (victim is None or node.last_used < victim.last_used):
+                victim = node
+        return victim
+
+    def _evict(self, node: _Node) -> None:
+        del node.parent.children[node.tokens[0]]
+        self._bytes -= node.nbytes
+        self._nodes -= 1
+        self._evictions += 1
+        node.state = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "nodes": self._nodes,
+                "size_bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "hit_rate": self._hits / self._lookups if self._lookups else 0.0,
+                "prompt_tokens": self._prompt_tokens,
+                "saved_tokens": self._saved_tokens,
+                "saved_token_ratio": (
+                    self._saved_tokens / self._prompt_tokens if self._prompt_tokens else 0.0
+                ),
+                "evictions": self._evictions,
+            }
+
+
+def _common_length(a: Sequence[Hashable], b: Sequence[Hashable]) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Set
+from server.app.models.loader import ModelLoader
+
+logger = logging.getLogger(__name__)
+
+# Name reported for the model loaded when a request names none
+DEFAULT_MODEL = "default"
+
+# Sentinel for "no evictable model", since None is the default model's key
+_NONE = object()
+
+
+@dataclass
+class _Resident:
+    loader: ModelLoader
+    nbytes: int
+    # Batches or rows currently using the model; pinned models are not evicted
+    refs: int = 0
+
+
+class ModelRegistry:
+    # The models resident on one device. A model is loaded the first time a
+    # request names it, and loaded models are evicted least recently used
+    # first once their memory would exceed max_bytes (0: no limit). Models
+    # in use are never evicted; if nothing can be evicted the load goes
+    # ahead over budget. Thread-safe: models are acquired from executor
+    # threads and released from the event loop.
+
+    def __init__(
+        self,
+        gpu_id: Optional[int] = None,
+        max_bytes: int = 0,
+        default_model: Optional[str] = None,
+        loader_factory: Callable[..., ModelLoader] = ModelLoader,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self._gpu_id = gpu_id
+        self._max_bytes = max_bytes
+        # A request naming this model gets the default one
+        self._default_model = default_model
+        self._loader_factory = loader_factory
+        self._clock = clock
+        self._cond = threading.Condition()
+        # Least recently used first
+        self._resident: "OrderedDict[Optional[str], _Resident]" = OrderedDict()
+        self._loading: Set[Optional[str]] = set()
+        self._bytes = 0
+        # Estimated size of models being loaded
+        self._reserved_bytes = 0
+        self._loads = 0
+        self._load_failures = 0
+        self._load_time_s = 0.0
+        self._evictions = 0
+        self._over_budget_loads = 0
+        self._warm_acquires = 0
+        self._cold_starts = 0
+        self._cold_start_wait_s = 0.0
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._bytes
+
+    def _key(self, model: Optional[str]) -> Optional[str]:
+        return None if model is None or model == self._default_model else model
+
+    def add(self, loader: ModelLoader, model: Optional[str] = None) -> None:
+        # Registers a loader that is already set up, e.g. one built by hand
+        key = self._key(model)
+        with self._cond:
+            nbytes = loader.memory_bytes()
+            self._resident[key] = _Resident(loader, nbytes)
+            self._bytes += nbytes
+
+    def is_resident(self, model: Optional[str]) -> bool:
+        with self._cond:
+            return self._key(model) in self._resident
+
+    def preload(self, model: Optional[str] = None) -> ModelLoader:
+        # Loads a model without counting a cold start, e.g. at startup
+        loader = self._acquire(model, cold_start=False)
+        self.release(model)
+        return loader
+
+    def acquire(self, model: Optional[str]) -> ModelLoader:
+        # The loader for model, loading it first if needed; blocks while it
+        # loads. The model stays pinned until release(model).
+        return self._acquire(model, cold_start=True)
+
+    def resident(self, model: Optional[str]) -> ModelLoader:
+        # The loader of a model the caller holds pinned
+        with self._cond:
+            return self._resident[self._key(model)].loader
+
+    def release(self, model: Optional[str]) -> None:
+        with self._cond:
+            resident = self._resident.get(self._key(model))
+            if resident is not None and resident.refs > 0:
+                resident.refs -= 1
+
+    def _acquire(self, model: Optional[str], cold_start: bool) -> ModelLoader:
+        key = self._key(model)
+        started = self._clock()
+        waited = False
+        with self._cond:
+            while True:
+                resident = self._resident.get(key)
+                if resident is not None:
+                    resident.refs += 1
+                    self._resident.move_to_end(key)
+                    if waited and cold_start:
+                        self._record_cold_start(started)
+                    elif not waited:
+                        self._warm_acquires += 1
+                    return resident.loader
+                if key not in self._loading:
+                    break
+                # Another thread is loading it
+                waited = True
+                self._cond.wait()
+            self._loading.add(key)
+            loader = self._loader_factory(gpu_id=self._gpu_id, model_name=key)
+            estimate = loader.estimate_bytes()
+            self._make_room(estimate)
+            self._reserved_bytes += estimate
+
+        try:
+            load_started = self._clock()
+            loader.load()
+            load_time = self._clock() - load_started
+        except Exception as e:
+            logger.error(f"Failed to load model {key or DEFAULT_MODEL}: {e}")
+            with self._cond:
+                self._reserved_bytes -= estimate
+                self._loading.discard(key)
+                self._load_failures += 1
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._reserved_bytes -= estimate
+            nbytes = loader.memory_bytes()
+            # Settle the estimate against the actual size
+            if not self._make_room(nbytes):
+                self._over_budget_loads += 1
+                logger.warning(
+                    f"Model memory budget of {self._max_bytes} bytes exceeded on GPU "
+                    f"{self._gpu_id}: every other resident model is in use"
+                )
+            self._resident[key] = _Resident(loader, nbytes, refs=1)
+            self._bytes += nbytes
+            self._loading.discard(key)
+            self._loads += 1
+            self._load_time_s += load_time
+            if cold_start:
+                self._record_cold_start(started)
+            self._cond.notify_all()
+        logger.info(
+            f"Loaded model {key or DEFAULT_MODEL} on GPU {self._gpu_id} in "
+            f"{load_time * 1000.0:.1f} ms ({nbytes} bytes, {self._bytes} resident)"
+        )
+        return loader
+
+    def _record_cold_start(self, started: float) -> None:
+        self._cold_starts += 1
+        self._cold_start_wait_s += self._clock() - started
+
+    def _make_room(self, nbytes: int) -> bool:
+        # Evicts unpinned models, least recently used first, until nbytes
+        # more fit the budget. Called with the lock held.
+        if self._max_bytes <= 0:
+            return True
+        while self._bytes + self._reserved_bytes + nbytes > self._max_bytes:
+            victim = next(
+                (key for key, resident in self._resident.items() if resident.refs == 0),
+                _NONE,
+            )
+            if victim is _NONE:
+                return False
+            self._evict(victim)
+        return True
+
+    def _evict(self, key: Optional[str]) -> None:
+        resident = self._resident.pop(key)
+        self._bytes -= resident.nbytes
+        self._evictions += 1
+        resident.loader.unload()
+        logger.info(f"Evicted model {key or DEFAULT_MODEL} from GPU {self._gpu_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_bytes": self._max_bytes,
+                "resident_bytes": self._bytes,
+                "resident": {
+                    key or DEFAULT_MODEL: {
+                        **resident.loader.stats(),
+                        "bytes": resident.nbytes,
+                        "in_use": resident.refs,
+                    }
+                    for key, resident in self._resident.items()
+                },
+                "loading": sorted(key or DEFAULT_MODEL for key in self._loading),
+                "loads": self._loads,
+                "load_failures": self._load_failures,
+                "mean_load_ms": self._load_time_s / self._loads * 1000.0 if self._loads else 0.0,
+                "evictions": self._evictions,
+                "over_budget_loads": self._over_budget_loads,
+                "warm_acquires": self._warm_acquires,
+                "cold_starts": self._cold_starts,
+                "mean_cold_start_ms": (
+                    self._cold_start_wait_s / self._cold_starts * 1000.0
+                    if self._cold_starts else 0.0
+                ),
+            }
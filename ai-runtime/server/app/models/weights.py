@@ -0,0 +1,149 @@
+import importlib
+import json
+import logging
+import os
+import resource
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Model directory layout: config.json names the architecture to build and its
+# constructor arguments, next to one weights file
+#   {"architecture": "name", "config": {...}, "weights": "model.pt"}
+# The architecture is a name registered with register_architecture() or a
+# "package.module:ClassName" import path the operator allowed
+# (MODEL_ARCHITECTURES). A model directory is data: its config.json alone
+# never decides which code is imported.
+CONFIG_FILE = "config.json"
+# Tried in order when config.json does not name the weights file
+WEIGHTS_FILES = ("model.safetensors", "model.pt", "pytorch_model.bin")
+
+
+# Architecture name -> model class (or any callable taking the config)
+_ARCHITECTURES: Dict[str, Callable[..., Any]] = {}
+
+
+def register_architecture(name: str, model_cls: Callable[..., Any]) -> None:
+    _ARCHITECTURES[name] = model_cls
+
+
+def resolve_architecture(name: str, allowed: Sequence[str] = ()) -> Callable[..., Any]:
+    if name in _ARCHITECTURES:
+        return _ARCHITECTURES[name]
+    if name in allowed:
+        module_name, _, class_name = name.partition(":")
+        return getattr(importlib.import_module(module_name), class_name)
+    raise ValueError(
+        f"Unknown model architecture {name!r}: register it with register_architecture() "
+        f"or list its import path in MODEL_ARCHITECTURES"
+    )
+
+
+@dataclass
+class LoadedWeights:
+    model: Any
+    model_dir: str
+    weights_file: str
+    weights_bytes: int
+    load_time_s: float
+
+
+def resolve_model_dir(model_path: str, model_name: Optional[str] = None) -> str:
+    # model_path is either the model directory itself or, with model_name,
+    # a directory holding one subdirectory per model
+    if model_name:
+        candidate = os.path.join(model_path, model_name)
+        if os.path.isdir(candidate):
+            return candidate
+    return model_path
+
+
+def load_weights(
+    model_dir: str, device: str = "cpu", allowed_architectures: Sequence[str] = ()
+) -> LoadedWeights:
+    # Builds the module without allocating parameters (meta device) and
+    # assigns the checkpoint tensors to it directly. The tensors are memory
+    # mapped, so startup reads no weight data: pages are faulted in on first
+    # use, and workers on the same host share them through the page cache.
+    # Moving to a GPU copies them, as it must.
+    import torch
+
+    started = time.perf_counter()
+    config_path = os.path.join(model_dir, CONFIG_FILE)
+    if not os.path.isfile(config_path):
+        raise FileNotFoundError(f"No {CONFIG_FILE} in model directory {model_dir}")
+    with open(config_path) as f:
+        config = json.load(f)
+    if "architecture" not in config:
+        raise ValueError(f"{config_path} does not name an architecture")
+    weights_file = _weights_file(model_dir, config.get("weights"))
+
+    model_cls = resolve_architecture(config["architecture"], allowed_architectures)
+    with torch.device("meta"):
+        model = model_cls(**config.get("config", {}))
+
+    state = _mmap_state_dict(weights_file)
+    model.load_state_dict(state, assign=True)
+    if device != "cpu":
+        model = model.to(device)
+    model.eval()
+
+    return LoadedWeights(
+        model=model,
+        model_dir=model_dir,
+        weights_file=weights_file,
+        weights_bytes=os.path.getsize(weights_file),
+        load_time_s=time.perf_counter() - started,
+    )
+
+
+def estimate_weights_bytes(model_dir: str) -> int:
+    # Size of the model's weights file, read before loading it
+    config_path = os.path.join(model_dir, CONFIG_FILE)
+    name = None
+    if os.path.isfile(config_path):
+        with open(config_path) as f:
+            name = json.load(f).get("weights")
+    return os.path.getsize(_weights_file(model_dir, name))
+
+
+def _weights_file(model_dir: str, name: Optional[str]) -> str:
+    candidates = (name,) if name else WEIGHTS_FILES
+    for candidate in candidates:
+        path = os.path.join(model_dir, candidate)
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f"No weights file ({', '.join(candidates)}) in {model_dir}")
+
+
+def _mmap_state_dict(weights_file: str) -> Dict[str, Any]:
+    if weights_file.endswith(".safetensors"):
+        try:
+            from safetensors.torch import load_file
+        except ImportError:
+            raise RuntimeError("Loading .safetensors weights requires the safetensors package")
+        # safetensors maps the file and returns tensors backed by the mapping
+        return load_file(weights_file, device="cpu")
+    import torch
+
+    # weights_only: a checkpoint is data, never code to run
+    return torch.load(weights_file, map_location="cpu", mmap=True, weights_only=True)
+
+
+def memory_usage() -> Dict[str, int]:
+    # Resident memory of this process. rss_shared_bytes is the file-backed
+    # part (mapped weights among it), which other processes mapping the same
+    # files share rather than duplicate.
+    try:
+        with open("/proc/self/statm") as f:
+            fields = f.read().split()
+        page = os.sysconf("SC_PAGE_SIZE")
+        return {
+            "rss_bytes": int(fields[1]) * page,
+            "rss_shared_bytes": int(fields[2]) * page,
+        }
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, in KiB on Linux
+        return {"rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
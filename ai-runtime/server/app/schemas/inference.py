@@ -1,4 +1,15 @@
-from shared.schemas.inference import InferenceRequest, InferenceResponse
-
-__all__ = ["InferenceRequest", "InferenceResponse"]
+from shared.schemas.inference import (
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_TEMPERATURE,
+    InferenceRequest,
+    InferenceResponse,
+    InferenceStreamChunk,
+)
 
+__all__ = [
+    "DEFAULT_MAX_TOKENS",
+    "DEFAULT_TEMPERATURE",
+    "InferenceRequest",
+    "InferenceResponse",
+    "InferenceStreamChunk",
+]
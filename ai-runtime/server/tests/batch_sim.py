@@ -0,0 +1,111 @@
+import heapq
+import random
+import statistics
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from server.app.core.batch_policy import BatchPolicy
+
+
+# Discrete-event model of the batcher -> scheduler -> workers pipeline on a
+# virtual clock. The batcher opens a batch with the oldest waiting request,
+# takes requests until the policy's target size or window is reached, and
+# hands the batch to the earliest free worker. Workers report each batch's
+# service time back to the policy once it has finished. Given per-request
+# costs, batches are also bounded by a cost budget and the service time is a
+# function of the batch's total cost instead of its size.
+
+
+@dataclass
+class SimResult:
+    latencies: List[float] = field(default_factory=list)
+    batch_sizes: List[int] = field(default_factory=list)
+    service_times: List[float] = field(default_factory=list)
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[rank]
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> float:
+        return self.percentile(99)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return sum(self.batch_sizes) / len(self.batch_sizes)
+
+    @property
+    def service_time_stdev(self) -> float:
+        return statistics.pstdev(self.service_times)
+
+
+def poisson_arrivals(rate: float, count: int, seed: int = 0) -> List[float]:
+    rng = random.Random(seed)
+    at = 0.0
+    arrivals = []
+    for _ in range(count):
+        at += rng.expovariate(rate)
+        arrivals.append(at)
+    return arrivals
+
+
+def linear_service(per_batch_s: float, per_request_s: float) -> Callable[[int], float]:
+    return lambda size: per_batch_s + per_request_s * size
+
+
+def simulate(
+    policy: BatchPolicy,
+    arrivals: List[float],
+    service_time: Callable[[int], float],
+    workers: int = 1,
+    costs: Optional[List[float]] = None,
+    max_batch_cost: Optional[float] = None,
+) -> SimResult:
+    result = SimResult()
+    worker_free = [0.0] * workers
+    finished: List[tuple] = []  # (finish time, size, service seconds)
+    batcher_free = 0.0
+    i = 0
+    while i < len(arrivals):
+        opened_at = max(batcher_free, arrivals[i])
+        while finished and finished[0][0] <= opened_at:
+            _, size, service = heapq.heappop(finished)
+            policy.observe_batch(size, service)
+
+        batch = [i]
+        cost = costs[i] if costs else 0.0
+        policy.observe_arrival(arrivals[i])
+        i += 1
+        target = policy.target_size()
+        deadline = opened_at + policy.window_s()
+        closed_at = None
+        while len(batch) < target and i < len(arrivals) and arrivals[i] <= deadline:
+            if max_batch_cost is not None and cost >= max_batch_cost:
+                break
+            if max_batch_cost is not None and cost + costs[i] > max_batch_cost:
+                # The request that does not fit closes the batch and opens the next
+                closed_at = max(opened_at, arrivals[i])
+                break
+            policy.observe_arrival(arrivals[i])
+            batch.append(i)
+            cost += costs[i] if costs else 0.0
+            i += 1
+        if closed_at is None:
+            full = len(batch) >= target or (max_batch_cost is not None and cost >= max_batch_cost)
+            closed_at = max(opened_at, arrivals[batch[-1]]) if full else deadline
+
+        service = service_time(cost if costs else len(batch))
+        start = max(heapq.heappop(worker_free), closed_at)
+        finish = start + service
+        heapq.heappush(worker_free, finish)
+        heapq.heappush(finished, (finish, len(batch), service))
+        result.batch_sizes.append(len(batch))
+        result.service_times.append(service)
+        result.latencies.extend(finish - arrivals[j] for j in batch)
+        batcher_free = closed_at
+    return result
@@ -0,0 +1,116 @@
+import pytest
+import asyncio
+import sys
+import os
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.batch_buckets import LengthBuckets, padding_efficiency, parse_edges
+from server.app.core.batcher import Batch, DynamicBatcher
+from server.app.core.queue import QueuedRequest
+from server.app.schemas.inference import InferenceRequest
+
+# Prompts of about 10 and 500 tokens at 4 characters per token
+SHORT = "x" * 40
+LONG = "x" * 2000
+
+
+def make_queued(
+    i: int, prompt: str, max_tokens: int = 10, model: Optional[str] = None
+) -> QueuedRequest:
+    return QueuedRequest(
+        request=InferenceRequest(prompt=prompt, max_tokens=max_tokens, model=model),
+        future=asyncio.get_running_loop().create_future(),
+        request_id=f"req{i}",
+    )
+
+
+def make_batcher(max_batch_size: int, buckets: Optional[LengthBuckets]) -> DynamicBatcher:
+    return DynamicBatcher(
+        max_batch_size=max_batch_size,
+        max_batch_latency_ms=50,
+        input_queue=asyncio.Queue(),
+        output_queue=asyncio.Queue(),
+        buckets=buckets,
+    )
+
+
+async def run_batcher(batcher: DynamicBatcher, queued: List[QueuedRequest], batches: int) -> List[Batch]:
+    for q in queued:
+        await batcher._input_queue.put(q)
+    await batcher.start()
+    try:
+        return [
+            await asyncio.wait_for(batcher._output_queue.get(), timeout=1.0)
+            for _ in range(batches)
+        ]
+    finally:
+        await batcher.stop()
+
+
+def ids(batch: Batch) -> List[str]:
+    return [q.request_id for q in batch.requests]
+
+
+class TestLengthBuckets:
+    def test_parse_edges(self):
+        assert parse_edges("512, 128,2048") == [128, 512, 2048]
+        assert parse_edges("") == []
+        with pytest.raises(ValueError):
+            parse_edges("0,128")
+
+    def test_bucket_by_prompt_and_max_tokens(self):
+        buckets = LengthBuckets([128, 512], max_tokens_edges=[64])
+        assert buckets.bucket(InferenceRequest(prompt="x" * 512, max_tokens=64)) == (0, 0)
+        assert buckets.bucket(InferenceRequest(prompt="x" * 513, max_tokens=65)) == (1, 1)
+        assert buckets.bucket(InferenceRequest(prompt="x" * 4000)) == (2, 1)
+
+    @pytest.mark.asyncio
+    async def test_padding_efficiency(self):
+        # 10 + 490 prompt tokens padded to 2 x 490, plus 10 generated each
+        requests = [make_queued(0, SHORT), make_queued(1, "x" * 1960)]
+        assert padding_efficiency(requests) == pytest.approx(520 / 1000)
+        assert padding_efficiency(requests[:1]) == 1.0
+
+
+class TestBucketedBatcher:
+    @pytest.mark.asyncio
+    async def test_lengths_batched_separately(self):
+        prompts = [SHORT, LONG, SHORT, LONG]
+        queued = lambda: [make_queued(i, p) for i, p in enumerate(prompts)]
+
+        mixed = await run_batcher(make_batcher(2, None), queued(), 2)
+        bucketed_batcher = make_batcher(2, LengthBuckets([128, 512]))
+        bucketed = await run_batcher(bucketed_batcher, queued(), 2)
+
+        assert [ids(b) for b in mixed] == [["req0", "req1"], ["req2", "req3"]]
+        assert [ids(b) for b in bucketed] == [["req0", "req2"], ["req1", "req3"]]
+        assert all(b.padding_efficiency < 0.6 for b in mixed)
+        assert all(b.padding_efficiency == 1.0 for b in bucketed)
+        assert bucketed_batcher.stats()["mean_padding_efficiency"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_sparse_bucket_goes_out_with_neighbours(self):
+        batcher = make_batcher(4, LengthBuckets([128, 512, 2048]))
+        queued = [make_queued(0, SHORT), make_queued(1, LONG), make_queued(2, "x" * 4000)]
+        batches = await run_batcher(batcher, queued, 1)
+
+        # Nearest bucket first
+        assert ids(batches[0]) == ["req0", "req1", "req2"]
+        assert batcher.stats()["merged_batches"] == 2
+        assert batcher._output_queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_merge_respects_target_size_and_model(self):
+        batcher = make_batcher(2, LengthBuckets([128]))
+        queued = [
+            make_queued(0, SHORT),
+            make_queued(1, LONG, model="other"),
+            make_queued(2, LONG),
+            make_queued(3, LONG),
+        ]
+        batches = await run_batcher(batcher, queued, 3)
+
+        assert sorted(ids(b) for b in batches) == [["req0"], ["req1"], ["req2", "req3"]]
+        assert batcher.stats()["merged_batches"] == 0
@@ -0,0 +1,142 @@
+import pytest
+import asyncio
+import random
+import sys
+import os
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.batch_cost import (
+    CostEstimator,
+    RequestCountEstimator,
+    TokenCostEstimator,
+    create_cost_estimator,
+)
+from server.app.core.batch_policy import FixedBatchPolicy
+from server.app.core.batcher import DynamicBatcher
+from server.app.core.queue import QueuedRequest
+from server.app.schemas.inference import InferenceRequest
+from server.tests.batch_sim import poisson_arrivals, simulate
+
+
+def make_queued(i: int, prompt: str = "x", max_tokens: Optional[int] = 10) -> QueuedRequest:
+    return QueuedRequest(
+        request=InferenceRequest(prompt=prompt, max_tokens=max_tokens),
+        future=asyncio.get_running_loop().create_future(),
+        request_id=f"req{i}",
+    )
+
+
+async def run_batcher(batcher: DynamicBatcher, queued: List[QueuedRequest], batches: int):
+    for q in queued:
+        await batcher._input_queue.put(q)
+    await batcher.start()
+    try:
+        return [
+            await asyncio.wait_for(batcher._output_queue.get(), timeout=1.0)
+            for _ in range(batches)
+        ]
+    finally:
+        await batcher.stop()
+
+
+class TestCostEstimators:
+    def test_token_cost_is_prompt_plus_generation(self):
+        estimator = TokenCostEstimator()
+        assert estimator.estimate(InferenceRequest(prompt="x" * 40, max_tokens=10)) == 20
+        # Unset max_tokens counts as the worker's default generation length
+        assert estimator.estimate(InferenceRequest(prompt="abc")) == 101
+
+    def test_token_cost_uses_tokenizer(self):
+        estimator = TokenCostEstimator(count_tokens=lambda prompt: len(prompt.split()))
+        assert estimator.estimate(InferenceRequest(prompt="one two three", max_tokens=5)) == 8
+
+    def test_factory(self):
+        assert isinstance(create_cost_estimator("tokens"), TokenCostEstimator)
+        assert isinstance(create_cost_estimator("requests"), RequestCountEstimator)
+        with pytest.raises(ValueError):
+            create_cost_estimator("flops")
+
+    def test_estimator_must_implement_estimate(self):
+        class Unfinished(CostEstimator):
+            pass
+
+        with pytest.raises(TypeError):
+            Unfinished()
+
+
+class TestCostBudget:
+    @pytest.mark.asyncio
+    async def test_batch_closes_before_exceeding_budget(self):
+        batcher = DynamicBatcher(
+            max_batch_size=8,
+            max_batch_latency_ms=50,
+            input_queue=asyncio.Queue(),
+            output_queue=asyncio.Queue(),
+            max_batch_cost=100,
+        )
+        # Costs 41, 41, 41, 11: the third would take the first batch to 123
+        queued = [make_queued(i, max_tokens=40) for i in range(3)] + [make_queued(3)]
+        batches = await run_batcher(batcher, queued, 2)
+
+        assert [[q.request_id for q in b.requests] for b in batches] == [
+            ["req0", "req1"],
+            ["req2", "req3"],
+        ]
+        assert [b.cost for b in batches] == [82, 52]
+        stats = batcher.stats()
+        assert stats["flushes"]["budget"] == 1
+        assert stats["mean_batch_cost"] == 67
+
+    @pytest.mark.asyncio
+    async def test_oversize_request_runs_alone(self):
+        batcher = DynamicBatcher(
+            max_batch_size=8,
+            max_batch_latency_ms=50,
+            input_queue=asyncio.Queue(),
+            output_queue=asyncio.Queue(),
+            max_batch_cost=100,
+        )
+        queued = [make_queued(0), make_queued(1, max_tokens=500), make_queued(2)]
+        batches = await run_batcher(batcher, queued, 3)
+
+        assert [[q.request_id for q in b.requests] for b in batches] == [
+            ["req0"],
+            ["req1"],
+            ["req2"],
+        ]
+        assert batches[1].cost == 501
+
+    @pytest.mark.asyncio
+    async def test_request_count_still_caps_batches(self):
+        batcher = DynamicBatcher(
+            max_batch_size=2,
+            max_batch_latency_ms=10000,
+            input_queue=asyncio.Queue(),
+            output_queue=asyncio.Queue(),
+            max_batch_cost=10000,
+        )
+        batches = await run_batcher(batcher, [make_queued(i) for i in range(4)], 2)
+
+        assert [b.size() for b in batches] == [2, 2]
+        assert batcher.stats()["flushes"]["full"] == 2
+
+
+class TestCostBudgetSimulation:
+    def test_token_budget_evens_out_batch_service_time(self):
+        # Mostly short chat turns with occasional long documents; the model
+        # costs a fixed overhead plus time per token
+        rng = random.Random(7)
+        arrivals = poisson_arrivals(150.0, 4000, seed=7)
+        costs = [rng.gauss(2500, 200) if rng.random() < 0.2 else rng.gauss(50, 10) for _ in arrivals]
+        service = lambda tokens: 0.002 + 0.00001 * tokens
+
+        by_count = simulate(FixedBatchPolicy(8, 50), arrivals, service, workers=2, costs=costs)
+        by_tokens = simulate(
+            FixedBatchPolicy(8, 50), arrivals, service, workers=2, costs=costs, max_batch_cost=4096
+        )
+
+        assert by_tokens.service_time_stdev < 0.6 * by_count.service_time_stdev
+        assert max(by_tokens.service_times) < 0.6 * max(by_count.service_times)
+        assert by_tokens.p99 <= by_count.p99
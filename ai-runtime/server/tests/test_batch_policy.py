@@ -0,0 +1,170 @@
+import pytest
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.batch_policy import (
+    AdaptiveBatchPolicy,
+    BatchPolicy,
+    FixedBatchPolicy,
+    create_batch_policy,
+)
+from server.app.core.batcher import DynamicBatcher
+from server.app.core.queue import QueuedRequest
+from server.app.schemas.inference import InferenceRequest
+from server.tests.batch_sim import linear_service, poisson_arrivals, simulate
+
+
+def warmed_up(rate: float, workers: int = 1, slo_ms: float = 200) -> AdaptiveBatchPolicy:
+    policy = AdaptiveBatchPolicy(max_batch_size=32, max_window_ms=50, slo_ms=slo_ms, workers=workers)
+    for at in poisson_arrivals(rate, 3000, seed=3):
+        policy.observe_arrival(at)
+    service = linear_service(0.005, 0.001)
+    for size in (1, 4, 8, 16, 32) * 4:
+        policy.observe_batch(size, service(size))
+    return policy
+
+
+class TestFixedBatchPolicy:
+    def test_returns_configured_values(self):
+        policy = FixedBatchPolicy(max_batch_size=8, max_batch_latency_ms=50)
+        policy.observe_arrival(1.0)
+        policy.observe_batch(8, 0.02)
+        assert policy.target_size() == 8
+        assert policy.window_s() == pytest.approx(0.05)
+        assert policy.describe()["policy"] == "fixed"
+
+    def test_factory(self):
+        fixed = create_batch_policy("fixed", 8, 50, 32, 200, 2)
+        adaptive = create_batch_policy("adaptive", 8, 50, 32, 200, 2)
+        assert isinstance(fixed, FixedBatchPolicy)
+        assert isinstance(adaptive, AdaptiveBatchPolicy)
+        # Starts out like the fixed policy
+        assert adaptive.target_size() == 8
+        assert adaptive.window_s() == pytest.approx(0.05)
+        with pytest.raises(ValueError):
+            create_batch_policy("greedy", 8, 50, 32, 200, 2)
+
+    def test_policy_must_implement_target_and_window(self):
+        class WindowOnly(BatchPolicy):
+            def window_s(self) -> float:
+                return 0.05
+
+        with pytest.raises(TypeError):
+            WindowOnly()
+
+
+class TestAdaptiveBatchPolicy:
+    def test_arrival_rate_estimate(self):
+        policy = AdaptiveBatchPolicy(max_batch_size=32, max_window_ms=50, slo_ms=200)
+        assert policy.arrival_rate() is None
+        for at in poisson_arrivals(500, 5000, seed=1):
+            policy.observe_arrival(at)
+        assert policy.arrival_rate() == pytest.approx(500, rel=0.15)
+
+    def test_service_model_fit(self):
+        policy = AdaptiveBatchPolicy(max_batch_size=32, max_window_ms=50, slo_ms=200)
+        assert policy.service_model() is None
+        for size in (2, 2, 2):
+            policy.observe_batch(size, 0.007)
+        # No spread of sizes yet
+        assert policy.service_model() is None
+        for size in (1, 8, 16):
+            policy.observe_batch(size, 0.005 + 0.001 * size)
+        a, b = policy.service_model()
+        assert a == pytest.approx(0.005, rel=0.05)
+        assert b == pytest.approx(0.001, rel=0.05)
+
+    def test_low_load_does_not_wait(self):
+        policy = warmed_up(rate=10)
+        assert policy.window_s() == 0.0
+        assert policy.target_size() == 1
+
+    def test_high_load_batches_more(self):
+        low, high = warmed_up(rate=200), warmed_up(rate=700)
+        assert 0.0 < low.window_s() < high.window_s() <= 0.05
+        assert 1 < low.target_size() < high.target_size() <= 32
+        assert high.describe()["meets_slo"] is True
+
+    def test_window_bounded_by_slo(self):
+        policy = warmed_up(rate=700, slo_ms=20)
+        assert policy.window_s() + 0.006 <= 0.020 + 1e-9
+
+
+class TestBatchPolicySimulation:
+    # Same Poisson arrivals and S(n) = 5 ms + 1 ms * n service under both
+    # policies; fixed is the default configuration (8 requests / 50 ms)
+
+    def run(self, rate: float, workers: int = 1):
+        arrivals = poisson_arrivals(rate, 4000, seed=1)
+        service = linear_service(0.005, 0.001)
+        fixed = simulate(FixedBatchPolicy(8, 50), arrivals, service, workers)
+        adaptive = simulate(
+            AdaptiveBatchPolicy(32, 50, slo_ms=200, workers=workers, initial_batch_size=8),
+            arrivals,
+            service,
+            workers,
+        )
+        return fixed, adaptive
+
+    def test_low_load_skips_the_window(self):
+        fixed, adaptive = self.run(rate=20)
+        assert fixed.p99 > 0.05
+        assert adaptive.p99 < fixed.p99 / 3
+        assert adaptive.mean_batch_size < 1.5
+
+    @pytest.mark.parametrize("rate,workers", [(100, 1), (300, 1), (450, 1), (600, 2), (900, 2)])
+    def test_moderate_load_p99_no_worse(self, rate, workers):
+        fixed, adaptive = self.run(rate, workers)
+        assert adaptive.p99 <= fixed.p99 * 1.05
+
+    def test_high_load_grows_batches_and_holds_slo(self):
+        # Beyond the fixed policy's capacity (8 / 13 ms = 615 requests/s)
+        fixed, adaptive = self.run(rate=750)
+        assert fixed.p99 > 1.0
+        assert adaptive.p99 < 0.2
+        assert adaptive.mean_batch_size > fixed.mean_batch_size
+
+
+class StubPolicy(FixedBatchPolicy):
+    def __init__(self) -> None:
+        super().__init__(max_batch_size=2, max_batch_latency_ms=0)
+        self.arrivals = []
+
+    def observe_arrival(self, at: float) -> None:
+        self.arrivals.append(at)
+
+
+class TestBatcherWithPolicy:
+    @pytest.mark.asyncio
+    async def test_batcher_follows_policy(self):
+        input_queue = asyncio.Queue()
+        output_queue = asyncio.Queue()
+        policy = StubPolicy()
+        batcher = DynamicBatcher(
+            max_batch_size=8,
+            max_batch_latency_ms=1000,
+            input_queue=input_queue,
+            output_queue=output_queue,
+            policy=policy,
+        )
+        await batcher.start()
+        try:
+            for i in range(3):
+                queued = QueuedRequest(
+                    request=InferenceRequest(prompt=f"test {i}"),
+                    future=asyncio.Future(),
+                    request_id=f"req{i}",
+                    enqueued_at=float(i),
+                )
+                input_queue.put_nowait(queued)
+            first = await asyncio.wait_for(output_queue.get(), timeout=0.5)
+            second = await asyncio.wait_for(output_queue.get(), timeout=0.5)
+        finally:
+            await batcher.stop()
+        # Target size 2 and a zero window instead of 8 / 1000 ms
+        assert [first.size(), second.size()] == [2, 1]
+        assert policy.arrivals == [0.0, 1.0, 2.0]
+        assert batcher.stats()["policy"] == "fixed"
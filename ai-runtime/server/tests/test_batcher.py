@@ -7,6 +7,7 @@ from typing import List
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from server.app.core.batcher import DynamicBatcher, Batch
+from server.app.core.deadlines import EXPIRED, DeadlineExceeded, DropStats
 from server.app.core.queue import QueuedRequest
 from server.app.schemas.inference import InferenceRequest
 
@@ -112,6 +113,124 @@ class TestDynamicBatcher:
             await batcher.stop()
             await asyncio.sleep(0.1)
 
+    @pytest.mark.asyncio
+    async def test_stop_flushes_partial_batch(self):
+        input_queue = asyncio.Queue()
+        output_queue = asyncio.Queue()
+        batcher = DynamicBatcher(
+            max_batch_size=10,
+            max_batch_latency_ms=10000,
+            input_queue=input_queue,
+            output_queue=output_queue,
+        )
+        await batcher.start()
+        for i in range(2):
+            queued = QueuedRequest(
+                request=InferenceRequest(prompt=f"test {i}"),
+                future=asyncio.Future(),
+                request_id=f"req{i}",
+            )
+            await input_queue.put(queued)
+        await asyncio.sleep(0.05)
+        assert output_queue.empty()
+
+        await batcher.stop()
+        batch = output_queue.get_nowait()
+        assert [q.request_id for q in batch.requests] == ["req0", "req1"]
+
+    @pytest.mark.asyncio
+    async def test_idle_batcher_stops_promptly(self):
+        input_queue = asyncio.Queue()
+        output_queue = asyncio.Queue()
+        batcher = DynamicBatcher(
+            max_batch_size=4,
+            max_batch_latency_ms=50,
+            input_queue=input_queue,
+            output_queue=output_queue,
+        )
+        await batcher.start()
+        await asyncio.sleep(0)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await batcher.stop()
+        # The pending get is cancelled; no polling interval to wait out
+        assert loop.time() - started < 0.05
+        assert batcher._task is None
+        assert output_queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_expired_requests_never_join_a_batch(self):
+        loop = asyncio.get_running_loop()
+        input_queue = asyncio.Queue()
+        output_queue = asyncio.Queue()
+        stats = DropStats()
+        batcher = DynamicBatcher(
+            max_batch_size=2,
+            max_batch_latency_ms=10000,
+            input_queue=input_queue,
+            output_queue=output_queue,
+            drop_stats=stats,
+        )
+        expired = QueuedRequest(
+            request=InferenceRequest(prompt="late"),
+            future=loop.create_future(),
+            request_id="late",
+            deadline=loop.time() - 0.01,
+        )
+        live = [
+            QueuedRequest(
+                request=InferenceRequest(prompt=f"test {i}"),
+                future=loop.create_future(),
+                request_id=f"req{i}",
+                deadline=loop.time() + 10.0 if i else None,
+            )
+            for i in range(2)
+        ]
+        for queued in [live[0], expired, live[1]]:
+            await input_queue.put(queued)
+
+        await batcher.start()
+        try:
+            batch = await asyncio.wait_for(output_queue.get(), timeout=1.0)
+        finally:
+            await batcher.stop()
+
+        assert [q.request_id for q in batch.requests] == ["req0", "req1"]
+        with pytest.raises(DeadlineExceeded):
+            expired.future.result()
+        assert stats.snapshot()["standard"]["dropped_by_reason"] == {EXPIRED: 1}
+
+    @pytest.mark.asyncio
+    async def test_models_never_share_a_batch(self):
+        loop = asyncio.get_running_loop()
+        input_queue = asyncio.Queue()
+        output_queue = asyncio.Queue()
+        batcher = DynamicBatcher(
+            max_batch_size=2,
+            max_batch_latency_ms=50,
+            input_queue=input_queue,
+            output_queue=output_queue,
+        )
+        for i, model in enumerate(["a", "b", "a", None]):
+            await input_queue.put(QueuedRequest(
+                request=InferenceRequest(prompt=f"test {i}", model=model),
+                future=loop.create_future(),
+                request_id=f"req{i}",
+            ))
+
+        await batcher.start()
+        try:
+            batches = [await asyncio.wait_for(output_queue.get(), timeout=1.0) for _ in range(3)]
+        finally:
+            await batcher.stop()
+
+        # "a" fills up first; the others go out when their window closes
+        assert [(b.model, [q.request_id for q in b.requests]) for b in batches] == [
+            ("a", ["req0", "req2"]),
+            ("b", ["req1"]),
+            (None, ["req3"]),
+        ]
+
 
 class TestBatch:
     def test_batch_size(self):
@@ -0,0 +1,206 @@
+import pytest
+import asyncio
+import sys
+import os
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from starlette.requests import Request
+
+from server.app.core.batcher import Batch, DynamicBatcher
+from server.app.core.cancellation import BATCHED, QUEUED, RUNNING, CancelStats
+from server.app.core.continuous import ContinuousBatchingWorker
+from server.app.core.queue import QueuedRequest
+from server.app.core.worker import GPUWorker
+from server.app.models.loader import ModelLoader
+from server.app.models.mock import MockModel
+from server.app.schemas.inference import InferenceRequest
+from shared.disconnect import ClientDisconnected, cancel_on_disconnect
+
+
+def make_http_request(disconnected: asyncio.Event) -> Request:
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    return Request({"type": "http", "method": "POST", "headers": []}, receive)
+
+
+def make_loader(token_delay_ms: float = 1.0) -> ModelLoader:
+    loader = ModelLoader(gpu_id=0)
+    loader.model = MockModel(gpu_id=0, token_delay_ms=token_delay_ms)
+    return loader
+
+
+def make_batch(max_tokens: List[int], stream: bool = False) -> Batch:
+    loop = asyncio.get_running_loop()
+    requests = [
+        QueuedRequest(
+            # 8-character prompts: 2 tokens
+            request=InferenceRequest(prompt=f"prompt{i:02d}", max_tokens=tokens),
+            future=loop.create_future(),
+            request_id=f"req{i}",
+            token_sink=asyncio.Queue() if stream else None,
+        )
+        for i, tokens in enumerate(max_tokens)
+    ]
+    return Batch(requests=requests, created_at=0.0)
+
+
+class CountingLoader(ModelLoader):
+    def __init__(self) -> None:
+        super().__init__(gpu_id=0)
+        self.device = "cpu"
+        self.runs = 0
+
+    def run_batch(self, prepared):
+        self.runs += 1
+        return ["done"] * len(prepared.prompts)
+
+
+class TestCancelOnDisconnect:
+    @pytest.mark.asyncio
+    async def test_returns_result_while_connected(self):
+        async def work() -> str:
+            return "result"
+
+        assert await cancel_on_disconnect(make_http_request(asyncio.Event()), work()) == "result"
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_work(self):
+        disconnected = asyncio.Event()
+        future = asyncio.get_running_loop().create_future()
+
+        async def work() -> str:
+            return await future
+
+        waiting = asyncio.create_task(cancel_on_disconnect(make_http_request(disconnected), work()))
+        await asyncio.sleep(0.01)
+        disconnected.set()
+        with pytest.raises(ClientDisconnected):
+            await asyncio.wait_for(waiting, timeout=1.0)
+        assert future.cancelled()
+
+
+class TestBatcherSkipsCancelled:
+    @pytest.mark.asyncio
+    async def test_cancelled_requests_never_batched(self):
+        stats = CancelStats()
+        batcher = DynamicBatcher(
+            max_batch_size=3,
+            max_batch_latency_ms=50,
+            input_queue=asyncio.Queue(),
+            output_queue=asyncio.Queue(),
+            cancel_stats=stats,
+        )
+        batch = make_batch([10, 10, 10, 10])
+        requests = batch.requests
+        requests[1].future.cancel()
+        for queued in requests[:3]:
+            await batcher._input_queue.put(queued)
+        await batcher.start()
+        try:
+            await asyncio.sleep(0.01)
+            # Cancelled while waiting in the open batch
+            requests[2].future.cancel()
+            await batcher._input_queue.put(requests[3])
+            flushed = await asyncio.wait_for(batcher._output_queue.get(), timeout=1.0)
+        finally:
+            await batcher.stop()
+
+        assert [q.request_id for q in flushed.requests] == ["req0", "req3"]
+        assert flushed.cost == 24
+        snapshot = stats.snapshot()
+        assert snapshot["cancelled_by_stage"][QUEUED] == 2
+        assert snapshot["tokens_saved"] == 24
+
+
+class TestWorkerSkipsCancelled:
+    @pytest.mark.asyncio
+    async def test_fully_cancelled_batch_never_runs(self):
+        stats = CancelStats()
+        loader = CountingLoader()
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader, cancel_stats=stats)
+        batch = make_batch([10, 10])
+        await worker.start()
+        try:
+            worker.submit(batch)
+            await asyncio.sleep(0)
+            for queued in batch.requests:
+                queued.future.cancel()
+            await asyncio.sleep(0.05)
+        finally:
+            await worker.stop()
+
+        assert loader.runs == 0
+        assert stats.snapshot()["cancelled_by_stage"][BATCHED] == 2
+        assert worker.in_flight_batches == 0
+        assert worker.stats()["models"]["resident"]["default"]["in_use"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_row_leaves_streamed_batch(self):
+        stats = CancelStats()
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=make_loader(), cancel_stats=stats)
+        batch = make_batch([200, 20], stream=True)
+        await worker.start()
+        try:
+            worker.submit(batch)
+            await asyncio.sleep(0.05)
+            batch.requests[0].future.cancel()
+            response = await asyncio.wait_for(batch.requests[1].future, timeout=2.0)
+        finally:
+            await worker.stop()
+
+        assert response.text.startswith("[MOCK (GPU 0)] Generated 20 tokens")
+        snapshot = stats.snapshot()
+        assert snapshot["cancelled_by_stage"][RUNNING] == 1
+        assert 0 < snapshot["tokens_saved"] < 200
+
+    @pytest.mark.asyncio
+    async def test_cancelled_row_leaves_static_batch(self):
+        stats = CancelStats()
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=make_loader(), cancel_stats=stats)
+        batch = make_batch([300, 20, 20])
+        await worker.start()
+        try:
+            worker.submit(batch)
+            await asyncio.sleep(0.05)
+            batch.requests[0].future.cancel()
+            responses = await asyncio.wait_for(
+                asyncio.gather(*(q.future for q in batch.requests[1:])), timeout=2.0
+            )
+            await asyncio.sleep(0.01)
+            assert worker.in_flight_batches == 0
+        finally:
+            await worker.stop()
+
+        assert all(
+            r.text == f"[MOCK (GPU 0)] Generated 20 tokens for: prompt{i:02d}..."
+            for i, r in enumerate(responses, start=1)
+        )
+        snapshot = stats.snapshot()
+        assert snapshot["cancelled_by_stage"][RUNNING] == 1
+        assert 0 < snapshot["tokens_saved"] < 300
+
+    @pytest.mark.asyncio
+    async def test_cancelled_row_leaves_continuous_batch(self):
+        stats = CancelStats()
+        worker = ContinuousBatchingWorker(
+            worker_id=0, gpu_id=0, model_loader=make_loader(), cancel_stats=stats
+        )
+        batch = make_batch([300, 20])
+        await worker.start()
+        try:
+            worker.submit(batch)
+            await asyncio.sleep(0.05)
+            batch.requests[0].future.cancel()
+            await asyncio.wait_for(batch.requests[1].future, timeout=2.0)
+            await asyncio.sleep(0.01)
+            assert worker.running_requests == 0
+        finally:
+            await worker.stop()
+
+        snapshot = stats.snapshot()
+        assert snapshot["cancelled_by_stage"][RUNNING] == 1
+        assert 0 < snapshot["tokens_saved"] < 300
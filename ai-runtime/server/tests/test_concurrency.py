@@ -81,3 +81,148 @@ class TestConcurrency:
         finally:
             await pipeline.shutdown()
             await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_pipeline_reports_worker_occupancy(self):
+        pipeline = InferencePipeline()
+        try:
+            await pipeline.initialize()
+            request = InferenceRequest(prompt="test")
+            await asyncio.wait_for(pipeline.enqueue(request, "req0"), timeout=5.0)
+            await asyncio.sleep(0.01)
+
+            stats = pipeline.stats()
+            assert stats["initialized"] is True
+            assert len(stats["workers"]) == len(pipeline._workers)
+            worker_stats = stats["workers"][0]
+            assert worker_stats["max_in_flight_batches"] == settings.worker_max_in_flight_batches
+            for key in ("execute_busy_ratio", "mean_in_flight_batches", "peak_in_flight_batches"):
+                assert key in worker_stats
+            assert sum(w["completed_batches"] for w in stats["workers"]) == 1
+        finally:
+            await pipeline.shutdown()
+            await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_health_reports_workers_not_ready(self):
+        pipeline = InferencePipeline()
+        try:
+            await pipeline.initialize()
+            workers = len(pipeline._workers)
+            assert pipeline.health() == {"status": "ok", "workers_ready": workers, "workers": workers}
+
+            await pipeline._workers[0].stop()
+            health = pipeline.health()
+            assert health["workers_ready"] == workers - 1
+            assert health["status"] == ("degraded" if workers > 1 else "unavailable")
+        finally:
+            await pipeline.shutdown()
+            await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_repeated_deterministic_requests_computed_once(self, monkeypatch):
+        monkeypatch.setattr(settings, "response_cache_enabled", True)
+        pipeline = InferencePipeline()
+        try:
+            await pipeline.initialize()
+            requests = [InferenceRequest(prompt="probe", temperature=0.0) for _ in range(5)]
+            responses = await asyncio.wait_for(
+                asyncio.gather(
+                    *(pipeline.enqueue(r, f"req{i}") for i, r in enumerate(requests))
+                ),
+                timeout=5.0,
+            )
+            repeat = await pipeline.enqueue(requests[0], "req5")
+
+            assert [r.request_id for r in responses] == [f"req{i}" for i in range(5)]
+            assert repeat.text == responses[0].text
+            cache = pipeline.stats()["response_cache"]
+            assert cache["coalesced"] == 4
+            assert cache["hits"] == 1
+            completed = sum(w["completed_batches"] for w in pipeline.stats()["workers"])
+            assert completed == 1
+        finally:
+            await pipeline.shutdown()
+            await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_full_response(self):
+        pipeline = InferencePipeline()
+        try:
+            await pipeline.initialize()
+            request = InferenceRequest(prompt="stream me")
+            pieces = []
+
+            async def collect():
+                async for piece in pipeline.stream(request, "req0"):
+                    pieces.append(piece)
+
+            await asyncio.wait_for(collect(), timeout=5.0)
+            response = await asyncio.wait_for(pipeline.enqueue(request, "req1"), timeout=5.0)
+
+            assert len(pieces) > 1
+            # Same text as the buffered request, up to the worker that ran it
+            suffix = "Generated 100 tokens for: stream me..."
+            assert "".join(pieces).endswith(suffix)
+            assert response.text.endswith(suffix)
+        finally:
+            await pipeline.shutdown()
+            await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_interactive_request_overtakes_bulk_backlog(self, monkeypatch):
+        monkeypatch.setattr(settings, "mock_token_delay_ms", 2.0)
+        pipeline = InferencePipeline()
+        try:
+            await pipeline.initialize()
+            finished = []
+
+            async def make_request(request_id: str, priority: str) -> None:
+                request = InferenceRequest(prompt=f"test {request_id}", priority=priority)
+                await asyncio.wait_for(pipeline.enqueue(request, request_id), timeout=10.0)
+                finished.append(request_id)
+
+            bulk = [asyncio.create_task(make_request(f"bulk{i}", "bulk")) for i in range(90)]
+            # Let the bulk backlog fill the workers and the batch queue first
+            await asyncio.sleep(0.05)
+            await make_request("interactive", "interactive")
+            await asyncio.gather(*bulk)
+
+            # Only the batches the workers had already taken in (in flight
+            # or in their queues) finish before it
+            held = len(pipeline._workers) * settings.batch_max_size * (
+                settings.worker_max_in_flight_batches + settings.scheduler_max_queued_batches
+            )
+            assert finished.index("interactive") < held
+        finally:
+            await pipeline.shutdown()
+            await asyncio.sleep(0.1)
+
+    @pytest.mark.asyncio
+    async def test_interactive_request_not_coalesced_with_queued_bulk(self, monkeypatch):
+        monkeypatch.setattr(settings, "mock_token_delay_ms", 2.0)
+        monkeypatch.setattr(settings, "response_cache_enabled", True)
+        pipeline = InferencePipeline()
+        try:
+            await pipeline.initialize()
+            finished = []
+
+            async def make_request(request_id: str, priority: str, prompt: str) -> None:
+                request = InferenceRequest(prompt=prompt, priority=priority, temperature=0.0)
+                await asyncio.wait_for(pipeline.enqueue(request, request_id), timeout=10.0)
+                finished.append(request_id)
+
+            load = [
+                asyncio.create_task(make_request(f"load{i}", "bulk", f"load {i}")) for i in range(90)
+            ]
+            probe = asyncio.create_task(make_request("bulk", "bulk", "same prompt"))
+            # Past the batch window, so the bulk request's batch is closed
+            await asyncio.sleep(0.1)
+            await make_request("interactive", "interactive", "same prompt")
+            await asyncio.gather(*load, probe)
+
+            assert finished.index("interactive") < finished.index("bulk")
+            assert pipeline.stats()["response_cache"]["coalesced"] == 0
+        finally:
+            await pipeline.shutdown()
+            await asyncio.sleep(0.1)
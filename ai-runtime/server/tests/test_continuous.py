@@ -0,0 +1,186 @@
+import pytest
+import asyncio
+import sys
+import os
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.batcher import Batch
+from server.app.core.continuous import ContinuousBatchingWorker
+from server.app.core.queue import QueuedRequest
+from server.app.models.loader import ModelLoader
+from server.app.models.mock import MockModel
+from server.app.schemas.inference import InferenceRequest
+
+
+def make_loader(token_delay_ms: float = 1.0) -> ModelLoader:
+    loader = ModelLoader(gpu_id=0)
+    loader.model = MockModel(gpu_id=0, token_delay_ms=token_delay_ms)
+    return loader
+
+
+def make_batch(max_tokens: List[int], prefix: str = "req") -> Batch:
+    loop = asyncio.get_running_loop()
+    requests = [
+        QueuedRequest(
+            request=InferenceRequest(prompt=f"{prefix}{i}", max_tokens=tokens, temperature=0.0),
+            future=loop.create_future(),
+            request_id=f"{prefix}{i}",
+        )
+        for i, tokens in enumerate(max_tokens)
+    ]
+    return Batch(requests=requests, created_at=0.0)
+
+
+class TestContinuousBatchingWorker:
+    @pytest.mark.asyncio
+    async def test_short_request_joins_and_leaves_before_long_one(self):
+        worker = ContinuousBatchingWorker(worker_id=0, gpu_id=0, model_loader=make_loader())
+        long = make_batch([300], prefix="long")
+        short = make_batch([5], prefix="short")
+        worker.submit(long)
+        await worker.start()
+        try:
+            await asyncio.sleep(0.02)
+            worker.submit(short)
+            response = await asyncio.wait_for(short.requests[0].future, timeout=2.0)
+            assert not long.requests[0].future.done()
+            await asyncio.wait_for(long.requests[0].future, timeout=5.0)
+        finally:
+            await worker.stop()
+
+        assert response.text == "[MOCK (GPU 0)] Generated 5"
+        assert worker.stats()["peak_running_requests"] == 2
+        assert worker.stats()["completed_requests"] == 2
+        assert worker.pending_requests == 0
+
+    @pytest.mark.asyncio
+    async def test_running_requests_capped(self):
+        worker = ContinuousBatchingWorker(
+            worker_id=0, gpu_id=0, model_loader=make_loader(), max_running_requests=2
+        )
+        batch = make_batch([50, 100, 50, 100, 50])
+        worker.submit(batch)
+        await worker.start()
+        try:
+            await asyncio.sleep(0.005)
+            assert worker.running_requests == 2
+            assert not worker.available
+            await asyncio.wait_for(
+                asyncio.gather(*(q.future for q in batch.requests)), timeout=5.0
+            )
+        finally:
+            await worker.stop()
+        assert worker.stats()["peak_running_requests"] == 2
+        assert worker.available
+        assert worker.service_time_per_request_s > 0
+
+    @pytest.mark.asyncio
+    async def test_streams_each_step(self):
+        worker = ContinuousBatchingWorker(worker_id=0, gpu_id=0, model_loader=make_loader())
+        batch = make_batch([20])
+        sink: asyncio.Queue = asyncio.Queue()
+        batch.requests[0].token_sink = sink
+        worker.submit(batch)
+        await worker.start()
+        try:
+            response = await asyncio.wait_for(batch.requests[0].future, timeout=2.0)
+        finally:
+            await worker.stop()
+        pieces = []
+        while not sink.empty():
+            pieces.append(sink.get_nowait())
+        assert len(pieces) > 1
+        assert "".join(pieces) == response.text
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request_frees_its_row(self):
+        worker = ContinuousBatchingWorker(
+            worker_id=0, gpu_id=0, model_loader=make_loader(), max_running_requests=1
+        )
+        first, second = make_batch([10_000], prefix="a"), make_batch([5], prefix="b")
+        worker.submit(first)
+        worker.submit(second)
+        await worker.start()
+        try:
+            await asyncio.sleep(0.01)
+            assert worker.running_requests == 1
+            first.requests[0].future.cancel()
+            response = await asyncio.wait_for(second.requests[0].future, timeout=2.0)
+        finally:
+            await worker.stop()
+        assert response.request_id == "b0"
+        assert worker.stats()["completed_requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_model_without_steps_still_served(self):
+        class WholeBatchModel:
+            def generate_batch(self, prompts, max_tokens, temperatures):
+                return [p.upper() for p in prompts]
+
+        loader = ModelLoader(gpu_id=0)
+        loader.model = WholeBatchModel()
+        worker = ContinuousBatchingWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batch = make_batch([5, 5])
+        worker.submit(batch)
+        await worker.start()
+        try:
+            responses = await asyncio.wait_for(
+                asyncio.gather(*(q.future for q in batch.requests)), timeout=2.0
+            )
+        finally:
+            await worker.stop()
+        assert [r.text for r in responses] == ["REQ0", "REQ1"]
+
+    @pytest.mark.asyncio
+    async def test_failed_step_fails_its_rows_and_worker_keeps_serving(self):
+        class FlakyLoader(ModelLoader):
+            failures = 1
+
+            def step_rows(self, rows):
+                if self.failures:
+                    self.failures -= 1
+                    raise RuntimeError("device lost")
+                return super().step_rows(rows)
+
+        loader = FlakyLoader(gpu_id=0)
+        loader.model = MockModel(gpu_id=0, token_delay_ms=1.0)
+        worker = ContinuousBatchingWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        first = make_batch([10, 10])
+        worker.submit(first)
+        await worker.start()
+        try:
+            for queued in first.requests:
+                with pytest.raises(RuntimeError, match="device lost"):
+                    await asyncio.wait_for(queued.future, timeout=2.0)
+            second = make_batch([5], prefix="b")
+            worker.submit(second)
+            response = await asyncio.wait_for(second.requests[0].future, timeout=2.0)
+        finally:
+            await worker.stop()
+        assert response.text == "[MOCK (GPU 0)] Generated 5"
+        assert worker.running_requests == 0
+        assert worker.pending_requests == 0
+
+    @pytest.mark.asyncio
+    async def test_steps_reported_to_batch_observer(self):
+        observed: List[tuple] = []
+        worker = ContinuousBatchingWorker(
+            worker_id=0,
+            gpu_id=0,
+            model_loader=make_loader(),
+            on_batch_executed=lambda size, service_s: observed.append((size, service_s)),
+        )
+        batch = make_batch([3, 6])
+        worker.submit(batch)
+        await worker.start()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.future for q in batch.requests)), timeout=2.0)
+        finally:
+            await worker.stop()
+        # One sample per step, sized by the rows it advanced
+        assert len(observed) == worker.stats()["decode_steps"]
+        assert observed[0][0] == 2
+        assert observed[-1][0] == 1
+        assert all(service_s > 0 for _, service_s in observed)
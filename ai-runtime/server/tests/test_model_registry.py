@@ -0,0 +1,201 @@
+import pytest
+import asyncio
+import sys
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.batcher import Batch
+from server.app.core.continuous import ContinuousBatchingWorker
+from server.app.core.queue import QueuedRequest
+from server.app.core.worker import GPUWorker
+from server.app.models.loader import ModelLoader
+from server.app.models.registry import ModelRegistry
+from server.app.schemas.inference import InferenceRequest
+
+
+class SizedLoader(ModelLoader):
+    # Loads instantly (or after load_delay_s) and reports a fixed size per model
+    sizes: Dict[Optional[str], int] = {}
+    load_delay_s = 0.0
+    fail_models: tuple = ()
+    loads: List[Optional[str]] = []
+
+    def __init__(self, gpu_id: Optional[int] = None, model_name: Optional[str] = None) -> None:
+        super().__init__(gpu_id=gpu_id, model_name=model_name)
+        self.unloaded = False
+
+    def load(self) -> None:
+        if self.model_name in self.fail_models:
+            raise FileNotFoundError(f"Unknown model {self.model_name}")
+        time.sleep(self.load_delay_s)
+        type(self).loads.append(self.model_name)
+        self.device = "cpu"
+
+    def estimate_bytes(self) -> int:
+        return self.sizes.get(self.model_name, 100)
+
+    def memory_bytes(self) -> int:
+        return self.sizes.get(self.model_name, 100)
+
+    def unload(self) -> None:
+        self.unloaded = True
+
+    def generate(self, prompt: str, max_tokens: int = 100, temperature: float = 0.7) -> str:
+        return f"{self.model_name or 'default'}:{prompt}"
+
+
+def make_factory(**attrs):
+    attrs.setdefault("loads", [])
+    return type("Loader", (SizedLoader,), attrs)
+
+
+def make_batch(prompts: List[str], model: Optional[str] = None) -> Batch:
+    loop = asyncio.get_running_loop()
+    requests = [
+        QueuedRequest(
+            request=InferenceRequest(prompt=prompt, model=model, max_tokens=4),
+            future=loop.create_future(),
+            request_id=f"req{i}",
+        )
+        for i, prompt in enumerate(prompts)
+    ]
+    return Batch(requests=requests, created_at=0.0, model=model)
+
+
+class TestModelRegistry:
+    def test_model_loaded_once_on_demand(self):
+        factory = make_factory()
+        registry = ModelRegistry(loader_factory=factory)
+        first = registry.acquire("a")
+        registry.release("a")
+        second = registry.acquire("a")
+        registry.release("a")
+        assert first is second
+        assert factory.loads == ["a"]
+        stats = registry.stats()
+        assert stats["loads"] == 1
+        assert stats["cold_starts"] == 1
+        assert stats["warm_acquires"] == 1
+        assert set(stats["resident"]) == {"a"}
+
+    def test_default_model_name_maps_to_default(self):
+        factory = make_factory()
+        registry = ModelRegistry(default_model="base", loader_factory=factory)
+        registry.preload()
+        assert registry.acquire("base") is registry.acquire(None)
+        assert factory.loads == [None]
+        assert registry.stats()["cold_starts"] == 0
+
+    def test_least_recently_used_model_evicted_over_budget(self):
+        factory = make_factory()
+        registry = ModelRegistry(max_bytes=250, loader_factory=factory)
+        loaders = {}
+        for model in ("a", "b", "a"):
+            loaders[model] = registry.acquire(model)
+            registry.release(model)
+        registry.acquire("c")
+        registry.release("c")
+
+        assert not registry.is_resident("b")
+        assert loaders["b"].unloaded
+        assert registry.is_resident("a") and registry.is_resident("c")
+        assert registry.resident_bytes == 200
+        assert registry.stats()["evictions"] == 1
+
+    def test_model_in_use_not_evicted(self):
+        factory = make_factory()
+        registry = ModelRegistry(max_bytes=150, loader_factory=factory)
+        registry.acquire("a")
+        registry.acquire("b")
+        assert registry.is_resident("a")
+        stats = registry.stats()
+        assert stats["evictions"] == 0
+        assert stats["over_budget_loads"] == 1
+
+        registry.release("a")
+        registry.release("b")
+        registry.acquire("c")
+        assert not registry.is_resident("a")
+
+    def test_concurrent_acquires_share_one_load(self):
+        factory = make_factory(load_delay_s=0.05)
+        registry = ModelRegistry(loader_factory=factory)
+        loaders = []
+        threads = [
+            threading.Thread(target=lambda: loaders.append(registry.acquire("a")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert factory.loads == ["a"]
+        assert len({id(loader) for loader in loaders}) == 1
+        stats = registry.stats()
+        assert stats["cold_starts"] == 4
+        assert stats["mean_cold_start_ms"] >= 40
+        assert stats["resident"]["a"]["in_use"] == 4
+
+    def test_failed_load_raises_and_is_counted(self):
+        factory = make_factory(fail_models=("missing",))
+        registry = ModelRegistry(loader_factory=factory)
+        with pytest.raises(FileNotFoundError):
+            registry.acquire("missing")
+        assert not registry.is_resident("missing")
+        assert registry.stats()["load_failures"] == 1
+
+
+class TestWorkerModels:
+    @pytest.mark.asyncio
+    async def test_batches_run_on_their_model(self):
+        registry = ModelRegistry(loader_factory=make_factory())
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_registry=registry)
+        first, second = make_batch(["x", "y"], model="a"), make_batch(["z"], model="b")
+
+        await worker._process_batch(first)
+        await worker._process_batch(second)
+
+        assert [q.future.result().text for q in first.requests] == ["a:x", "a:y"]
+        assert second.requests[0].future.result().text == "b:z"
+        models = worker.stats()["models"]
+        assert set(models["resident"]) == {"a", "b"}
+        assert all(model["in_use"] == 0 for model in models["resident"].values())
+
+    @pytest.mark.asyncio
+    async def test_unknown_model_fails_only_its_batch(self):
+        registry = ModelRegistry(loader_factory=make_factory(fail_models=("missing",)))
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_registry=registry)
+        bad, good = make_batch(["x"], model="missing"), make_batch(["y"], model="a")
+
+        await worker._process_batch(bad)
+        await worker._process_batch(good)
+
+        with pytest.raises(FileNotFoundError):
+            bad.requests[0].future.result()
+        assert good.requests[0].future.result().text == "a:y"
+
+    @pytest.mark.asyncio
+    async def test_continuous_worker_steps_each_model(self, monkeypatch):
+        from server.app.core.config import settings
+
+        monkeypatch.setattr(settings, "use_mock_model", True)
+        registry = ModelRegistry(gpu_id=0)
+        worker = ContinuousBatchingWorker(worker_id=0, gpu_id=0, model_registry=registry)
+        batches = [make_batch(["p"], model="alpha"), make_batch(["q"], model="beta")]
+        await worker.start()
+        try:
+            for batch in batches:
+                worker.submit(batch)
+            responses = await asyncio.wait_for(
+                asyncio.gather(*(b.requests[0].future for b in batches)), timeout=5.0
+            )
+        finally:
+            await worker.stop()
+        assert responses[0].text.startswith("[MOCK alpha (GPU 0)]")
+        assert responses[1].text.startswith("[MOCK beta (GPU 0)]")
+        resident = worker.stats()["models"]["resident"]
+        assert resident["alpha"]["in_use"] == resident["beta"]["in_use"] == 0
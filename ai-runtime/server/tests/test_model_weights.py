@@ -0,0 +1,174 @@
+import pytest
+import importlib.util
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+torch = pytest.importorskip("torch")
+
+from server.app.core.config import settings
+from server.app.models.loader import ModelLoader
+from server.app.models.weights import (
+    load_weights,
+    memory_usage,
+    register_architecture,
+    resolve_model_dir,
+)
+
+# The repository's SimpleMLP lives in the top-level server package, which this
+# tree's own server package shadows; import it under another name
+SIMPLE_MODELS_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "server", "models"
+)
+SIMPLE_MODELS_PACKAGE = "tensornext_simple_models"
+
+
+def import_simple_models():
+    if SIMPLE_MODELS_PACKAGE not in sys.modules:
+        if not os.path.isdir(SIMPLE_MODELS_DIR):
+            pytest.skip("SimpleMLP sources not available")
+        spec = importlib.util.spec_from_file_location(
+            SIMPLE_MODELS_PACKAGE,
+            os.path.join(SIMPLE_MODELS_DIR, "__init__.py"),
+            submodule_search_locations=[SIMPLE_MODELS_DIR],
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[SIMPLE_MODELS_PACKAGE] = module
+        spec.loader.exec_module(module)
+    return sys.modules[SIMPLE_MODELS_PACKAGE]
+
+
+def write_model_dir(model_dir, model, architecture):
+    model_dir.mkdir()
+    torch.save(model.state_dict(), model_dir / "model.pt")
+    (model_dir / "config.json").write_text(json.dumps({
+        "architecture": architecture,
+        "config": {"input_dim": 16, "hidden_dim": 32, "output_dim": 8},
+    }))
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    # A SimpleMLP saved the way a model directory is laid out
+    models = import_simple_models()
+    register_architecture("simple-mlp", models.SimpleMLP)
+    model = models.SimpleMLP(input_dim=16, hidden_dim=32, output_dim=8)
+    write_model_dir(tmp_path / "simple-mlp", model, "simple-mlp")
+    return model, tmp_path / "simple-mlp"
+
+
+@pytest.fixture
+def generative_checkpoint(tmp_path):
+    # A SimpleMLP that also generates text, as the server requires
+    models = import_simple_models()
+
+    class GenerativeMLP(models.SimpleMLP):
+        def generate(self, prompt, max_tokens=100, temperature=0.7):
+            return f"mlp: {prompt}"
+
+    register_architecture("generative-mlp", GenerativeMLP)
+    model = GenerativeMLP(input_dim=16, hidden_dim=32, output_dim=8)
+    write_model_dir(tmp_path / "generative-mlp", model, "generative-mlp")
+    return model, tmp_path / "generative-mlp"
+
+
+@pytest.fixture
+def model_settings():
+    saved = (
+        settings.use_mock_model, settings.model_path, settings.model_name, settings.model_architectures
+    )
+    object.__setattr__(settings, "use_mock_model", False)
+    yield settings
+    object.__setattr__(settings, "use_mock_model", saved[0])
+    object.__setattr__(settings, "model_path", saved[1])
+    object.__setattr__(settings, "model_name", saved[2])
+    object.__setattr__(settings, "model_architectures", saved[3])
+
+
+class TestLoadWeights:
+    def test_loads_simple_mlp_with_mapped_weights(self, checkpoint):
+        original, model_dir = checkpoint
+        loaded = load_weights(str(model_dir))
+        assert type(loaded.model).__name__ == "SimpleMLP"
+        assert not loaded.model.training
+        assert loaded.weights_file == str(model_dir / "model.pt")
+        assert loaded.weights_bytes == os.path.getsize(model_dir / "model.pt")
+        assert loaded.load_time_s > 0
+
+        for name, param in loaded.model.state_dict().items():
+            assert torch.equal(param, original.state_dict()[name])
+        # The parameters are backed by a mapping of the checkpoint file
+        # rather than a private copy
+        if os.path.exists("/proc/self/maps"):
+            with open("/proc/self/maps") as f:
+                assert os.path.realpath(loaded.weights_file) in f.read()
+        x = torch.randn(4, 16)
+        with torch.no_grad():
+            assert torch.allclose(loaded.model(x), original(x))
+
+    def test_missing_config_rejected(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            load_weights(str(tmp_path))
+
+    def test_unknown_architecture_rejected_without_import(self, tmp_path):
+        # An import path in config.json is not imported unless the operator
+        # allowed it
+        models = import_simple_models()
+        model = models.SimpleMLP(input_dim=16, hidden_dim=32, output_dim=8)
+        write_model_dir(tmp_path / "m", model, "unlisted_module_for_test:Model")
+        with pytest.raises(ValueError, match="Unknown model architecture"):
+            load_weights(str(tmp_path / "m"))
+        assert "unlisted_module_for_test" not in sys.modules
+
+    def test_allowed_import_path_loads(self, tmp_path):
+        models = import_simple_models()
+        model = models.SimpleMLP(input_dim=16, hidden_dim=32, output_dim=8)
+        path = f"{SIMPLE_MODELS_PACKAGE}.simple_model:SimpleMLP"
+        write_model_dir(tmp_path / "m", model, path)
+        with pytest.raises(ValueError):
+            load_weights(str(tmp_path / "m"))
+        loaded = load_weights(str(tmp_path / "m"), allowed_architectures=[path])
+        assert type(loaded.model).__name__ == "SimpleMLP"
+
+    def test_model_name_selects_subdirectory(self, checkpoint):
+        _, model_dir = checkpoint
+        parent = str(model_dir.parent)
+        assert resolve_model_dir(parent, "simple-mlp") == str(model_dir)
+        assert resolve_model_dir(str(model_dir), None) == str(model_dir)
+
+    def test_memory_usage(self):
+        assert memory_usage()["rss_bytes"] > 0
+
+
+class TestModelLoaderWeights:
+    def test_load_from_model_path(self, generative_checkpoint, model_settings):
+        _, model_dir = generative_checkpoint
+        object.__setattr__(settings, "model_path", str(model_dir.parent))
+        object.__setattr__(settings, "model_name", "generative-mlp")
+        loader = ModelLoader(gpu_id=None)
+        loader.load()
+        assert type(loader.model).__name__ == "GenerativeMLP"
+        assert loader.generate("hi") == "mlp: hi"
+        stats = loader.stats()
+        assert stats["weights"]["weights_file"] == str(model_dir / "model.pt")
+        assert stats["weights"]["load_time_ms"] > 0
+        assert stats["memory"]["rss_bytes"] > 0
+
+    def test_non_generative_model_rejected_at_load(self, checkpoint, model_settings):
+        _, model_dir = checkpoint
+        object.__setattr__(settings, "model_path", str(model_dir))
+        object.__setattr__(settings, "model_name", None)
+        loader = ModelLoader(gpu_id=None)
+        with pytest.raises(TypeError, match="does not support text generation"):
+            loader.load()
+        assert loader.model is None
+
+    def test_no_model_path_keeps_placeholder(self, model_settings):
+        object.__setattr__(settings, "model_path", None)
+        loader = ModelLoader(gpu_id=None)
+        loader.load()
+        assert loader.model is None
+        assert loader.stats()["weights"] is None
+        assert loader.generate("hi").startswith("[PLACEHOLDER]")
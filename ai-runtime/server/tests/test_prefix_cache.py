@@ -0,0 +1,143 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.models.loader import ModelLoader
+from server.app.models.mock import MockModel
+from server.app.models.prefix_cache import PrefixCache
+
+SYSTEM_PROMPT = "You are a helpful assistant. Answer briefly and cite sources."
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += 1.0
+        return self.now
+
+
+def make_cache(max_bytes: int = 1 << 20) -> PrefixCache:
+    # One byte of state per token
+    return PrefixCache(
+        max_bytes=max_bytes,
+        split_state=lambda state, n: (state[:n], state[n:]),
+        state_nbytes=len,
+        clock=FakeClock(),
+    )
+
+
+def compute(cache: PrefixCache, tokens: str):
+    # Acquire, "prefill" the uncached tail and insert it, like ModelLoader
+    match = cache.acquire(tokens)
+    cache.insert(tokens, match, tokens[match.length:])
+    return match
+
+
+class TestPrefixCache:
+    def test_shared_prefix_split_into_its_own_node(self):
+        cache = make_cache()
+        first = compute(cache, "SSSSSaaa")
+        cache.release(first)
+        second = compute(cache, "SSSSSbbb")
+        cache.release(second)
+        assert second.length == 5
+        assert second.states == ["SSSSS"]
+
+        third = cache.acquire("SSSSSaaaX")
+        assert third.length == 8
+        assert "".join(third.states) == "SSSSSaaa"
+        stats = cache.stats()
+        assert stats["nodes"] == 3
+        assert stats["size_bytes"] == 11
+        assert (stats["lookups"], stats["hits"], stats["saved_tokens"]) == (3, 2, 13)
+
+    def test_last_token_always_computed(self):
+        cache = make_cache()
+        cache.release(compute(cache, "abcd"))
+        match = cache.acquire("abcd")
+        assert match.length == 3
+
+    def test_least_recently_used_leaf_evicted(self):
+        cache = make_cache(max_bytes=8)
+        for tokens in ("aaaa", "bbbb"):
+            cache.release(compute(cache, tokens))
+        cache.release(cache.acquire("aaaaX"))
+        cache.release(compute(cache, "cccc"))
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.acquire("bbbbX").length == 0
+        assert cache.acquire("aaaaX").length == 4
+        assert cache.size_bytes == 8
+
+    def test_pinned_prefix_not_evicted(self):
+        cache = make_cache(max_bytes=8)
+        pinned = compute(cache, "aaaa")
+        cache.release(compute(cache, "bbbb"))
+        cache.release(compute(cache, "cccc"))
+        # "bbbb" was the only unpinned leaf; "aaaa" is still in use
+        assert cache.acquire("bbbbX").length == 0
+        assert cache.acquire("aaaaX").length == 4
+
+        cache.release(pinned)
+        blocked = compute(cache, "dddddddd")
+        # Everything else is pinned by the lookups above, so nothing fits
+        assert cache.acquire("ddddddddX").length == 0
+        cache.release(blocked)
+
+    def test_state_larger_than_budget_not_cached(self):
+        cache = make_cache(max_bytes=4)
+        cache.release(compute(cache, "abcdefgh"))
+        assert cache.size_bytes == 0
+
+
+class TestLoaderPrefixReuse:
+    def make_loader(self, max_bytes: int = 1 << 20) -> ModelLoader:
+        loader = ModelLoader(gpu_id=0)
+        loader.model = MockModel(gpu_id=0)
+        assert loader.enable_prefix_cache(max_bytes)
+        return loader
+
+    def test_shared_system_prompt_computed_once(self):
+        loader = self.make_loader()
+        questions = ["What is radix?", "Why cache prefixes?", "How big is a KV cache?"]
+        prompts = [f"{SYSTEM_PROMPT} {q}" for q in questions]
+        system_tokens = len(loader.model.tokenize(SYSTEM_PROMPT))
+
+        texts = loader.generate_batch(prompts[:1], [40], [0.0])
+        texts += loader.generate_batch(prompts[1:], [40, 40], [0.0, 0.0])
+
+        assert texts == [loader.model.text(p, 40) for p in prompts]
+        total = sum(len(loader.model.tokenize(p)) for p in prompts)
+        # The system prompt is computed by the first request only
+        assert loader.model.computed_tokens == total - 2 * system_tokens
+        stats = loader.stats()["prefix_cache"]
+        assert stats["saved_tokens"] == 2 * system_tokens
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_rows_pin_prefix_until_finished(self):
+        loader = self.make_loader(max_bytes=12 * 1024)
+        rows = loader.start_rows([f"{SYSTEM_PROMPT} first"], [3], [0.0])
+        assert rows[0].prefix is not None
+        # Does not fit next to the pinned prompt: nothing is evicted
+        loader.generate_batch(["one two three four five six seven eight"], [1], [0.0])
+        assert loader.prefix_cache.stats()["evictions"] == 0
+
+        while not rows[0].finished:
+            loader.step_rows(rows)
+        assert rows[0].prefix is None
+        loader.generate_batch(["one two three four five six seven eight"], [1], [0.0])
+        assert loader.prefix_cache.stats()["evictions"] == 1
+
+    def test_model_without_prefix_support(self):
+        class WholeBatchModel:
+            def generate_batch(self, prompts, max_tokens, temperatures):
+                return prompts
+
+        loader = ModelLoader(gpu_id=0)
+        loader.model = WholeBatchModel()
+        assert not loader.enable_prefix_cache(1 << 20)
+        assert loader.stats()["prefix_cache"] is None
@@ -0,0 +1,228 @@
+import pytest
+import asyncio
+import sys
+import os
+import signal
+import threading
+from typing import List, Union
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.batcher import Batch
+from server.app.core.cancellation import RUNNING, CancelStats
+from server.app.core.config import settings
+from server.app.core import process_worker
+from server.app.core.process_worker import ProcessWorker, WorkerProcessCrashed, physical_cpu_count
+from server.app.core.queue import QueuedRequest
+from server.app.schemas.inference import InferenceRequest
+
+
+def make_batch(
+    prompts: List[str], max_tokens: Union[int, List[int]] = 20, stream: bool = False
+) -> Batch:
+    loop = asyncio.get_running_loop()
+    if isinstance(max_tokens, int):
+        max_tokens = [max_tokens] * len(prompts)
+    requests = [
+        QueuedRequest(
+            request=InferenceRequest(prompt=prompt, max_tokens=tokens),
+            future=loop.create_future(),
+            request_id=f"req{i}",
+            token_sink=asyncio.Queue() if stream else None,
+        )
+        for i, (prompt, tokens) in enumerate(zip(prompts, max_tokens))
+    ]
+    return Batch(requests=requests, created_at=0.0)
+
+
+@pytest.fixture
+def mock_settings():
+    saved = (settings.use_mock_model, settings.mock_token_delay_ms)
+    object.__setattr__(settings, "use_mock_model", True)
+    yield settings
+    object.__setattr__(settings, "use_mock_model", saved[0])
+    object.__setattr__(settings, "mock_token_delay_ms", saved[1])
+
+
+class TestProcessWorker:
+    @pytest.mark.asyncio
+    async def test_batch_runs_in_child_process(self, mock_settings):
+        worker = ProcessWorker(worker_id=0)
+        await worker.start()
+        try:
+            assert worker.pid is not None and worker.pid != os.getpid()
+            batch = make_batch(["hello", "world"])
+            worker.submit(batch)
+            responses = await asyncio.wait_for(
+                asyncio.gather(*(queued.future for queued in batch.requests)), timeout=10.0
+            )
+            assert [r.request_id for r in responses] == ["req0", "req1"]
+            assert responses[0].text.startswith("[MOCK] Generated 20 tokens for: hello")
+            stats = worker.stats()
+            assert stats["process"]["alive"]
+            assert stats["models"]["resident"]["default"]["device"] == "mock"
+        finally:
+            await worker.stop()
+        assert worker.pid is None
+
+    @pytest.mark.asyncio
+    async def test_streamed_pieces_reach_sinks(self, mock_settings):
+        worker = ProcessWorker(worker_id=0)
+        await worker.start()
+        try:
+            batch = make_batch(["stream me"], stream=True)
+            worker.submit(batch)
+            queued = batch.requests[0]
+            response = await asyncio.wait_for(queued.future, timeout=10.0)
+            await asyncio.sleep(0)
+            pieces = []
+            while not queued.token_sink.empty():
+                pieces.append(queued.token_sink.get_nowait())
+            assert len(pieces) > 1
+            assert "".join(pieces) == response.text
+        finally:
+            await worker.stop()
+
+    @pytest.mark.asyncio
+    async def test_dead_process_restarted_before_next_batch(self, mock_settings):
+        worker = ProcessWorker(worker_id=0)
+        await worker.start()
+        try:
+            first_pid = worker.pid
+            os.kill(first_pid, signal.SIGKILL)
+            await asyncio.sleep(0.2)
+            batch = make_batch(["after crash"])
+            worker.submit(batch)
+            response = await asyncio.wait_for(batch.requests[0].future, timeout=10.0)
+            assert "after crash" in response.text
+            assert worker.restarts == 1
+            assert worker.pid != first_pid
+        finally:
+            await worker.stop()
+
+    @pytest.mark.asyncio
+    async def test_dead_process_restarted_without_waiting_for_a_batch(self, mock_settings):
+        worker = ProcessWorker(worker_id=0)
+        await worker.start()
+        try:
+            assert worker.ready and worker.stats()["ready"]
+            first_pid = worker.pid
+            os.kill(first_pid, signal.SIGKILL)
+            async with asyncio.timeout(10.0):
+                while worker.ready:
+                    await asyncio.sleep(0.01)
+                assert not worker.stats()["ready"]
+                # Back without any batch being submitted
+                while not worker.ready:
+                    await asyncio.sleep(0.01)
+            assert worker.restarts == 1
+            assert worker.pid != first_pid
+        finally:
+            await worker.stop()
+        assert not worker.ready
+
+    @pytest.mark.asyncio
+    async def test_cancelled_row_stops_in_child(self, mock_settings):
+        object.__setattr__(settings, "mock_token_delay_ms", 5.0)
+        stats = CancelStats()
+        worker = ProcessWorker(worker_id=0, cancel_stats=stats)
+        await worker.start()
+        try:
+            batch = make_batch(["long", "short"], max_tokens=[400, 20])
+            worker.submit(batch)
+            while worker.in_flight_batches == 0:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.2)
+            batch.requests[0].future.cancel()
+            response = await asyncio.wait_for(batch.requests[1].future, timeout=10.0)
+            assert response.text.startswith("[MOCK] Generated 20 tokens for: short")
+            # The batch ends long before the cancelled row's 2 s of decoding
+            async with asyncio.timeout(1.0):
+                while worker.in_flight_batches:
+                    await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+
+        snapshot = stats.snapshot()
+        assert snapshot["cancelled_by_stage"][RUNNING] == 1
+        assert 0 < snapshot["tokens_saved"] < 400
+
+    @pytest.mark.asyncio
+    async def test_crash_mid_batch_fails_only_that_batch(self, mock_settings):
+        object.__setattr__(settings, "mock_token_delay_ms", 50.0)
+        worker = ProcessWorker(worker_id=0, max_in_flight_batches=1)
+        await worker.start()
+        try:
+            slow = make_batch(["slow"], max_tokens=100)
+            worker.submit(slow)
+            while worker.in_flight_batches == 0:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.2)
+            os.kill(worker.pid, signal.SIGKILL)
+            with pytest.raises(WorkerProcessCrashed):
+                await asyncio.wait_for(slow.requests[0].future, timeout=10.0)
+
+            object.__setattr__(settings, "mock_token_delay_ms", 0.0)
+            quick = make_batch(["quick"], max_tokens=2)
+            worker.submit(quick)
+            response = await asyncio.wait_for(quick.requests[0].future, timeout=10.0)
+            assert response.text
+            assert worker.stats()["process"]["restarts"] == 1
+        finally:
+            await worker.stop()
+
+    def test_physical_cpu_count(self):
+        assert 1 <= physical_cpu_count() <= (os.cpu_count() or 1)
+
+    def test_stop_does_not_block_cancels_while_joining(self, mock_settings):
+        # A child slow to exit holds up stop(), but not a cancel sent from
+        # the event loop meanwhile
+        class SlowProcess:
+            pid = 1
+
+            def __init__(self) -> None:
+                self.joining = threading.Event()
+                self.exit = threading.Event()
+
+            def join(self, timeout=None) -> None:
+                self.joining.set()
+                self.exit.wait(timeout)
+
+            def is_alive(self) -> bool:
+                return False
+
+        worker = ProcessWorker(worker_id=0)
+        process = SlowProcess()
+        worker._process = process
+        worker._conn, child_conn = worker._context.Pipe()
+        stopper = threading.Thread(target=worker._stop_process)
+        stopper.start()
+        try:
+            assert process.joining.wait(5.0)
+            cancel = threading.Thread(target=worker._send_cancel, args=(0, 0))
+            cancel.start()
+            cancel.join(1.0)
+            assert not cancel.is_alive()
+        finally:
+            process.exit.set()
+            stopper.join()
+            child_conn.close()
+
+    def test_physical_cpu_count_respects_affinity_and_cgroup_quota(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(process_worker, "_physical_core_count", lambda: 16)
+        monkeypatch.setattr(os, "sched_getaffinity", lambda pid: {0, 1, 2, 3, 4, 5}, raising=False)
+        monkeypatch.setattr(process_worker, "CGROUP_ROOT", str(tmp_path))
+        assert physical_cpu_count() == 6
+
+        (tmp_path / "cpu.max").write_text("max 100000\n")
+        assert physical_cpu_count() == 6
+        (tmp_path / "cpu.max").write_text("250000 100000\n")
+        assert physical_cpu_count() == 3
+
+        (tmp_path / "cpu.max").unlink()
+        (tmp_path / "cpu").mkdir()
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("150000\n")
+        (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+        assert physical_cpu_count() == 2
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+        assert physical_cpu_count() == 6
@@ -5,6 +5,14 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
+from server.app.core.deadlines import (
+    DEADLINE_EXCEEDED,
+    EXPIRED,
+    QUEUE_FULL,
+    DeadlineExceeded,
+    DropStats,
+    drop_if_late,
+)
 from server.app.core.queue import BoundedRequestQueue, QueuedRequest
 from server.app.schemas.inference import InferenceRequest, InferenceResponse
 
@@ -49,3 +57,69 @@ class TestBoundedRequestQueue:
         queued = await queue.get()
         assert queued.request.prompt == "test"
         assert queued.request_id == "req0"
+
+
+class TestPriorityAndDeadlines:
+    @pytest.mark.asyncio
+    async def test_served_by_priority_then_deadline_then_arrival(self):
+        queue = BoundedRequestQueue(maxsize=10)
+        await queue.put(InferenceRequest(prompt="b", priority="bulk"), "bulk")
+        await queue.put(InferenceRequest(prompt="s1"), "standard1")
+        await queue.put(InferenceRequest(prompt="s2", deadline_ms=5000), "standard-late")
+        await queue.put(InferenceRequest(prompt="s3", deadline_ms=100), "standard-soon")
+        await queue.put(InferenceRequest(prompt="s4"), "standard2")
+        await queue.put(InferenceRequest(prompt="i", priority="interactive"), "interactive")
+
+        order = [(await queue.get()).request_id for _ in range(6)]
+        assert order == [
+            "interactive",
+            "standard-soon",
+            "standard-late",
+            "standard1",
+            "standard2",
+            "bulk",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_deadline_set_from_arrival(self):
+        queue = BoundedRequestQueue(maxsize=10)
+        await queue.put(InferenceRequest(prompt="a", deadline_ms=250), "req0")
+        queued = await queue.get()
+        assert queued.deadline == pytest.approx(queued.enqueued_at + 0.25)
+
+    @pytest.mark.asyncio
+    async def test_queue_full_counted_as_drop(self):
+        stats = DropStats()
+        queue = BoundedRequestQueue(maxsize=1, drop_stats=stats)
+        await queue.put(InferenceRequest(prompt="a", priority="bulk"), "req0")
+        rejected = await queue.put(InferenceRequest(prompt="b", priority="bulk"), "req1")
+        with pytest.raises(RuntimeError):
+            await rejected
+
+        bulk = stats.snapshot()["bulk"]
+        assert bulk["submitted"] == 2
+        assert bulk["dropped_by_reason"] == {QUEUE_FULL: 1}
+        assert bulk["drop_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_drop_if_late(self):
+        loop = asyncio.get_running_loop()
+        stats = DropStats()
+        queued = QueuedRequest(
+            request=InferenceRequest(prompt="a"),
+            future=loop.create_future(),
+            request_id="req0",
+            priority="interactive",
+            deadline=10.0,
+        )
+        assert not drop_if_late(queued, 9.0, stats, remaining_s=0.5)
+        assert drop_if_late(queued, 10.5, stats)
+
+        with pytest.raises(DeadlineExceeded) as excinfo:
+            queued.future.result()
+        assert excinfo.value.code == DEADLINE_EXCEEDED
+        assert excinfo.value.reason == EXPIRED
+        assert excinfo.value.late_by_ms == pytest.approx(500.0)
+        snapshot = stats.snapshot()
+        assert snapshot["interactive"]["dropped_by_reason"] == {EXPIRED: 1}
+        assert snapshot["standard"]["drop_rate"] == 0.0
@@ -0,0 +1,173 @@
+import pytest
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.response_cache import ResponseCache, request_key
+from server.app.schemas.inference import InferenceRequest, InferenceResponse
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def response(text: str, request_id: str = "req0") -> InferenceResponse:
+    return InferenceResponse(text=text, request_id=request_id)
+
+
+class TestRequestKey:
+    def test_only_deterministic_requests_have_keys(self):
+        assert request_key(InferenceRequest(prompt="a", temperature=0.0)) is not None
+        assert request_key(InferenceRequest(prompt="a", temperature=0.7)) is None
+        assert request_key(InferenceRequest(prompt="a", temperature=None)) is None
+
+    def test_key_covers_prompt_and_max_tokens(self):
+        base = request_key(InferenceRequest(prompt="a", temperature=0.0))
+        assert base == request_key(InferenceRequest(prompt="a", max_tokens=100, temperature=0.0))
+        assert base != request_key(InferenceRequest(prompt="b", temperature=0.0))
+        assert base != request_key(InferenceRequest(prompt="a", max_tokens=5, temperature=0.0))
+        # Scheduling hints do not change the generated text
+        assert base == request_key(
+            InferenceRequest(prompt="a", temperature=0.0, priority="bulk", deadline_ms=10)
+        )
+
+
+class TestResponseCache:
+    def test_hit_relabels_request_id(self):
+        cache = ResponseCache(max_entries=4, max_bytes=1 << 20, ttl_s=60.0)
+        assert cache.get("k", "req0") is None
+        cache.put("k", response("hello"))
+
+        hit = cache.get("k", "req1")
+        assert hit.text == "hello"
+        assert hit.request_id == "req1"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_least_recently_used_evicted(self):
+        cache = ResponseCache(max_entries=2, max_bytes=1 << 20, ttl_s=60.0)
+        cache.put("a", response("a"))
+        cache.put("b", response("b"))
+        cache.get("a", "req")
+        cache.put("c", response("c"))
+
+        assert cache.get("b", "req") is None
+        assert cache.get("a", "req") is not None
+        assert cache.get("c", "req") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_budget(self):
+        cache = ResponseCache(max_entries=100, max_bytes=1000, ttl_s=60.0)
+        for i in range(10):
+            cache.put(f"k{i}", response("x" * 200))
+        assert cache.size_bytes <= 1000
+        assert 0 < len(cache) < 10
+        # An entry larger than the whole budget is not stored at all
+        cache.put("huge", response("x" * 2000))
+        assert cache.get("huge", "req") is None
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = ResponseCache(max_entries=4, max_bytes=1 << 20, ttl_s=5.0, clock=clock)
+        cache.put("k", response("hello"))
+        clock.now = 4.9
+        assert cache.get("k", "req") is not None
+        clock.now = 5.0
+        assert cache.get("k", "req") is None
+        assert cache.stats()["expirations"] == 1
+        assert cache.size_bytes == 0
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_share_one_computation(self):
+        loop = asyncio.get_running_loop()
+        cache = ResponseCache(max_entries=4, max_bytes=1 << 20, ttl_s=60.0)
+        submitted = []
+
+        async def submit():
+            future = loop.create_future()
+            submitted.append(future)
+            return future
+
+        waiters = [
+            asyncio.ensure_future(cache.compute("k", f"req{i}", submit)) for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert len(submitted) == 1
+        submitted[0].set_result(response("hello", "req0"))
+
+        results = await asyncio.gather(*waiters)
+        assert [r.request_id for r in results] == ["req0", "req1", "req2"]
+        assert {r.text for r in results} == {"hello"}
+        assert cache.stats()["coalesced"] == 2
+        assert cache.stats()["in_flight"] == 0
+        assert cache.get("k", "req3").text == "hello"
+
+    @pytest.mark.asyncio
+    async def test_groups_never_share_a_computation(self):
+        loop = asyncio.get_running_loop()
+        cache = ResponseCache(max_entries=4, max_bytes=1 << 20, ttl_s=60.0)
+        submitted = []
+
+        async def submit():
+            future = loop.create_future()
+            submitted.append(future)
+            return future
+
+        bulk = asyncio.ensure_future(cache.compute("k", "req0", submit, group="bulk"))
+        interactive = asyncio.ensure_future(cache.compute("k", "req1", submit, group="interactive"))
+        await asyncio.sleep(0)
+        assert len(submitted) == 2
+        submitted[1].set_result(response("hello", "req1"))
+
+        assert (await interactive).text == "hello"
+        assert not bulk.done()
+        assert cache.stats()["coalesced"] == 0
+        # Stored under the key alone: any group can hit it
+        assert cache.get("k", "req2").text == "hello"
+        submitted[0].set_result(response("hello", "req0"))
+        await bulk
+
+    @pytest.mark.asyncio
+    async def test_failures_shared_but_not_cached(self):
+        loop = asyncio.get_running_loop()
+        cache = ResponseCache(max_entries=4, max_bytes=1 << 20, ttl_s=60.0)
+        future = loop.create_future()
+
+        async def submit():
+            return future
+
+        waiters = [asyncio.ensure_future(cache.compute("k", f"req{i}", submit)) for i in range(2)]
+        await asyncio.sleep(0)
+        future.set_exception(ValueError("boom"))
+
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_only_when_every_waiter_leaves(self):
+        loop = asyncio.get_running_loop()
+        cache = ResponseCache(max_entries=4, max_bytes=1 << 20, ttl_s=60.0)
+        future = loop.create_future()
+
+        async def submit():
+            return future
+
+        first = asyncio.ensure_future(cache.compute("k", "req0", submit))
+        second = asyncio.ensure_future(cache.compute("k", "req1", submit))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not future.done()
+
+        second.cancel()
+        await asyncio.sleep(0)
+        assert future.cancelled()
@@ -6,7 +6,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from server.app.core.scheduler import Scheduler
-from server.app.core.worker import GPUWorker
+from server.app.core.worker import BatchQueue, GPUWorker
 from server.app.core.batcher import Batch
 from server.app.core.queue import QueuedRequest
 from server.app.schemas.inference import InferenceRequest
@@ -122,3 +122,139 @@ class TestScheduler:
             for worker in workers:
                 await worker.stop()
             await asyncio.sleep(0.2)
+
+    @pytest.mark.asyncio
+    async def test_scheduler_waits_for_queue_room_in_order(self):
+        loader = ModelLoader(gpu_id=0)
+        loader.load()
+        # Not started: nothing drains the worker's queue unless the test does
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batch_queue = asyncio.Queue()
+        scheduler = Scheduler(workers=[worker], batch_queue=batch_queue, max_queued_batches=1)
+        await scheduler.start()
+        try:
+            batches = [make_batch(f"req{i}") for i in range(3)]
+            for batch in batches:
+                await batch_queue.put(batch)
+            await asyncio.sleep(0.05)
+            # One queued at the worker; the rest wait in the batch queue
+            assert worker.queue_depth == 1
+            assert batch_queue.qsize() == 2
+
+            dispatched = []
+            for _ in range(3):
+                await asyncio.wait_for(_wait_for_queued(worker), timeout=1.0)
+                dispatched.append(worker.take_queued())
+            assert dispatched == batches
+        finally:
+            await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_backlog_dispatched_most_urgent_first(self):
+        loader = ModelLoader(gpu_id=0)
+        loader.load()
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batch_queue = BatchQueue()
+        scheduler = Scheduler(workers=[worker], batch_queue=batch_queue, max_queued_batches=1)
+        await scheduler.start()
+        try:
+            bulk = [make_batch(f"bulk{i}", priority="bulk") for i in range(3)]
+            for batch in bulk:
+                await batch_queue.put(batch)
+            await asyncio.sleep(0.05)
+            # Arrives last, while the worker's queue is full
+            interactive = make_batch("interactive", priority="interactive")
+            await batch_queue.put(interactive)
+
+            dispatched = []
+            for _ in range(4):
+                await asyncio.wait_for(_wait_for_queued(worker), timeout=1.0)
+                dispatched.append(worker.take_queued())
+            assert dispatched == [bulk[0], interactive, bulk[1], bulk[2]]
+        finally:
+            await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_selects_lowest_estimated_completion(self):
+        workers = [GPUWorker(worker_id=i, gpu_id=i, model_loader=ModelLoader(gpu_id=i)) for i in range(2)]
+        scheduler = Scheduler(workers=workers, batch_queue=asyncio.Queue(), max_queued_batches=4)
+
+        # Fast worker with a backlog vs. slow idle worker
+        workers[0]._service_time_per_request_s = 0.001
+        workers[0].submit(make_batch("a", size=4))
+        workers[1]._service_time_per_request_s = 0.05
+        assert scheduler._select_worker(make_batch("b", size=2)) is workers[0]
+
+        # Same speed: the idle worker wins
+        workers[1]._service_time_per_request_s = 0.001
+        assert scheduler._select_worker(make_batch("c", size=2)) is workers[1]
+
+    @pytest.mark.asyncio
+    async def test_ties_go_to_fewest_pending_requests(self):
+        workers = [GPUWorker(worker_id=i, gpu_id=i, model_loader=ModelLoader(gpu_id=i)) for i in range(2)]
+        scheduler = Scheduler(workers=workers, batch_queue=asyncio.Queue(), max_queued_batches=4)
+        # No service time measured yet, so every estimate is zero
+        workers[0].submit(make_batch("a", size=3))
+        assert scheduler._select_worker(make_batch("b")) is workers[1]
+
+    @pytest.mark.asyncio
+    async def test_full_queues_are_skipped(self):
+        workers = [GPUWorker(worker_id=i, gpu_id=i, model_loader=ModelLoader(gpu_id=i)) for i in range(2)]
+        scheduler = Scheduler(workers=workers, batch_queue=asyncio.Queue(), max_queued_batches=1)
+        workers[1]._service_time_per_request_s = 1.0
+        workers[0].submit(make_batch("a"))
+        assert scheduler._select_worker(make_batch("b")) is workers[1]
+        workers[1].submit(make_batch("c"))
+        assert scheduler._select_worker(make_batch("d")) is None
+
+    @pytest.mark.asyncio
+    async def test_dispatch_preserves_fifo_start_order(self):
+        started: list[str] = []
+
+        class RecordingWorker(GPUWorker):
+            async def _execute(self, requests, prepared):
+                started.append(requests[0].request_id)
+                await asyncio.sleep(0.01 * (self.worker_id + 1))
+                return ["done"] * len(requests)
+
+        workers = []
+        for i in range(2):
+            loader = ModelLoader(gpu_id=i)
+            loader.load()
+            workers.append(RecordingWorker(worker_id=i, gpu_id=i, model_loader=loader))
+        batch_queue = asyncio.Queue()
+        scheduler = Scheduler(workers=workers, batch_queue=batch_queue, work_stealing=True)
+        for worker in workers:
+            await worker.start()
+        await scheduler.start()
+        try:
+            batches = [make_batch(f"req{i:02d}") for i in range(12)]
+            for batch in batches:
+                await batch_queue.put(batch)
+            await asyncio.wait_for(
+                asyncio.gather(*(b.requests[0].future for b in batches)), timeout=5.0
+            )
+            assert started == [f"req{i:02d}" for i in range(12)]
+            assert all(worker.stats()["completed_batches"] > 0 for worker in workers)
+        finally:
+            await scheduler.stop()
+            for worker in workers:
+                await worker.stop()
+
+
+def make_batch(request_id: str, size: int = 1, priority: str = "standard") -> Batch:
+    requests = [
+        QueuedRequest(
+            request=InferenceRequest(prompt=f"test {i}", priority=priority),
+            future=asyncio.get_running_loop().create_future(),
+            request_id=request_id if i == 0 else f"{request_id}-{i}",
+            priority=priority,
+        )
+        for i in range(size)
+    ]
+    return Batch(requests=requests, created_at=0.0)
+
+
+async def _wait_for_queued(worker: GPUWorker) -> None:
+    while worker.queue_depth == 0:
+        await asyncio.sleep(0.005)
@@ -0,0 +1,447 @@
+import pytest
+import asyncio
+import sys
+import os
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server.app.core.worker import GPUWorker
+from server.app.core.batcher import Batch
+from server.app.core.deadlines import UNMEETABLE, DeadlineExceeded, DropStats
+from server.app.core.queue import QueuedRequest
+from server.app.schemas.inference import InferenceRequest
+from server.app.models.loader import ModelLoader
+from server.app.models.mock import MockModel
+
+
+class RecordingLoader(ModelLoader):
+    def __init__(self, fail_prompts: tuple = ()) -> None:
+        super().__init__(gpu_id=0)
+        self.batch_calls: List[List[str]] = []
+        self.fail_prompts = fail_prompts
+
+    def generate(self, prompt: str, max_tokens: int = 100, temperature: float = 0.7) -> str:
+        if prompt in self.fail_prompts:
+            raise ValueError(f"bad prompt: {prompt}")
+        return f"out:{prompt}:{max_tokens}:{temperature}"
+
+    def generate_batch(self, prompts, max_tokens, temperatures):
+        self.batch_calls.append(list(prompts))
+        return super().generate_batch(prompts, max_tokens, temperatures)
+
+
+class SlowLoader(ModelLoader):
+    def __init__(self, delay_s: float) -> None:
+        super().__init__(gpu_id=0)
+        self.delay_s = delay_s
+        self.prompts: List[str] = []
+
+    def generate_batch(self, prompts, max_tokens, temperatures):
+        self.prompts.extend(prompts)
+        time.sleep(self.delay_s)
+        return [f"out:{prompt}" for prompt in prompts]
+
+
+def make_batch(prompts: List[str]) -> Batch:
+    loop = asyncio.get_running_loop()
+    requests = [
+        QueuedRequest(
+            request=InferenceRequest(prompt=prompt),
+            future=loop.create_future(),
+            request_id=f"req{i}",
+        )
+        for i, prompt in enumerate(prompts)
+    ]
+    return Batch(requests=requests, created_at=0.0)
+
+
+class TestGPUWorker:
+    @pytest.mark.asyncio
+    async def test_batch_runs_single_model_call(self):
+        loader = RecordingLoader()
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batch = make_batch(["a", "b", "c"])
+
+        await worker._process_batch(batch)
+
+        assert loader.batch_calls == [["a", "b", "c"]]
+        texts = [queued.future.result().text for queued in batch.requests]
+        assert texts == ["out:a:100:0.7", "out:b:100:0.7", "out:c:100:0.7"]
+        assert [queued.future.result().request_id for queued in batch.requests] == [
+            "req0",
+            "req1",
+            "req2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failed_row_does_not_fail_batch(self):
+        loader = RecordingLoader(fail_prompts=("b",))
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batch = make_batch(["a", "b", "c"])
+
+        await worker._process_batch(batch)
+
+        assert batch.requests[0].future.result().text == "out:a:100:0.7"
+        with pytest.raises(ValueError):
+            batch.requests[1].future.result()
+        assert batch.requests[2].future.result().text == "out:c:100:0.7"
+
+    @pytest.mark.asyncio
+    async def test_skips_requests_already_done(self):
+        loader = RecordingLoader()
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batch = make_batch(["a", "b"])
+        batch.requests[0].future.cancel()
+
+        await worker._process_batch(batch)
+
+        assert loader.batch_calls == [["b"]]
+        assert batch.requests[1].future.result().text == "out:b:100:0.7"
+
+    @pytest.mark.asyncio
+    async def test_tracks_load_and_service_time(self):
+        loader = SlowLoader(delay_s=0.02)
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        first, second = make_batch(["a", "b"]), make_batch(["c"])
+        worker.submit(first)
+        worker.submit(second)
+        assert worker.queue_depth == 2
+        assert worker.queued_requests == 3
+
+        await worker.start()
+        try:
+            await asyncio.sleep(0.005)
+            assert worker.in_flight_requests == 2
+            assert worker.queued_requests == 1
+            await asyncio.wait_for(second.requests[0].future, timeout=2.0)
+            await asyncio.sleep(0.005)
+        finally:
+            await worker.stop()
+
+        assert worker.pending_requests == 0
+        assert worker.service_time_per_request_s > 0
+        assert worker.stats()["completed_batches"] == 2
+
+    @pytest.mark.asyncio
+    async def test_idle_worker_steals_oldest_queued_batch(self):
+        loaders = [SlowLoader(delay_s=0.1), SlowLoader(delay_s=0.02)]
+        workers = [
+            GPUWorker(worker_id=i, gpu_id=i, model_loader=loader)
+            for i, loader in enumerate(loaders)
+        ]
+        workers[1].set_peers(workers)
+        backlog = [make_batch([f"b{i}"]) for i in range(3)]
+        for sequence, batch in enumerate(backlog, start=1):
+            batch.sequence = sequence
+            workers[0].submit(batch)
+        workers[1].submit(make_batch(["other"]))
+
+        for worker in workers:
+            await worker.start()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(b.requests[0].future for b in backlog)), timeout=2.0
+            )
+        finally:
+            for worker in workers:
+                await worker.stop()
+
+        # Worker 1 ran dry while worker 0 was still on b0 and took the rest,
+        # oldest first
+        assert workers[1].stats()["stolen_batches"] == 2
+        assert loaders[0].prompts == ["b0"]
+        assert loaders[1].prompts == ["other", "b1", "b2"]
+
+    @pytest.mark.asyncio
+    async def test_queue_serves_most_urgent_batch_first(self):
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=ModelLoader(gpu_id=0))
+        standard = [make_batch([f"s{i}"]) for i in range(2)]
+        urgent = make_batch(["u0"])
+        urgent.requests[0] = QueuedRequest(
+            request=InferenceRequest(prompt="u0", priority="interactive"),
+            future=asyncio.get_running_loop().create_future(),
+            request_id="u0",
+            priority="interactive",
+        )
+        for batch in [*standard, urgent]:
+            worker.submit(batch)
+
+        # FIFO among batches of equal urgency
+        assert [worker.take_queued() for _ in range(3)] == [urgent, *standard]
+
+    @pytest.mark.asyncio
+    async def test_drops_requests_that_cannot_meet_deadline(self):
+        loop = asyncio.get_running_loop()
+        loader = RecordingLoader()
+        stats = DropStats()
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader, drop_stats=stats)
+        # Two requests at 50 ms each leave 100 ms of work for this batch
+        worker._service_time_per_request_s = 0.05
+        batch = make_batch(["tight", "loose", "none"])
+        batch.requests[0].deadline = loop.time() + 0.05
+        batch.requests[1].deadline = loop.time() + 10.0
+
+        await worker._process_batch(batch)
+
+        assert loader.batch_calls == [["loose", "none"]]
+        with pytest.raises(DeadlineExceeded) as excinfo:
+            batch.requests[0].future.result()
+        assert excinfo.value.reason == UNMEETABLE
+        assert batch.requests[1].future.result().text == "out:loose:100:0.7"
+        assert stats.snapshot()["standard"]["dropped_by_reason"] == {UNMEETABLE: 1}
+
+
+class StagedModel:
+    # Separate prepare and run stages that record when each one ran
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.events: List[tuple] = []
+
+    def prepare_batch(self, prompts, max_tokens, temperatures):
+        self.events.append(("prepare", prompts[0], time.perf_counter()))
+        time.sleep(self.delay_s)
+        return [p.upper() for p in prompts]
+
+    def run_batch(self, inputs):
+        started = time.perf_counter()
+        time.sleep(self.delay_s)
+        self.events.append(("run", inputs[0].lower(), started, time.perf_counter()))
+        return inputs
+
+
+class TestInFlightBatches:
+    @pytest.mark.asyncio
+    async def test_next_batch_prepared_while_previous_executes(self):
+        loader = ModelLoader(gpu_id=0)
+        loader.model = StagedModel(delay_s=0.03)
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader, max_in_flight_batches=2)
+        batches = [make_batch([f"b{i}"]) for i in range(4)]
+        for batch in batches:
+            worker.submit(batch)
+
+        await worker.start()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(b.requests[0].future for b in batches)), timeout=2.0
+            )
+        finally:
+            await worker.stop()
+
+        assert [b.requests[0].future.result().text for b in batches] == ["B0", "B1", "B2", "B3"]
+        events = loader.model.events
+        runs = [event for event in events if event[0] == "run"]
+        prepares = {event[1]: event[2] for event in events if event[0] == "prepare"}
+        # Execution stays in order and one at a time
+        assert [run[1] for run in runs] == ["b0", "b1", "b2", "b3"]
+        assert all(a[3] <= b[2] for a, b in zip(runs, runs[1:]))
+        # b1 was prepared before b0 finished executing
+        assert prepares["b1"] < runs[0][3]
+
+        occupancy = worker.occupancy()
+        assert occupancy["peak_in_flight_batches"] == 2
+        assert 0.0 < occupancy["execute_busy_ratio"] <= 1.0
+        assert occupancy["mean_in_flight_batches"] > 1.0
+        assert worker.stats()["completed_batches"] == 4
+        assert worker.in_flight_batches == 0
+
+    @pytest.mark.asyncio
+    async def test_single_slot_runs_batches_back_to_back(self):
+        loader = ModelLoader(gpu_id=0)
+        loader.model = StagedModel(delay_s=0.01)
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batches = [make_batch([f"b{i}"]) for i in range(3)]
+        for batch in batches:
+            worker.submit(batch)
+
+        await worker.start()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(b.requests[0].future for b in batches)), timeout=2.0
+            )
+        finally:
+            await worker.stop()
+
+        stages = [(event[0], event[1]) for event in loader.model.events]
+        assert stages == [
+            ("prepare", "b0"), ("run", "b0"),
+            ("prepare", "b1"), ("run", "b1"),
+            ("prepare", "b2"), ("run", "b2"),
+        ]
+        assert worker.occupancy()["peak_in_flight_batches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_preparation_failure_fails_only_that_batch(self):
+        class BadPrepareLoader(RecordingLoader):
+            def prepare_batch(self, prompts, max_tokens, temperatures):
+                if "bad" in prompts:
+                    raise ValueError("cannot tokenize")
+                return super().prepare_batch(prompts, max_tokens, temperatures)
+
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=BadPrepareLoader(), max_in_flight_batches=2)
+        bad, good = make_batch(["bad"]), make_batch(["good"])
+        worker.submit(bad)
+        worker.submit(good)
+        await worker.start()
+        try:
+            with pytest.raises(ValueError):
+                await asyncio.wait_for(bad.requests[0].future, timeout=2.0)
+            response = await asyncio.wait_for(good.requests[0].future, timeout=2.0)
+        finally:
+            await worker.stop()
+        assert response.text == "out:good:100:0.7"
+        assert worker.available
+
+    @pytest.mark.asyncio
+    async def test_unexpected_errors_fail_the_batch_not_the_loops(self, monkeypatch):
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=RecordingLoader(), max_in_flight_batches=1)
+        live_requests, execute = worker._live_requests, worker._execute
+
+        def broken_intake(batch):
+            if batch.requests[0].request.prompt == "intake":
+                raise RuntimeError("intake broke")
+            return live_requests(batch)
+
+        async def broken_execute(requests, prepared):
+            if requests[0].request.prompt == "execute":
+                raise RuntimeError("execute broke")
+            return await execute(requests, prepared)
+
+        monkeypatch.setattr(worker, "_live_requests", broken_intake)
+        monkeypatch.setattr(worker, "_execute", broken_execute)
+        batches = [make_batch(["intake"]), make_batch(["execute"]), make_batch(["good"])]
+        for batch in batches:
+            worker.submit(batch)
+        await worker.start()
+        try:
+            for batch, message in zip(batches, ("intake broke", "execute broke")):
+                with pytest.raises(RuntimeError, match=message):
+                    await asyncio.wait_for(batch.requests[0].future, timeout=2.0)
+            response = await asyncio.wait_for(batches[2].requests[0].future, timeout=2.0)
+        finally:
+            await worker.stop()
+        assert response.text == "out:good:100:0.7"
+        assert worker.in_flight_batches == 0
+        assert worker.available
+
+
+class TestStreaming:
+    @pytest.mark.asyncio
+    async def test_text_reaches_sink_before_future_resolves(self):
+        loader = ModelLoader(gpu_id=0)
+        loader.model = MockModel(gpu_id=0, token_delay_ms=5.0)
+        worker = GPUWorker(worker_id=0, gpu_id=0, model_loader=loader)
+        batch = make_batch(["streamed", "buffered"])
+        sink: asyncio.Queue = asyncio.Queue()
+        batch.requests[0].token_sink = sink
+        received = []
+
+        async def consume():
+            while True:
+                received.append(await sink.get())
+                if batch.requests[0].future.done():
+                    return
+
+        consumer = asyncio.ensure_future(consume())
+        worker.submit(batch)
+        await worker.start()
+        try:
+            response = await asyncio.wait_for(batch.requests[0].future, timeout=2.0)
+            await asyncio.sleep(0)
+        finally:
+            consumer.cancel()
+            await worker.stop()
+        # Several pieces were consumed while the batch was still running
+        assert len(received) > 1
+        while not sink.empty():
+            received.append(sink.get_nowait())
+        assert "".join(received) == response.text
+        assert batch.requests[1].future.result().text == loader.model.text("buffered", 100)
+
+
+class TestModelLoaderBatch:
+    def test_batched_model_called_once(self):
+        class BatchModel:
+            def __init__(self) -> None:
+                self.calls = 0
+
+            def generate_batch(self, prompts, max_tokens, temperatures):
+                self.calls += 1
+                return [p.upper() for p in prompts]
+
+        loader = ModelLoader(gpu_id=0)
+        loader.model = BatchModel()
+        results = loader.generate_batch(["x", "y"], [10, 10], [0.0, 0.0])
+        assert results == ["X", "Y"]
+        assert loader.model.calls == 1
+
+    def test_batched_model_failure_falls_back_per_row(self):
+        class FlakyModel:
+            def generate_batch(self, prompts, max_tokens, temperatures):
+                raise RuntimeError("batch failed")
+
+            def generate(self, prompt, max_tokens, temperature):
+                if prompt == "bad":
+                    raise RuntimeError("row failed")
+                return prompt
+
+        loader = ModelLoader(gpu_id=0)
+        loader.model = FlakyModel()
+        results = loader.generate_batch(["ok", "bad"], [10, 10], [0.0, 0.0])
+        assert results[0] == "ok"
+        assert isinstance(results[1], RuntimeError)
+
+    def test_mismatched_lengths_rejected(self):
+        loader = ModelLoader(gpu_id=0)
+        with pytest.raises(ValueError):
+            loader.generate_batch(["a"], [10, 20], [0.7])
+
+    def test_run_batch_uses_prepared_inputs(self):
+        loader = ModelLoader(gpu_id=0)
+        loader.model = StagedModel(delay_s=0.0)
+        prepared = loader.prepare_batch(["x", "y"], [10, 10], [0.0, 0.0])
+        assert prepared.inputs == ["X", "Y"]
+        assert loader.run_batch(prepared) == ["X", "Y"]
+
+    def test_mock_model_decodes_max_tokens_steps(self):
+        loader = ModelLoader(gpu_id=1)
+        loader.model = MockModel(gpu_id=1)
+        prepared = loader.prepare_batch(["a", "a longer prompt here"], [12, 30], [0.0, 0.5])
+        steps = list(loader.stream_batch(prepared))
+        # One step per token of the longer row; the shorter row has left
+        assert len(steps) == 30
+        assert [step[0] for step in steps[12:]] == [None] * 18
+        assert "".join(step[1] for step in steps) == loader.model.text("a longer prompt here", 30)
+        assert loader.model.generate("a", 12) == loader.model.text("a", 12)
+        # max_tokens cuts the text short
+        assert loader.model.generate("a", 2) == "[MOCK (GPU"
+
+    def test_step_rows_per_row_limits(self):
+        loader = ModelLoader(gpu_id=0)
+        loader.model = MockModel()
+        rows = loader.start_rows(["x", "y"], [1, 3], [0.0, 0.9])
+        assert loader.step_rows(rows) == ["[MOCK]", "[MOCK]"]
+        assert [row.finished for row in rows] == [True, False]
+        assert loader.step_rows(rows) == [None, " Generated"]
+        assert loader.step_rows(rows) == [None, " 3"]
+        assert rows[1].finished
+        assert rows[1].text == "[MOCK] Generated 3"
+
+    def test_step_rows_without_step_model_finishes_in_one_step(self):
+        loader = RecordingLoader()
+        rows = loader.start_rows(["x", "y"], [5, 5], [0.1, 0.1])
+        assert loader.step_rows(rows) == ["out:x:5:0.1", "out:y:5:0.1"]
+        assert all(row.finished for row in rows)
+
+    def test_stream_batch_falls_back_to_single_step(self):
+        loader = RecordingLoader()
+        prepared = loader.prepare_batch(["x", "y"], [5, 5], [0.1, 0.1])
+        assert list(loader.stream_batch(prepared)) == [["out:x:5:0.1", "out:y:5:0.1"]]
+
+    def test_run_batch_without_split_model_generates(self):
+        loader = RecordingLoader()
+        prepared = loader.prepare_batch(["x"], [5], [0.1])
+        assert prepared.inputs is None
+        assert loader.run_batch(prepared) == ["out:x:5:0.1"]
+        assert loader.batch_calls == [["x"]]
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Awaitable, TypeVar
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+# Status logged for requests whose client went away (nginx convention);
+# nobody is left to receive it
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    # Raised by cancel_on_disconnect when the client left before the work
+    # completed; the work has been cancelled
+    pass
+
+
+async def wait_for_disconnect(http_request: Request) -> None:
+    # The request body has been read by the time the handler runs, so the
+    # next ASGI message is the disconnect
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(http_request: Request, work: Awaitable[T]) -> T:
+    # Runs work until it completes or the client disconnects, whichever is
+    # first. On disconnect the work is cancelled, so whatever it waits on
+    # (a queued request's future, an upstream HTTP call) is cancelled too.
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(http_request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task.done() and not task.cancelled():
+        return task.result()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    raise ClientDisconnected("Client disconnected")
@@ -1,14 +1,29 @@
-from typing import Optional
+from typing import Any, Dict, Literal, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
+# Generation settings for a request that leaves them unset (or null)
+DEFAULT_MAX_TOKENS = 100
+DEFAULT_TEMPERATURE = 0.7
 
 class InferenceRequest(BaseModel):
     model_config = ConfigDict(extra="forbid", strict=True)
     
     api_version: str = Field(default="v1", description="API version")
+    model: Optional[str] = Field(
+        default=None,
+        max_length=128,
+        pattern=r"^[A-Za-z0-9][A-Za-z0-9._-]*$",
+        description="Model to run (default: the node's default model)",
+    )
     prompt: str = Field(..., description="Input prompt text")
-    max_tokens: Optional[int] = Field(default=100, description="Maximum tokens to generate")
-    temperature: Optional[float] = Field(default=0.7, description="Sampling temperature")
+    max_tokens: Optional[int] = Field(default=DEFAULT_MAX_TOKENS, description="Maximum tokens to generate")
+    temperature: Optional[float] = Field(default=DEFAULT_TEMPERATURE, description="Sampling temperature")
+    priority: Optional[Literal["interactive", "standard", "bulk"]] = Field(
+        default=None, description="Priority class (default: standard)"
+    )
+    deadline_ms: Optional[int] = Field(
+        default=None, gt=0, description="Time budget from arrival; dropped if it cannot be met"
+    )
 
 
 class InferenceResponse(BaseModel):
@@ -18,3 +33,15 @@ class InferenceResponse(BaseModel):
     text: str = Field(..., description="Generated text")
     request_id: str = Field(..., description="Request identifier for tracing")
 
+
+
+class InferenceStreamChunk(BaseModel):
+    model_config = ConfigDict(extra="forbid", strict=True)
+
+    api_version: str = Field(default="v1", description="API version")
+    request_id: str = Field(..., description="Request identifier for tracing")
+    text: str = Field(default="", description="Text generated since the previous chunk")
+    done: bool = Field(default=False, description="Set on the last chunk of the stream")
+    error: Optional[Dict[str, Any]] = Field(
+        default=None, description="Set on the last chunk if generation failed mid-stream"
+    )
@@ -10,8 +10,20 @@ import requests
 import json
 import time
 import sys
+from array import array
 from typing import List
 
+# Support both package imports (tests) and running as a standalone script
+try:
+    from .loadgen import LoadGenerator, binary_payload, json_payload, load_replay
+except ImportError:
+    from loadgen import LoadGenerator, binary_payload, json_payload, load_replay
+
+
+# Binary wire format (raw little-endian float32, shape in a header)
+BINARY_CONTENT_TYPE = "application/octet-stream"
+SHAPE_HEADER = "X-Tensor-Shape"
+
 
 def create_sample_input(batch_size: int = 1, input_dim: int = 128) -> List[List[float]]:
     """
@@ -28,11 +40,48 @@ def create_sample_input(batch_size: int = 1, input_dim: int = 128) -> List[List[
     return [[random.random() for _ in range(input_dim)] for _ in range(batch_size)]
 
 
+def encode_binary_input(input_data: List[List[float]]) -> bytes:
+    """
+    Encode a 2D input batch as raw little-endian float32.
+    
+    Args:
+        input_data: Input data as 2D list
+    
+    Returns:
+        Raw bytes for the request body
+    """
+    values = array("f", (value for row in input_data for value in row))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def decode_binary_output(body: bytes, shape_header: str) -> List[List[float]]:
+    """
+    Decode a raw little-endian float32 response body into a 2D list.
+    
+    Args:
+        body: Response body
+        shape_header: Value of the X-Tensor-Shape response header
+    
+    Returns:
+        Output as 2D list
+    """
+    rows, cols = (int(dim) for dim in shape_header.split(","))
+    values = array("f")
+    values.frombytes(body)
+    if sys.byteorder != "little":
+        values.byteswap()
+    flat = values.tolist()
+    return [flat[i * cols:(i + 1) * cols] for i in range(rows)]
+
+
 def send_request(
     server_url: str,
     input_data: List[List[float]],
     prefer_gpu: bool = True,
-    min_gpu_memory_mb: float = 100.0
+    min_gpu_memory_mb: float = 100.0,
+    binary: bool = False
 ) -> dict:
     """
     Send an inference request to the server.
@@ -42,19 +91,42 @@ def send_request(
         input_data: Input data as 2D list
         prefer_gpu: Whether to prefer GPU execution
         min_gpu_memory_mb: Minimum GPU memory required
+        binary: Use the binary float32 wire format instead of JSON
     
     Returns:
         Response dictionary from the server
     """
     url = f"{server_url}/predict"
     
-    payload = {
-        "input_data": input_data,
-        "prefer_gpu": prefer_gpu,
-        "min_gpu_memory_mb": min_gpu_memory_mb
-    }
-    
     try:
+        if binary:
+            response = requests.post(
+                url,
+                data=encode_binary_input(input_data),
+                headers={
+                    "Content-Type": BINARY_CONTENT_TYPE,
+                    "Accept": BINARY_CONTENT_TYPE,
+                    SHAPE_HEADER: f"{len(input_data)},{len(input_data[0]) if input_data else 0}",
+                    "X-Prefer-GPU": "true" if prefer_gpu else "false",
+                    "X-Min-GPU-Memory-MB": str(min_gpu_memory_mb),
+                },
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = {
+                "output": decode_binary_output(response.content, response.headers[SHAPE_HEADER]),
+                "device": response.headers.get("X-Device", "unknown"),
+                "latency_ms": float(response.headers.get("X-Latency-Ms", 0.0)),
+            }
+            if "X-GPU-Memory-MB" in response.headers:
+                result["gpu_memory_mb"] = float(response.headers["X-GPU-Memory-MB"])
+            return result
+        
+        payload = {
+            "input_data": input_data,
+            "prefer_gpu": prefer_gpu,
+            "min_gpu_memory_mb": min_gpu_memory_mb
+        }
         response = requests.post(url, json=payload, timeout=30.0)
         response.raise_for_status()
         return response.json()
@@ -95,6 +167,54 @@ def print_results(response: dict):
     print("="*60 + "\n")
 
 
+def run_load_test(args: argparse.Namespace):
+    """
+    Run a closed-loop or open-loop load test and print the report.
+    
+    Args:
+        args: Parsed command-line arguments
+    """
+    encode = encode_binary_input if args.binary else None
+    if args.replay:
+        payloads = load_replay(args.replay, encode=encode)
+        source = f"{len(payloads)} payload(s) replayed from {args.replay}"
+    else:
+        # A few distinct payloads, built up front so encoding is not measured
+        payloads = []
+        for _ in range(16):
+            input_data = create_sample_input(batch_size=args.batch_size, input_dim=args.input_dim)
+            if args.binary:
+                payloads.append(binary_payload(input_data, encode, args.prefer_gpu, args.min_gpu_memory))
+            else:
+                payloads.append(json_payload(input_data, args.prefer_gpu, args.min_gpu_memory))
+        source = f"synthetic batch size {args.batch_size} x {args.input_dim}"
+    
+    duration = args.duration
+    if args.count is None and duration is None:
+        duration = 10.0
+    
+    pool_size = args.concurrency if args.mode == "closed" else args.max_in_flight
+    generator = LoadGenerator(args.server, payloads, pool_size=pool_size)
+    limit = f"{args.count} requests" if args.count is not None else f"{duration:.1f} s"
+    try:
+        if args.mode == "closed":
+            print(f"Closed loop: concurrency {args.concurrency}, {limit}, {source}\n")
+            report = generator.run_closed_loop(args.concurrency, requests=args.count, duration_s=duration)
+        else:
+            print(f"Open loop: Poisson arrivals at {args.rps} req/s, {limit}, {source}\n")
+            report = generator.run_open_loop(
+                args.rps,
+                requests=args.count,
+                duration_s=duration,
+                max_in_flight=args.max_in_flight,
+                seed=args.seed
+            )
+    finally:
+        generator.close()
+    
+    print(report.format())
+
+
 def main():
     """Main CLI entrypoint."""
     parser = argparse.ArgumentParser(
@@ -110,6 +230,15 @@ Examples:
 
   # Send multiple requests
   python client.py --server http://192.168.1.100:8000 --count 5
+
+  # Use the binary float32 wire format instead of JSON
+  python client.py --server http://192.168.1.100:8000 --batch-size 1024 --binary
+
+  # Load test: 32 requests in flight for 30 seconds
+  python client.py --server http://192.168.1.100:8000 --load-test --concurrency 32 --duration 30
+
+  # Load test: Poisson arrivals at 200 req/s, replaying recorded payloads
+  python client.py --server http://192.168.1.100:8000 --load-test --mode open --rps 200 --replay requests.jsonl
         """
     )
     
@@ -150,8 +279,8 @@ Examples:
     parser.add_argument(
         "--count",
         type=int,
-        default=1,
-        help="Number of requests to send (default: 1)"
+        default=None,
+        help="Number of requests to send (default: 1, or --duration for load tests)"
     )
     
     parser.add_argument(
@@ -161,6 +290,61 @@ Examples:
         help="Minimum GPU memory required in MB (default: 100.0)"
     )
     
+    parser.add_argument(
+        "--binary",
+        action="store_true",
+        help="Send and receive raw float32 tensors instead of JSON"
+    )
+    
+    load_group = parser.add_argument_group("load testing")
+    load_group.add_argument(
+        "--load-test",
+        action="store_true",
+        help="Send concurrent requests and report throughput and latency percentiles"
+    )
+    load_group.add_argument(
+        "--mode",
+        choices=("closed", "open"),
+        default="closed",
+        help="closed: fixed concurrency; open: Poisson arrivals at --rps (default: closed)"
+    )
+    load_group.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Requests in flight in closed-loop mode (default: 8)"
+    )
+    load_group.add_argument(
+        "--rps",
+        type=float,
+        default=50.0,
+        help="Target arrival rate in open-loop mode (default: 50)"
+    )
+    load_group.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=256,
+        help="Sender threads in open-loop mode (default: 256)"
+    )
+    load_group.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Load test length in seconds when --count is not given (default: 10)"
+    )
+    load_group.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        help="JSONL file with one /predict JSON body per line to replay"
+    )
+    load_group.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for the open-loop arrival schedule"
+    )
+    
     args = parser.parse_args()
     
     # Set default prefer_gpu to True if --no-prefer-gpu was not explicitly specified
@@ -184,10 +368,19 @@ Examples:
         print(f"Warning: Could not check server health: {e}")
         print("Continuing anyway...")
     
+    if args.load_test:
+        print()
+        run_load_test(args)
+        return
+    
+    if args.count is None:
+        args.count = 1
+    
     # Send inference requests
     print(f"\nSending {args.count} request(s) to {args.server}")
     print(f"Prefer GPU: {args.prefer_gpu}")
-    print(f"Batch size: {args.batch_size}, Input dim: {args.input_dim}\n")
+    print(f"Batch size: {args.batch_size}, Input dim: {args.input_dim}")
+    print(f"Wire format: {'binary float32' if args.binary else 'JSON'}\n")
     
     for i in range(args.count):
         if args.count > 1:
@@ -203,7 +396,8 @@ Examples:
             server_url=args.server,
             input_data=input_data,
             prefer_gpu=args.prefer_gpu,
-            min_gpu_memory_mb=args.min_gpu_memory
+            min_gpu_memory_mb=args.min_gpu_memory,
+            binary=args.binary
         )
         client_latency = (time.time() - start_time) * 1000
         
@@ -0,0 +1,459 @@
+"""
+Load generator for the inference server.
+
+Sends /predict requests over a shared connection pool from many threads
+and reports throughput and latency percentiles. Two modes are supported:
+
+- Closed loop: a fixed number of workers, each sending its next request as
+  soon as the previous one completes.
+- Open loop: requests arrive as a Poisson process at a target rate whether
+  or not earlier requests have completed. Latency is measured from each
+  request's scheduled arrival, so queueing caused by an overloaded server
+  is included rather than hidden (no coordinated omission).
+
+Payloads are built once up front (synthetic or replayed from a JSONL file)
+so encoding cost is not part of the measurement.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+import itertools
+import json
+import math
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+JSON_CONTENT_TYPE = "application/json"
+
+PERCENTILES = (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("p999", 0.999))
+
+# Columns of the latency table
+STAT_KEYS = ("mean",) + tuple(name for name, _ in PERCENTILES) + ("max",)
+
+
+@dataclass(frozen=True)
+class Payload:
+    """A pre-encoded /predict request."""
+    body: bytes
+    headers: Dict[str, str]
+
+
+@dataclass
+class RequestResult:
+    """Outcome of one request."""
+    client_latency_ms: float
+    server_latency_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadTestReport:
+    """Aggregated results of a load test run."""
+    mode: str
+    duration_s: float
+    sent: int
+    succeeded: int
+    failed: int
+    client_latency_ms: Dict[str, float] = field(default_factory=dict)
+    server_latency_ms: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput_rps(self) -> float:
+        """Successful requests per second."""
+        return self.succeeded / self.duration_s if self.duration_s > 0 else 0.0
+
+    def format(self) -> str:
+        """
+        Format the report as a human-readable table.
+
+        Returns:
+            Multi-line report text
+        """
+        lines = [
+            "=" * 60,
+            f"LOAD TEST RESULTS ({self.mode} loop)",
+            "=" * 60,
+            f"Duration:           {self.duration_s:.2f} s",
+            f"Requests:           {self.sent} sent, {self.succeeded} ok, {self.failed} failed",
+            f"Throughput:         {self.throughput_rps:.1f} req/s",
+            "",
+            f"{'latency (ms)':<14}" + "".join(f"{key:>10}" for key in STAT_KEYS),
+        ]
+        for label, stats in (("client", self.client_latency_ms), ("server", self.server_latency_ms)):
+            if stats:
+                lines.append(f"{label:<14}" + "".join(f"{stats[key]:>10.2f}" for key in STAT_KEYS))
+        if self.errors:
+            lines.append("")
+            lines.append("Errors:")
+            for error, count in sorted(self.errors.items(), key=lambda item: -item[1]):
+                lines.append(f"  {count:>6} x {error}")
+        lines.append("=" * 60)
+        return "\n".join(lines)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values: Values in ascending order
+        q: Quantile in [0, 1]
+
+    Returns:
+        The smallest value with at least q of the values at or below it
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize latencies as mean, max and the reported percentiles.
+
+    Args:
+        values: Latencies in milliseconds
+
+    Returns:
+        Dictionary of statistics (empty if there are no values)
+    """
+    if not values:
+        return {}
+    ordered = sorted(values)
+    stats = {name: percentile(ordered, q) for name, q in PERCENTILES}
+    stats["mean"] = sum(ordered) / len(ordered)
+    stats["max"] = ordered[-1]
+    return stats
+
+
+def poisson_arrivals(
+    rate: float,
+    count: Optional[int] = None,
+    duration_s: Optional[float] = None,
+    rng: Optional[random.Random] = None
+) -> List[float]:
+    """
+    Generate Poisson arrival times (exponential inter-arrival gaps).
+
+    Args:
+        rate: Mean arrivals per second
+        count: Number of arrivals to generate
+        duration_s: Generate arrivals until this offset (used if count is None)
+        rng: Random source (for reproducible schedules)
+
+    Returns:
+        Arrival offsets in seconds from the start, ascending
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if count is None and duration_s is None:
+        raise ValueError("count or duration_s is required")
+    rng = rng or random.Random()
+    arrivals: List[float] = []
+    now = 0.0
+    while True:
+        now += rng.expovariate(rate)
+        if count is not None and len(arrivals) >= count:
+            break
+        if count is None and now > duration_s:
+            break
+        arrivals.append(now)
+    return arrivals
+
+
+def json_payload(
+    input_data: List[List[float]],
+    prefer_gpu: bool = True,
+    min_gpu_memory_mb: float = 100.0
+) -> Payload:
+    """
+    Encode a JSON /predict request.
+
+    Args:
+        input_data: Input batch as 2D list
+        prefer_gpu: Whether to prefer GPU execution
+        min_gpu_memory_mb: Minimum GPU memory required
+
+    Returns:
+        Pre-encoded payload
+    """
+    body = json.dumps({
+        "input_data": input_data,
+        "prefer_gpu": prefer_gpu,
+        "min_gpu_memory_mb": min_gpu_memory_mb,
+    }).encode("utf-8")
+    return Payload(body, {"Content-Type": JSON_CONTENT_TYPE})
+
+
+def binary_payload(
+    input_data: List[List[float]],
+    encode: Callable[[List[List[float]]], bytes],
+    prefer_gpu: bool = True,
+    min_gpu_memory_mb: float = 100.0
+) -> Payload:
+    """
+    Encode a binary float32 /predict request.
+
+    Args:
+        input_data: Input batch as 2D list
+        encode: Function that encodes the batch as raw float32 bytes
+        prefer_gpu: Whether to prefer GPU execution
+        min_gpu_memory_mb: Minimum GPU memory required
+
+    Returns:
+        Pre-encoded payload
+    """
+    rows = len(input_data)
+    cols = len(input_data[0]) if input_data else 0
+    return Payload(encode(input_data), {
+        "Content-Type": "application/octet-stream",
+        "Accept": "application/octet-stream",
+        "X-Tensor-Shape": f"{rows},{cols}",
+        "X-Prefer-GPU": "true" if prefer_gpu else "false",
+        "X-Min-GPU-Memory-MB": str(min_gpu_memory_mb),
+    })
+
+
+def load_replay(
+    path: str,
+    encode: Optional[Callable[[List[List[float]]], bytes]] = None
+) -> List[Payload]:
+    """
+    Load request payloads from a JSONL file.
+
+    Each non-empty line is a /predict JSON body (input_data plus optional
+    prefer_gpu, min_gpu_memory_mb and min_precision).
+
+    Args:
+        path: Path to the JSONL file
+        encode: If given, convert each line to the binary format with this encoder
+
+    Returns:
+        Payloads in file order
+    """
+    payloads: List[Payload] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                input_data = request["input_data"]
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"{path}:{line_number}: invalid request line: {e}")
+            if encode is None:
+                payloads.append(Payload(line.encode("utf-8"), {"Content-Type": JSON_CONTENT_TYPE}))
+                continue
+            payload = binary_payload(
+                input_data,
+                encode,
+                prefer_gpu=request.get("prefer_gpu", True),
+                min_gpu_memory_mb=request.get("min_gpu_memory_mb", 100.0)
+            )
+            if request.get("min_precision") is not None:
+                payload.headers["X-Min-Precision"] = request["min_precision"]
+            payloads.append(payload)
+    if not payloads:
+        raise ValueError(f"{path}: no requests to replay")
+    return payloads
+
+
+class LoadGenerator:
+    """
+    Drives /predict with closed-loop or open-loop traffic.
+
+    All worker threads share one requests.Session whose connection pool is
+    sized to the concurrency, so connections are reused instead of opened
+    per request.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        payloads: Sequence[Payload],
+        pool_size: int = 64,
+        timeout_s: float = 30.0,
+        send: Optional[Callable[[Payload], Optional[float]]] = None
+    ):
+        """
+        Initialize the load generator.
+
+        Args:
+            server_url: Base URL of the server (e.g., "http://localhost:8000")
+            payloads: Requests to send, used round-robin
+            pool_size: Maximum pooled connections
+            timeout_s: Per-request timeout
+            send: Replaces the HTTP call (for tests); takes a payload and
+                returns the server-side latency in ms, raising on failure
+        """
+        if not payloads:
+            raise ValueError("at least one payload is required")
+        self.url = f"{server_url.rstrip('/')}/predict"
+        self.payloads = list(payloads)
+        self.pool_size = pool_size
+        self.timeout_s = timeout_s
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._send = send or self._post
+        self._next_payload = itertools.count()
+        self._payload_lock = threading.Lock()
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+    def _payload(self) -> Payload:
+        """Pick the next payload round-robin."""
+        with self._payload_lock:
+            index = next(self._next_payload)
+        return self.payloads[index % len(self.payloads)]
+
+    def _post(self, payload: Payload) -> Optional[float]:
+        """
+        Send one request over the shared session.
+
+        Args:
+            payload: Request to send
+
+        Returns:
+            Server-reported latency in ms, if present
+        """
+        response = self.session.post(
+            self.url, data=payload.body, headers=payload.headers, timeout=self.timeout_s
+        )
+        response.raise_for_status()
+        if "X-Latency-Ms" in response.headers:
+            return float(response.headers["X-Latency-Ms"])
+        return response.json().get("latency_ms")
+
+    def _measure(self, payload: Payload, started: float) -> RequestResult:
+        """
+        Send a request and time it from ``started``.
+
+        Args:
+            payload: Request to send
+            started: perf_counter() value the latency is measured from
+
+        Returns:
+            Result of the request
+        """
+        try:
+            server_latency_ms = self._send(payload)
+            error = None
+        except Exception as e:
+            server_latency_ms = None
+            error = type(e).__name__ if not str(e) else f"{type(e).__name__}: {str(e)[:80]}"
+        client_latency_ms = (time.perf_counter() - started) * 1000.0
+        return RequestResult(client_latency_ms, server_latency_ms, error)
+
+    def run_closed_loop(
+        self,
+        concurrency: int,
+        requests: Optional[int] = None,
+        duration_s: Optional[float] = None
+    ) -> LoadTestReport:
+        """
+        Run with a fixed number of requests in flight.
+
+        Args:
+            concurrency: Worker threads, each with one request in flight
+            requests: Total requests to send
+            duration_s: Stop starting new requests after this many seconds
+                (used if requests is None)
+
+        Returns:
+            Load test report
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if requests is None and duration_s is None:
+            raise ValueError("requests or duration_s is required")
+        results: List[RequestResult] = []
+        results_lock = threading.Lock()
+        remaining = itertools.count()
+        began = time.perf_counter()
+        deadline = began + duration_s if duration_s is not None else None
+
+        def worker():
+            while True:
+                if requests is not None and next(remaining) >= requests:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                result = self._measure(self._payload(), time.perf_counter())
+                with results_lock:
+                    results.append(result)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._report("closed", results, time.perf_counter() - began)
+
+    def run_open_loop(
+        self,
+        rps: float,
+        requests: Optional[int] = None,
+        duration_s: Optional[float] = None,
+        max_in_flight: int = 256,
+        seed: Optional[int] = None
+    ) -> LoadTestReport:
+        """
+        Run with Poisson arrivals at a target rate.
+
+        Args:
+            rps: Target arrivals per second
+            requests: Total requests to send
+            duration_s: Length of the arrival schedule (used if requests is None)
+            max_in_flight: Sender threads; arrivals beyond this wait for a free
+                thread, and that wait counts towards their latency
+            seed: Seed for a reproducible arrival schedule
+
+        Returns:
+            Load test report
+        """
+        arrivals = poisson_arrivals(rps, requests, duration_s, random.Random(seed))
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            began = time.perf_counter()
+            for offset in arrivals:
+                scheduled = began + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(self._measure, self._payload(), scheduled))
+            results = [future.result() for future in futures]
+        return self._report("open", results, time.perf_counter() - began)
+
+    @staticmethod
+    def _report(mode: str, results: List[RequestResult], duration_s: float) -> LoadTestReport:
+        """Aggregate request results into a report."""
+        succeeded = [result for result in results if result.error is None]
+        errors: Dict[str, int] = {}
+        for result in results:
+            if result.error is not None:
+                errors[result.error] = errors.get(result.error, 0) + 1
+        return LoadTestReport(
+            mode=mode,
+            duration_s=duration_s,
+            sent=len(results),
+            succeeded=len(succeeded),
+            failed=len(results) - len(succeeded),
+            client_latency_ms=summarize([result.client_latency_ms for result in succeeded]),
+            server_latency_ms=summarize([
+                result.server_latency_ms for result in succeeded if result.server_latency_ms is not None
+            ]),
+            errors=errors,
+        )
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark inference throughput across thread pool configurations.
+
+Runs a fixed number of concurrent requests through an InferencePool for
+every combination of pool size and intra-op thread count, and reports the
+resulting throughput. Each configuration runs in a fresh subprocess because
+torch thread settings are process-wide.
+
+Usage:
+    python scripts/bench_inference_pool.py
+    python scripts/bench_inference_pool.py --pool-sizes 1,2,4 --intra-op 1,2 --batch-size 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List
+
+# Add repository root to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _parse_list(value: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+async def _run_config(pool_size: int, intra_op: int, requests: int, concurrency: int, batch_size: int) -> dict:
+    """
+    Measure throughput for one pool configuration in this process.
+
+    Args:
+        pool_size: Number of pool workers
+        intra_op: Intra-op threads per worker
+        requests: Total requests to send
+        concurrency: Requests in flight at once
+        batch_size: Rows per request
+
+    Returns:
+        Dictionary with the configuration and measured throughput
+    """
+    import torch
+    from server.executor import Executor
+    from server.inference_pool import InferencePool
+    from server.models.simple_model import create_model
+
+    pool = InferencePool(max_workers=pool_size, intra_op_threads=intra_op, inter_op_threads=1)
+    executor = Executor(create_model("cpu"), device="cpu")
+    inputs = torch.randn(batch_size, 128)
+    loop = asyncio.get_running_loop()
+
+    def infer():
+        return executor.execute(inputs, device="cpu")
+
+    # Warm up every worker thread
+    await asyncio.gather(*(loop.run_in_executor(pool, infer) for _ in range(pool_size * 2)))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with semaphore:
+            await loop.run_in_executor(pool, infer)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    pool.shutdown(wait=True)
+
+    return {
+        "pool_size": pool_size,
+        "intra_op": intra_op,
+        "requests_per_sec": requests / elapsed,
+        "rows_per_sec": requests * batch_size / elapsed,
+    }
+
+
+def main():
+    """Run the benchmark matrix and print a throughput table."""
+    parser = argparse.ArgumentParser(description="Benchmark inference pool configurations")
+    parser.add_argument("--pool-sizes", type=_parse_list, default=None,
+                        help="Comma-separated pool sizes (default: 1,2,4,<cores>)")
+    parser.add_argument("--intra-op", type=_parse_list, default=None,
+                        help="Comma-separated intra-op thread counts (default: 1,2,4,<cores>)")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per configuration")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests")
+    parser.add_argument("--batch-size", type=int, default=16, help="Rows per request")
+    parser.add_argument("--single", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        pool_size, intra_op = (int(v) for v in args.single.split(","))
+        result = asyncio.run(
+            _run_config(pool_size, intra_op, args.requests, args.concurrency, args.batch_size)
+        )
+        print(json.dumps(result))
+        return
+
+    cores = os.cpu_count() or 1
+    pool_sizes = args.pool_sizes or sorted({1, 2, 4, cores})
+    intra_ops = args.intra_op or sorted({1, 2, 4, cores})
+
+    print(f"CPU cores: {cores}, requests: {args.requests}, "
+          f"concurrency: {args.concurrency}, batch size: {args.batch_size}\n")
+    print(f"{'pool':>6} {'intra':>6} {'threads':>8} {'req/s':>10} {'rows/s':>12}")
+    print("-" * 46)
+
+    for pool_size in pool_sizes:
+        for intra_op in intra_ops:
+            output = subprocess.run(
+                [
+                    sys.executable, __file__,
+                    "--single", f"{pool_size},{intra_op}",
+                    "--requests", str(args.requests),
+                    "--concurrency", str(args.concurrency),
+                    "--batch-size", str(args.batch_size),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            marker = "  (oversubscribed)" if pool_size * intra_op > cores else ""
+            print(f"{pool_size:>6} {intra_op:>6} {pool_size * intra_op:>8} "
+                  f"{result['requests_per_sec']:>10.1f} {result['rows_per_sec']:>12.1f}{marker}")
+
+
+if __name__ == "__main__":
+    main()
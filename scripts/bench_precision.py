@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark inference throughput and accuracy for each precision mode.
+
+For every precision (fp32, bf16, int8-dynamic) this builds an Executor on
+the CPU, measures rows per second at several batch sizes, and reports the
+error of the outputs against fp32.
+
+Usage:
+    python scripts/bench_precision.py
+    python scripts/bench_precision.py --batch-sizes 1,32,256 --iterations 200 --threads 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+# Add repository root to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _parse_list(value: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    """Run the benchmark for every precision and print a table."""
+    parser = argparse.ArgumentParser(description="Benchmark precision modes")
+    parser.add_argument("--batch-sizes", type=_parse_list, default=[1, 32, 256],
+                        help="Comma-separated batch sizes (default: 1,32,256)")
+    parser.add_argument("--iterations", type=int, default=200, help="Forward passes per batch size")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 keeps the default)")
+    parser.add_argument("--backend", type=str, default="eager", help="Execution backend")
+    args = parser.parse_args()
+
+    import torch
+    from server.executor import Executor
+    from server.models import precision as precisions
+    from server.models.simple_model import create_model
+
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+
+    torch.manual_seed(0)
+    model = create_model("cpu")
+
+    print(f"torch threads: {torch.get_num_threads()}, backend: {args.backend}, "
+          f"iterations: {args.iterations}\n")
+    header = f"{'precision':>13} " + " ".join(f"{f'rows/s @{b}':>14}" for b in args.batch_sizes)
+    print(f"{header} {'speedup':>8} {'max err':>10} {'rel err':>9}")
+    print("-" * (len(header) + 30))
+
+    baseline = None
+    for precision in reversed(precisions.PRECISIONS):
+        executor = Executor(
+            model,
+            device="cpu",
+            backend=args.backend,
+            warmup_batch_sizes=args.batch_sizes,
+            precision=precision
+        )
+        rates = []
+        for batch_size in args.batch_sizes:
+            inputs = torch.randn(batch_size, 128)
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                executor.execute(inputs)
+            rates.append(batch_size * args.iterations / (time.perf_counter() - started))
+
+        if baseline is None:
+            baseline = rates
+        speedup = sum(r / b for r, b in zip(rates, baseline)) / len(rates)
+        accuracy = precisions.compare_to_fp32(model, precision)
+        print(f"{precision:>13} " + " ".join(f"{rate:>14.0f}" for rate in rates)
+              + f" {speedup:>7.2f}x {accuracy['max_abs_error']:>10.2e} {accuracy['relative_error']:>9.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Dynamic micro-batching for inference requests.
+
+The micro-batcher sits in front of the executor. Concurrent requests routed
+to the same device at the same precision are concatenated along the batch dimension, run through a
+single forward pass and split back per request. A batch is dispatched when it
+reaches the row limit or when its oldest request has waited the maximum time.
+"""
+
+from concurrent.futures import Executor as ThreadPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+import asyncio
+import time
+import torch
+
+try:
+    from .executor import Executor
+    from .telemetry import TelemetryCollector
+except ImportError:
+    from executor import Executor
+    from telemetry import TelemetryCollector
+
+
+@dataclass
+class _PendingRequest:
+    """A request waiting to join a batch."""
+    input_tensor: torch.Tensor
+    future: asyncio.Future
+    enqueued_at: float
+    telemetry: Optional[TelemetryCollector] = None
+
+
+@dataclass
+class _PendingBatch:
+    """Requests collected for one device and precision."""
+    requests: List[_PendingRequest] = field(default_factory=list)
+    rows: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests for the same device and precision into one forward pass.
+
+    Each call to ``submit`` resolves with the request's own slice of the
+    batched output and the time it spent waiting for the batch to dispatch.
+    Stage spans of the shared forward pass are added to every request's
+    telemetry.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        max_batch_rows: int = 64,
+        max_wait_ms: float = 2.0,
+        thread_pool: Optional[ThreadPool] = None
+    ):
+        """
+        Initialize the micro-batcher.
+
+        Args:
+            executor: Executor that runs the batched forward pass
+            max_batch_rows: Dispatch once this many rows are pending for a batch
+            max_wait_ms: Dispatch once the oldest pending request waited this long
+            thread_pool: Pool that runs forward passes (defaults to the loop's executor)
+        """
+        if max_batch_rows < 1:
+            raise ValueError("max_batch_rows must be at least 1")
+        self.executor = executor
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_ms = max_wait_ms
+        self.thread_pool = thread_pool
+        # Pending batches keyed by (device, precision)
+        self._pending: Dict[Tuple[str, Optional[str]], _PendingBatch] = {}
+        self._tasks: set = set()
+
+    async def submit(
+        self,
+        input_tensor: torch.Tensor,
+        device: str,
+        precision: Optional[str] = None,
+        telemetry: Optional[TelemetryCollector] = None
+    ) -> Tuple[torch.Tensor, float]:
+        """
+        Queue a request and wait for its batched result.
+
+        Args:
+            input_tensor: Input of shape (rows, features)
+            device: Device the request was scheduled to
+            precision: Precision to execute at (None for the executor's default)
+            telemetry: Optional collector that receives the batch's stage spans
+
+        Returns:
+            Tuple of (output rows for this request, queue wait in milliseconds)
+        """
+        loop = asyncio.get_running_loop()
+        rows = input_tensor.shape[0] if input_tensor.dim() > 0 else 1
+        request = _PendingRequest(input_tensor, loop.create_future(), time.perf_counter(), telemetry)
+
+        key = (device, precision)
+        pending = self._pending.get(key)
+        if pending is not None and pending.rows + rows > self.max_batch_rows:
+            # Adding this request would overflow the batch; send what we have
+            self._flush(key)
+            pending = None
+        if pending is None:
+            pending = _PendingBatch()
+            pending.timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush, key)
+            self._pending[key] = pending
+
+        pending.requests.append(request)
+        pending.rows += rows
+        if pending.rows >= self.max_batch_rows:
+            self._flush(key)
+
+        return await request.future
+
+    async def flush_all(self):
+        """Dispatch every pending batch and wait for them to complete."""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self, key: Tuple[str, Optional[str]]):
+        """
+        Dispatch a pending batch.
+
+        Args:
+            key: (device, precision) of the pending batch to run
+        """
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        task = asyncio.ensure_future(self._run(key, pending.requests))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Tuple[str, Optional[str]], requests: List[_PendingRequest]):
+        """
+        Execute a batch off the event loop and resolve each request's future.
+
+        Args:
+            key: (device, precision) to execute with
+            requests: Requests in the batch
+        """
+        dispatched_at = time.perf_counter()
+        inputs = [request.input_tensor for request in requests]
+        loop = asyncio.get_running_loop()
+        batch_telemetry = TelemetryCollector()
+        try:
+            results = await loop.run_in_executor(
+                self.thread_pool, self._execute_batch, key, inputs, batch_telemetry
+            )
+        except Exception:
+            # Typically one malformed input (e.g. wrong feature size) breaks the
+            # concatenation; run requests separately so only that one fails.
+            batch_telemetry = TelemetryCollector()
+            results = await loop.run_in_executor(
+                self.thread_pool, self._execute_each, key, inputs, batch_telemetry
+            )
+
+        for request, result in zip(requests, results):
+            if request.future.done():
+                continue
+            if isinstance(result, Exception):
+                request.future.set_exception(result)
+            else:
+                if request.telemetry is not None:
+                    request.telemetry.add_spans(batch_telemetry.spans)
+                queue_wait_ms = (dispatched_at - request.enqueued_at) * 1000.0
+                request.future.set_result((result, queue_wait_ms))
+
+    def _execute_batch(
+        self,
+        key: Tuple[str, Optional[str]],
+        inputs: List[torch.Tensor],
+        telemetry: Optional[TelemetryCollector] = None
+    ) -> List[torch.Tensor]:
+        """
+        Run one forward pass over the concatenated inputs.
+
+        Args:
+            key: (device, precision) to execute with
+            inputs: Per-request input tensors
+            telemetry: Optional collector for the batch's stage spans
+
+        Returns:
+            Per-request output tensors
+        """
+        device, precision = key
+        if len(inputs) == 1:
+            return [self.executor.execute(inputs[0], device=device, precision=precision, telemetry=telemetry)]
+        sizes = [tensor.shape[0] for tensor in inputs]
+        output = self.executor.execute(
+            torch.cat(inputs, dim=0), device=device, precision=precision, telemetry=telemetry
+        )
+        return list(torch.split(output, sizes, dim=0))
+
+    def _execute_each(
+        self,
+        key: Tuple[str, Optional[str]],
+        inputs: List[torch.Tensor],
+        telemetry: Optional[TelemetryCollector] = None
+    ) -> List[Union[torch.Tensor, Exception]]:
+        """
+        Run each input separately, capturing per-request failures.
+
+        Args:
+            key: (device, precision) to execute with
+            inputs: Per-request input tensors
+            telemetry: Optional collector for the stage spans of all runs
+
+        Returns:
+            Per-request output tensors or the exception each one raised
+        """
+        device, precision = key
+        results: List[Union[torch.Tensor, Exception]] = []
+        for tensor in inputs:
+            try:
+                results.append(
+                    self.executor.execute(tensor, device=device, precision=precision, telemetry=telemetry)
+                )
+            except Exception as e:
+                results.append(e)
+        return results
@@ -0,0 +1,130 @@
+"""
+Runtime configuration for the inference server.
+
+Settings are read from environment variables at startup so the server can
+be tuned without code changes. Every setting has a default that matches the
+server's original behavior.
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean environment variable.
+
+    Args:
+        name: Variable name
+        default: Value to use when the variable is unset
+
+    Returns:
+        Parsed boolean ("1", "true" and "yes" are truthy)
+    """
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes")
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Read an integer environment variable.
+
+    Args:
+        name: Variable name
+        default: Value to use when the variable is unset
+
+    Returns:
+        Parsed integer
+    """
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+def _env_float(name: str, default: float) -> float:
+    """
+    Read a float environment variable.
+
+    Args:
+        name: Variable name
+        default: Value to use when the variable is unset
+
+    Returns:
+        Parsed float
+    """
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+def _env_int_tuple(name: str, default: Tuple[int, ...]) -> Tuple[int, ...]:
+    """
+    Read a comma-separated list of integers from an environment variable.
+
+    Args:
+        name: Variable name
+        default: Value to use when the variable is unset
+
+    Returns:
+        Tuple of parsed integers
+    """
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return tuple(int(item) for item in value.split(",") if item.strip())
+
+
+@dataclass
+class ServerConfig:
+    """
+    Server settings.
+
+    Attributes:
+        microbatch_enabled: Coalesce concurrent /predict calls into one forward pass
+        microbatch_max_rows: Maximum rows per coalesced forward pass
+        microbatch_max_wait_ms: Maximum time a request waits for others to join
+        inference_pool_size: Inference worker threads (0 picks a default)
+        intra_op_threads: torch intra-op threads per worker (0 splits cores evenly)
+        inter_op_threads: torch inter-op threads (0 keeps torch's default)
+        model_backend: Execution backend ("eager", "torchscript", "compile" or "auto")
+        warmup_batch_sizes: Batch sizes each model replica is warmed up with
+        model_precision: Default precision ("fp32", "bf16" or "int8-dynamic")
+        device_sample_interval_ms: How often GPU memory and utilization are sampled
+    """
+
+    microbatch_enabled: bool = False
+    microbatch_max_rows: int = 64
+    microbatch_max_wait_ms: float = 2.0
+    inference_pool_size: int = 0
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    model_backend: str = "eager"
+    warmup_batch_sizes: Tuple[int, ...] = (1, 8, 32)
+    model_precision: str = "fp32"
+    device_sample_interval_ms: float = 500.0
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        """
+        Build the configuration from environment variables.
+
+        Returns:
+            ServerConfig populated from environment variables
+        """
+        return cls(
+            microbatch_enabled=_env_bool("MICROBATCH_ENABLED", cls.microbatch_enabled),
+            microbatch_max_rows=_env_int("MICROBATCH_MAX_ROWS", cls.microbatch_max_rows),
+            microbatch_max_wait_ms=_env_float("MICROBATCH_MAX_WAIT_MS", cls.microbatch_max_wait_ms),
+            inference_pool_size=_env_int("INFERENCE_POOL_SIZE", cls.inference_pool_size),
+            intra_op_threads=_env_int("INTRA_OP_THREADS", cls.intra_op_threads),
+            inter_op_threads=_env_int("INTER_OP_THREADS", cls.inter_op_threads),
+            model_backend=os.getenv("MODEL_BACKEND", cls.model_backend).strip().lower(),
+            warmup_batch_sizes=_env_int_tuple("WARMUP_BATCH_SIZES", cls.warmup_batch_sizes),
+            model_precision=os.getenv("MODEL_PRECISION", cls.model_precision).strip().lower(),
+            device_sample_interval_ms=_env_float("DEVICE_SAMPLE_INTERVAL_MS", cls.device_sample_interval_ms),
+        )
@@ -0,0 +1,224 @@
+"""
+Background sampling of device state.
+
+Querying the CUDA driver for memory and utilization on every request adds
+latency to the hot path. The sampler refreshes the state of every device on
+an interval in a background thread and publishes it as an immutable
+snapshot; the scheduler and telemetry read the latest snapshot without any
+driver calls.
+"""
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+import threading
+import time
+import torch
+
+
+_MB = 1024 ** 2
+
+
+@dataclass(frozen=True)
+class DeviceState:
+    """
+    State of one device at a point in time.
+
+    Attributes:
+        device: Device string (e.g., "cuda:0")
+        total_memory_mb: Total device memory
+        free_memory_mb: Memory not in use
+        allocated_memory_mb: Memory allocated by this process's tensors
+        utilization: Compute utilization in percent, or None if unknown
+    """
+
+    device: str
+    total_memory_mb: float
+    free_memory_mb: float
+    allocated_memory_mb: float
+    utilization: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class DeviceSnapshot:
+    """
+    Immutable view of every sampled device.
+
+    Attributes:
+        devices: Device state keyed by device string
+        sampled_at: time.monotonic() when the snapshot was taken
+    """
+
+    devices: Mapping[str, DeviceState] = field(default_factory=lambda: MappingProxyType({}))
+    sampled_at: float = 0.0
+
+    def get(self, device: str) -> Optional[DeviceState]:
+        """
+        Get the state of a device.
+
+        Args:
+            device: Device string (e.g., "cuda:0")
+
+        Returns:
+            Device state, or None if the device was not sampled
+        """
+        return self.devices.get(device)
+
+    def age_ms(self) -> float:
+        """
+        Get the time since the snapshot was taken.
+
+        Returns:
+            Age in milliseconds
+        """
+        return (time.monotonic() - self.sampled_at) * 1000.0
+
+
+class DeviceBackend:
+    """
+    Source of device state.
+
+    The default implementation queries CUDA through torch. Tests can pass
+    a backend that returns canned states instead.
+    """
+
+    def is_available(self) -> bool:
+        """
+        Check whether any GPU can be used.
+
+        Returns:
+            True if CUDA is available
+        """
+        return torch.cuda.is_available()
+
+    def device_count(self) -> int:
+        """
+        Get the number of GPUs.
+
+        Returns:
+            Number of CUDA devices (0 on a CPU-only host)
+        """
+        return torch.cuda.device_count() if self.is_available() else 0
+
+    def sample(self, index: int) -> DeviceState:
+        """
+        Query the current state of one GPU.
+
+        Args:
+            index: CUDA device index
+
+        Returns:
+            Current device state
+        """
+        allocated = torch.cuda.memory_allocated(index) / _MB
+        try:
+            free_bytes, total_bytes = torch.cuda.mem_get_info(index)
+            free, total = free_bytes / _MB, total_bytes / _MB
+        except RuntimeError:
+            total = torch.cuda.get_device_properties(index).total_memory / _MB
+            free = total - allocated
+        try:
+            # Needs pynvml; not every install has it
+            utilization = float(torch.cuda.utilization(index))
+        except Exception:
+            utilization = None
+        return DeviceState(
+            device=f"cuda:{index}",
+            total_memory_mb=total,
+            free_memory_mb=free,
+            allocated_memory_mb=allocated,
+            utilization=utilization
+        )
+
+
+class DeviceStateSampler:
+    """
+    Periodically samples every device and publishes an immutable snapshot.
+
+    Readers call ``snapshot()`` and never touch the driver. Publishing
+    replaces the snapshot reference in one assignment, so readers always see
+    a complete, consistent snapshot without taking a lock.
+    """
+
+    def __init__(self, backend: Optional[DeviceBackend] = None, interval_s: float = 0.5):
+        """
+        Initialize the sampler and take a first sample.
+
+        Args:
+            backend: Source of device state (defaults to CUDA via torch)
+            interval_s: Seconds between background refreshes
+        """
+        if interval_s <= 0:
+            raise ValueError("interval_s must be positive")
+        self.backend = backend if backend is not None else DeviceBackend()
+        self.interval_s = interval_s
+        self.available = self.backend.is_available()
+        self.device_count = self.backend.device_count() if self.available else 0
+        self._snapshot = DeviceSnapshot(sampled_at=time.monotonic())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh()
+
+    def snapshot(self) -> DeviceSnapshot:
+        """
+        Get the latest published snapshot.
+
+        Returns:
+            Most recent device snapshot
+        """
+        return self._snapshot
+
+    def refresh(self) -> DeviceSnapshot:
+        """
+        Sample every device now and publish the result.
+
+        A device that fails to sample keeps its previous state.
+
+        Returns:
+            The newly published snapshot
+        """
+        previous = self._snapshot
+        states: Dict[str, DeviceState] = {}
+        for index in range(self.device_count):
+            device = f"cuda:{index}"
+            try:
+                states[device] = self.backend.sample(index)
+            except Exception as e:
+                print(f"Warning: failed to sample {device}: {e}")
+                if previous.get(device) is not None:
+                    states[device] = previous.get(device)
+        self._snapshot = DeviceSnapshot(MappingProxyType(states), time.monotonic())
+        return self._snapshot
+
+    def start(self):
+        """
+        Start refreshing in a background thread.
+
+        Does nothing on a host without GPUs, where the state never changes.
+        """
+        if self.device_count == 0 or self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="device-state-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and wait for it to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self) -> bool:
+        """
+        Check whether the background thread is running.
+
+        Returns:
+            True if the sampler is refreshing in the background
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        """Refresh until stopped."""
+        while not self._stop.wait(self.interval_s):
+            self.refresh()
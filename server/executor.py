@@ -6,95 +6,265 @@ scheduled device. It handles device-specific operations and ensures
 proper tensor placement.
 """
 
-from typing import Dict, Any
+from typing import Dict, List, Optional, Sequence, Tuple
+import copy
 import threading
 import torch
 import torch.nn as nn
 
+try:
+    from .models import backends
+    from .models import precision as precisions
+    from .telemetry import TelemetryCollector
+except ImportError:
+    from models import backends
+    from models import precision as precisions
+    from telemetry import TelemetryCollector
+
+
+def normalize_device(device: str) -> str:
+    """
+    Normalize a device string so equivalent devices share one replica.
+
+    Args:
+        device: Device string ("cpu", "cuda", "cuda:1", etc.)
+
+    Returns:
+        Canonical device string ("cpu" or "cuda:<index>")
+    """
+    parsed = torch.device(device)
+    if parsed.type == "cuda":
+        return f"cuda:{parsed.index if parsed.index is not None else 0}"
+    return parsed.type
+
 
 class Executor:
     """
     Executes inference requests on the specified device.
-    
-    The executor manages model loading and inference execution,
-    handling device placement and tensor operations.
+
+    The executor keeps one resident model replica per device and precision.
+    Replicas are built lazily the first time they are used and reused
+    afterwards, so requests never move weights between devices and requests
+    routed to different devices run concurrently. Each replica runs on the
+    configured execution backend (see models/backends.py) at its numeric
+    precision (see models/precision.py).
     """
-    
-    def __init__(self, model: nn.Module, device: str = "cpu"):
+
+    def __init__(
+        self,
+        model: nn.Module,
+        device: str = "cpu",
+        backend: str = backends.EAGER,
+        warmup_batch_sizes: Optional[Sequence[int]] = None,
+        precision: str = precisions.FP32
+    ):
         """
         Initialize the executor with a model.
-        
+
+        The replica for the initial device is built and warmed up right away,
+        so backend preparation happens at startup rather than on the first request.
+
         Args:
-            model: PyTorch model instance
+            model: PyTorch model instance (eager, fp32)
             device: Target device for execution ("cpu" or "cuda:0", etc.)
+            backend: Execution backend ("eager", "torchscript", "compile" or "auto")
+            warmup_batch_sizes: Batch sizes to warm up each replica with
+                (defaults to backends.DEFAULT_WARMUP_BATCH_SIZES for non-eager backends)
+            precision: Default precision ("fp32", "bf16" or "int8-dynamic");
+                requests may ask for a higher one
         """
-        self.model = model
-        self.device = device
+        if backend != backends.AUTO and backend not in backends.BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}")
+        self.precision = precisions.validate_precision(precision)
+        self.device = normalize_device(device)
         # Ensure model is on the correct device
-        self.model = self.model.to(device)
+        self.model = model.to(self.device)
         self.model.eval()
-        # Lock to ensure atomic device changes and execution
+        # Eager source model; replicas for other devices are copied from it
+        self._source_model = self.model
+        self._source_device = self.device
+        if warmup_batch_sizes is None:
+            warmup_batch_sizes = () if backend == backends.EAGER else backends.DEFAULT_WARMUP_BATCH_SIZES
+        self.warmup_batch_sizes = tuple(warmup_batch_sizes)
+        # Resident replicas keyed by (normalized device string, precision)
+        self._replicas: Dict[Tuple[str, str], nn.Module] = {}
+        # Guards replica creation only; inference itself runs without a lock
         self._lock = threading.Lock()
-        
-    def execute(self, input_data: torch.Tensor, device: str = None) -> torch.Tensor:
+        # Mean ms per forward for each backend timed by "auto"
+        self.backend_timings: Dict[str, float] = {}
+
+        initial_precision = self.resolve_precision(None, self.device)
+        if backend == backends.AUTO:
+            replica, backend, self.backend_timings = backends.select_backend(
+                self._precision_base(self.device, initial_precision),
+                self.device,
+                self.warmup_batch_sizes or backends.DEFAULT_WARMUP_BATCH_SIZES
+            )
+            self.backend = backend
+        else:
+            self.backend = backend
+            replica = self._build_replica(self.device, initial_precision)
+        self._replicas[(self.device, initial_precision)] = replica
+
+    def resolve_precision(self, min_precision: Optional[str] = None, device: Optional[str] = None) -> str:
+        """
+        Choose the precision a request runs at.
+
+        Args:
+            min_precision: Lowest precision the request accepts (None for no constraint)
+            device: Device the request runs on (defaults to the current device)
+
+        Returns:
+            The configured precision, raised to min_precision and to what the device supports
+        """
+        device = normalize_device(device) if device is not None else self.device
+        return precisions.resolve_precision(self.precision, min_precision, device)
+
+    def _precision_base(self, device: str, precision: str) -> nn.Module:
+        """
+        Get an eager model on the device converted to the given precision.
+
+        Args:
+            device: Normalized target device
+            precision: Precision to convert to
+
+        Returns:
+            Eager model in eval mode
+        """
+        if device == self._source_device:
+            base = self._source_model
+        else:
+            base = copy.deepcopy(self._source_model).to(device)
+            base.eval()
+        return precisions.apply_precision(base, precision, device)
+
+    def _build_replica(self, device: str, precision: str) -> nn.Module:
+        """
+        Create a new model replica on the given device.
+
+        Args:
+            device: Normalized target device
+            precision: Precision of the replica
+
+        Returns:
+            Warmed-up replica in eval mode on the target device
+        """
+        base = self._precision_base(device, precision)
+        replica, used = backends.prepare_backend(base, self.backend, device, self.warmup_batch_sizes)
+        if used != self.backend and device == self._source_device:
+            # The configured backend does not work here at all; report what runs
+            self.backend = used
+        return replica
+
+    def get_replica(self, device: str, precision: Optional[str] = None) -> nn.Module:
+        """
+        Get the resident replica for a device, creating it on first use.
+
+        Args:
+            device: Target device ("cpu" or "cuda:0", etc.)
+            precision: Replica precision (defaults to the configured precision
+                as supported on the device)
+
+        Returns:
+            Model replica resident on the device
+        """
+        device = normalize_device(device)
+        if precision is None:
+            precision = self.resolve_precision(None, device)
+        key = (device, precision)
+        replica = self._replicas.get(key)
+        if replica is not None:
+            return replica
+
+        with self._lock:
+            # Another thread may have built it while we waited for the lock
+            replica = self._replicas.get(key)
+            if replica is None:
+                replica = self._build_replica(device, precision)
+                self._replicas[key] = replica
+        return replica
+
+    def resident_devices(self) -> List[str]:
+        """
+        Get the devices that currently hold a model replica.
+
+        Returns:
+            List of normalized device strings
+        """
+        return list(dict.fromkeys(device for device, _ in self._replicas))
+
+    def resident_replicas(self) -> List[Tuple[str, str]]:
+        """
+        Get the (device, precision) pairs that currently hold a model replica.
+
+        Returns:
+            List of (normalized device string, precision) tuples
+        """
+        return list(self._replicas.keys())
+
+    def execute(
+        self,
+        input_data: torch.Tensor,
+        device: str = None,
+        precision: Optional[str] = None,
+        telemetry: Optional[TelemetryCollector] = None
+    ) -> torch.Tensor:
         """
         Execute inference on the input data.
-        
+
         Args:
             input_data: Input tensor (will be moved to the specified device)
             device: Optional device to execute on. If None, uses executor's current device.
                     When provided, executes on this device without modifying executor state.
-        
+            precision: Optional precision to execute at (see resolve_precision).
+                    If None, uses the configured precision.
+            telemetry: Optional collector that receives "h2d_copy" and "forward" spans
+
         Returns:
-            Output tensor from the model
+            Output tensor from the model (float32)
         """
         # Use provided device or fall back to executor's device
-        execution_device = device if device is not None else self.device
-        
+        execution_device = normalize_device(device) if device is not None else self.device
+        replica = self.get_replica(execution_device, precision)
+        # Kernels run asynchronously on CUDA; wait for them so spans are accurate
+        synchronize = telemetry is not None and execution_device.startswith("cuda")
+        if telemetry is not None:
+            started = telemetry.start_span()
+
         # Move input to the execution device (this is safe, doesn't modify executor state)
         input_tensor = input_data.to(execution_device)
-        
-        # Use lock to ensure atomic device changes and execution
-        with self._lock:
-            # Handle device placement: preserve executor state if using different device
-            model_was_moved = False
-            original_device = None
-            
-            if device is not None and device != self.device:
-                # Store original device and move model temporarily
-                original_device = self.device
-                self.model = self.model.to(execution_device)
-                model_was_moved = True
-            
-            try:
-                # Run inference (no gradient computation needed)
-                with torch.no_grad():
-                    output = self.model(input_tensor)
-            finally:
-                # Restore model to original device if it was moved
-                if model_was_moved and original_device is not None:
-                    self.model = self.model.to(original_device)
-        
+        if telemetry is not None:
+            if synchronize:
+                torch.cuda.synchronize(execution_device)
+            started = telemetry.end_span("h2d_copy", started)
+
+        # Run inference (no gradient computation needed). Replicas are read-only
+        # during inference, so concurrent requests can share them safely.
+        with torch.no_grad():
+            output = replica(input_tensor)
+        if telemetry is not None:
+            if synchronize:
+                torch.cuda.synchronize(execution_device)
+            telemetry.end_span("forward", started)
+
         return output
-    
+
     def set_device(self, device: str):
         """
-        Change the execution device.
-        
+        Change the default execution device.
+
         Args:
             device: New target device ("cpu" or "cuda:0", etc.)
         """
+        self.get_replica(device)
         with self._lock:
-            self.device = device
-            self.model = self.model.to(device)
-            self.model.eval()
-    
+            self.device = normalize_device(device)
+
     def get_device(self) -> str:
         """
         Get the current execution device.
-        
+
         Returns:
             Current device string
         """
         return self.device
-
@@ -0,0 +1,104 @@
+"""
+Thread pool for running inference off the asyncio event loop.
+
+A torch forward pass holds the calling thread for its whole duration, so
+running it inside an ``async def`` endpoint stalls every other request on the
+event loop. The pool gives inference its own worker threads and controls how
+many intra-op threads each forward pass may use, so that concurrent requests
+share the CPU cores instead of oversubscribing them.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import os
+import torch
+
+
+def default_pool_size(cpu_count: Optional[int] = None) -> int:
+    """
+    Choose a pool size when none is configured.
+
+    Args:
+        cpu_count: Number of CPU cores (defaults to os.cpu_count())
+
+    Returns:
+        Number of pool workers
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, min(4, cpu_count))
+
+
+def default_intra_op_threads(pool_size: int, cpu_count: Optional[int] = None) -> int:
+    """
+    Split the CPU cores evenly between pool workers.
+
+    Args:
+        pool_size: Number of pool workers
+        cpu_count: Number of CPU cores (defaults to os.cpu_count())
+
+    Returns:
+        Intra-op threads per forward pass
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // max(1, pool_size))
+
+
+class InferencePool(ThreadPoolExecutor):
+    """
+    Sized thread pool for inference work.
+
+    Each worker thread sets ``torch.set_num_threads`` when it starts, so that
+    ``max_workers * intra_op_threads`` roughly matches the available cores.
+    The inter-op thread count is process-wide in PyTorch and can only be set
+    once, before any parallel work has run; it is applied when the pool is
+    created.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers: Number of worker threads (0 or None picks a default)
+            intra_op_threads: torch intra-op threads per worker (0 or None splits cores evenly)
+            inter_op_threads: torch inter-op threads (0 or None keeps torch's default)
+        """
+        self.pool_size = max_workers or default_pool_size()
+        self.intra_op_threads = intra_op_threads or default_intra_op_threads(self.pool_size)
+        self.inter_op_threads = inter_op_threads or None
+
+        if self.inter_op_threads is not None:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError as e:
+                # Raised when inter-op work already ran in this process
+                print(f"Warning: could not set inter-op threads to {self.inter_op_threads}: {e}")
+                self.inter_op_threads = torch.get_num_interop_threads()
+
+        super().__init__(
+            max_workers=self.pool_size,
+            thread_name_prefix="inference",
+            initializer=self._initialize_worker
+        )
+
+    def _initialize_worker(self):
+        """Apply the intra-op thread setting in a new worker thread."""
+        torch.set_num_threads(self.intra_op_threads)
+
+    def describe(self) -> Dict[str, int]:
+        """
+        Describe the pool configuration.
+
+        Returns:
+            Dictionary with pool size and thread settings
+        """
+        return {
+            "pool_size": self.pool_size,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads or torch.get_num_interop_threads()
+        }
@@ -0,0 +1,219 @@
+"""
+Latency histograms exposed in Prometheus text format.
+
+Each finished request contributes its stage spans (see TelemetryCollector)
+to per-stage histograms labelled with the device and the request's batch
+size bucket. ``render`` produces the text exposition format served on
+``/metrics``.
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import threading
+
+try:
+    from .telemetry import TelemetryCollector
+except ImportError:
+    from telemetry import TelemetryCollector
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from 50 µs to 2.5 s
+DEFAULT_LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+# Upper bounds of the batch size buckets used as a label
+BATCH_SIZE_BUCKETS = (1, 4, 16, 64, 256)
+
+
+def batch_size_bucket(batch_size: int) -> str:
+    """
+    Map a batch size to a coarse label so label cardinality stays bounded.
+
+    Args:
+        batch_size: Rows in the request
+
+    Returns:
+        Bucket label such as "1", "2-4" or "257+"
+    """
+    lower = 1
+    for upper in BATCH_SIZE_BUCKETS:
+        if batch_size <= upper:
+            return str(upper) if lower == upper else f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{lower}+"
+
+
+def _format_value(value: float) -> str:
+    """Format a number the way Prometheus expects."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    """Format label pairs as {name="value",...}."""
+    if not labels:
+        return ""
+    pairs = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observations.
+
+    Buckets are stored non-cumulatively and summed when rendered.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            buckets: Sorted upper bounds (an implicit +Inf bucket is added)
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        """
+        Get the cumulative count at each upper bound.
+
+        Returns:
+            List of (upper bound, observations <= bound), ending with +Inf
+        """
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+class MetricsRegistry:
+    """
+    Aggregates per-request telemetry into Prometheus metrics.
+
+    Metrics:
+    - ``inference_stage_seconds{stage,device,batch_size}``: histogram per stage
+    - ``inference_request_seconds{device,batch_size}``: end-to-end latency histogram
+    - ``inference_request_errors_total{device}``: failed requests
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        Initialize an empty registry.
+
+        Args:
+            buckets: Histogram upper bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self._stages: Dict[Tuple[str, str, str], Histogram] = {}
+        self._requests: Dict[Tuple[str, str], Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, telemetry: TelemetryCollector, batch_size: int):
+        """
+        Record a finished request.
+
+        Args:
+            telemetry: Stopped collector holding the request's spans
+            batch_size: Rows in the request
+        """
+        device = telemetry.device or "unknown"
+        bucket = batch_size_bucket(batch_size)
+        with self._lock:
+            for stage, seconds in telemetry.spans.items():
+                key = (stage, device, bucket)
+                histogram = self._stages.get(key)
+                if histogram is None:
+                    histogram = self._stages[key] = Histogram(self.buckets)
+                histogram.observe(seconds)
+            histogram = self._requests.get((device, bucket))
+            if histogram is None:
+                histogram = self._requests[(device, bucket)] = Histogram(self.buckets)
+            histogram.observe(telemetry.get_latency_ms() / 1000.0)
+
+    def observe_error(self, device: str):
+        """
+        Record a failed request.
+
+        Args:
+            device: Device the request was scheduled to ("unknown" if none)
+        """
+        with self._lock:
+            self._errors[device] = self._errors.get(device, 0) + 1
+
+    def stage_histogram(self, stage: str, device: str, batch_size: int) -> Histogram:
+        """
+        Get the histogram for a stage, device and batch size.
+
+        Args:
+            stage: Stage name
+            device: Device string
+            batch_size: Rows in the request (mapped to its bucket)
+
+        Returns:
+            The histogram, or an empty one if nothing was recorded
+        """
+        key = (stage, device, batch_size_bucket(batch_size))
+        return self._stages.get(key) or Histogram(self.buckets)
+
+    def render(self) -> str:
+        """
+        Render every metric in Prometheus text exposition format.
+
+        Returns:
+            Metrics text
+        """
+        lines: List[str] = []
+        with self._lock:
+            lines.append("# HELP inference_stage_seconds Time spent in each request stage.")
+            lines.append("# TYPE inference_stage_seconds histogram")
+            for (stage, device, bucket), histogram in sorted(self._stages.items()):
+                labels = [("stage", stage), ("device", device), ("batch_size", bucket)]
+                self._render_histogram(lines, "inference_stage_seconds", labels, histogram)
+
+            lines.append("# HELP inference_request_seconds End-to-end request latency.")
+            lines.append("# TYPE inference_request_seconds histogram")
+            for (device, bucket), histogram in sorted(self._requests.items()):
+                labels = [("device", device), ("batch_size", bucket)]
+                self._render_histogram(lines, "inference_request_seconds", labels, histogram)
+
+            lines.append("# HELP inference_request_errors_total Requests that failed during execution.")
+            lines.append("# TYPE inference_request_errors_total counter")
+            for device, count in sorted(self._errors.items()):
+                lines.append(f"inference_request_errors_total{_format_labels([('device', device)])} {count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(
+        lines: List[str], name: str, labels: List[Tuple[str, str]], histogram: Histogram
+    ):
+        """Append the bucket, sum and count lines of one histogram."""
+        for bound, count in histogram.cumulative_counts():
+            bucket_labels = _format_labels(labels + [("le", _format_value(bound))])
+            lines.append(f"{name}_bucket{bucket_labels} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
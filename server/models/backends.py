@@ -0,0 +1,221 @@
+"""
+Execution backends for inference models.
+
+A backend turns an eager ``nn.Module`` into the module that actually serves
+requests:
+- ``eager``: the module as-is
+- ``torchscript``: traced with ``torch.jit.trace`` and frozen
+- ``compile``: wrapped with ``torch.compile`` (inductor)
+
+Backends are warmed up for a set of batch sizes before serving so that
+lazy initialization (tracing, compilation, allocator growth) is paid at
+startup instead of by the first requests. The ``auto`` choice times every
+backend and keeps the fastest.
+"""
+
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import time
+import warnings
+import torch
+import torch.nn as nn
+
+
+EAGER = "eager"
+TORCHSCRIPT = "torchscript"
+COMPILE = "compile"
+AUTO = "auto"
+
+BACKENDS = (EAGER, TORCHSCRIPT, COMPILE)
+
+DEFAULT_WARMUP_BATCH_SIZES = (1, 8, 32)
+
+
+def input_features(model: nn.Module) -> int:
+    """
+    Find the number of input features a model expects.
+
+    Args:
+        model: Eager model whose first linear layer defines the input size
+
+    Returns:
+        Input feature count
+    """
+    for module in model.modules():
+        if isinstance(module, nn.Linear):
+            return module.in_features
+        if hasattr(module, "in_features"):
+            return int(module.in_features)
+    raise ValueError("Cannot infer input features: model has no linear layer")
+
+
+def example_input(model: nn.Module, device: str, batch_size: int = 1) -> torch.Tensor:
+    """
+    Create a random input batch for tracing, warm-up and timing.
+
+    Args:
+        model: Eager model
+        device: Device to place the input on
+        batch_size: Number of rows
+
+    Returns:
+        Random float32 input tensor
+    """
+    return torch.randn(batch_size, input_features(model), device=device)
+
+
+def build_backend(
+    model: nn.Module,
+    backend: str,
+    device: str,
+    example_batch_size: int = 1
+) -> nn.Module:
+    """
+    Wrap an eager model in the requested backend.
+
+    Args:
+        model: Eager model already placed on ``device`` and in eval mode
+        backend: One of BACKENDS
+        device: Device the model lives on
+        example_batch_size: Batch size of the example used for tracing
+
+    Returns:
+        Module that serves requests with the chosen backend
+    """
+    if backend == EAGER:
+        return model
+
+    if backend == TORCHSCRIPT:
+        example = example_input(model, device, example_batch_size)
+        with warnings.catch_warnings(), torch.no_grad():
+            # TorchScript is deprecated upstream but still the cheapest graph mode here
+            warnings.simplefilter("ignore", FutureWarning)
+            traced = torch.jit.trace(model, example)
+            return torch.jit.freeze(traced.eval())
+
+    if backend == COMPILE:
+        return torch.compile(model)
+
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+def warm_up(module: nn.Module, reference: nn.Module, device: str, batch_sizes: Iterable[int]):
+    """
+    Run the module once per batch size so lazy initialization happens now.
+
+    Args:
+        module: Backend module to warm up
+        reference: Eager model (used to size the inputs)
+        device: Device the module lives on
+        batch_sizes: Batch sizes to run
+    """
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            module(example_input(reference, device, batch_size))
+
+
+def time_backend(
+    module: nn.Module,
+    reference: nn.Module,
+    device: str,
+    batch_sizes: Sequence[int],
+    iterations: int = 20
+) -> float:
+    """
+    Measure the mean time of one forward pass over the given batch sizes.
+
+    Args:
+        module: Warmed-up backend module
+        reference: Eager model (used to size the inputs)
+        device: Device the module lives on
+        batch_sizes: Batch sizes to time
+        iterations: Forward passes per batch size
+
+    Returns:
+        Mean seconds per forward pass
+    """
+    inputs = [example_input(reference, device, batch_size) for batch_size in batch_sizes]
+    is_cuda = device.startswith("cuda")
+    with torch.no_grad():
+        if is_cuda:
+            torch.cuda.synchronize(device)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for batch in inputs:
+                module(batch)
+        if is_cuda:
+            torch.cuda.synchronize(device)
+        elapsed = time.perf_counter() - started
+    return elapsed / (iterations * max(1, len(inputs)))
+
+
+def prepare_backend(
+    model: nn.Module,
+    backend: str,
+    device: str,
+    warmup_batch_sizes: Sequence[int] = DEFAULT_WARMUP_BATCH_SIZES
+) -> Tuple[nn.Module, str]:
+    """
+    Build and warm up a backend, falling back to eager if it is unavailable.
+
+    ``torch.compile`` needs a working C++ toolchain and TorchScript cannot
+    trace every device, so a failing backend degrades to eager instead of
+    taking the server down.
+
+    Args:
+        model: Eager model on ``device`` in eval mode
+        backend: One of BACKENDS
+        device: Device the model lives on
+        warmup_batch_sizes: Batch sizes to warm up
+
+    Returns:
+        Tuple of (serving module, backend actually used)
+    """
+    example_batch_size = warmup_batch_sizes[0] if warmup_batch_sizes else 1
+    try:
+        module = build_backend(model, backend, device, example_batch_size)
+        warm_up(module, model, device, warmup_batch_sizes)
+        return module, backend
+    except Exception as e:
+        if backend == EAGER:
+            raise
+        print(f"Warning: {backend} backend unavailable on {device}, using eager: {e}")
+        warm_up(model, model, device, warmup_batch_sizes)
+        return model, EAGER
+
+
+def select_backend(
+    model: nn.Module,
+    device: str,
+    warmup_batch_sizes: Sequence[int] = DEFAULT_WARMUP_BATCH_SIZES,
+    candidates: Sequence[str] = BACKENDS
+) -> Tuple[nn.Module, str, Dict[str, float]]:
+    """
+    Time every candidate backend and keep the fastest.
+
+    Args:
+        model: Eager model on ``device`` in eval mode
+        device: Device the model lives on
+        warmup_batch_sizes: Batch sizes used for warm-up and timing
+        candidates: Backends to try
+
+    Returns:
+        Tuple of (fastest module, its backend name, mean ms per forward for each backend that built)
+    """
+    batch_sizes = list(warmup_batch_sizes) or [1]
+    timings: Dict[str, float] = {}
+    best: Optional[Tuple[nn.Module, str, float]] = None
+
+    for candidate in candidates:
+        module, used = prepare_backend(model, candidate, device, batch_sizes)
+        if used != candidate:
+            # Fell back to eager; eager is timed on its own
+            continue
+        seconds = time_backend(module, model, device, batch_sizes)
+        timings[candidate] = round(seconds * 1000.0, 4)
+        if best is None or seconds < best[2]:
+            best = (module, candidate, seconds)
+
+    if best is None:
+        module, used = prepare_backend(model, EAGER, device, batch_sizes)
+        return module, used, timings
+    return best[0], best[1], timings
@@ -0,0 +1,195 @@
+"""
+Numeric precision modes for inference models.
+
+A precision mode turns an fp32 eager model into a cheaper variant:
+- ``fp32``: the model as-is
+- ``bf16``: forward passes run under bfloat16 autocast, outputs are float32
+- ``int8-dynamic``: ``nn.Linear`` weights quantized to int8, activations
+  quantized on the fly (CPU only)
+
+Modes are ordered by fidelity (int8-dynamic < bf16 < fp32). A request may
+state the minimum precision it accepts; it is then served at the configured
+precision or, if that is too low, at its minimum.
+"""
+
+from typing import Dict, Optional
+import copy
+import warnings
+import torch
+import torch.nn as nn
+
+
+FP32 = "fp32"
+BF16 = "bf16"
+INT8_DYNAMIC = "int8-dynamic"
+
+# Ordered from lowest to highest fidelity
+PRECISIONS = (INT8_DYNAMIC, BF16, FP32)
+
+
+class AutocastModule(nn.Module):
+    """
+    Runs a model under autocast and returns float32 outputs.
+
+    Callers keep sending and receiving float32 tensors; only the matmuls
+    inside the forward pass run in the reduced dtype.
+    """
+
+    def __init__(self, model: nn.Module, dtype: torch.dtype = torch.bfloat16):
+        super(AutocastModule, self).__init__()
+        self.model = model
+        self.dtype = dtype
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """Forward pass under autocast for the input's device type."""
+        with torch.autocast(device_type=x.device.type, dtype=self.dtype):
+            output = self.model(x)
+        return output.float()
+
+
+def validate_precision(precision: str) -> str:
+    """
+    Check that a precision name is known.
+
+    Args:
+        precision: Precision name
+
+    Returns:
+        The precision name
+
+    Raises:
+        ValueError: If the precision is unknown
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {PRECISIONS}")
+    return precision
+
+
+def rank(precision: str) -> int:
+    """
+    Get the fidelity rank of a precision (higher is more precise).
+
+    Args:
+        precision: Precision name
+
+    Returns:
+        Index of the precision in PRECISIONS
+    """
+    return PRECISIONS.index(validate_precision(precision))
+
+
+def is_supported(precision: str, device: str) -> bool:
+    """
+    Check whether a precision can run on a device.
+
+    Args:
+        precision: Precision name
+        device: Device string
+
+    Returns:
+        True if the precision can run on the device
+    """
+    if precision == INT8_DYNAMIC:
+        # Dynamic quantized kernels exist for CPU only
+        return torch.device(device).type == "cpu"
+    return True
+
+
+def resolve_precision(configured: str, minimum: Optional[str], device: str) -> str:
+    """
+    Choose the precision to serve a request with.
+
+    Starts from the configured precision, raises it to the request's minimum
+    and then to the first precision the device supports.
+
+    Args:
+        configured: Server's configured precision
+        minimum: Lowest precision the request accepts (None for no constraint)
+        device: Device the request runs on
+
+    Returns:
+        Precision to execute with
+    """
+    index = rank(configured)
+    if minimum is not None:
+        index = max(index, rank(minimum))
+    for precision in PRECISIONS[index:]:
+        if is_supported(precision, device):
+            return precision
+    return FP32
+
+
+def apply_precision(model: nn.Module, precision: str, device: str) -> nn.Module:
+    """
+    Convert an fp32 model to the given precision.
+
+    The input model is never modified.
+
+    Args:
+        model: fp32 eager model on ``device`` in eval mode
+        precision: One of PRECISIONS
+        device: Device the model lives on
+
+    Returns:
+        Model that runs at the requested precision
+
+    Raises:
+        ValueError: If the precision is unknown or unsupported on the device
+    """
+    validate_precision(precision)
+    if not is_supported(precision, device):
+        raise ValueError(f"Precision {precision!r} is not supported on {device}")
+
+    if precision == FP32:
+        return model
+
+    if precision == BF16:
+        return AutocastModule(model, torch.bfloat16).eval()
+
+    with warnings.catch_warnings():
+        # Eager-mode quantization is deprecated upstream but has no in-tree replacement
+        warnings.simplefilter("ignore", DeprecationWarning)
+        warnings.simplefilter("ignore", UserWarning)
+        quantized = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8
+        )
+    return quantized.eval()
+
+
+def compare_to_fp32(
+    model: nn.Module,
+    precision: str,
+    device: str = "cpu",
+    batch_size: int = 256,
+    seed: int = 0
+) -> Dict[str, float]:
+    """
+    Measure how far a precision mode's outputs are from fp32.
+
+    Args:
+        model: fp32 eager model on ``device`` in eval mode
+        precision: Precision to compare
+        device: Device to run on
+        batch_size: Number of random input rows
+        seed: Seed for the random inputs
+
+    Returns:
+        Dictionary with max_abs_error, mean_abs_error and relative_error
+        (mean absolute error divided by the mean absolute fp32 output)
+    """
+    generator = torch.Generator().manual_seed(seed)
+    in_features = next(m.in_features for m in model.modules() if isinstance(m, nn.Linear))
+    inputs = torch.randn(batch_size, in_features, generator=generator).to(device)
+    candidate = apply_precision(model, precision, device)
+
+    with torch.no_grad():
+        reference = model(inputs).float()
+        output = candidate(inputs).float()
+
+    error = (output - reference).abs()
+    scale = reference.abs().mean().clamp_min(1e-12)
+    return {
+        "max_abs_error": error.max().item(),
+        "mean_abs_error": error.mean().item(),
+        "relative_error": (error.mean() / scale).item(),
+    }
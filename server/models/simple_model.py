@@ -8,6 +8,8 @@ The model is intentionally small for PoC purposes.
 import torch
 import torch.nn as nn
 
+from .precision import FP32, apply_precision
+
 
 class SimpleMLP(nn.Module):
     """
@@ -33,12 +35,13 @@ class SimpleMLP(nn.Module):
         return x
 
 
-def create_model(device: str = "cpu") -> nn.Module:
+def create_model(device: str = "cpu", precision: str = FP32) -> nn.Module:
     """
     Create and initialize the model on the specified device.
     
     Args:
         device: Target device ("cpu" or "cuda:0", "cuda:1", etc.)
+        precision: Numeric precision ("fp32", "bf16" or "int8-dynamic")
     
     Returns:
         Model instance on the specified device
@@ -46,5 +49,5 @@ def create_model(device: str = "cpu") -> nn.Module:
     model = SimpleMLP()
     model = model.to(device)
     model.eval()  # Set to evaluation mode for inference
-    return model
+    return apply_precision(model, precision, device)
 
@@ -3,10 +3,16 @@ Scheduler for deciding execution target (CPU vs GPU).
 
 The scheduler inspects request constraints and GPU availability to make
 routing decisions. This is a simple implementation suitable for PoC.
+Device state comes from a DeviceStateSampler snapshot, so scheduling makes
+no driver calls.
 """
 
 from typing import Optional
-import torch
+
+try:
+    from .device_monitor import DeviceStateSampler
+except ImportError:
+    from device_monitor import DeviceStateSampler
 
 
 class Scheduler:
@@ -19,15 +25,27 @@ class Scheduler:
     - GPU memory availability
     """
     
-    def __init__(self, default_gpu_device: str = "cuda:0"):
+    def __init__(self, default_gpu_device: str = "cuda:0", sampler: Optional[DeviceStateSampler] = None):
         """
         Initialize the scheduler.
         
         Args:
             default_gpu_device: Default CUDA device to use (e.g., "cuda:0")
+            sampler: Device state sampler to read from. If None, the scheduler
+                creates and starts its own.
         """
         self.default_gpu_device = default_gpu_device
-        self.cuda_available = torch.cuda.is_available()
+        self._owns_sampler = sampler is None
+        if sampler is None:
+            sampler = DeviceStateSampler()
+            sampler.start()
+        self.sampler = sampler
+        self.cuda_available = sampler.available
+    
+    def close(self):
+        """Stop the device sampler if the scheduler created it."""
+        if self._owns_sampler:
+            self.sampler.stop()
         
     def is_gpu_available(self) -> bool:
         """
@@ -42,6 +60,8 @@ class Scheduler:
         """
         Get free GPU memory in MB for the specified device.
         
+        Reads the latest sampled snapshot; no driver calls are made.
+        
         Args:
             device: CUDA device string (e.g., "cuda:0")
         
@@ -51,14 +71,10 @@ class Scheduler:
         if not self.cuda_available:
             return None
         
-        try:
-            device_idx = int(device.split(":")[1])
-            total = torch.cuda.get_device_properties(device_idx).total_memory / (1024 ** 2)
-            allocated = torch.cuda.memory_allocated(device_idx) / (1024 ** 2)
-            free = total - allocated
-            return free
-        except (IndexError, ValueError, RuntimeError):
+        state = self.sampler.snapshot().get(device)
+        if state is None:
             return None
+        return state.free_memory_mb
     
     def schedule(self, prefer_gpu: bool = True, min_gpu_memory_mb: float = 100.0) -> str:
         """
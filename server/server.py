@@ -5,24 +5,45 @@ This is the main entrypoint for the inference server. It handles HTTP requests,
 coordinates scheduling and execution, and returns results with telemetry.
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel, ValidationError
+from typing import List, Literal, Optional, Tuple
+import asyncio
 import torch
 import uvicorn
 
 # Support both relative imports (when run as module) and absolute imports (when run as script)
 try:
     from .scheduler import Scheduler
+    from .device_monitor import DeviceStateSampler
     from .executor import Executor
     from .telemetry import TelemetryCollector
     from .models.simple_model import create_model
+    from .batching import MicroBatcher
+    from .config import ServerConfig
+    from .inference_pool import InferencePool
+    from .metrics import MetricsRegistry, PROMETHEUS_CONTENT_TYPE
+    from .models import precision as precisions
+    from . import wire
 except ImportError:
     # Fall back to absolute imports when running as standalone script
     from scheduler import Scheduler
+    from device_monitor import DeviceStateSampler
     from executor import Executor
     from telemetry import TelemetryCollector
     from models.simple_model import create_model
+    from batching import MicroBatcher
+    from config import ServerConfig
+    from inference_pool import InferencePool
+    from metrics import MetricsRegistry, PROMETHEUS_CONTENT_TYPE
+    from models import precision as precisions
+    import wire
+
+
+# Numeric precisions, lowest fidelity first
+Precision = Literal["int8-dynamic", "bf16", "fp32"]
 
 
 # Request/Response models
@@ -31,6 +52,7 @@ class InferenceRequest(BaseModel):
     input_data: List[List[float]]  # 2D array: batch_size x input_dim
     prefer_gpu: bool = True
     min_gpu_memory_mb: float = 100.0
+    min_precision: Optional[Precision] = None  # Lowest precision the caller accepts
 
 
 class InferenceResponse(BaseModel):
@@ -39,6 +61,8 @@ class InferenceResponse(BaseModel):
     device: str  # Device used for execution
     latency_ms: float  # End-to-end latency
     gpu_memory_mb: Optional[float] = None  # GPU memory used (if applicable)
+    queue_wait_ms: Optional[float] = None  # Time spent waiting for a micro-batch
+    precision: Optional[str] = None  # Precision the model ran at
 
 
 # Initialize FastAPI app
@@ -51,6 +75,10 @@ app = FastAPI(
 # Global components (initialized at startup)
 scheduler: Optional[Scheduler] = None
 executor: Optional[Executor] = None
+batcher: Optional[MicroBatcher] = None  # Set when micro-batching is enabled
+inference_pool: Optional[InferencePool] = None  # Runs forward passes off the event loop
+device_sampler: Optional[DeviceStateSampler] = None  # Samples GPU state in the background
+metrics_registry = MetricsRegistry()  # Per-stage latency histograms for /metrics
 
 
 @app.on_event("startup")
@@ -59,14 +87,28 @@ async def startup_event():
     Initialize server components at startup.
     
     This loads the model and initializes the scheduler and executor.
-    The model is loaded once and reused for all requests.
+    The model is loaded once and reused for all requests, and its execution
+    backend is prepared and warmed up before the server accepts traffic.
     """
-    global scheduler, executor
+    global scheduler, executor, batcher, inference_pool, device_sampler
     
     print("Initializing server components...")
+    config = ServerConfig.from_env()
+    
+    # Create the inference pool first so thread settings apply before any torch work
+    inference_pool = InferencePool(
+        max_workers=config.inference_pool_size,
+        intra_op_threads=config.intra_op_threads,
+        inter_op_threads=config.inter_op_threads
+    )
+    print(f"Inference pool: {inference_pool.describe()}")
+    
+    # Sample device state in the background so requests never query the driver
+    device_sampler = DeviceStateSampler(interval_s=config.device_sample_interval_ms / 1000.0)
+    device_sampler.start()
     
     # Initialize scheduler
-    scheduler = Scheduler(default_gpu_device="cuda:0")
+    scheduler = Scheduler(default_gpu_device="cuda:0", sampler=device_sampler)
     
     # Determine initial device (will be updated per request)
     initial_device = scheduler.schedule(prefer_gpu=True)
@@ -74,7 +116,28 @@ async def startup_event():
     
     # Load model on initial device
     model = create_model(device=initial_device)
-    executor = Executor(model, device=initial_device)
+    executor = Executor(
+        model,
+        device=initial_device,
+        backend=config.model_backend,
+        warmup_batch_sizes=config.warmup_batch_sizes,
+        precision=config.model_precision
+    )
+    print(f"Execution backend: {executor.backend}, precision: {executor.precision}")
+    if executor.backend_timings:
+        print(f"Backend timings (ms per forward): {executor.backend_timings}")
+    
+    if config.microbatch_enabled:
+        batcher = MicroBatcher(
+            executor,
+            max_batch_rows=config.microbatch_max_rows,
+            max_wait_ms=config.microbatch_max_wait_ms,
+            thread_pool=inference_pool
+        )
+        print(
+            f"Micro-batching enabled: max_rows={config.microbatch_max_rows}, "
+            f"max_wait_ms={config.microbatch_max_wait_ms}"
+        )
     
     print(f"Server ready. CUDA available: {scheduler.is_gpu_available()}")
     if scheduler.is_gpu_available():
@@ -85,6 +148,22 @@ async def startup_event():
             print("GPU memory free: Unable to retrieve")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Release server components at shutdown.
+    
+    Pending micro-batches are dispatched so no request is left waiting,
+    then the inference pool finishes its queued work and stops.
+    """
+    if batcher is not None:
+        await batcher.flush_all()
+    if inference_pool is not None:
+        inference_pool.shutdown(wait=True)
+    if device_sampler is not None:
+        device_sampler.stop()
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -99,19 +178,186 @@ async def health_check():
     info = {
         "status": "ready",
         "cuda_available": scheduler.is_gpu_available(),
-        "current_device": executor.get_device()
+        "current_device": executor.get_device(),
+        "model_backend": executor.backend,
+        "model_precision": executor.precision
     }
     
+    if executor.backend_timings:
+        info["backend_timings_ms"] = executor.backend_timings
+    
+    if inference_pool is not None:
+        info["inference_pool"] = inference_pool.describe()
+    
     if scheduler.is_gpu_available():
         free_mem = scheduler.get_gpu_memory_free_mb("cuda:0")
         if free_mem is not None:
             info["gpu_memory_free_mb"] = free_mem
+        state = scheduler.sampler.snapshot().get("cuda:0")
+        if state is not None and state.utilization is not None:
+            info["gpu_utilization"] = state.utilization
     
     return info
 
 
-@app.post("/predict", response_model=InferenceResponse, response_model_exclude_none=True)
-async def predict(request: InferenceRequest):
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics endpoint.
+    
+    Exposes per-stage latency histograms (read_body, parse, tensor_build,
+    schedule, queue_wait, h2d_copy, forward, d2h_copy, serialize) labelled
+    by device and batch size bucket, plus end-to-end latency and error counts.
+    
+    Returns:
+        Metrics in Prometheus text exposition format
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _parse_bool_header(value: Optional[str], default: bool) -> bool:
+    """
+    Parse a boolean request header.
+
+    Args:
+        value: Header value ("true"/"false", "1"/"0", "yes"/"no")
+        default: Value to use when the header is absent
+
+    Returns:
+        Parsed boolean
+    """
+    if value is None:
+        return default
+    normalized = value.strip().lower()
+    if normalized in ("1", "true", "yes"):
+        return True
+    if normalized in ("0", "false", "no"):
+        return False
+    raise HTTPException(status_code=400, detail=f"Invalid boolean header value: {value!r}")
+
+
+def _run_inference(
+    input_tensor: torch.Tensor, device: str, precision: str, telemetry: TelemetryCollector
+) -> torch.Tensor:
+    """
+    Run the forward pass and bring the output back to the CPU.
+    
+    Called on an inference pool thread, never on the event loop.
+    
+    Args:
+        input_tensor: Model input
+        device: Device to execute on
+        precision: Precision to execute at
+        telemetry: Collector for the h2d_copy, forward and d2h_copy spans
+    
+    Returns:
+        Model output on the CPU
+    """
+    output = executor.execute(input_tensor, device=device, precision=precision, telemetry=telemetry)
+    started = telemetry.start_span()
+    output_cpu = output.cpu()
+    telemetry.end_span("d2h_copy", started)
+    return output_cpu
+
+
+def _to_list(output_cpu: torch.Tensor, telemetry: TelemetryCollector) -> List[List[float]]:
+    """
+    Convert the output to Python lists for the JSON response.
+    
+    Called on an inference pool thread, never on the event loop.
+    
+    Args:
+        output_cpu: Model output on the CPU
+        telemetry: Collector for the serialize span
+    
+    Returns:
+        Nested list of floats
+    """
+    started = telemetry.start_span()
+    output_list = output_cpu.tolist()
+    telemetry.end_span("serialize", started)
+    return output_list
+
+
+async def _read_request(
+    http_request: Request, telemetry: TelemetryCollector
+) -> Tuple[torch.Tensor, bool, float, Optional[str]]:
+    """
+    Decode the request body according to its content type.
+
+    JSON bodies are validated against InferenceRequest. Binary bodies (raw
+    float32 or .npy) are wrapped zero-copy and carry the scheduling options
+    in the X-Prefer-GPU, X-Min-GPU-Memory-MB and X-Min-Precision headers.
+
+    Args:
+        http_request: Incoming HTTP request
+        telemetry: Collector for the read_body, parse and tensor_build spans
+
+    Returns:
+        Tuple of (input tensor, prefer_gpu, min_gpu_memory_mb, min_precision)
+    """
+    started = telemetry.start_span()
+    body = await http_request.body()
+    started = telemetry.end_span("read_body", started)
+    content_type = wire.media_type(http_request.headers.get("content-type"))
+
+    if content_type in wire.BINARY_CONTENT_TYPES:
+        try:
+            input_tensor = wire.decode_tensor(
+                body, content_type, http_request.headers.get(wire.SHAPE_HEADER)
+            )
+        except wire.WireFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Decoding wraps the body in place, so parsing and tensor building are one step
+        telemetry.end_span("parse", started)
+        prefer_gpu = _parse_bool_header(http_request.headers.get("X-Prefer-GPU"), True)
+        try:
+            min_gpu_memory_mb = float(http_request.headers.get("X-Min-GPU-Memory-MB", 100.0))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid X-Min-GPU-Memory-MB header")
+        min_precision = http_request.headers.get("X-Min-Precision")
+        if min_precision is not None:
+            min_precision = min_precision.strip().lower()
+            if min_precision not in precisions.PRECISIONS:
+                raise HTTPException(status_code=400, detail="Invalid X-Min-Precision header")
+        return input_tensor, prefer_gpu, min_gpu_memory_mb, min_precision
+
+    if content_type not in ("", wire.JSON_CONTENT_TYPE):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+
+    try:
+        request = InferenceRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    started = telemetry.end_span("parse", started)
+    try:
+        input_tensor = torch.tensor(request.input_data, dtype=torch.float32)
+    except (ValueError, TypeError) as e:
+        # Ragged rows pass validation but cannot form a tensor
+        raise HTTPException(status_code=400, detail=f"Invalid input_data: {e}")
+    telemetry.end_span("tensor_build", started)
+    return input_tensor, request.prefer_gpu, request.min_gpu_memory_mb, request.min_precision
+
+
+_PREDICT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            wire.JSON_CONTENT_TYPE: {"schema": InferenceRequest.model_json_schema()},
+            wire.RAW_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            wire.NPY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+@app.post(
+    "/predict",
+    response_model=InferenceResponse,
+    response_model_exclude_none=True,
+    openapi_extra=_PREDICT_REQUEST_BODY,
+)
+async def predict(http_request: Request):
     """
     Main inference endpoint.
     
@@ -122,8 +368,13 @@ async def predict(request: InferenceRequest):
     4. Collects telemetry
     5. Returns results with metadata
     
+    The body may be JSON (InferenceRequest), raw little-endian float32 with an
+    X-Tensor-Shape header, or a .npy file. The response format follows the
+    Accept header and defaults to the request's format; binary responses carry
+    the execution metadata in X-* headers.
+    
     Args:
-        request: Inference request with input data and preferences
+        http_request: Incoming HTTP request
     
     Returns:
         Inference response with output and execution metadata
@@ -132,27 +383,49 @@ async def predict(request: InferenceRequest):
         raise HTTPException(status_code=503, detail="Server not initialized")
     
     # Initialize telemetry
-    telemetry = TelemetryCollector()
+    telemetry = TelemetryCollector(sampler=scheduler.sampler)
     telemetry.start()
     
+    input_tensor, prefer_gpu, min_gpu_memory_mb, min_precision = await _read_request(
+        http_request, telemetry
+    )
+    batch_size = input_tensor.shape[0] if input_tensor.dim() > 0 else 1
+    response_type = wire.negotiate_response_type(
+        http_request.headers.get("accept"), http_request.headers.get("content-type")
+    )
+    
     try:
-        # Convert input to tensor
-        input_tensor = torch.tensor(request.input_data, dtype=torch.float32)
-        
         # Make scheduling decision
+        started = telemetry.start_span()
         target_device = scheduler.schedule(
-            prefer_gpu=request.prefer_gpu,
-            min_gpu_memory_mb=request.min_gpu_memory_mb
+            prefer_gpu=prefer_gpu,
+            min_gpu_memory_mb=min_gpu_memory_mb
         )
         
         telemetry.set_device(target_device)
         
+        # Serve at the configured precision unless the request needs more
+        precision = executor.resolve_precision(min_precision, target_device)
+        telemetry.end_span("schedule", started)
+        
         # Execute inference on the target device atomically
         # Pass device explicitly to avoid race conditions with concurrent requests
-        output_tensor = executor.execute(input_tensor, device=target_device)
-        
-        # Move output back to CPU for serialization
-        output_cpu = output_tensor.cpu()
+        loop = asyncio.get_running_loop()
+        if batcher is not None:
+            # Coalesce with concurrent requests for the same device
+            output_tensor, queue_wait_ms = await batcher.submit(
+                input_tensor, target_device, precision, telemetry
+            )
+            telemetry.set_queue_wait_ms(queue_wait_ms)
+            # Move output back to CPU for serialization
+            started = telemetry.start_span()
+            output_cpu = output_tensor.cpu()
+            telemetry.end_span("d2h_copy", started)
+        else:
+            # Run on the inference pool so the event loop stays responsive
+            output_cpu = await loop.run_in_executor(
+                inference_pool, _run_inference, input_tensor, target_device, precision, telemetry
+            )
         
         # Stop telemetry
         telemetry.stop()
@@ -160,17 +433,40 @@ async def predict(request: InferenceRequest):
         # Prepare response
         telemetry_dict = telemetry.to_dict()
         
+        if response_type in wire.BINARY_CONTENT_TYPES:
+            headers = {
+                wire.SHAPE_HEADER: wire.format_shape(output_cpu.shape),
+                "X-Device": telemetry_dict["device"],
+                "X-Latency-Ms": str(telemetry_dict["latency_ms"]),
+                "X-Precision": precision,
+            }
+            if telemetry_dict.get("gpu_memory_mb") is not None:
+                headers["X-GPU-Memory-MB"] = str(telemetry_dict["gpu_memory_mb"])
+            if telemetry_dict.get("queue_wait_ms") is not None:
+                headers["X-Queue-Wait-Ms"] = str(telemetry_dict["queue_wait_ms"])
+            started = telemetry.start_span()
+            content = wire.encode_tensor(output_cpu, response_type)
+            telemetry.end_span("serialize", started)
+            metrics_registry.observe(telemetry, batch_size)
+            return Response(content=content, media_type=response_type, headers=headers)
+        
+        # Converting large outputs to Python floats is CPU-bound too
+        output_list = await loop.run_in_executor(inference_pool, _to_list, output_cpu, telemetry)
         response = InferenceResponse(
-            output=output_cpu.tolist(),
+            output=output_list,
             device=telemetry_dict["device"],
             latency_ms=telemetry_dict["latency_ms"],
-            gpu_memory_mb=telemetry_dict.get("gpu_memory_mb")
+            gpu_memory_mb=telemetry_dict.get("gpu_memory_mb"),
+            queue_wait_ms=telemetry_dict.get("queue_wait_ms"),
+            precision=precision
         )
+        metrics_registry.observe(telemetry, batch_size)
         
         return response
         
     except Exception as e:
         telemetry.stop()
+        metrics_registry.observe_error(telemetry.device or "unknown")
         raise HTTPException(status_code=500, detail=f"Execution error: {str(e)}")
 
 
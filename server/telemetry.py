@@ -5,24 +5,40 @@ This module provides utilities to collect execution metadata including:
 - End-to-end latency
 - Device used (CPU/GPU)
 - GPU memory usage (if applicable)
+- Queue wait when requests are micro-batched
+- Named stage spans (parse, schedule, forward, ...) for latency breakdowns
 """
 
 import time
 from typing import Dict, Optional
 import torch
 
+try:
+    from .device_monitor import DeviceStateSampler
+except ImportError:
+    from device_monitor import DeviceStateSampler
+
+
+_perf_counter = time.perf_counter
+
 
 class TelemetryCollector:
     """
     Collects execution telemetry for inference requests.
     
     This class tracks timing, device usage, and GPU memory statistics.
+    When a device sampler is given, GPU memory is read from its latest
+    snapshot instead of querying the driver.
     """
     
-    def __init__(self):
+    def __init__(self, sampler: Optional[DeviceStateSampler] = None):
+        self.sampler = sampler
         self.start_time: Optional[float] = None
         self.end_time: Optional[float] = None
         self.device: Optional[str] = None
+        self.queue_wait_ms: Optional[float] = None
+        # Seconds spent in each named stage
+        self.spans: Dict[str, float] = {}
         
     def start(self):
         """Mark the start of execution."""
@@ -36,6 +52,60 @@ class TelemetryCollector:
         """Set the device used for execution."""
         self.device = device
         
+    def set_queue_wait_ms(self, queue_wait_ms: float):
+        """Set the time the request waited to be dispatched in a batch."""
+        self.queue_wait_ms = queue_wait_ms
+        self.spans["queue_wait"] = queue_wait_ms / 1000.0
+        
+    def start_span(self) -> float:
+        """
+        Get a start timestamp for a stage span.
+        
+        Returns:
+            Current time.perf_counter() value
+        """
+        return _perf_counter()
+        
+    def end_span(self, name: str, started: float) -> float:
+        """
+        Record the time since ``started`` under a stage name.
+        
+        Time recorded under the same name accumulates. The return value is
+        the end timestamp, so consecutive stages can be chained:
+        ``t = telemetry.end_span("parse", t)``. This is on the request hot
+        path and costs well under a microsecond.
+        
+        Args:
+            name: Stage name
+            started: Start timestamp from start_span() or a previous end_span()
+        
+        Returns:
+            End timestamp
+        """
+        now = _perf_counter()
+        spans = self.spans
+        spans[name] = spans.get(name, 0.0) + (now - started)
+        return now
+        
+    def add_spans(self, spans: Dict[str, float]):
+        """
+        Add stage spans measured elsewhere (e.g. for a shared batch).
+        
+        Args:
+            spans: Seconds per stage name
+        """
+        for name, seconds in spans.items():
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+        
+    def get_spans_ms(self) -> Dict[str, float]:
+        """
+        Get the recorded stage spans in milliseconds.
+        
+        Returns:
+            Milliseconds per stage name
+        """
+        return {name: seconds * 1000.0 for name, seconds in self.spans.items()}
+        
     def get_latency_ms(self) -> float:
         """
         Get end-to-end latency in milliseconds.
@@ -60,6 +130,10 @@ class TelemetryCollector:
         if not device.startswith("cuda"):
             return None
         
+        if self.sampler is not None:
+            state = self.sampler.snapshot().get(device)
+            return state.allocated_memory_mb if state is not None else None
+        
         if not torch.cuda.is_available():
             return None
         
@@ -83,6 +157,10 @@ class TelemetryCollector:
         if not device.startswith("cuda"):
             return None
         
+        if self.sampler is not None:
+            state = self.sampler.snapshot().get(device)
+            return state.free_memory_mb if state is not None else None
+        
         if not torch.cuda.is_available():
             return None
         
@@ -107,6 +185,9 @@ class TelemetryCollector:
             "latency_ms": round(self.get_latency_ms(), 2)
         }
         
+        if self.queue_wait_ms is not None:
+            result["queue_wait_ms"] = round(self.queue_wait_ms, 3)
+        
         if self.device and self.device.startswith("cuda"):
             gpu_memory = self.get_gpu_memory_mb(self.device)
             if gpu_memory is not None:
@@ -0,0 +1,300 @@
+"""
+Binary tensor wire format for the inference endpoint.
+
+Besides JSON, /predict accepts and returns two binary encodings:
+- Raw little-endian float32 (``application/octet-stream``) with the tensor
+  shape in the ``X-Tensor-Shape`` header (e.g. ``"32,128"``)
+- NumPy ``.npy`` files (``application/x-npy``) holding a C-ordered ``<f4`` array
+
+Request bodies are wrapped with ``torch.frombuffer`` so decoding does not copy
+or parse individual floats. NumPy is not required on either side.
+"""
+
+from typing import Optional, Sequence, Tuple
+import ast
+import ctypes
+import struct
+import sys
+import warnings
+import torch
+
+
+JSON_CONTENT_TYPE = "application/json"
+RAW_CONTENT_TYPE = "application/octet-stream"
+NPY_CONTENT_TYPE = "application/x-npy"
+BINARY_CONTENT_TYPES = (RAW_CONTENT_TYPE, NPY_CONTENT_TYPE)
+
+SHAPE_HEADER = "X-Tensor-Shape"
+
+NPY_MAGIC = b"\x93NUMPY"
+NPY_DTYPE = "<f4"
+FLOAT32_SIZE = 4
+
+
+class WireFormatError(ValueError):
+    """Raised when a binary tensor payload cannot be decoded."""
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """
+    Extract the bare media type from a Content-Type or Accept entry.
+
+    Args:
+        content_type: Header value (e.g. "application/json; charset=utf-8")
+
+    Returns:
+        Lower-cased media type without parameters ("" if missing)
+    """
+    if not content_type:
+        return ""
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def parse_shape(value: Optional[str]) -> Tuple[int, ...]:
+    """
+    Parse a shape header such as "32,128" or "32x128".
+
+    Args:
+        value: Header value
+
+    Returns:
+        Tuple of non-negative dimensions
+
+    Raises:
+        WireFormatError: If the header is missing or malformed
+    """
+    if not value:
+        raise WireFormatError(f"Missing {SHAPE_HEADER} header for raw tensor body")
+    try:
+        shape = tuple(int(dim) for dim in value.replace("x", ",").split(",") if dim.strip())
+    except ValueError:
+        raise WireFormatError(f"Invalid {SHAPE_HEADER} header: {value!r}")
+    if not shape or any(dim < 0 for dim in shape):
+        raise WireFormatError(f"Invalid {SHAPE_HEADER} header: {value!r}")
+    return shape
+
+
+def format_shape(shape: Sequence[int]) -> str:
+    """
+    Format a tensor shape for the shape header.
+
+    Args:
+        shape: Tensor shape
+
+    Returns:
+        Comma-separated dimensions (e.g. "32,64")
+    """
+    return ",".join(str(dim) for dim in shape)
+
+
+def _numel(shape: Sequence[int]) -> int:
+    count = 1
+    for dim in shape:
+        count *= dim
+    return count
+
+
+def _frombuffer(body: bytes, shape: Tuple[int, ...], offset: int = 0) -> torch.Tensor:
+    """
+    Wrap a float32 region of the body as a tensor without copying.
+
+    Args:
+        body: Request body
+        shape: Expected tensor shape
+        offset: Byte offset of the first element
+
+    Returns:
+        Float32 tensor sharing memory with ``body``
+    """
+    count = _numel(shape)
+    expected = count * FLOAT32_SIZE
+    if len(body) - offset != expected:
+        raise WireFormatError(
+            f"Body holds {len(body) - offset} bytes of tensor data, "
+            f"expected {expected} for shape {format_shape(shape)}"
+        )
+    if count == 0:
+        return torch.empty(shape, dtype=torch.float32)
+    with warnings.catch_warnings():
+        # Request bodies are immutable bytes; the tensor is only read by the model
+        warnings.simplefilter("ignore", UserWarning)
+        tensor = torch.frombuffer(body, dtype=torch.float32, count=count, offset=offset)
+    if sys.byteorder != "little":
+        tensor = tensor.view(torch.uint8).view(-1, FLOAT32_SIZE).flip(-1).contiguous()
+        tensor = tensor.view(torch.float32).view(-1)
+    return tensor.view(shape)
+
+
+def _tobytes(tensor: torch.Tensor) -> bytes:
+    """
+    Serialize a tensor to little-endian float32 bytes with a single copy.
+
+    Args:
+        tensor: Tensor on any device
+
+    Returns:
+        Raw little-endian float32 bytes in C order
+    """
+    tensor = tensor.detach().to(device="cpu", dtype=torch.float32).contiguous()
+    if sys.byteorder != "little":
+        tensor = tensor.view(torch.uint8).view(-1, FLOAT32_SIZE).flip(-1).contiguous()
+    return ctypes.string_at(tensor.data_ptr(), tensor.numel() * tensor.element_size())
+
+
+def decode_raw(body: bytes, shape_header: Optional[str]) -> torch.Tensor:
+    """
+    Decode a raw little-endian float32 body.
+
+    Args:
+        body: Request body
+        shape_header: Value of the shape header
+
+    Returns:
+        Float32 tensor with the declared shape
+    """
+    return _frombuffer(body, parse_shape(shape_header))
+
+
+def decode_npy(body: bytes) -> torch.Tensor:
+    """
+    Decode a ``.npy`` body holding a C-ordered float32 array.
+
+    Args:
+        body: Request body
+
+    Returns:
+        Float32 tensor with the array's shape
+    """
+    if not body.startswith(NPY_MAGIC) or len(body) < 10:
+        raise WireFormatError("Body is not a .npy file")
+    major = body[6]
+    if major == 1:
+        (header_len,) = struct.unpack("<H", body[8:10])
+        header_start = 10
+    elif major in (2, 3):
+        if len(body) < 12:
+            raise WireFormatError("Truncated .npy header")
+        (header_len,) = struct.unpack("<I", body[8:12])
+        header_start = 12
+    else:
+        raise WireFormatError(f"Unsupported .npy version {major}")
+
+    data_offset = header_start + header_len
+    try:
+        header = ast.literal_eval(body[header_start:data_offset].decode("latin1"))
+        descr = header["descr"]
+        fortran_order = header["fortran_order"]
+        shape = tuple(int(dim) for dim in header["shape"])
+    except (ValueError, SyntaxError, KeyError, TypeError):
+        raise WireFormatError("Malformed .npy header")
+
+    if descr != NPY_DTYPE:
+        raise WireFormatError(f"Unsupported .npy dtype {descr!r}, expected {NPY_DTYPE!r}")
+    if fortran_order:
+        raise WireFormatError("Fortran-ordered .npy arrays are not supported")
+    return _frombuffer(body, shape, offset=data_offset)
+
+
+def encode_raw(tensor: torch.Tensor) -> bytes:
+    """
+    Encode a tensor as raw little-endian float32.
+
+    Args:
+        tensor: Tensor to encode
+
+    Returns:
+        Raw bytes (shape travels in the shape header)
+    """
+    return _tobytes(tensor)
+
+
+def encode_npy(tensor: torch.Tensor) -> bytes:
+    """
+    Encode a tensor as a version 1.0 ``.npy`` file.
+
+    Args:
+        tensor: Tensor to encode
+
+    Returns:
+        ``.npy`` file contents
+    """
+    shape = tuple(tensor.shape)
+    shape_repr = f"({shape[0]},)" if len(shape) == 1 else f"({', '.join(str(d) for d in shape)})"
+    header = f"{{'descr': '{NPY_DTYPE}', 'fortran_order': False, 'shape': {shape_repr}, }}"
+    # Pad so the data starts on a 64-byte boundary, as numpy does
+    prefix_len = len(NPY_MAGIC) + 2 + 2
+    padding = 64 - (prefix_len + len(header) + 1) % 64
+    header = header + " " * (padding % 64) + "\n"
+    return (
+        NPY_MAGIC
+        + bytes([1, 0])
+        + struct.pack("<H", len(header))
+        + header.encode("latin1")
+        + _tobytes(tensor)
+    )
+
+
+def decode_tensor(body: bytes, content_type: str, shape_header: Optional[str] = None) -> torch.Tensor:
+    """
+    Decode a binary request body according to its content type.
+
+    Args:
+        body: Request body
+        content_type: Media type of the body
+        shape_header: Value of the shape header (raw format only)
+
+    Returns:
+        Float32 tensor
+
+    Raises:
+        WireFormatError: If the content type is unsupported or the body is invalid
+    """
+    content_type = media_type(content_type)
+    if content_type == RAW_CONTENT_TYPE:
+        return decode_raw(body, shape_header)
+    if content_type == NPY_CONTENT_TYPE:
+        return decode_npy(body)
+    raise WireFormatError(f"Unsupported tensor content type {content_type!r}")
+
+
+def encode_tensor(tensor: torch.Tensor, content_type: str) -> bytes:
+    """
+    Encode a tensor in the requested binary format.
+
+    Args:
+        tensor: Tensor to encode
+        content_type: Target media type
+
+    Returns:
+        Encoded body
+    """
+    content_type = media_type(content_type)
+    if content_type == RAW_CONTENT_TYPE:
+        return encode_raw(tensor)
+    if content_type == NPY_CONTENT_TYPE:
+        return encode_npy(tensor)
+    raise WireFormatError(f"Unsupported tensor content type {content_type!r}")
+
+
+def negotiate_response_type(accept: Optional[str], request_content_type: Optional[str]) -> str:
+    """
+    Choose the response format from the Accept header.
+
+    An explicit Accept entry for a supported format wins; otherwise the
+    response mirrors the request format, so binary requests get binary replies.
+
+    Args:
+        accept: Accept header value
+        request_content_type: Content-Type of the request
+
+    Returns:
+        Media type to respond with
+    """
+    for entry in (accept or "").split(","):
+        candidate = media_type(entry)
+        if candidate in BINARY_CONTENT_TYPES or candidate == JSON_CONTENT_TYPE:
+            return candidate
+    request_type = media_type(request_content_type)
+    if request_type in BINARY_CONTENT_TYPES:
+        return request_type
+    return JSON_CONTENT_TYPE
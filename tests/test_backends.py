@@ -0,0 +1,151 @@
+"""
+Tests for model execution backends.
+"""
+
+import pytest
+import torch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.executor import Executor
+from server.models import backends
+from server.models.simple_model import SimpleMLP, create_model
+
+
+@pytest.fixture
+def model():
+    """Create a seeded eager model on CPU."""
+    torch.manual_seed(0)
+    return create_model(device="cpu")
+
+
+class TestBuildBackend:
+    """Test cases for building individual backends."""
+    
+    def test_input_features(self, model):
+        """Test that the input size is read from the first linear layer."""
+        assert backends.input_features(model) == 128
+        assert backends.input_features(SimpleMLP(input_dim=32)) == 32
+    
+    def test_eager_is_identity(self, model):
+        """Test that the eager backend returns the model itself."""
+        assert backends.build_backend(model, "eager", "cpu") is model
+    
+    def test_torchscript_matches_eager(self, model):
+        """Test that the traced model matches eager outputs for other batch sizes."""
+        traced = backends.build_backend(model, "torchscript", "cpu", example_batch_size=8)
+        inputs = torch.randn(3, 128)
+        
+        with torch.no_grad():
+            assert torch.allclose(traced(inputs), model(inputs), atol=1e-5)
+    
+    def test_unknown_backend(self, model):
+        """Test that unknown backend names are rejected."""
+        with pytest.raises(ValueError):
+            backends.build_backend(model, "tensorrt", "cpu")
+    
+    def test_prepare_falls_back_to_eager(self, model, monkeypatch):
+        """Test that a failing backend degrades to eager."""
+        def broken_build(*args, **kwargs):
+            raise RuntimeError("no toolchain")
+        
+        monkeypatch.setattr(backends, "build_backend", broken_build)
+        module, used = backends.prepare_backend(model, "compile", "cpu", (1,))
+        
+        assert module is model
+        assert used == "eager"
+    
+    @pytest.mark.slow
+    def test_compile_matches_eager(self, model):
+        """Test that the compiled model matches eager outputs."""
+        module, used = backends.prepare_backend(model, "compile", "cpu", (4,))
+        inputs = torch.randn(4, 128)
+        
+        with torch.no_grad():
+            assert torch.allclose(module(inputs), model(inputs), atol=1e-5)
+
+
+class TestSelectBackend:
+    """Test cases for automatic backend selection."""
+    
+    def test_select_times_candidates(self, model):
+        """Test that selection times every candidate and keeps the fastest."""
+        module, chosen, timings = backends.select_backend(
+            model, "cpu", (1, 4), candidates=("eager", "torchscript")
+        )
+        
+        assert set(timings) == {"eager", "torchscript"}
+        assert chosen == min(timings, key=timings.get)
+        assert chosen in ("eager", "torchscript")
+    
+    def test_select_skips_failed_backends(self, model, monkeypatch):
+        """Test that backends that fall back are not timed."""
+        original = backends.build_backend
+        
+        def build(model, backend, device, example_batch_size=1):
+            if backend == "torchscript":
+                raise RuntimeError("cannot trace")
+            return original(model, backend, device, example_batch_size)
+        
+        monkeypatch.setattr(backends, "build_backend", build)
+        _, chosen, timings = backends.select_backend(
+            model, "cpu", (1,), candidates=("eager", "torchscript")
+        )
+        
+        assert chosen == "eager"
+        assert set(timings) == {"eager"}
+
+
+class TestExecutorBackends:
+    """Test cases for executor integration."""
+    
+    def test_default_backend_is_eager(self, model):
+        """Test that the executor serves the eager model by default."""
+        executor = Executor(model, device="cpu")
+        assert executor.backend == "eager"
+        assert executor.get_replica("cpu") is model
+    
+    def test_torchscript_executor(self, model):
+        """Test that the executor serves requests with a traced replica."""
+        inputs = torch.randn(5, 128)
+        with torch.no_grad():
+            expected = model(inputs)
+        
+        executor = Executor(model, device="cpu", backend="torchscript", warmup_batch_sizes=(1, 8))
+        
+        assert executor.backend == "torchscript"
+        assert isinstance(executor.get_replica("cpu"), torch.jit.ScriptModule)
+        assert torch.allclose(executor.execute(inputs), expected, atol=1e-5)
+    
+    def test_auto_backend_reports_timings(self, model, monkeypatch):
+        """Test that auto picks a backend and records the timings."""
+        original = backends.select_backend
+        monkeypatch.setattr(
+            backends,
+            "select_backend",
+            lambda model, device, sizes: original(model, device, sizes, candidates=("eager", "torchscript"))
+        )
+        
+        executor = Executor(model, device="cpu", backend="auto", warmup_batch_sizes=(1,))
+        
+        assert executor.backend in ("eager", "torchscript")
+        assert set(executor.backend_timings) == {"eager", "torchscript"}
+    
+    def test_invalid_backend(self, model):
+        """Test that the executor rejects unknown backends."""
+        with pytest.raises(ValueError):
+            Executor(model, device="cpu", backend="onnx")
+    
+    def test_warmup_runs_configured_batch_sizes(self, model):
+        """Test that replicas are warmed up with each configured batch size."""
+        seen = []
+        handle = model.register_forward_hook(lambda module, args, output: seen.append(args[0].shape[0]))
+        try:
+            Executor(model, device="cpu", warmup_batch_sizes=(1, 8, 32))
+        finally:
+            handle.remove()
+        
+        assert seen == [1, 8, 32]
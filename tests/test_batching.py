@@ -0,0 +1,150 @@
+"""
+Tests for MicroBatcher class.
+"""
+
+import pytest
+import asyncio
+import torch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.batching import MicroBatcher
+from server.executor import Executor
+from server.models.simple_model import SimpleMLP
+
+
+class CountingExecutor(Executor):
+    """Executor that records the batch size of every forward pass."""
+    
+    def __init__(self, model, device="cpu"):
+        super().__init__(model, device=device)
+        self.calls = []
+        self.precisions = []
+    
+    def execute(self, input_data, device=None, precision=None, telemetry=None):
+        self.calls.append(input_data.shape[0])
+        self.precisions.append(precision)
+        return super().execute(input_data, device=device, precision=precision, telemetry=telemetry)
+
+
+@pytest.fixture
+def executor():
+    """Create a counting executor on CPU."""
+    torch.manual_seed(0)
+    return CountingExecutor(SimpleMLP(), device="cpu")
+
+
+class TestMicroBatcher:
+    """Test cases for MicroBatcher class."""
+    
+    def test_invalid_max_rows(self, executor):
+        """Test that a non-positive row limit is rejected."""
+        with pytest.raises(ValueError):
+            MicroBatcher(executor, max_batch_rows=0)
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_forward(self, executor):
+        """Test that concurrent requests are coalesced into one forward pass."""
+        batcher = MicroBatcher(executor, max_batch_rows=64, max_wait_ms=20.0)
+        inputs = [torch.randn(n, 128) for n in (1, 2, 3)]
+        
+        results = await asyncio.gather(*(batcher.submit(x, "cpu") for x in inputs))
+        
+        assert executor.calls == [6]
+        for x, (output, queue_wait_ms) in zip(inputs, results):
+            assert output.shape == (x.shape[0], 64)
+            expected = executor.get_replica("cpu")(x)
+            assert torch.allclose(output, expected, atol=1e-5)
+            assert queue_wait_ms >= 0
+    
+    @pytest.mark.asyncio
+    async def test_dispatch_on_max_rows(self, executor):
+        """Test that a full batch is dispatched without waiting for the timer."""
+        batcher = MicroBatcher(executor, max_batch_rows=4, max_wait_ms=10_000.0)
+        
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(torch.randn(2, 128), "cpu") for _ in range(2))),
+            timeout=2.0,
+        )
+        
+        assert executor.calls == [4]
+        assert len(results) == 2
+    
+    @pytest.mark.asyncio
+    async def test_overflow_starts_new_batch(self, executor):
+        """Test that a request that would overflow the batch starts a new one."""
+        batcher = MicroBatcher(executor, max_batch_rows=4, max_wait_ms=10.0)
+        
+        await asyncio.gather(*(batcher.submit(torch.randn(3, 128), "cpu") for _ in range(2)))
+        
+        assert executor.calls == [3, 3]
+    
+    @pytest.mark.asyncio
+    async def test_dispatch_on_timeout(self, executor):
+        """Test that a lone request is dispatched after the wait window."""
+        batcher = MicroBatcher(executor, max_batch_rows=64, max_wait_ms=5.0)
+        
+        output, queue_wait_ms = await asyncio.wait_for(
+            batcher.submit(torch.randn(1, 128), "cpu"), timeout=2.0
+        )
+        
+        assert output.shape == (1, 64)
+        assert queue_wait_ms >= 4.0
+    
+    @pytest.mark.asyncio
+    async def test_devices_batched_separately(self, executor):
+        """Test that requests for different devices never share a batch."""
+        batcher = MicroBatcher(executor, max_batch_rows=64, max_wait_ms=5.0)
+        
+        cpu_result, meta_result = await asyncio.gather(
+            batcher.submit(torch.randn(1, 128), "cpu"),
+            batcher.submit(torch.randn(1, 128), "meta"),
+        )
+        
+        assert cpu_result[0].device.type == "cpu"
+        assert meta_result[0].device.type == "meta"
+        assert sorted(executor.calls) == [1, 1]
+    
+    @pytest.mark.asyncio
+    async def test_precisions_batched_separately(self, executor):
+        """Test that requests needing different precisions never share a batch."""
+        batcher = MicroBatcher(executor, max_batch_rows=64, max_wait_ms=5.0)
+        
+        await asyncio.gather(
+            batcher.submit(torch.randn(1, 128), "cpu"),
+            batcher.submit(torch.randn(2, 128), "cpu", precision="bf16"),
+            batcher.submit(torch.randn(3, 128), "cpu", precision="bf16"),
+        )
+        
+        assert sorted(zip(executor.calls, executor.precisions), key=lambda c: c[0]) == [
+            (1, None), (5, "bf16")
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_bad_request_does_not_fail_batch(self, executor):
+        """Test that a malformed input only fails its own request."""
+        batcher = MicroBatcher(executor, max_batch_rows=64, max_wait_ms=5.0)
+        
+        good, bad = await asyncio.gather(
+            batcher.submit(torch.randn(1, 128), "cpu"),
+            batcher.submit(torch.randn(1, 64), "cpu"),
+            return_exceptions=True,
+        )
+        
+        assert good[0].shape == (1, 64)
+        assert isinstance(bad, Exception)
+    
+    @pytest.mark.asyncio
+    async def test_flush_all(self, executor):
+        """Test that flush_all dispatches pending batches immediately."""
+        batcher = MicroBatcher(executor, max_batch_rows=64, max_wait_ms=10_000.0)
+        
+        task = asyncio.ensure_future(batcher.submit(torch.randn(1, 128), "cpu"))
+        await asyncio.sleep(0)
+        await batcher.flush_all()
+        
+        output, _ = await asyncio.wait_for(task, timeout=1.0)
+        assert output.shape == (1, 64)
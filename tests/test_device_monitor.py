@@ -0,0 +1,144 @@
+"""
+Tests for the background device state sampler.
+"""
+
+import pytest
+import time
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.device_monitor import DeviceBackend, DeviceSnapshot, DeviceState, DeviceStateSampler
+
+
+class FakeDeviceBackend(DeviceBackend):
+    """Device backend that serves canned GPU states and counts queries."""
+    
+    def __init__(self, free_memory_mb=(8000.0,), available=True):
+        self.free_memory_mb = list(free_memory_mb)
+        self.available = available
+        self.samples = 0
+        self.fail = False
+    
+    def is_available(self):
+        return self.available
+    
+    def device_count(self):
+        return len(self.free_memory_mb)
+    
+    def sample(self, index):
+        self.samples += 1
+        if self.fail:
+            raise RuntimeError("driver error")
+        return DeviceState(
+            device=f"cuda:{index}",
+            total_memory_mb=16000.0,
+            free_memory_mb=self.free_memory_mb[index],
+            allocated_memory_mb=16000.0 - self.free_memory_mb[index],
+            utilization=50.0
+        )
+
+
+class TestDeviceSnapshot:
+    """Test cases for DeviceSnapshot."""
+    
+    def test_empty_snapshot(self):
+        """Test that an empty snapshot has no devices."""
+        snapshot = DeviceSnapshot()
+        assert snapshot.get("cuda:0") is None
+        assert len(snapshot.devices) == 0
+    
+    def test_snapshot_is_immutable(self):
+        """Test that snapshots cannot be modified after publishing."""
+        sampler = DeviceStateSampler(backend=FakeDeviceBackend())
+        snapshot = sampler.snapshot()
+        
+        with pytest.raises(TypeError):
+            snapshot.devices["cuda:1"] = snapshot.get("cuda:0")
+        with pytest.raises(AttributeError):
+            snapshot.sampled_at = 0.0
+
+
+class TestDeviceStateSampler:
+    """Test cases for DeviceStateSampler."""
+    
+    def test_initial_sample(self):
+        """Test that the sampler publishes a snapshot on creation."""
+        backend = FakeDeviceBackend(free_memory_mb=(8000.0, 2000.0))
+        sampler = DeviceStateSampler(backend=backend)
+        
+        snapshot = sampler.snapshot()
+        assert sampler.available
+        assert sampler.device_count == 2
+        assert snapshot.get("cuda:0").free_memory_mb == 8000.0
+        assert snapshot.get("cuda:1").free_memory_mb == 2000.0
+        assert snapshot.get("cuda:1").utilization == 50.0
+    
+    def test_reading_snapshot_does_not_query_backend(self):
+        """Test that readers never reach the device backend."""
+        backend = FakeDeviceBackend()
+        sampler = DeviceStateSampler(backend=backend)
+        samples = backend.samples
+        
+        for _ in range(100):
+            sampler.snapshot().get("cuda:0")
+        
+        assert backend.samples == samples
+    
+    def test_refresh_publishes_new_snapshot(self):
+        """Test that refresh replaces the snapshot without mutating the old one."""
+        backend = FakeDeviceBackend()
+        sampler = DeviceStateSampler(backend=backend)
+        old = sampler.snapshot()
+        
+        backend.free_memory_mb[0] = 100.0
+        new = sampler.refresh()
+        
+        assert new is sampler.snapshot()
+        assert new.get("cuda:0").free_memory_mb == 100.0
+        assert old.get("cuda:0").free_memory_mb == 8000.0
+    
+    def test_failed_sample_keeps_previous_state(self):
+        """Test that a driver error keeps the last known state."""
+        backend = FakeDeviceBackend()
+        sampler = DeviceStateSampler(backend=backend)
+        
+        backend.fail = True
+        snapshot = sampler.refresh()
+        
+        assert snapshot.get("cuda:0").free_memory_mb == 8000.0
+    
+    def test_cpu_only_host(self):
+        """Test that a host without GPUs publishes an empty snapshot and no thread."""
+        backend = FakeDeviceBackend(free_memory_mb=(), available=False)
+        sampler = DeviceStateSampler(backend=backend)
+        sampler.start()
+        
+        assert not sampler.available
+        assert not sampler.is_running()
+        assert len(sampler.snapshot().devices) == 0
+        assert backend.samples == 0
+        sampler.stop()
+    
+    def test_background_refresh(self):
+        """Test that the background thread keeps the snapshot fresh."""
+        backend = FakeDeviceBackend()
+        sampler = DeviceStateSampler(backend=backend, interval_s=0.01)
+        sampler.start()
+        try:
+            backend.free_memory_mb[0] = 123.0
+            deadline = time.monotonic() + 2.0
+            while sampler.snapshot().get("cuda:0").free_memory_mb != 123.0:
+                assert time.monotonic() < deadline, "snapshot was not refreshed"
+                time.sleep(0.01)
+        finally:
+            sampler.stop()
+        
+        assert not sampler.is_running()
+    
+    def test_invalid_interval(self):
+        """Test that a non-positive interval is rejected."""
+        with pytest.raises(ValueError):
+            DeviceStateSampler(backend=FakeDeviceBackend(), interval_s=0)
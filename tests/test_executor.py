@@ -12,7 +12,7 @@ import threading
 # Add parent directory to path to import server modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from server.executor import Executor
+from server.executor import Executor, normalize_device
 from server.models.simple_model import SimpleMLP
 
 
@@ -138,3 +138,149 @@ class TestExecutor:
         assert len(results) == num_threads
         for thread_id, shape in results:
             assert shape == (2, 64)
+
+
+class TestExecutorReplicas:
+    """Test cases for per-device replica caching."""
+    
+    def test_initial_device_uses_model_as_replica(self):
+        """Test that the initial device reuses the given model without copying."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu")
+        
+        assert executor.get_replica("cpu") is model
+        assert executor.resident_devices() == ["cpu"]
+    
+    def test_replica_built_lazily_and_reused(self):
+        """Test that a new device gets one replica that is reused afterwards."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu")
+        
+        # The meta device lets us exercise a second device without a GPU
+        first = executor.get_replica("meta")
+        second = executor.get_replica("meta")
+        
+        assert first is second
+        assert first is not model
+        assert sorted(executor.resident_devices()) == ["cpu", "meta"]
+        # Source model stays where it was
+        assert next(model.parameters()).device.type == "cpu"
+    
+    def test_execute_on_other_device_keeps_default(self):
+        """Test that executing on another device does not change executor state."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu")
+        
+        output = executor.execute(torch.randn(2, 128), device="meta")
+        
+        assert output.device.type == "meta"
+        assert output.shape == (2, 64)
+        assert executor.get_device() == "cpu"
+        assert next(executor.model.parameters()).device.type == "cpu"
+    
+    def test_replica_built_once_under_concurrency(self):
+        """Test that concurrent first use of a device builds a single replica."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu")
+        builds = []
+        original_build = executor._build_replica
+        
+        def counting_build(device, precision):
+            builds.append(device)
+            return original_build(device, precision)
+        
+        executor._build_replica = counting_build
+        
+        threads = [
+            threading.Thread(target=executor.get_replica, args=("meta",))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert builds == ["meta"]
+    
+    def test_device_strings_normalized(self):
+        """Test that equivalent device strings share a replica."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu")
+        
+        assert executor.get_replica("cpu:0") is model
+        assert normalize_device("cuda") == "cuda:0"
+        assert normalize_device("cuda:1") == "cuda:1"
+    
+    @pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA not available")
+    def test_gpu_replica_is_resident(self):
+        """Test that a GPU replica stays resident between requests."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu")
+        
+        executor.execute(torch.randn(2, 128), device="cuda:0")
+        replica = executor.get_replica("cuda:0")
+        executor.execute(torch.randn(2, 128), device="cuda")
+        
+        assert executor.get_replica("cuda:0") is replica
+        assert next(replica.parameters()).device.type == "cuda"
+        assert next(model.parameters()).device.type == "cpu"
+
+
+class TestExecutorPrecision:
+    """Test cases for per-precision replicas."""
+    
+    def test_default_precision_is_fp32(self):
+        """Test that the executor serves the fp32 model by default."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu")
+        
+        assert executor.precision == "fp32"
+        assert executor.resolve_precision() == "fp32"
+        assert executor.resident_replicas() == [("cpu", "fp32")]
+    
+    def test_configured_precision_builds_replica(self):
+        """Test that a reduced precision replica is built at startup."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu", precision="int8-dynamic")
+        
+        output = executor.execute(torch.randn(4, 128))
+        
+        assert output.dtype == torch.float32
+        assert output.shape == (4, 64)
+        assert executor.resident_replicas() == [("cpu", "int8-dynamic")]
+        # The source model keeps its fp32 weights
+        assert executor.get_replica("cpu", "fp32") is model
+    
+    def test_min_precision_raises_precision(self):
+        """Test that a request's minimum precision overrides a lower default."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu", precision="int8-dynamic")
+        
+        assert executor.resolve_precision(None) == "int8-dynamic"
+        assert executor.resolve_precision("int8-dynamic") == "int8-dynamic"
+        assert executor.resolve_precision("bf16") == "bf16"
+        assert executor.resolve_precision("fp32") == "fp32"
+    
+    def test_min_precision_never_lowers_precision(self):
+        """Test that a lower minimum does not reduce the configured precision."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu", precision="bf16")
+        
+        assert executor.resolve_precision("int8-dynamic") == "bf16"
+    
+    def test_fp32_request_matches_source_model(self):
+        """Test that fp32 execution on a reduced precision executor is exact."""
+        model = SimpleMLP()
+        executor = Executor(model, device="cpu", precision="bf16")
+        inputs = torch.randn(3, 128)
+        
+        with torch.no_grad():
+            expected = model(inputs)
+        
+        assert torch.equal(executor.execute(inputs, precision="fp32"), expected)
+        assert sorted(executor.resident_replicas()) == [("cpu", "bf16"), ("cpu", "fp32")]
+    
+    def test_invalid_precision(self):
+        """Test that unknown precisions are rejected."""
+        with pytest.raises(ValueError):
+            Executor(SimpleMLP(), device="cpu", precision="fp8")
@@ -0,0 +1,83 @@
+"""
+Tests for InferencePool class.
+"""
+
+import pytest
+import asyncio
+import threading
+import time
+import torch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.inference_pool import InferencePool, default_pool_size, default_intra_op_threads
+
+
+class TestPoolSizing:
+    """Test cases for default pool sizing."""
+    
+    def test_default_pool_size(self):
+        """Test that the default pool size is bounded by cores."""
+        assert default_pool_size(1) == 1
+        assert default_pool_size(2) == 2
+        assert default_pool_size(64) == 4
+    
+    def test_default_intra_op_threads(self):
+        """Test that cores are split evenly between workers."""
+        assert default_intra_op_threads(4, cpu_count=16) == 4
+        assert default_intra_op_threads(3, cpu_count=8) == 2
+        assert default_intra_op_threads(8, cpu_count=4) == 1
+
+
+class TestInferencePool:
+    """Test cases for InferencePool class."""
+    
+    def test_describe(self):
+        """Test that the pool reports its configuration."""
+        pool = InferencePool(max_workers=2, intra_op_threads=1)
+        try:
+            info = pool.describe()
+            assert info["pool_size"] == 2
+            assert info["intra_op_threads"] == 1
+            assert info["inter_op_threads"] >= 1
+        finally:
+            pool.shutdown(wait=True)
+    
+    def test_worker_applies_intra_op_threads(self):
+        """Test that worker threads run with the configured intra-op threads."""
+        original = torch.get_num_threads()
+        pool = InferencePool(max_workers=1, intra_op_threads=1)
+        try:
+            assert pool.submit(torch.get_num_threads).result() == 1
+        finally:
+            pool.shutdown(wait=True)
+            torch.set_num_threads(original)
+    
+    @pytest.mark.asyncio
+    async def test_runs_off_event_loop(self):
+        """Test that work submitted to the pool does not block the event loop."""
+        pool = InferencePool(max_workers=1, intra_op_threads=1)
+        original = torch.get_num_threads()
+        try:
+            loop = asyncio.get_running_loop()
+            loop_thread = threading.get_ident()
+            
+            def blocking_job():
+                time.sleep(0.2)
+                return threading.get_ident()
+            
+            job = loop.run_in_executor(pool, blocking_job)
+            ticks = 0
+            while not job.done():
+                await asyncio.sleep(0.01)
+                ticks += 1
+            
+            assert await job != loop_thread
+            # The loop kept running while the job slept
+            assert ticks >= 5
+        finally:
+            pool.shutdown(wait=True)
+            torch.set_num_threads(original)
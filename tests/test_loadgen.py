@@ -0,0 +1,218 @@
+"""
+Tests for the client load generator.
+"""
+
+import pytest
+import json
+import random
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path to import client modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from client.client import encode_binary_input
+from client.loadgen import (
+    LoadGenerator,
+    Payload,
+    json_payload,
+    load_replay,
+    percentile,
+    poisson_arrivals,
+    summarize,
+)
+
+
+class FakeServer:
+    """Stands in for the HTTP call and tracks concurrency."""
+    
+    def __init__(self, delay_s=0.005, fail_every=0):
+        self.delay_s = delay_s
+        self.fail_every = fail_every
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+    
+    def send(self, payload):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay_s)
+            if self.fail_every and call % self.fail_every == 0:
+                raise RuntimeError("boom")
+            return self.delay_s * 500.0
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class TestStatistics:
+    """Test cases for latency statistics."""
+    
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        assert percentile(values, 0.50) == 50
+        assert percentile(values, 0.90) == 90
+        assert percentile(values, 0.99) == 99
+        assert percentile(values, 0.999) == 100
+        assert percentile([], 0.5) == 0.0
+    
+    def test_summarize(self):
+        """Test that summaries include mean, max and every percentile."""
+        stats = summarize([4.0, 1.0, 3.0, 2.0])
+        assert stats["mean"] == 2.5
+        assert stats["max"] == 4.0
+        assert stats["p50"] == 2.0
+        assert set(stats) == {"mean", "max", "p50", "p90", "p99", "p999"}
+        assert summarize([]) == {}
+
+
+class TestPoissonArrivals:
+    """Test cases for the open-loop arrival schedule."""
+    
+    def test_count(self):
+        """Test that a fixed number of ascending arrivals is generated."""
+        arrivals = poisson_arrivals(100.0, count=50, rng=random.Random(0))
+        assert len(arrivals) == 50
+        assert arrivals == sorted(arrivals)
+    
+    def test_rate(self):
+        """Test that the mean rate matches the target."""
+        arrivals = poisson_arrivals(200.0, duration_s=50.0, rng=random.Random(1))
+        assert all(offset <= 50.0 for offset in arrivals)
+        assert len(arrivals) / 50.0 == pytest.approx(200.0, rel=0.05)
+    
+    def test_reproducible(self):
+        """Test that a seed reproduces the schedule."""
+        first = poisson_arrivals(10.0, count=5, rng=random.Random(7))
+        second = poisson_arrivals(10.0, count=5, rng=random.Random(7))
+        assert first == second
+    
+    def test_invalid_arguments(self):
+        """Test that a rate and a limit are required."""
+        with pytest.raises(ValueError):
+            poisson_arrivals(0.0, count=1)
+        with pytest.raises(ValueError):
+            poisson_arrivals(1.0)
+
+
+class TestReplay:
+    """Test cases for replaying payloads from JSONL."""
+    
+    def test_load_json(self, tmp_path):
+        """Test that each line becomes one JSON payload."""
+        path = tmp_path / "requests.jsonl"
+        path.write_text(
+            json.dumps({"input_data": [[0.1, 0.2]]}) + "\n\n"
+            + json.dumps({"input_data": [[0.3, 0.4]], "prefer_gpu": False}) + "\n"
+        )
+        
+        payloads = load_replay(str(path))
+        
+        assert len(payloads) == 2
+        assert json.loads(payloads[1].body)["prefer_gpu"] is False
+        assert payloads[0].headers["Content-Type"] == "application/json"
+    
+    def test_load_binary(self, tmp_path):
+        """Test that lines can be converted to the binary wire format."""
+        path = tmp_path / "requests.jsonl"
+        path.write_text(json.dumps({"input_data": [[0.1, 0.2]], "prefer_gpu": False, "min_precision": "fp32"}) + "\n")
+        
+        payload = load_replay(str(path), encode=encode_binary_input)[0]
+        
+        assert len(payload.body) == 8
+        assert payload.headers["X-Tensor-Shape"] == "1,2"
+        assert payload.headers["X-Prefer-GPU"] == "false"
+        assert payload.headers["X-Min-Precision"] == "fp32"
+    
+    def test_invalid_line(self, tmp_path):
+        """Test that malformed lines are reported with their line number."""
+        path = tmp_path / "requests.jsonl"
+        path.write_text('{"prefer_gpu": true}\n')
+        
+        with pytest.raises(ValueError, match=":1:"):
+            load_replay(str(path))
+
+
+class TestLoadGenerator:
+    """Test cases for closed-loop and open-loop runs."""
+    
+    def test_closed_loop_fixed_concurrency(self):
+        """Test that closed loop keeps exactly the configured requests in flight."""
+        server = FakeServer(delay_s=0.005)
+        generator = LoadGenerator("http://test", [json_payload([[0.0]])], send=server.send)
+        
+        report = generator.run_closed_loop(concurrency=4, requests=40)
+        
+        assert report.sent == 40
+        assert report.succeeded == 40
+        assert server.calls == 40
+        assert server.max_in_flight == 4
+        assert report.client_latency_ms["p50"] >= 5.0
+        assert report.server_latency_ms["p50"] == pytest.approx(2.5)
+    
+    def test_closed_loop_duration(self):
+        """Test that closed loop stops after the duration."""
+        server = FakeServer(delay_s=0.002)
+        generator = LoadGenerator("http://test", [json_payload([[0.0]])], send=server.send)
+        
+        report = generator.run_closed_loop(concurrency=2, duration_s=0.1)
+        
+        assert report.sent > 0
+        assert report.duration_s < 1.0
+    
+    def test_open_loop_rate(self):
+        """Test that open loop sends at the target rate regardless of completions."""
+        server = FakeServer(delay_s=0.05)
+        generator = LoadGenerator("http://test", [json_payload([[0.0]])], send=server.send)
+        
+        report = generator.run_open_loop(rps=200.0, requests=40, seed=3)
+        
+        assert report.sent == 40
+        # 50 ms service time at 200 req/s means ~10 requests overlap
+        assert server.max_in_flight > 2
+        assert report.throughput_rps > 50.0
+    
+    def test_open_loop_counts_queueing(self):
+        """Test that open-loop latency includes waiting for a free sender."""
+        server = FakeServer(delay_s=0.02)
+        generator = LoadGenerator("http://test", [json_payload([[0.0]])], send=server.send)
+        
+        report = generator.run_open_loop(rps=1000.0, requests=20, max_in_flight=1, seed=0)
+        
+        # With one sender the last request waits for all the others
+        assert report.client_latency_ms["max"] >= 20 * 20.0 * 0.8
+    
+    def test_failures_reported(self):
+        """Test that failed requests are counted and excluded from latency stats."""
+        server = FakeServer(delay_s=0.0, fail_every=4)
+        generator = LoadGenerator("http://test", [json_payload([[0.0]])], send=server.send)
+        
+        report = generator.run_closed_loop(concurrency=1, requests=20)
+        
+        assert report.failed == 5
+        assert report.succeeded == 15
+        assert report.errors == {"RuntimeError: boom": 5}
+        assert "LOAD TEST RESULTS" in report.format()
+    
+    def test_payloads_round_robin(self):
+        """Test that payloads are used in turn."""
+        seen = []
+        payloads = [Payload(b"a", {}), Payload(b"b", {})]
+        generator = LoadGenerator("http://test", payloads, send=lambda payload: seen.append(payload.body))
+        
+        generator.run_closed_loop(concurrency=1, requests=4)
+        
+        assert seen == [b"a", b"b", b"a", b"b"]
+    
+    def test_requires_payloads(self):
+        """Test that an empty payload list is rejected."""
+        with pytest.raises(ValueError):
+            LoadGenerator("http://test", [])
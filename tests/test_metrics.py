@@ -0,0 +1,87 @@
+"""
+Tests for Prometheus metrics aggregation.
+"""
+
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.metrics import Histogram, MetricsRegistry, batch_size_bucket
+from server.telemetry import TelemetryCollector
+
+
+def make_telemetry(device="cpu", **spans):
+    """Create a stopped collector with the given spans in seconds."""
+    telemetry = TelemetryCollector()
+    telemetry.start()
+    telemetry.set_device(device)
+    telemetry.add_spans(spans)
+    telemetry.stop()
+    return telemetry
+
+
+class TestBatchSizeBucket:
+    """Test cases for batch size bucketing."""
+    
+    @pytest.mark.parametrize("batch_size,bucket", [
+        (1, "1"), (2, "2-4"), (4, "2-4"), (5, "5-16"), (64, "17-64"), (256, "65-256"), (1000, "257+"),
+    ])
+    def test_buckets(self, batch_size, bucket):
+        """Test that batch sizes map to bounded labels."""
+        assert batch_size_bucket(batch_size) == bucket
+
+
+class TestHistogram:
+    """Test cases for Histogram."""
+    
+    def test_observe(self):
+        """Test that observations land in cumulative buckets."""
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(5.65)
+        assert histogram.cumulative_counts() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+
+
+class TestMetricsRegistry:
+    """Test cases for MetricsRegistry."""
+    
+    def test_stage_histograms_by_device_and_batch(self):
+        """Test that spans are aggregated per stage, device and batch bucket."""
+        registry = MetricsRegistry()
+        registry.observe(make_telemetry("cpu", forward=0.002, parse=0.0001), batch_size=8)
+        registry.observe(make_telemetry("cpu", forward=0.003), batch_size=10)
+        registry.observe(make_telemetry("cuda:0", forward=0.001), batch_size=8)
+        
+        cpu_forward = registry.stage_histogram("forward", "cpu", 8)
+        assert cpu_forward.count == 2
+        assert cpu_forward.sum == pytest.approx(0.005)
+        assert registry.stage_histogram("forward", "cuda:0", 8).count == 1
+        assert registry.stage_histogram("forward", "cpu", 1).count == 0
+    
+    def test_render_prometheus_text(self):
+        """Test the text exposition format."""
+        registry = MetricsRegistry(buckets=(0.001, 0.01))
+        registry.observe(make_telemetry("cpu", forward=0.002), batch_size=1)
+        registry.observe_error("cpu")
+        
+        text = registry.render()
+        
+        assert "# TYPE inference_stage_seconds histogram" in text
+        assert 'inference_stage_seconds_bucket{stage="forward",device="cpu",batch_size="1",le="0.001"} 0' in text
+        assert 'inference_stage_seconds_bucket{stage="forward",device="cpu",batch_size="1",le="0.01"} 1' in text
+        assert 'inference_stage_seconds_bucket{stage="forward",device="cpu",batch_size="1",le="+Inf"} 1' in text
+        assert 'inference_stage_seconds_count{stage="forward",device="cpu",batch_size="1"} 1' in text
+        assert 'inference_request_seconds_count{device="cpu",batch_size="1"} 1' in text
+        assert 'inference_request_errors_total{device="cpu"} 1' in text
+        assert text.endswith("\n")
+    
+    def test_render_empty(self):
+        """Test that an empty registry still renders metric metadata."""
+        text = MetricsRegistry().render()
+        assert "# TYPE inference_request_seconds histogram" in text
@@ -0,0 +1,101 @@
+"""
+Tests for numeric precision modes.
+"""
+
+import pytest
+import torch
+import torch.nn as nn
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.models import precision
+from server.models.simple_model import create_model
+
+
+@pytest.fixture
+def model():
+    """Create a seeded fp32 model on CPU."""
+    torch.manual_seed(0)
+    return create_model(device="cpu")
+
+
+class TestApplyPrecision:
+    """Test cases for converting models between precisions."""
+    
+    def test_fp32_is_identity(self, model):
+        """Test that fp32 returns the model itself."""
+        assert precision.apply_precision(model, "fp32", "cpu") is model
+    
+    def test_bf16_returns_float32(self, model):
+        """Test that bf16 autocast keeps float32 inputs and outputs."""
+        converted = precision.apply_precision(model, "bf16", "cpu")
+        
+        with torch.no_grad():
+            output = converted(torch.randn(4, 128))
+        
+        assert isinstance(converted, precision.AutocastModule)
+        assert output.dtype == torch.float32
+        assert output.shape == (4, 64)
+    
+    def test_int8_quantizes_linear_layers(self, model):
+        """Test that int8-dynamic replaces every linear layer and leaves the source intact."""
+        converted = precision.apply_precision(model, "int8-dynamic", "cpu")
+        
+        assert not any(type(m) is nn.Linear for m in converted.modules())
+        assert all(type(m) is nn.Linear for m in (model.fc1, model.fc2, model.fc3))
+    
+    def test_int8_rejected_on_gpu(self, model):
+        """Test that int8-dynamic is refused on devices without kernels for it."""
+        with pytest.raises(ValueError):
+            precision.apply_precision(model, "int8-dynamic", "cuda:0")
+    
+    def test_unknown_precision(self, model):
+        """Test that unknown precisions are rejected."""
+        with pytest.raises(ValueError):
+            precision.apply_precision(model, "fp16", "cpu")
+    
+    def test_create_model_with_precision(self):
+        """Test that create_model applies the requested precision."""
+        model = create_model(device="cpu", precision="bf16")
+        assert isinstance(model, precision.AutocastModule)
+
+
+class TestResolvePrecision:
+    """Test cases for choosing the precision a request runs at."""
+    
+    def test_ordering(self):
+        """Test that precisions are ranked by fidelity."""
+        assert precision.rank("int8-dynamic") < precision.rank("bf16") < precision.rank("fp32")
+    
+    def test_configured_precision_without_minimum(self):
+        """Test that the configured precision is used when no minimum is given."""
+        assert precision.resolve_precision("int8-dynamic", None, "cpu") == "int8-dynamic"
+    
+    def test_minimum_raises_precision(self):
+        """Test that a higher minimum wins over the configured precision."""
+        assert precision.resolve_precision("int8-dynamic", "bf16", "cpu") == "bf16"
+        assert precision.resolve_precision("bf16", "int8-dynamic", "cpu") == "bf16"
+    
+    def test_unsupported_precision_steps_up(self):
+        """Test that int8-dynamic on a GPU is served at the next precision up."""
+        assert precision.resolve_precision("int8-dynamic", None, "cuda:0") == "bf16"
+
+
+class TestAccuracy:
+    """Test cases for accuracy against fp32."""
+    
+    def test_fp32_has_no_error(self, model):
+        """Test that fp32 compared with itself is exact."""
+        result = precision.compare_to_fp32(model, "fp32")
+        assert result["max_abs_error"] == 0.0
+    
+    @pytest.mark.parametrize("mode,tolerance", [("bf16", 0.05), ("int8-dynamic", 0.05)])
+    def test_reduced_precision_close_to_fp32(self, model, mode, tolerance):
+        """Test that reduced precisions stay within a small relative error of fp32."""
+        result = precision.compare_to_fp32(model, mode)
+        
+        assert 0.0 < result["relative_error"] < tolerance
+        assert result["mean_abs_error"] <= result["max_abs_error"]
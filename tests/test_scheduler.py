@@ -11,6 +11,27 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from server.scheduler import Scheduler
+from server.device_monitor import DeviceBackend, DeviceState, DeviceStateSampler
+
+
+class FakeDeviceBackend(DeviceBackend):
+    """Device backend that reports fixed free memory and counts queries."""
+    
+    def __init__(self, free_memory_mb=(8000.0,), available=True):
+        self.free_memory_mb = free_memory_mb
+        self.available = available
+        self.samples = 0
+    
+    def is_available(self):
+        return self.available
+    
+    def device_count(self):
+        return len(self.free_memory_mb)
+    
+    def sample(self, index):
+        self.samples += 1
+        free = self.free_memory_mb[index]
+        return DeviceState(f"cuda:{index}", 16000.0, free, 16000.0 - free)
 
 
 class TestScheduler:
@@ -108,3 +129,49 @@ class TestScheduler:
         
         # All should be CPU when prefer_gpu=False
         assert all(d == "cpu" for d in devices)
+
+
+class TestSchedulerWithSampler:
+    """Test cases for scheduling from sampled device state."""
+    
+    def test_schedule_gpu_from_snapshot(self):
+        """Test that GPU routing uses the sampled free memory."""
+        sampler = DeviceStateSampler(backend=FakeDeviceBackend(free_memory_mb=(8000.0,)))
+        scheduler = Scheduler(sampler=sampler)
+        
+        assert scheduler.is_gpu_available()
+        assert scheduler.get_gpu_memory_free_mb("cuda:0") == 8000.0
+        assert scheduler.schedule(prefer_gpu=True, min_gpu_memory_mb=100.0) == "cuda:0"
+    
+    def test_schedule_falls_back_on_low_sampled_memory(self):
+        """Test that low sampled free memory routes to CPU."""
+        sampler = DeviceStateSampler(backend=FakeDeviceBackend(free_memory_mb=(50.0,)))
+        scheduler = Scheduler(sampler=sampler)
+        
+        assert scheduler.schedule(prefer_gpu=True, min_gpu_memory_mb=100.0) == "cpu"
+    
+    def test_schedule_makes_no_driver_calls(self):
+        """Test that scheduling only reads the published snapshot."""
+        backend = FakeDeviceBackend()
+        scheduler = Scheduler(sampler=DeviceStateSampler(backend=backend))
+        samples = backend.samples
+        
+        for _ in range(10):
+            scheduler.schedule(prefer_gpu=True)
+        
+        assert backend.samples == samples
+    
+    def test_unknown_device_has_no_memory(self):
+        """Test that devices missing from the snapshot report no free memory."""
+        scheduler = Scheduler(sampler=DeviceStateSampler(backend=FakeDeviceBackend()))
+        
+        assert scheduler.get_gpu_memory_free_mb("cuda:3") is None
+        assert scheduler.get_gpu_memory_free_mb("invalid") is None
+    
+    def test_cpu_only_sampler(self):
+        """Test that a CPU-only sampler always schedules to CPU."""
+        backend = FakeDeviceBackend(free_memory_mb=(), available=False)
+        scheduler = Scheduler(sampler=DeviceStateSampler(backend=backend))
+        
+        assert not scheduler.is_gpu_available()
+        assert scheduler.schedule(prefer_gpu=True) == "cpu"
@@ -15,6 +15,8 @@ import server.server as server_module
 from server.scheduler import Scheduler
 from server.executor import Executor
 from server.models.simple_model import create_model
+from server import wire
+from server.batching import MicroBatcher
 
 
 @pytest.fixture
@@ -62,6 +64,7 @@ class TestHealthEndpoint:
         assert data["status"] == "ready"
         assert "cuda_available" in data
         assert "current_device" in data
+        assert data["model_backend"] == "eager"
     
     def test_health_check_structure(self, client):
         """Test health check response structure."""
@@ -79,6 +82,38 @@ class TestHealthEndpoint:
             pass
 
 
+class TestMetricsEndpoint:
+    """Test cases for /metrics endpoint."""
+    
+    def test_metrics_after_predict(self, client):
+        """Test that a request's stages show up in the Prometheus output."""
+        server_module.metrics_registry = server_module.MetricsRegistry()
+        response = client.post("/predict", json={"input_data": [[0.1] * 128] * 3, "prefer_gpu": False})
+        assert response.status_code == 200
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        for stage in ("read_body", "parse", "tensor_build", "schedule", "h2d_copy", "forward", "d2h_copy", "serialize"):
+            assert f'inference_stage_seconds_count{{stage="{stage}",device="cpu",batch_size="2-4"}} 1' in text
+        assert 'inference_request_seconds_count{device="cpu",batch_size="2-4"} 1' in text
+    
+    def test_metrics_binary_request(self, client):
+        """Test that binary requests record a parse stage without tensor_build."""
+        server_module.metrics_registry = server_module.MetricsRegistry()
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(torch.randn(1, 128)),
+            headers={"Content-Type": "application/octet-stream", "X-Tensor-Shape": "1,128", "X-Prefer-GPU": "false"},
+        )
+        assert response.status_code == 200
+        
+        text = client.get("/metrics").text
+        assert 'inference_stage_seconds_count{stage="parse",device="cpu",batch_size="1"} 1' in text
+        assert 'stage="tensor_build"' not in text
+
+
 class TestPredictEndpoint:
     """Test cases for /predict endpoint."""
     
@@ -202,3 +237,223 @@ class TestPredictEndpoint:
             data = response.json()
             assert "output" in data
             assert len(data["output"]) == 1
+
+
+class TestPredictBinary:
+    """Test cases for the binary wire format on /predict."""
+    
+    def test_predict_raw_request_and_response(self, client):
+        """Test a raw float32 request gets a raw float32 response."""
+        input_tensor = torch.randn(4, 128)
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(input_tensor),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Tensor-Shape": "4,128",
+                "X-Prefer-GPU": "false",
+            },
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert response.headers["X-Tensor-Shape"] == "4,64"
+        assert response.headers["X-Device"] == "cpu"
+        assert float(response.headers["X-Latency-Ms"]) >= 0
+        
+        output = wire.decode_raw(response.content, response.headers["X-Tensor-Shape"])
+        expected = server_module.executor.execute(input_tensor, device="cpu")
+        assert torch.allclose(output, expected, atol=1e-6)
+    
+    def test_predict_npy_request_and_response(self, client):
+        """Test a .npy request gets a .npy response."""
+        input_tensor = torch.randn(2, 128)
+        response = client.post(
+            "/predict",
+            content=wire.encode_npy(input_tensor),
+            headers={"Content-Type": "application/x-npy", "X-Prefer-GPU": "false"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-npy"
+        assert wire.decode_npy(response.content).shape == (2, 64)
+    
+    def test_predict_json_request_binary_response(self, client):
+        """Test the Accept header selects a binary response for JSON input."""
+        response = client.post(
+            "/predict",
+            json={"input_data": [[0.1] * 128], "prefer_gpu": False},
+            headers={"Accept": "application/octet-stream"},
+        )
+        assert response.status_code == 200
+        assert response.headers["X-Tensor-Shape"] == "1,64"
+        assert len(response.content) == 64 * 4
+    
+    def test_predict_binary_request_json_response(self, client):
+        """Test a binary request can ask for a JSON response."""
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(torch.randn(1, 128)),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Tensor-Shape": "1,128",
+                "X-Prefer-GPU": "false",
+                "Accept": "application/json",
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["output"]) == 1
+        assert len(data["output"][0]) == 64
+        assert data["device"] == "cpu"
+    
+    def test_predict_ragged_rows(self, client):
+        """Test that rows of different lengths are rejected with the reason."""
+        server_module.metrics_registry = server_module.MetricsRegistry()
+        response = client.post(
+            "/predict", json={"input_data": [[1.0] * 128, [1.0] * 3], "prefer_gpu": False}
+        )
+        assert response.status_code == 400
+        assert "Invalid input_data" in response.json()["detail"]
+        
+        # Like other malformed bodies, not an execution error
+        text = client.get("/metrics").text
+        assert "inference_request_errors_total{" not in text
+    
+    def test_predict_raw_missing_shape(self, client):
+        """Test a raw request without a shape header is rejected."""
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(torch.randn(1, 128)),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == 400
+    
+    def test_predict_raw_shape_mismatch(self, client):
+        """Test a raw request whose body does not match its shape is rejected."""
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(torch.randn(1, 128)),
+            headers={"Content-Type": "application/octet-stream", "X-Tensor-Shape": "2,128"},
+        )
+        assert response.status_code == 400
+    
+    def test_predict_unsupported_content_type(self, client):
+        """Test an unsupported content type is rejected."""
+        response = client.post(
+            "/predict",
+            content=b"input",
+            headers={"Content-Type": "text/plain"},
+        )
+        assert response.status_code == 415
+
+
+class TestPredictMicroBatching:
+    """Test cases for /predict with micro-batching enabled."""
+    
+    @pytest.fixture(autouse=True)
+    def enable_batching(self):
+        """Enable micro-batching on the server module."""
+        server_module.batcher = MicroBatcher(server_module.executor, max_batch_rows=8, max_wait_ms=1.0)
+        yield
+        server_module.batcher = None
+    
+    def test_predict_reports_queue_wait(self, client):
+        """Test that batched responses include their queue wait."""
+        response = client.post("/predict", json={"input_data": [[0.1] * 128], "prefer_gpu": False})
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["output"]) == 1
+        assert data["queue_wait_ms"] >= 0
+    
+    def test_batched_request_records_batch_stages(self, client):
+        """Test that batched requests get the shared forward pass spans."""
+        server_module.metrics_registry = server_module.MetricsRegistry()
+        response = client.post("/predict", json={"input_data": [[0.1] * 128], "prefer_gpu": False})
+        assert response.status_code == 200
+        
+        text = client.get("/metrics").text
+        for stage in ("queue_wait", "h2d_copy", "forward", "d2h_copy"):
+            assert f'inference_stage_seconds_count{{stage="{stage}",device="cpu",batch_size="1"}} 1' in text
+    
+    def test_predict_binary_reports_queue_wait(self, client):
+        """Test that binary responses carry the queue wait header."""
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(torch.randn(2, 128)),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Tensor-Shape": "2,128",
+                "X-Prefer-GPU": "false",
+            },
+        )
+        assert response.status_code == 200
+        assert float(response.headers["X-Queue-Wait-Ms"]) >= 0
+
+
+class TestPredictPrecision:
+    """Test cases for per-request minimum precision on /predict."""
+    
+    @pytest.fixture(autouse=True)
+    def int8_executor(self):
+        """Serve an int8-dynamic executor by default."""
+        server_module.executor = Executor(create_model(device="cpu"), device="cpu", precision="int8-dynamic")
+    
+    def test_predict_uses_configured_precision(self, client):
+        """Test that requests without a minimum run at the configured precision."""
+        response = client.post("/predict", json={"input_data": [[0.1] * 128], "prefer_gpu": False})
+        assert response.status_code == 200
+        assert response.json()["precision"] == "int8-dynamic"
+    
+    def test_predict_min_precision_raises_precision(self, client):
+        """Test that a request can ask for a higher precision than configured."""
+        input_data = [[0.1] * 128]
+        response = client.post(
+            "/predict",
+            json={"input_data": input_data, "prefer_gpu": False, "min_precision": "fp32"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["precision"] == "fp32"
+        
+        with torch.no_grad():
+            expected = server_module.executor.model(torch.tensor(input_data))
+        assert torch.allclose(torch.tensor(data["output"]), expected, atol=1e-6)
+    
+    def test_predict_invalid_min_precision(self, client):
+        """Test that unknown precisions are rejected with a validation error."""
+        response = client.post(
+            "/predict",
+            json={"input_data": [[0.1] * 128], "min_precision": "fp8"},
+        )
+        assert response.status_code == 422
+    
+    def test_predict_binary_min_precision_header(self, client):
+        """Test that binary requests state their minimum precision in a header."""
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(torch.randn(1, 128)),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Tensor-Shape": "1,128",
+                "X-Prefer-GPU": "false",
+                "X-Min-Precision": "bf16",
+            },
+        )
+        assert response.status_code == 200
+        assert response.headers["X-Precision"] == "bf16"
+    
+    def test_predict_binary_invalid_min_precision_header(self, client):
+        """Test that an unknown precision header is rejected."""
+        response = client.post(
+            "/predict",
+            content=wire.encode_raw(torch.randn(1, 128)),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Tensor-Shape": "1,128",
+                "X-Min-Precision": "fp8",
+            },
+        )
+        assert response.status_code == 400
+    
+    def test_health_reports_precision(self, client):
+        """Test that /health reports the configured precision."""
+        assert client.get("/health").json()["model_precision"] == "int8-dynamic"
@@ -12,6 +12,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from server.telemetry import TelemetryCollector
+from server.device_monitor import DeviceBackend, DeviceState, DeviceStateSampler
 
 
 class TestTelemetryCollector:
@@ -165,3 +166,85 @@ class TestTelemetryCollector:
         # Both should have positive latency
         assert latency1 > 0
         assert latency2 > 0
+    
+    def test_queue_wait_reported(self):
+        """Test that queue wait is included once set."""
+        telemetry = TelemetryCollector()
+        telemetry.set_device("cpu")
+        assert "queue_wait_ms" not in telemetry.to_dict()
+        
+        telemetry.set_queue_wait_ms(1.23456)
+        assert telemetry.to_dict()["queue_wait_ms"] == 1.235
+
+
+class TestTelemetrySpans:
+    """Test cases for stage spans."""
+    
+    def test_end_span_records_and_chains(self):
+        """Test that consecutive spans chain from each other's end time."""
+        telemetry = TelemetryCollector()
+        
+        started = telemetry.start_span()
+        time.sleep(0.002)
+        started = telemetry.end_span("parse", started)
+        time.sleep(0.001)
+        telemetry.end_span("forward", started)
+        
+        assert telemetry.spans["parse"] >= 0.002
+        assert telemetry.spans["forward"] >= 0.001
+        assert set(telemetry.get_spans_ms()) == {"parse", "forward"}
+    
+    def test_spans_accumulate(self):
+        """Test that repeated stages add up."""
+        telemetry = TelemetryCollector()
+        telemetry.add_spans({"forward": 0.001})
+        telemetry.add_spans({"forward": 0.002})
+        
+        assert telemetry.spans["forward"] == pytest.approx(0.003)
+    
+    def test_queue_wait_recorded_as_span(self):
+        """Test that queue wait also shows up as a stage."""
+        telemetry = TelemetryCollector()
+        telemetry.set_queue_wait_ms(2.0)
+        
+        assert telemetry.spans["queue_wait"] == pytest.approx(0.002)
+    
+    def test_span_overhead_under_a_microsecond(self):
+        """Test that recording a span costs less than a microsecond."""
+        telemetry = TelemetryCollector()
+        iterations = 100_000
+        best = float("inf")
+        for _ in range(5):
+            started = telemetry.start_span()
+            begin = time.perf_counter()
+            for _ in range(iterations):
+                started = telemetry.end_span("stage", started)
+            best = min(best, (time.perf_counter() - begin) / iterations)
+        
+        assert best < 1e-6
+
+
+class TestTelemetryWithSampler:
+    """Test cases for telemetry backed by a device sampler."""
+    
+    def test_gpu_memory_from_snapshot(self):
+        """Test that GPU memory is read from the sampled snapshot."""
+        class FakeDeviceBackend(DeviceBackend):
+            def is_available(self):
+                return True
+            
+            def device_count(self):
+                return 1
+            
+            def sample(self, index):
+                return DeviceState(f"cuda:{index}", 16000.0, 12000.0, 4000.0)
+        
+        telemetry = TelemetryCollector(sampler=DeviceStateSampler(backend=FakeDeviceBackend()))
+        telemetry.start()
+        telemetry.set_device("cuda:0")
+        telemetry.stop()
+        
+        assert telemetry.get_gpu_memory_mb("cuda:0") == 4000.0
+        assert telemetry.get_free_gpu_memory_mb("cuda:0") == 12000.0
+        assert telemetry.get_gpu_memory_mb("cuda:1") is None
+        assert telemetry.to_dict()["gpu_memory_mb"] == 4000.0
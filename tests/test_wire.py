@@ -0,0 +1,117 @@
+"""
+Tests for the binary tensor wire format.
+"""
+
+import pytest
+import struct
+import torch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server import wire
+
+
+class TestShapeHeader:
+    """Test cases for shape header parsing."""
+    
+    def test_parse_shape(self):
+        """Test parsing comma and x separated shapes."""
+        assert wire.parse_shape("32,128") == (32, 128)
+        assert wire.parse_shape("4x8") == (4, 8)
+        assert wire.parse_shape(" 2 , 3 ") == (2, 3)
+    
+    def test_parse_shape_invalid(self):
+        """Test that malformed shapes are rejected."""
+        for value in (None, "", "a,b", "-1,4"):
+            with pytest.raises(wire.WireFormatError):
+                wire.parse_shape(value)
+    
+    def test_format_shape(self):
+        """Test formatting a shape for the header."""
+        assert wire.format_shape(torch.Size([3, 64])) == "3,64"
+
+
+class TestRawFormat:
+    """Test cases for raw little-endian float32 bodies."""
+    
+    def test_decode_raw(self):
+        """Test decoding a raw body into a tensor."""
+        body = struct.pack("<6f", 0, 1, 2, 3, 4, 5)
+        tensor = wire.decode_tensor(body, "application/octet-stream", "2,3")
+        
+        assert tensor.dtype == torch.float32
+        assert tensor.shape == (2, 3)
+        assert tensor.tolist() == [[0, 1, 2], [3, 4, 5]]
+    
+    def test_decode_raw_size_mismatch(self):
+        """Test that a body not matching the shape is rejected."""
+        body = struct.pack("<4f", 0, 1, 2, 3)
+        with pytest.raises(wire.WireFormatError):
+            wire.decode_raw(body, "2,3")
+    
+    def test_raw_roundtrip(self):
+        """Test encoding then decoding a tensor."""
+        tensor = torch.randn(5, 7)
+        body = wire.encode_raw(tensor)
+        
+        assert len(body) == 5 * 7 * 4
+        decoded = wire.decode_raw(body, wire.format_shape(tensor.shape))
+        assert torch.equal(decoded, tensor)
+    
+    def test_encode_non_contiguous(self):
+        """Test encoding a non-contiguous view."""
+        tensor = torch.arange(12, dtype=torch.float32).reshape(3, 4)[:, 1:3]
+        decoded = wire.decode_raw(wire.encode_raw(tensor), "3,2")
+        assert torch.equal(decoded, tensor)
+
+
+class TestNpyFormat:
+    """Test cases for .npy bodies."""
+    
+    def test_npy_roundtrip(self):
+        """Test encoding then decoding a .npy body."""
+        tensor = torch.randn(3, 128)
+        body = wire.encode_npy(tensor)
+        
+        assert body.startswith(b"\x93NUMPY")
+        # Header is padded so data is 64-byte aligned
+        header_len = struct.unpack("<H", body[8:10])[0]
+        assert (10 + header_len) % 64 == 0
+        assert torch.equal(wire.decode_npy(body), tensor)
+    
+    def test_npy_one_dimensional(self):
+        """Test a 1-D array header."""
+        tensor = torch.arange(4, dtype=torch.float32)
+        assert torch.equal(wire.decode_npy(wire.encode_npy(tensor)), tensor)
+    
+    def test_npy_rejects_other_dtypes(self):
+        """Test that non-float32 arrays are rejected."""
+        body = wire.encode_npy(torch.zeros(2, 2)).replace(b"<f4", b"<f8")
+        with pytest.raises(wire.WireFormatError):
+            wire.decode_npy(body)
+    
+    def test_npy_rejects_garbage(self):
+        """Test that non-npy bodies are rejected."""
+        with pytest.raises(wire.WireFormatError):
+            wire.decode_npy(b"not a numpy file")
+
+
+class TestNegotiation:
+    """Test cases for response content negotiation."""
+    
+    def test_explicit_accept_wins(self):
+        """Test that an explicit Accept header selects the format."""
+        assert wire.negotiate_response_type("application/x-npy", "application/json") == \
+            "application/x-npy"
+        assert wire.negotiate_response_type("application/json", "application/octet-stream") == \
+            "application/json"
+    
+    def test_defaults_to_request_format(self):
+        """Test that the response mirrors the request format by default."""
+        assert wire.negotiate_response_type("*/*", "application/octet-stream") == \
+            "application/octet-stream"
+        assert wire.negotiate_response_type(None, "application/json") == "application/json"
+        assert wire.negotiate_response_type(None, None) == "application/json"